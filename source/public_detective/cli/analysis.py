@@ -19,10 +19,13 @@ from public_detective.providers.http import HttpProvider
 from public_detective.providers.pubsub import PubSubProvider
 from public_detective.repositories.analyses import AnalysisRepository
 from public_detective.repositories.budget_ledgers import BudgetLedgerRepository
+from public_detective.repositories.file_contents import FileContentsRepository
 from public_detective.repositories.file_records import FileRecordsRepository
+from public_detective.repositories.pre_analysis_checkpoints import PreAnalysisCheckpointRepository
 from public_detective.repositories.procurements import ProcurementsRepository
 from public_detective.repositories.source_documents import SourceDocumentsRepository
 from public_detective.repositories.status_histories import StatusHistoryRepository
+from public_detective.repositories.token_counts import TokenCountsRepository
 from public_detective.services.analysis import AnalysisService
 from rich.progress import BarColumn, Progress, TaskProgressColumn, TextColumn, TimeRemainingColumn
 
@@ -143,6 +146,17 @@ def run(ctx: click.Context, analysis_id: UUID) -> None:
     default=None,
     help="Maximum number of messages to publish. If None, publishes all found.",
 )
+@click.option(
+    "--workers",
+    type=click.IntRange(min=1),
+    default=1,
+    help="Number of processes pre-analyzing procurements in parallel.",
+)
+@click.option(
+    "--resume",
+    is_flag=True,
+    help="Continue a previous run over the same date range from its last checkpoint.",
+)
 @click.option("--no-progress", is_flag=True, help="Disable the progress bar.")
 @click.pass_context
 def prepare(
@@ -153,6 +167,8 @@ def prepare(
     batch_size: int,
     sleep_seconds: int,
     max_messages: int | None,
+    workers: int,
+    resume: bool,
     no_progress: bool,
 ) -> None:
     """Scans for new procurements and prepares them for analysis.
@@ -165,6 +181,8 @@ def prepare(
         batch_size: Number of procurements to process in each batch.
         sleep_seconds: Seconds to sleep between batches.
         max_messages: Maximum number of messages to publish.
+        workers: Number of processes pre-analyzing procurements in parallel.
+        resume: Whether to continue from the checkpoint of a previous run.
         no_progress: Whether to disable the progress bar.
     """
     start_date_is_default = ctx.get_parameter_source("start_date") == ParameterSource.DEFAULT
@@ -173,6 +191,8 @@ def prepare(
     if pncp_control_number:
         if not start_date_is_default or not end_date_is_default:
             raise click.UsageError("The --pncp-control-number option cannot be used with --start-date or --end-date.")
+        if resume:
+            raise click.UsageError("The --pncp-control-number option cannot be used with --resume.")
     elif start_date.date() > end_date.date():
         raise click.BadParameter("Start date cannot be after end date. Please provide a valid date range.")
 
@@ -191,6 +211,7 @@ def prepare(
     )
     status_history_repo = StatusHistoryRepository(engine=db_engine)
     budget_ledger_repo = BudgetLedgerRepository(engine=db_engine)
+    pre_analysis_checkpoint_repo = PreAnalysisCheckpointRepository(engine=db_engine)
 
     service = AnalysisService(
         procurement_repo=procurement_repo,
@@ -204,6 +225,9 @@ def prepare(
         http_provider=http_provider,
         pubsub_provider=pubsub_provider,
         gcs_path_prefix=gcs_path_prefix,
+        pre_analysis_checkpoint_repo=pre_analysis_checkpoint_repo,
+        file_content_repo=FileContentsRepository(engine=db_engine),
+        token_count_repo=TokenCountsRepository(engine=db_engine),
     )
 
     try:
@@ -219,6 +243,8 @@ def prepare(
                 batch_size=batch_size,
                 sleep_seconds=sleep_seconds,
                 max_messages=max_messages,
+                resume=resume,
+                workers=workers,
             )
 
         if not should_show_progress(no_progress):
@@ -235,6 +261,7 @@ def prepare(
                 days_task_id = None
                 procurements_task_id = None
                 pages_task_id = None
+                procurements_total = 0
 
                 for event, data in event_generator:
                     if event == "day_started":
@@ -253,6 +280,10 @@ def prepare(
                         if procurements_task_id is not None:
                             progress.remove_task(procurements_task_id)
                         procurements_task_id = None
+                        if pages_task_id is not None:
+                            progress.remove_task(pages_task_id)
+                        pages_task_id = None
+                        procurements_total = 0
 
                     elif event == "fetching_pages_started":
                         modality_name, total_pages = data
@@ -268,16 +299,13 @@ def prepare(
                             progress.update(pages_task_id, advance=1)
 
                     elif event == "procurements_fetched":
-                        if pages_task_id is not None:
-                            progress.remove_task(pages_task_id)
-                        pages_task_id = None
-
-                        procurements_for_the_day = data
-                        if procurements_for_the_day:
-                            procurements_task_id = progress.add_task(
-                                f"  -> Processing {len(procurements_for_the_day)} procurements",
-                                total=len(procurements_for_the_day),
-                            )
+                        if data:
+                            procurements_total += len(data)
+                            description = f"  -> Processing {procurements_total} procurements"
+                            if procurements_task_id is None:
+                                procurements_task_id = progress.add_task(description, total=procurements_total)
+                            else:
+                                progress.update(procurements_task_id, description=description, total=procurements_total)
 
                     elif event == "procurement_processed":
                         if procurements_task_id is not None:
@@ -355,6 +383,8 @@ def retry(ctx: click.Context, initial_backoff_hours: int, max_retries: int, time
             http_provider=http_provider,
             pubsub_provider=pubsub_provider,
             gcs_path_prefix=gcs_path_prefix,
+            file_content_repo=FileContentsRepository(engine=db_engine),
+            token_count_repo=TokenCountsRepository(engine=db_engine),
         )
 
         retried_count = service.retry_analyses(initial_backoff_hours, max_retries, timeout_hours)
@@ -475,3 +505,51 @@ def rank(
     except Exception as e:
         click.secho(f"An error occurred: {e}", fg="red")
         raise click.Abort()
+
+
+@analysis_group.command("gc-contents")
+@click.option(
+    "--min-idle-days",
+    type=click.IntRange(min=1),
+    default=30,
+    help="Only delete contents unused for at least this many days.",
+    show_default=True,
+)
+@click.pass_context
+def gc_contents(ctx: click.Context, min_idle_days: int) -> None:
+    """Deletes stored file contents that no analysis references anymore.
+
+    Args:
+        ctx: The click context.
+        min_idle_days: Only delete contents unused for at least this many days.
+    """
+    click.echo("Collecting unused file contents...")
+    gcs_path_prefix = ctx.obj.get("gcs_path_prefix")
+
+    try:
+        db_engine = DatabaseManager.get_engine()
+        pubsub_provider = PubSubProvider()
+        http_provider = HttpProvider()
+
+        service = AnalysisService(
+            procurement_repo=ProcurementsRepository(
+                engine=db_engine, pubsub_provider=pubsub_provider, http_provider=http_provider
+            ),
+            analysis_repo=AnalysisRepository(engine=db_engine),
+            source_document_repo=SourceDocumentsRepository(engine=db_engine),
+            file_record_repo=FileRecordsRepository(engine=db_engine),
+            status_history_repo=StatusHistoryRepository(engine=db_engine),
+            budget_ledger_repo=BudgetLedgerRepository(engine=db_engine),
+            ai_provider=AiProvider(Analysis),
+            gcs_provider=GcsProvider(),
+            http_provider=http_provider,
+            pubsub_provider=pubsub_provider,
+            gcs_path_prefix=gcs_path_prefix,
+            file_content_repo=FileContentsRepository(engine=db_engine),
+        )
+
+        deleted_count = service.collect_unused_file_contents(min_idle_days)
+        click.secho(f"Deleted {deleted_count} unused file contents.", fg="green")
+    except Exception as e:
+        click.secho(f"An error occurred: {e}", fg="red")
+        raise click.Abort()
@@ -0,0 +1,33 @@
+"""This module defines custom exceptions related to archive extraction."""
+
+
+class ExtractionLimitError(Exception):
+    """Raised when extracting an archive exceeds the procurement's extraction budget.
+
+    Attributes:
+        limit: The name of the limit that was exceeded: `depth`,
+            `total_bytes`, `members` or `ratio`.
+        message: A description of the violation.
+    """
+
+    limit: str
+    message: str
+
+    def __init__(self, limit: str, message: str) -> None:
+        """Initializes the error.
+
+        Args:
+            limit: The name of the limit that was exceeded.
+            message: A description of the violation.
+        """
+        super().__init__(limit, message)
+        self.limit = limit
+        self.message = message
+
+    def __str__(self) -> str:
+        """Returns the description of the violation.
+
+        Returns:
+            The description of the violation.
+        """
+        return self.message
@@ -0,0 +1,7 @@
+"""This module defines custom exceptions related to the office document converter."""
+
+
+class OfficeServerUnavailableError(RuntimeError):
+    """Raised when no LibreOffice server of the pool can be brought up to run a job."""
+
+    pass
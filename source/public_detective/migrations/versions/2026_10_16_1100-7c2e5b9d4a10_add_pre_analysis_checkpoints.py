@@ -0,0 +1,56 @@
+"""Add pre-analysis checkpoint tables.
+
+Revision ID: 7c2e5b9d4a10
+Revises: 3f6d2a8c1b47
+Create Date: 2026-10-16 11:00:00.000000
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+from public_detective.migrations.helpers import get_qualified_name
+
+revision: str = "7c2e5b9d4a10"
+down_revision: str | None = "3f6d2a8c1b47"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrades the database to the latest version."""
+    checkpoints_table = get_qualified_name("pre_analysis_checkpoints")
+    checkpoint_procurements_table = get_qualified_name("pre_analysis_checkpoint_procurements")
+    op.execute(
+        f"""
+        CREATE TABLE {checkpoints_table} (
+            start_date DATE NOT NULL,
+            end_date DATE NOT NULL,
+            last_completed_date DATE,
+            page_date DATE,
+            city_code INTEGER,
+            modality INTEGER,
+            page INTEGER,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+            PRIMARY KEY (start_date, end_date)
+        );
+        CREATE TABLE {checkpoint_procurements_table} (
+            start_date DATE NOT NULL,
+            end_date DATE NOT NULL,
+            target_date DATE NOT NULL,
+            pncp_control_number TEXT NOT NULL,
+            processed_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+            PRIMARY KEY (start_date, end_date, target_date, pncp_control_number),
+            FOREIGN KEY (start_date, end_date)
+                REFERENCES {checkpoints_table}(start_date, end_date) ON DELETE CASCADE
+        );
+    """
+    )
+
+
+def downgrade() -> None:
+    """Downgrades the database to the previous version."""
+    checkpoints_table = get_qualified_name("pre_analysis_checkpoints")
+    checkpoint_procurements_table = get_qualified_name("pre_analysis_checkpoint_procurements")
+    op.execute(f"DROP TABLE IF EXISTS {checkpoint_procurements_table} CASCADE;")
+    op.execute(f"DROP TABLE IF EXISTS {checkpoints_table} CASCADE;")
@@ -0,0 +1,49 @@
+"""Add EXTRACTION_LIMIT_EXCEEDED exclusion reason.
+
+Revision ID: a4e91c7d2f58
+Revises: 7c2e5b9d4a10
+Create Date: 2026-10-16 12:00:00.000000
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+from public_detective.migrations.helpers import get_qualified_name
+
+revision: str = "a4e91c7d2f58"
+down_revision: str | None = "7c2e5b9d4a10"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrades the database to the latest version."""
+    exclusion_reason_type = get_qualified_name("exclusion_reason")
+    op.execute(f"ALTER TYPE {exclusion_reason_type} ADD VALUE IF NOT EXISTS 'EXTRACTION_LIMIT_EXCEEDED';")
+
+
+def downgrade() -> None:
+    """Downgrades the database to the previous version."""
+    file_records_table = get_qualified_name("file_records")
+    exclusion_reason_type = get_qualified_name("exclusion_reason")
+    previous_exclusion_reason_type = get_qualified_name("exclusion_reason_previous")
+    op.execute(
+        f"""
+        UPDATE {file_records_table}
+            SET exclusion_reason = 'EXTRACTION_FAILED'
+            WHERE exclusion_reason = 'EXTRACTION_LIMIT_EXCEEDED';
+        ALTER TYPE {exclusion_reason_type} RENAME TO exclusion_reason_previous;
+        CREATE TYPE {exclusion_reason_type} AS ENUM (
+            'UNSUPPORTED_EXTENSION',
+            'EXTRACTION_FAILED',
+            'TOKEN_LIMIT_EXCEEDED',
+            'CONVERSION_FAILED',
+            'LOCK_FILE',
+            'FILE_TOO_LARGE'
+        );
+        ALTER TABLE {file_records_table}
+            ALTER COLUMN exclusion_reason TYPE {exclusion_reason_type}
+            USING exclusion_reason::text::{exclusion_reason_type};
+        DROP TYPE {previous_exclusion_reason_type};
+    """
+    )
@@ -0,0 +1,48 @@
+"""Add the content-addressed file store.
+
+Revision ID: b7d3e0f16a92
+Revises: a4e91c7d2f58
+Create Date: 2026-10-16 13:00:00.000000
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+from public_detective.migrations.helpers import get_qualified_name
+
+revision: str = "b7d3e0f16a92"
+down_revision: str | None = "a4e91c7d2f58"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrades the database to the latest version."""
+    file_contents_table = get_qualified_name("file_contents")
+    file_records_table = get_qualified_name("file_records")
+    op.execute(
+        f"""
+        CREATE TABLE {file_contents_table} (
+            content_hash TEXT PRIMARY KEY,
+            extension TEXT NOT NULL,
+            size_bytes BIGINT NOT NULL,
+            original_gcs_path TEXT NOT NULL,
+            prepared_content_gcs_uris TEXT[],
+            inferred_extension TEXT,
+            used_fallback_conversion BOOLEAN NOT NULL DEFAULT FALSE,
+            reference_count INTEGER NOT NULL DEFAULT 0,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+            last_used_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+        );
+        ALTER TABLE {file_records_table} ADD COLUMN content_hash TEXT;
+        CREATE INDEX idx_file_records_content_hash ON {file_records_table} (content_hash);
+    """
+    )
+
+
+def downgrade() -> None:
+    """Downgrades the database to the previous version."""
+    file_contents_table = get_qualified_name("file_contents")
+    file_records_table = get_qualified_name("file_records")
+    op.execute(f"ALTER TABLE {file_records_table} DROP COLUMN IF EXISTS content_hash;")
+    op.execute(f"DROP TABLE IF EXISTS {file_contents_table} CASCADE;")
@@ -0,0 +1,47 @@
+"""Add the persistent token count cache.
+
+Revision ID: c5f2a8e41b97
+Revises: b7d3e0f16a92
+Create Date: 2026-10-16 14:00:00.000000
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+from public_detective.migrations.helpers import get_qualified_name
+
+revision: str = "c5f2a8e41b97"
+down_revision: str | None = "b7d3e0f16a92"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrades the database to the latest version."""
+    token_counts_table = get_qualified_name("token_counts")
+    file_contents_table = get_qualified_name("file_contents")
+    file_records_table = get_qualified_name("file_records")
+    op.execute(
+        f"""
+        CREATE TABLE {token_counts_table} (
+            content_hash TEXT NOT NULL,
+            mime_type TEXT NOT NULL,
+            model TEXT NOT NULL,
+            token_count INTEGER NOT NULL,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+            PRIMARY KEY (content_hash, mime_type, model)
+        );
+        ALTER TABLE {file_contents_table} ADD COLUMN ai_content_hash TEXT;
+        ALTER TABLE {file_records_table} ADD COLUMN ai_content_hash TEXT;
+    """
+    )
+
+
+def downgrade() -> None:
+    """Downgrades the database to the previous version."""
+    token_counts_table = get_qualified_name("token_counts")
+    file_contents_table = get_qualified_name("file_contents")
+    file_records_table = get_qualified_name("file_records")
+    op.execute(f"ALTER TABLE {file_records_table} DROP COLUMN IF EXISTS ai_content_hash;")
+    op.execute(f"ALTER TABLE {file_contents_table} DROP COLUMN IF EXISTS ai_content_hash;")
+    op.execute(f"DROP TABLE IF EXISTS {token_counts_table} CASCADE;")
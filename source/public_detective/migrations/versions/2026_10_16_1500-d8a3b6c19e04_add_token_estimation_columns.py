@@ -0,0 +1,35 @@
+"""Add the columns of local input token estimation.
+
+Revision ID: d8a3b6c19e04
+Revises: c5f2a8e41b97
+Create Date: 2026-10-16 15:00:00.000000
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+from public_detective.migrations.helpers import get_qualified_name
+
+revision: str = "d8a3b6c19e04"
+down_revision: str | None = "c5f2a8e41b97"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrades the database to the latest version."""
+    procurement_analyses_table = get_qualified_name("procurement_analyses")
+    op.execute(
+        f"""
+        ALTER TABLE {procurement_analyses_table} ADD COLUMN estimated_input_tokens INTEGER;
+        ALTER TABLE {procurement_analyses_table}
+            ADD COLUMN input_tokens_estimated BOOLEAN NOT NULL DEFAULT FALSE;
+    """
+    )
+
+
+def downgrade() -> None:
+    """Downgrades the database to the previous version."""
+    procurement_analyses_table = get_qualified_name("procurement_analyses")
+    op.execute(f"ALTER TABLE {procurement_analyses_table} DROP COLUMN IF EXISTS input_tokens_estimated;")
+    op.execute(f"ALTER TABLE {procurement_analyses_table} DROP COLUMN IF EXISTS estimated_input_tokens;")
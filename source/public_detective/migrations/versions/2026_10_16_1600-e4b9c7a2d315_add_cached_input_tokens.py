@@ -0,0 +1,33 @@
+"""Add the cached input tokens of an analysis.
+
+Revision ID: e4b9c7a2d315
+Revises: d8a3b6c19e04
+Create Date: 2026-10-16 16:00:00.000000
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+from public_detective.migrations.helpers import get_qualified_name
+
+revision: str = "e4b9c7a2d315"
+down_revision: str | None = "d8a3b6c19e04"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrades the database to the latest version."""
+    procurement_analyses_table = get_qualified_name("procurement_analyses")
+    op.execute(
+        f"""
+        ALTER TABLE {procurement_analyses_table}
+            ADD COLUMN cached_input_tokens_used INTEGER NOT NULL DEFAULT 0;
+    """
+    )
+
+
+def downgrade() -> None:
+    """Downgrades the database to the previous version."""
+    procurement_analyses_table = get_qualified_name("procurement_analyses")
+    op.execute(f"ALTER TABLE {procurement_analyses_table} DROP COLUMN IF EXISTS cached_input_tokens_used;")
@@ -0,0 +1,33 @@
+"""Add the local token estimate of a stored file content.
+
+Revision ID: f2c6d9b83a41
+Revises: e4b9c7a2d315
+Create Date: 2026-10-16 17:00:00.000000
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+from public_detective.migrations.helpers import get_qualified_name
+
+revision: str = "f2c6d9b83a41"
+down_revision: str | None = "e4b9c7a2d315"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrades the database to the latest version."""
+    file_contents_table = get_qualified_name("file_contents")
+    op.execute(
+        f"""
+        ALTER TABLE {file_contents_table}
+            ADD COLUMN estimated_tokens INTEGER;
+    """
+    )
+
+
+def downgrade() -> None:
+    """Downgrades the database to the previous version."""
+    file_contents_table = get_qualified_name("file_contents")
+    op.execute(f"ALTER TABLE {file_contents_table} DROP COLUMN IF EXISTS estimated_tokens;")
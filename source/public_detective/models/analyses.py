@@ -265,6 +265,10 @@ class AnalysisResult(BaseModel):
         processed_documents_gcs_path: The GCS path for the structured JSON
             report generated by the AI model.
         input_tokens_used: The number of tokens in the prompt sent to the AI.
+        estimated_input_tokens: The local, uncalibrated estimate of the
+            input tokens made during pre-analysis.
+        input_tokens_estimated: Whether `input_tokens_used` is a calibrated
+            estimate that the AI model has not counted yet.
         output_tokens_used: The number of tokens in the response received
             from the AI.
     """
@@ -282,6 +286,8 @@ class AnalysisResult(BaseModel):
     processed_documents_gcs_path: str | None = None
     analysis_prompt: str | None = None
     input_tokens_used: int | None = None
+    estimated_input_tokens: int | None = None
+    input_tokens_estimated: bool = False
     output_tokens_used: int | None = None
     grounding_metadata: GroundingMetadata | None = Field(
         None,
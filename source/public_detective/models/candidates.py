@@ -5,6 +5,7 @@ from __future__ import annotations
 from typing import Any
 from uuid import UUID
 
+from public_detective.models.file_contents import FileContent
 from public_detective.models.file_records import ExclusionReason
 from pydantic import BaseModel, ConfigDict, Field, model_validator
 
@@ -30,6 +31,11 @@ class AIFileCandidate(BaseModel):
     extraction_failed: bool = False
     inferred_extension: str | None = None
     used_fallback_conversion: bool = False
+    content_hash: str = ""
+    ai_content_hash: str = ""
+    token_count: int | None = None
+    estimated_tokens: int | None = None
+    stored_content: FileContent | None = None
 
     @model_validator(mode="after")
     def set_ai_defaults(self) -> AIFileCandidate:
@@ -0,0 +1,43 @@
+"""This module defines the Pydantic model for the content-addressed file store."""
+
+from pydantic import BaseModel
+
+
+class FileContent(BaseModel):
+    """Represents a file already prepared for analysis, keyed by its content.
+
+    Identical attachments are common, both inside one procurement and across
+    procurements. Each distinct content is uploaded and converted once, and
+    every later copy reuses this record. Its token counts are not stored
+    here but in the token count cache, which is keyed by model.
+
+    Attributes:
+        content_hash: The SHA-256 hex digest of the original bytes.
+        extension: The lowercase extension, with its dot, of the file the
+            content was first prepared from. Copies are only reused under
+            the same extension, since the extension drives the conversion.
+        size_bytes: The size of the original content, in bytes.
+        original_gcs_path: The GCS path of the original content.
+        prepared_content_gcs_uris: The GCS URIs of the content prepared for
+            the AI model, if any.
+        inferred_extension: The extension inferred from the content, if the
+            file's own extension was not supported.
+        used_fallback_conversion: Whether the content was converted with the
+            fallback conversion.
+        ai_content_hash: The SHA-256 hex digest of the content sent to the
+            AI model, which keys its entry in the token count cache.
+        estimated_tokens: The local, uncalibrated token estimate of the
+            content sent to the AI model, once made.
+        reference_count: The number of file records pointing to the content.
+    """
+
+    content_hash: str
+    extension: str
+    size_bytes: int
+    original_gcs_path: str
+    prepared_content_gcs_uris: list[str] | None = None
+    inferred_extension: str | None = None
+    used_fallback_conversion: bool = False
+    ai_content_hash: str | None = None
+    estimated_tokens: int | None = None
+    reference_count: int = 0
@@ -21,6 +21,11 @@ class ExclusionReason(StrEnum):
     TOKEN_LIMIT_EXCEEDED = "Arquivo excluído porque o limite de {max_tokens} tokens foi excedido."  # nosec
     CONVERSION_FAILED = "Falha ao converter o arquivo."
     LOCK_FILE = "Arquivo de bloqueio temporário, ignorado pois não contém o documento real."
+    FILE_TOO_LARGE = "Arquivo excluído porque excede o tamanho máximo permitido para download."
+    EXTRACTION_LIMIT_EXCEEDED = (
+        "Arquivo compactado excluído porque excede os limites de extração (profundidade, tamanho, "
+        "quantidade de arquivos ou taxa de compressão)."
+    )
 
     def __str__(self) -> str:
         """Returns the string representation of the enum member.
@@ -137,3 +142,5 @@ class NewFileRecord(BaseModel):
     prepared_content_gcs_uris: list[str] | None
     inferred_extension: str | None = None
     used_fallback_conversion: bool = False
+    content_hash: str | None = None
+    ai_content_hash: str | None = None
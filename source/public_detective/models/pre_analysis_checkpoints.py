@@ -0,0 +1,32 @@
+"""This module defines the Pydantic model for pre-analysis checkpoints."""
+
+from datetime import date
+
+from pydantic import BaseModel
+
+
+class PreAnalysisCheckpoint(BaseModel):
+    """Represents the progress of a pre-analysis run over a date range.
+
+    A run is identified by its date range. The page fields point to the last
+    (city, modality, page) search page whose procurements were all processed
+    on `page_date`, the day in progress when the checkpoint was saved.
+
+    Attributes:
+        start_date: The first day of the run.
+        end_date: The last day of the run.
+        last_completed_date: The last day fully processed, if any.
+        page_date: The day of the last completed search page, if any.
+        city_code: The IBGE code of the city searched, or `None` for a
+            nationwide search.
+        modality: The code of the procurement modality searched.
+        page: The number of the last completed search page.
+    """
+
+    start_date: date
+    end_date: date
+    last_completed_date: date | None = None
+    page_date: date | None = None
+    city_code: int | None = None
+    modality: int | None = None
+    page: int | None = None
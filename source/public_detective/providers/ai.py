@@ -4,9 +4,19 @@ It defines a generic `AiProvider` class that can be specialized with a
 Pydantic model to handle structured data output from the AI. The provider
 manages API configuration, file uploads, prompt execution, and robust parsing
 of the AI's response.
+
+When context caching is enabled, the system instruction of a request is kept
+in a Gemini cached content object and referenced by name, so its tokens are
+billed at the cached input rate. Retries of the same documents reuse a cache
+that also holds their files. Caches are looked up by a display name derived
+from what they hold, so workers share them across processes.
 """
 
+import asyncio
+import hashlib
 import json
+import threading
+from datetime import datetime, timedelta, timezone
 from mimetypes import guess_type
 from typing import Generic, TypeVar
 
@@ -34,6 +44,15 @@ class AiProvider(Generic[PydanticModel]):
     output_schema: type[PydanticModel]
     no_ai_tools: bool
     thinking_level: types.ThinkingLevel
+    _context_caches: dict[str, tuple[str | None, datetime]]
+    _context_cache_lock: threading.Lock
+    _context_cache_key_locks: dict[str, threading.Lock]
+    _context_cache_list_lock: threading.Lock
+    _context_caches_listed_at: datetime | None
+
+    _CONTEXT_CACHE_PREFIX = "public-detective-"
+    _CONTEXT_CACHE_EXPIRY_MARGIN = timedelta(minutes=5)
+    _CONTEXT_CACHE_LIST_INTERVAL = timedelta(minutes=5)
 
     def __init__(
         self,
@@ -54,6 +73,11 @@ class AiProvider(Generic[PydanticModel]):
         self.output_schema = output_schema
         self.gcs_provider = GcsProvider()
         self.no_ai_tools = no_ai_tools
+        self._context_caches = {}
+        self._context_cache_lock = threading.Lock()
+        self._context_cache_key_locks = {}
+        self._context_cache_list_lock = threading.Lock()
+        self._context_caches_listed_at = None
 
         if self.config.GCP_GEMINI_THINKING_LEVEL.upper() == "LOW":
             self.thinking_level = types.ThinkingLevel.LOW
@@ -73,8 +97,13 @@ class AiProvider(Generic[PydanticModel]):
         )
 
     def get_structured_analysis(
-        self, prompt: str, file_uris: list[str], max_output_tokens: int | None = None
-    ) -> tuple[PydanticModel, int, int, int, dict, str | None]:
+        self,
+        prompt: str,
+        file_uris: list[str],
+        max_output_tokens: int | None = None,
+        system_instruction: str | None = None,
+        document_hash: str | None = None,
+    ) -> tuple[PydanticModel, int, int, int, dict, str | None, int]:
         """Send files for analysis and parse the response.
 
         This method is designed to be highly robust. It includes a retry mechanism
@@ -89,6 +118,10 @@ class AiProvider(Generic[PydanticModel]):
                 files to be included in the analysis.
             max_output_tokens: An optional integer to set the token limit.
                 If `None`, no limit is applied.
+            system_instruction: Optional instructions sent apart from the
+                prompt, and cached when context caching is enabled.
+            document_hash: The hash of the documents, given to cache the
+                files with the system instruction for later requests.
 
         Returns:
             A tuple containing:
@@ -99,29 +132,268 @@ class AiProvider(Generic[PydanticModel]):
             - The number of thinking tokens used.
             - A dict containing grounding metadata (search_queries, sources).
             - The raw thoughts from the AI (if available).
+            - The number of input tokens read from a context cache.
         """
-        file_parts: list[types.Part] = []
-        for gcs_uri in file_uris:
-            mime_type = guess_type(gcs_uri)[0] or "application/octet-stream"
-            file_parts.append(types.Part.from_uri(file_uri=gcs_uri, mime_type=mime_type))
+        enable_tools = not self.no_ai_tools
+        cached_content, uncached_file_uris = self._resolve_context_cache(
+            system_instruction, file_uris, document_hash, enable_tools
+        )
+        request_contents = self._build_request_contents(prompt, uncached_file_uris)
+        response = self._generate_content_response(
+            request_contents,
+            max_output_tokens,
+            enable_tools=enable_tools,
+            system_instruction=system_instruction,
+            cached_content=cached_content,
+        )
+        return self._process_analysis_response(response)
 
-        all_parts = [types.Part(text=prompt), *file_parts]
-        request_contents = types.Content(role="user", parts=all_parts)
+    async def get_structured_analysis_async(
+        self,
+        prompt: str,
+        file_uris: list[str],
+        max_output_tokens: int | None = None,
+        system_instruction: str | None = None,
+        document_hash: str | None = None,
+    ) -> tuple[PydanticModel, int, int, int, dict, str | None, int]:
+        """Send files for analysis with the async client and parse the response.
+
+        This is the non-blocking counterpart of `get_structured_analysis`, for
+        callers running on an event loop: the request is awaited instead of
+        holding a thread while the model thinks.
+
+        Args:
+            prompt: The instructional prompt for the AI model.
+            file_uris: A list of GCS URIs (e.g., gs://bucket/object) for the
+                files to be included in the analysis.
+            max_output_tokens: An optional integer to set the token limit.
+                If `None`, no limit is applied.
+            system_instruction: Optional instructions sent apart from the
+                prompt, and cached when context caching is enabled.
+            document_hash: The hash of the documents, given to cache the
+                files with the system instruction for later requests.
+
+        Returns:
+            The same tuple as `get_structured_analysis`.
+        """
+        enable_tools = not self.no_ai_tools
+        cached_content, uncached_file_uris = await asyncio.to_thread(
+            self._resolve_context_cache, system_instruction, file_uris, document_hash, enable_tools
+        )
+        request_contents = self._build_request_contents(prompt, uncached_file_uris)
+        response = await self.client.aio.models.generate_content(
+            model=self.config.GCP_GEMINI_MODEL,
+            contents=request_contents,
+            config=self._build_generate_content_config(
+                max_output_tokens, enable_tools, system_instruction=system_instruction, cached_content=cached_content
+            ),
+        )
+        return self._process_analysis_response(response)
+
+    def _build_request_contents(self, prompt: str, file_uris: list[str]) -> types.Content:
+        """Builds the request sending a prompt with files.
+
+        Args:
+            prompt: The instructional prompt for the AI model.
+            file_uris: The GCS URIs of the files.
+
+        Returns:
+            The structured prompt and attachments sent to Gemini.
+        """
+        file_parts = [self._get_file_part(gcs_uri) for gcs_uri in file_uris]
+        return types.Content(role="user", parts=[types.Part(text=prompt), *file_parts])
+
+    def _resolve_context_cache(
+        self,
+        system_instruction: str | None,
+        file_uris: list[str],
+        document_hash: str | None,
+        enable_tools: bool,
+    ) -> tuple[str | None, list[str]]:
+        """Picks the context cache a request reads from, creating it if needed.
+
+        A request given a document hash reads from a cache holding the system
+        instruction and its files; any other request, or one whose document
+        cache could not be created, reads from a cache holding the system
+        instruction only.
+
+        Args:
+            system_instruction: The system instruction of the request.
+            file_uris: The GCS URIs of the files of the request.
+            document_hash: The hash of the documents, if they should be cached.
+            enable_tools: Flag indicating whether external tools are enabled.
+
+        Returns:
+            The name of the cached content, or `None` to send the request
+            uncached, and the file URIs still to be sent with the request.
+        """
+        if not self.config.GCP_GEMINI_CONTEXT_CACHE_ENABLED or not system_instruction:
+            return None, file_uris
+        if document_hash and file_uris:
+            cached_content = self._get_context_cache(system_instruction, enable_tools, file_uris, document_hash)
+            if cached_content:
+                return cached_content, []
+        return self._get_context_cache(system_instruction, enable_tools), file_uris
+
+    def _get_context_cache(
+        self,
+        system_instruction: str,
+        enable_tools: bool,
+        file_uris: list[str] | None = None,
+        document_hash: str | None = None,
+    ) -> str | None:
+        """Returns the name of a live context cache, finding or creating it.
+
+        Failures to create a cache, such as content below the minimum size
+        of a cache, are remembered until the TTL elapses, so the request is
+        sent uncached meanwhile. Requests for the same cache wait for each
+        other, so it is created once, but never for a different cache.
+
+        Args:
+            system_instruction: The system instruction the cache holds.
+            enable_tools: Flag indicating whether the cache holds the tools.
+            file_uris: The GCS URIs of the files the cache holds, if any.
+            document_hash: The hash of the documents the cache holds, if any.
+
+        Returns:
+            The name of the cached content, or `None` if there is none.
+        """
+        key_parts = [self.config.GCP_GEMINI_MODEL, system_instruction, str(enable_tools), document_hash or ""]
+        key_parts.extend(file_uris or [])
+        display_name = self._CONTEXT_CACHE_PREFIX + hashlib.sha256("\0".join(key_parts).encode()).hexdigest()
+
+        with self._context_cache_lock:
+            key_lock = self._context_cache_key_locks.setdefault(display_name, threading.Lock())
+
+        with key_lock:
+            cached_entry = self._get_known_context_cache(display_name)
+            if cached_entry is None:
+                self._list_context_caches()
+                cached_entry = self._get_known_context_cache(display_name)
+            if cached_entry is not None:
+                return cached_entry[0]
+
+            cached_content = self._create_context_cache(display_name, system_instruction, enable_tools, file_uris)
+            now = datetime.now(timezone.utc)
+            ttl = timedelta(seconds=self.config.GCP_GEMINI_CONTEXT_CACHE_TTL_SECONDS)
+            with self._context_cache_lock:
+                if cached_content is None:
+                    self._context_caches[display_name] = (None, now + ttl)
+                    return None
+                self._context_caches[display_name] = (cached_content.name, cached_content.expire_time or now + ttl)
+            return cached_content.name
+
+    def _get_known_context_cache(self, display_name: str) -> tuple[str | None, datetime] | None:
+        """Returns the cache already known under a display name, if still live.
+
+        Args:
+            display_name: The display name of the cache.
+
+        Returns:
+            The name of the cached content, or `None` after a failed creation,
+            and its expiry time, or `None` if no live cache is known.
+        """
+        with self._context_cache_lock:
+            cached_entry = self._context_caches.get(display_name)
+        if cached_entry and cached_entry[1] > datetime.now(timezone.utc) + self._CONTEXT_CACHE_EXPIRY_MARGIN:
+            return cached_entry
+        return None
+
+    def _list_context_caches(self) -> None:
+        """Records the live caches created earlier, possibly by another process.
+
+        The caches are listed at most once per interval, since a single
+        listing covers every display name.
+        """
+        with self._context_cache_list_lock:
+            now = datetime.now(timezone.utc)
+            if (
+                self._context_caches_listed_at
+                and now < self._context_caches_listed_at + self._CONTEXT_CACHE_LIST_INTERVAL
+            ):
+                return
+            self._context_caches_listed_at = now
+            try:
+                cached_contents = list(self.client.caches.list())
+            except Exception as e:
+                self.logger.warning(f"Could not list the context caches: {e}")
+                return
+
+        with self._context_cache_lock:
+            for cached_content in cached_contents:
+                display_name = cached_content.display_name
+                if (
+                    not display_name
+                    or not display_name.startswith(self._CONTEXT_CACHE_PREFIX)
+                    or not cached_content.expire_time
+                    or cached_content.expire_time <= now + self._CONTEXT_CACHE_EXPIRY_MARGIN
+                ):
+                    continue
+                known_entry = self._context_caches.get(display_name)
+                if known_entry is None or known_entry[0] is None or known_entry[1] < cached_content.expire_time:
+                    self._context_caches[display_name] = (cached_content.name, cached_content.expire_time)
+
+    def _create_context_cache(
+        self, display_name: str, system_instruction: str, enable_tools: bool, file_uris: list[str] | None
+    ) -> types.CachedContent | None:
+        """Creates a context cache holding a system instruction, its tools and files.
+
+        Args:
+            display_name: The display name of the cache.
+            system_instruction: The system instruction to cache.
+            enable_tools: Flag indicating whether the tools are cached.
+            file_uris: The GCS URIs of the files to cache, if any.
+
+        Returns:
+            The cached content, or `None` if it could not be created.
+        """
+        tools, tool_config = self._build_tools(enable_tools)
+        cached_files = (
+            [types.Content(role="user", parts=[self._get_file_part(uri) for uri in file_uris])] if file_uris else None
+        )
+        try:
+            cached_content = self.client.caches.create(
+                model=self.config.GCP_GEMINI_MODEL,
+                config=types.CreateCachedContentConfig(
+                    display_name=display_name,
+                    ttl=f"{self.config.GCP_GEMINI_CONTEXT_CACHE_TTL_SECONDS}s",
+                    system_instruction=system_instruction,
+                    contents=cached_files,
+                    tools=tools or None,
+                    tool_config=tool_config,
+                ),
+            )
+        except Exception as e:
+            self.logger.warning(f"Could not create a context cache; sending requests uncached: {e}")
+            return None
+        cached_tokens = cached_content.usage_metadata.total_token_count if cached_content.usage_metadata else None
+        self.logger.info(f"Created context cache {cached_content.name} holding {cached_tokens} tokens.")
+        return cached_content
+
+    def _process_analysis_response(
+        self, response: types.GenerateContentResponse
+    ) -> tuple[PydanticModel, int, int, int, dict, str | None, int]:
+        """Extracts the analysis, token usage, grounding and thoughts of a response.
 
+        Args:
+            response: The GenerateContent response from the Gemini API.
+
+        Returns:
+            The same tuple as `get_structured_analysis`.
+        """
+        self.logger.info(f"Full API Response (first attempt): {response}")
         total_input_tokens = 0
         total_output_tokens = 0
         total_thinking_tokens = 0
+        cached_input_tokens = 0
         grounding_sources: list[dict] = []
         search_queries: list[str] = []
 
-        enable_tools = not self.no_ai_tools
-        response = self._generate_content_response(request_contents, max_output_tokens, enable_tools=enable_tools)
-        self.logger.info(f"Full API Response (first attempt): {response}")
-
         if response.usage_metadata:
             total_input_tokens += response.usage_metadata.prompt_token_count or 0
             total_output_tokens += response.usage_metadata.candidates_token_count or 0
             total_thinking_tokens += response.usage_metadata.thoughts_token_count or 0
+            cached_input_tokens += response.usage_metadata.cached_content_token_count or 0
 
         validated_response = self._parse_and_validate_response(response)
         self.logger.debug(f"Validated AI response: {validated_response}")
@@ -176,6 +448,7 @@ class AiProvider(Generic[PydanticModel]):
             total_thinking_tokens,
             grounding_metadata,
             full_thoughts,
+            cached_input_tokens,
         )
 
     def count_tokens_for_analysis(self, prompt: str, file_uris: list[str]) -> tuple[int, int, int]:
@@ -190,13 +463,7 @@ class AiProvider(Generic[PydanticModel]):
             A tuple containing the total number of input tokens, 0 for output
             tokens, and 0 for thinking tokens.
         """
-        file_parts: list[types.Part] = []
-        for gcs_uri in file_uris:
-            mime_type = guess_type(gcs_uri)[0]
-            if not mime_type:
-                mime_type = "application/octet-stream"
-            file_parts.append(types.Part.from_uri(file_uri=gcs_uri, mime_type=mime_type))
-
+        file_parts = [self._get_file_part(gcs_uri) for gcs_uri in file_uris]
         all_parts = [types.Part(text=prompt), *file_parts]
         request_contents = types.Content(role="user", parts=all_parts)
         response = self.client.models.count_tokens(model=self.config.GCP_GEMINI_MODEL, contents=request_contents)
@@ -204,6 +471,31 @@ class AiProvider(Generic[PydanticModel]):
         self.logger.info(f"Estimated token count: {token_count}")
         return token_count or 0, 0, 0
 
+    def count_tokens_for_file(self, file_uri: str) -> int:
+        """Calculate the number of tokens of a single file, without a prompt.
+
+        Args:
+            file_uri: The GCS URI (e.g., gs://bucket/object) of the file.
+
+        Returns:
+            The number of input tokens the file adds to a request.
+        """
+        request_contents = types.Content(role="user", parts=[self._get_file_part(file_uri)])
+        response = self.client.models.count_tokens(model=self.config.GCP_GEMINI_MODEL, contents=request_contents)
+        return response.total_tokens or 0
+
+    def _get_file_part(self, gcs_uri: str) -> types.Part:
+        """Builds the request part referencing a file in GCS.
+
+        Args:
+            gcs_uri: The GCS URI of the file.
+
+        Returns:
+            The part, with the MIME type guessed from the file name.
+        """
+        mime_type = guess_type(gcs_uri)[0] or "application/octet-stream"
+        return types.Part.from_uri(file_uri=gcs_uri, mime_type=mime_type)
+
     def _parse_and_validate_response(self, response) -> PydanticModel:  # type: ignore
         """Parse the AI's response, handling multiple potential formats and errors.
 
@@ -256,7 +548,12 @@ class AiProvider(Generic[PydanticModel]):
             ) from e
 
     def _generate_content_response(
-        self, request_contents: types.Content, max_output_tokens: int | None, enable_tools: bool
+        self,
+        request_contents: types.Content,
+        max_output_tokens: int | None,
+        enable_tools: bool,
+        system_instruction: str | None = None,
+        cached_content: str | None = None,
     ) -> types.GenerateContentResponse:
         """Generate model output using the configured schema.
 
@@ -264,31 +561,77 @@ class AiProvider(Generic[PydanticModel]):
             request_contents: The structured prompt and attachments sent to Gemini.
             max_output_tokens: Optional limit for the model output.
             enable_tools: Flag indicating whether external tools should be enabled.
+            system_instruction: Optional instructions sent apart from the prompt.
+            cached_content: The name of the context cache the request reads from.
 
         Returns:
             The raw GenerateContent response from the Gemini API.
         """
-        tools: list[types.Tool] = []
-        tool_config: types.ToolConfig | None = None
-
-        if enable_tools:
-            tools.append(types.Tool(google_search=types.GoogleSearch()))
-            tool_config = types.ToolConfig(
-                function_calling_config=types.FunctionCallingConfig(mode=types.FunctionCallingConfigMode.AUTO)
-            )
-
         return self.client.models.generate_content(
             model=self.config.GCP_GEMINI_MODEL,
             contents=request_contents,
-            config=types.GenerateContentConfig(
+            config=self._build_generate_content_config(
+                max_output_tokens, enable_tools, system_instruction=system_instruction, cached_content=cached_content
+            ),
+        )
+
+    def _build_generate_content_config(
+        self,
+        max_output_tokens: int | None,
+        enable_tools: bool,
+        system_instruction: str | None = None,
+        cached_content: str | None = None,
+    ) -> types.GenerateContentConfig:
+        """Builds the generation settings of an analysis request.
+
+        A request reading from a context cache takes its system instruction
+        and tools from the cache, as Gemini rejects them in the request.
+
+        Args:
+            max_output_tokens: Optional limit for the model output.
+            enable_tools: Flag indicating whether external tools should be enabled.
+            system_instruction: Optional instructions sent apart from the prompt.
+            cached_content: The name of the context cache the request reads from.
+
+        Returns:
+            The settings asking for a structured, thought-through answer.
+        """
+        thinking_config = types.ThinkingConfig(thinking_level=self.thinking_level, include_thoughts=True)
+        if cached_content:
+            return types.GenerateContentConfig(
                 response_mime_type="application/json",
                 response_schema=self.output_schema,
                 max_output_tokens=max_output_tokens,
-                tools=tools,
-                tool_config=tool_config,
-                thinking_config=types.ThinkingConfig(thinking_level=self.thinking_level, include_thoughts=True),
-            ),
+                cached_content=cached_content,
+                thinking_config=thinking_config,
+            )
+
+        tools, tool_config = self._build_tools(enable_tools)
+        return types.GenerateContentConfig(
+            response_mime_type="application/json",
+            response_schema=self.output_schema,
+            max_output_tokens=max_output_tokens,
+            system_instruction=system_instruction,
+            tools=tools,
+            tool_config=tool_config,
+            thinking_config=thinking_config,
+        )
+
+    def _build_tools(self, enable_tools: bool) -> tuple[list[types.Tool], types.ToolConfig | None]:
+        """Builds the tools an analysis may call.
+
+        Args:
+            enable_tools: Flag indicating whether external tools should be enabled.
+
+        Returns:
+            The tools and their configuration, empty when tools are disabled.
+        """
+        if not enable_tools:
+            return [], None
+        tool_config = types.ToolConfig(
+            function_calling_config=types.FunctionCallingConfig(mode=types.FunctionCallingConfigMode.AUTO)
         )
+        return [types.Tool(google_search=types.GoogleSearch())], tool_config
 
     def _should_retry_without_tools(self, response) -> bool:  # type: ignore
         """Determine whether the response suggests retrying without tools.
@@ -40,7 +40,43 @@ class Config(BaseSettings):
     PNCP_PUBLIC_QUERY_API_URL: str = "https://pncp.gov.br/api/consulta/v1/"
     PNCP_INTEGRATION_API_URL: str = "https://pncp.gov.br/api/pncp/v1/"
 
-    HTTP_REQUEST_DELAY_SECONDS: float = 0.5
+    HTTP_MAX_REQUESTS_PER_SECOND: float = 2.0
+    HTTP_RATE_LIMIT_BURST: int = 2
+    HTTP_RATE_LIMIT_MIN_REQUESTS_PER_SECOND: float = 0.2
+    HTTP_RETRY_AFTER_MAX_SECONDS: float = 120.0
+    HTTP_POOL_CONNECTIONS: int = 10
+    HTTP_POOL_MAXSIZE: int = 10
+
+    PNCP_FETCH_MAX_WORKERS: int = 4
+    PNCP_FETCH_QUEUE_MAX_EVENTS: int = 1000
+    PNCP_DOWNLOAD_MAX_WORKERS: int = 4
+    PNCP_DOWNLOAD_SPOOL_MAX_MEMORY_BYTES: int = 16 * 1024 * 1024
+    PNCP_DOWNLOAD_MAX_BYTES: int = 300 * 1024 * 1024
+    PNCP_DOWNLOAD_CACHE_DIR: str | None = None
+    PNCP_DOWNLOAD_CACHE_MAX_BYTES: int = 2 * 1024 * 1024 * 1024
+    PNCP_EXTRACTION_MAX_DEPTH: int = 5
+    PNCP_EXTRACTION_MAX_TOTAL_BYTES: int = 1024 * 1024 * 1024
+    PNCP_EXTRACTION_MAX_MEMBERS: int = 5000
+    PNCP_EXTRACTION_MAX_RATIO: float = 100.0
+    PNCP_EXTRACTION_7Z_PARALLEL: bool = False
+
+    OFFICE_CONVERTER_POOL_SIZE: int = 2
+    OFFICE_CONVERTER_SERVER_COMMAND: str = "unoserver"
+    OFFICE_CONVERTER_JOB_TIMEOUT_SECONDS: float = 120.0
+    OFFICE_CONVERTER_STARTUP_TIMEOUT_SECONDS: float = 60.0
+    OFFICE_CONVERTER_MAX_JOBS_PER_WORKER: int = 200
+    CONVERTER_LIBREOFFICE_MAX_WORKERS: int = 2
+    CONVERTER_IMAGEMAGICK_MAX_WORKERS: int = 2
+    CONVERTER_IMAGEIO_MAX_WORKERS: int = 1
+    CONVERTER_CACHE_DIR: str | None = None
+    CONVERTER_CACHE_MAX_BYTES: int = 1024 * 1024 * 1024
+    IMAGE_CONVERTER_MEMORY_LIMIT: str = "256MiB"
+    IMAGE_CONVERTER_MAP_LIMIT: str = "512MiB"
+    IMAGE_CONVERTER_DISK_LIMIT: str = "1GiB"
+    MEDIA_NORMALIZATION_MAX_DIMENSION: int = 1536
+    GIF_TARGET_FPS: float = 1.0
+    GIF_KEYFRAMES_ONLY: bool = False
+    GIF_MAX_DURATION_SECONDS: float = 300.0
 
     LOG_LEVEL: str = "INFO"
 
@@ -66,10 +102,17 @@ class Config(BaseSettings):
 
     GCP_GEMINI_MAX_OUTPUT_TOKENS: int = 65536
     GCP_GEMINI_MAX_INPUT_TOKENS: int = 1048576
+    TOKEN_ESTIMATION_ENABLED: bool = False
+    TOKEN_ESTIMATION_CALIBRATION_SAMPLES: int = 200
+    GCP_GEMINI_CONTEXT_CACHE_ENABLED: bool = False
+    GCP_GEMINI_CONTEXT_CACHE_TTL_SECONDS: int = 3600
 
     GCP_GEMINI_TEXT_INPUT_COST: Decimal = Decimal("12.155222719")
     GCP_GEMINI_TEXT_INPUT_LONG_COST: Decimal = Decimal("24.310445439")
 
+    GCP_GEMINI_CACHED_INPUT_COST: Decimal = Decimal("1.215522272")
+    GCP_GEMINI_CACHED_INPUT_LONG_COST: Decimal = Decimal("2.431044544")
+
     GCP_GEMINI_TEXT_OUTPUT_COST: Decimal = Decimal("72.931336319")
     GCP_GEMINI_TEXT_OUTPUT_LONG_COST: Decimal = Decimal("109.397004479")
 
@@ -85,6 +128,10 @@ class Config(BaseSettings):
     GCP_GEMINI_SEARCH_QUERY_COST: Decimal = Decimal("14.00")
 
     WORKER_MAX_CONCURRENCY: int = 4
+    WORKER_ASYNC_MODE: bool = False
+    WORKER_ASYNC_MAX_MESSAGES: int = 64
+    WORKER_ASYNC_MAX_AI_CALLS: int = 16
+    WORKER_ASYNC_IO_THREADS: int = 4
 
     RANKING_WEIGHT_IMPACT: float = 1.5
     RANKING_WEIGHT_QUALITY: float = 0.5
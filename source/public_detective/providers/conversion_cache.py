@@ -0,0 +1,183 @@
+"""This module provides a local disk cache for file conversion results.
+
+Retried analyses and new versions of a procurement often hand the same
+documents to the converters again. The cache keeps each conversion result
+under a key made of the SHA-256 of the input, its extension, the target
+format and the version of the converter, so an identical conversion is
+served from disk while an upgrade of LibreOffice, ImageMagick or the
+Python imaging libraries invalidates the old results. Entries are evicted
+in least-recently-used order once the cache grows past its size budget.
+"""
+
+import hashlib
+import os
+import subprocess  # nosec B404
+import threading
+from collections.abc import Callable
+
+from public_detective.providers.config import ConfigProvider
+from public_detective.providers.disk_cache import DiskCache
+from public_detective.providers.logging import Logger, LoggingProvider
+
+_command_versions: dict[tuple[str, ...], str | None] = {}
+_command_versions_lock = threading.Lock()
+
+
+def get_command_version(command: list[str]) -> str | None:
+    """Returns the first line printed by a converter's version command.
+
+    The result is computed once per process.
+
+    Args:
+        command: The command that prints the version, such as
+            `["soffice", "--version"]`.
+
+    Returns:
+        The version line, or `None` if the command could not be run.
+    """
+    key = tuple(command)
+    with _command_versions_lock:
+        if key not in _command_versions:
+            try:
+                completed = subprocess.run(command, capture_output=True, text=True, timeout=30)  # nosec B603
+                lines = completed.stdout.strip().splitlines()
+                _command_versions[key] = lines[0] if completed.returncode == 0 and lines else None
+            except (OSError, subprocess.SubprocessError):
+                _command_versions[key] = None
+        return _command_versions[key]
+
+
+class ConversionCache(DiskCache):
+    """A size-bounded, thread-safe disk cache of conversion results.
+
+    Each result is stored as a single `.bin` file named after its key.
+    """
+
+    _instance: "ConversionCache | None" = None
+    _instance_lock = threading.Lock()
+
+    logger: Logger
+
+    def __init__(self, directory: str, max_bytes: int) -> None:
+        """Initializes the cache, creating its directory if needed.
+
+        Args:
+            directory: The directory where results are stored.
+            max_bytes: The total size of the results kept before evicting.
+        """
+        super().__init__(directory, max_bytes)
+        self.logger = LoggingProvider().get_logger()
+
+    @classmethod
+    def get_instance(cls) -> "ConversionCache | None":
+        """Returns the cache shared by the converters of the current process.
+
+        Returns:
+            The cache, or `None` if `CONVERTER_CACHE_DIR` is not set.
+        """
+        config = ConfigProvider.get_config()
+        if not config.CONVERTER_CACHE_DIR:
+            return None
+        with cls._instance_lock:
+            if cls._instance is None or cls._instance.directory != config.CONVERTER_CACHE_DIR:
+                cls._instance = cls(config.CONVERTER_CACHE_DIR, config.CONVERTER_CACHE_MAX_BYTES)
+            return cls._instance
+
+    @staticmethod
+    def make_key(content: bytes, source_extension: str, target_format: str, converter_version: str) -> str:
+        """Builds the key of a conversion.
+
+        Args:
+            content: The content to convert.
+            source_extension: The extension of the content, such as `.docx`.
+            target_format: The format produced, such as `pdf`.
+            converter_version: The version of the tool doing the conversion.
+
+        Returns:
+            The hexadecimal key of the conversion.
+        """
+        digest = hashlib.sha256()
+        digest.update(hashlib.sha256(content).digest())
+        for part in (source_extension.lower(), target_format, converter_version):
+            digest.update(b"\0" + part.encode())
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        """Returns the path of a key's result.
+
+        Args:
+            key: The key of the conversion.
+
+        Returns:
+            The path of the result file.
+        """
+        return os.path.join(self.directory, f"{key}.bin")
+
+    def get(self, key: str) -> bytes | None:
+        """Returns a cached result and records the lookup.
+
+        Args:
+            key: The key of the conversion.
+
+        Returns:
+            The cached result, or `None` if it is not cached.
+        """
+        path = self._path(key)
+        try:
+            with open(path, "rb") as result_file:
+                result = result_file.read()
+            os.utime(path)
+        except OSError:
+            self.record_miss()
+            return None
+        self.record_hit()
+        return result
+
+    def put(self, key: str, result: bytes) -> None:
+        """Stores a result, then evicts old results beyond the size budget.
+
+        Args:
+            key: The key of the conversion.
+            result: The converted content.
+        """
+        if len(result) > self.max_bytes:
+            return
+        try:
+            self._write_atomically(self._path(key), result)
+        except OSError as e:
+            self.logger.warning(f"Could not store a conversion result in the cache: {e}")
+            return
+        self._record_store()
+
+    def get_or_convert(
+        self,
+        content: bytes,
+        source_extension: str,
+        target_format: str,
+        converter_version: str | None,
+        convert: Callable[[], bytes],
+    ) -> bytes:
+        """Returns the cached result of a conversion, converting on a miss.
+
+        Conversions whose converter version is unknown bypass the cache,
+        since their results could not be told apart across upgrades.
+
+        Args:
+            content: The content to convert.
+            source_extension: The extension of the content.
+            target_format: The format produced.
+            converter_version: The version of the tool doing the conversion.
+            convert: Runs the conversion when the result is not cached.
+
+        Returns:
+            The converted content.
+        """
+        if converter_version is None:
+            return convert()
+        key = self.make_key(content, source_extension, target_format, converter_version)
+        cached_result = self.get(key)
+        if cached_result is not None:
+            return cached_result
+        result = convert()
+        self.put(key, result)
+        return result
@@ -0,0 +1,138 @@
+"""This module provides the base of the local disk caches.
+
+The download and conversion caches both keep their entries as files in a
+single directory, write them atomically so several processes can share
+it, evict them in least-recently-used order once the directory grows past
+a size budget, and count their hits, misses, stores and evictions. That
+shared behaviour lives in `DiskCache`.
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+from typing import IO, Any
+
+
+class DiskCache:
+    """A size-bounded, thread-safe directory of cached files.
+
+    The content of every entry is a `.bin` file, whose modification time
+    records its last use and drives the LRU eviction. Subclasses may keep
+    companion files next to it (such as metadata), named like the content
+    file with one of `_COMPANION_SUFFIXES`, which are evicted along with it
+    but do not count towards the size budget.
+    """
+
+    _CONTENT_SUFFIX = ".bin"
+    _COMPANION_SUFFIXES: tuple[str, ...] = ()
+
+    directory: str
+    max_bytes: int
+    hits: int
+    misses: int
+    stores: int
+    evictions: int
+    _lock: threading.Lock
+
+    def __init__(self, directory: str, max_bytes: int) -> None:
+        """Initializes the cache, creating its directory if needed.
+
+        Args:
+            directory: The directory where entries are stored.
+            max_bytes: The total content size kept before evicting entries.
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def record_hit(self) -> None:
+        """Records a lookup served from the cache."""
+        with self._lock:
+            self.hits += 1
+
+    def record_miss(self) -> None:
+        """Records a lookup that could not be served from the cache."""
+        with self._lock:
+            self.misses += 1
+
+    def _write_atomically(self, path: str, content: bytes | IO[bytes]) -> None:
+        """Writes a file under a temporary name and moves it into place.
+
+        Readers therefore never see a partially written file. If the write
+        fails partway, the temporary file is removed before the error is
+        raised again.
+
+        Args:
+            path: The final path of the file.
+            content: The bytes to write, or a handle to copy them from.
+        """
+        temporary_file = tempfile.NamedTemporaryFile("wb", dir=self.directory, suffix=".tmp", delete=False)
+        try:
+            with temporary_file:
+                if isinstance(content, bytes):
+                    temporary_file.write(content)
+                else:
+                    shutil.copyfileobj(content, temporary_file)
+            os.replace(temporary_file.name, path)
+        except BaseException:
+            try:
+                os.remove(temporary_file.name)
+            except OSError:
+                pass
+            raise
+
+    def _record_store(self) -> None:
+        """Records a stored entry, then evicts old entries beyond the budget."""
+        with self._lock:
+            self.stores += 1
+            self._evict()
+
+    def _evict(self) -> None:
+        """Removes least recently used entries until the budget is respected."""
+        entries = []
+        total_size = 0
+        with os.scandir(self.directory) as directory_entries:
+            for directory_entry in directory_entries:
+                if not directory_entry.name.endswith(self._CONTENT_SUFFIX):
+                    continue
+                try:
+                    stat = directory_entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, directory_entry.path))
+                total_size += stat.st_size
+
+        for _, size, content_path in sorted(entries):
+            if total_size <= self.max_bytes:
+                break
+            base = content_path[: -len(self._CONTENT_SUFFIX)]
+            for path in (content_path, *(f"{base}{suffix}" for suffix in self._COMPANION_SUFFIXES)):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            total_size -= size
+            self.evictions += 1
+
+    def get_stats(self) -> dict[str, Any]:
+        """Returns the cache counters.
+
+        Returns:
+            A dictionary with the number of `hits`, `misses`, `stores` and
+            `evictions`, and the `hit_ratio` over all lookups.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "stores": self.stores,
+                "evictions": self.evictions,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
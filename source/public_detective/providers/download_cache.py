@@ -0,0 +1,133 @@
+"""This module provides a local disk cache for downloaded documents.
+
+The cache stores the body of each download together with the validators
+sent by the server (`ETag` and `Last-Modified`), so that later fetches of
+the same URL can be sent as conditional GET requests and, on a
+`304 Not Modified` answer, be served from disk. Entries are evicted in
+least-recently-used order once the cache grows past its size budget.
+"""
+
+import hashlib
+import json
+import os
+from typing import IO
+
+from public_detective.providers.disk_cache import DiskCache
+from pydantic import BaseModel
+
+
+class CachedDownload(BaseModel):
+    """The metadata stored alongside a cached download.
+
+    Attributes:
+        url: The URL the content was downloaded from.
+        size: The size of the cached content, in bytes.
+        etag: The `ETag` header of the cached response.
+        last_modified: The `Last-Modified` header of the cached response.
+        filename: The filename from the `Content-Disposition` header.
+        content_type: The `Content-Type` header of the cached response.
+        content_length: The `Content-Length` header of the cached response.
+    """
+
+    url: str
+    size: int
+    etag: str | None = None
+    last_modified: str | None = None
+    filename: str | None = None
+    content_type: str | None = None
+    content_length: int | None = None
+
+    @property
+    def validators(self) -> dict[str, str]:
+        """The headers that turn a request for this URL into a conditional GET.
+
+        Returns:
+            A dictionary with `If-None-Match` and/or `If-Modified-Since`.
+        """
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class DownloadCache(DiskCache):
+    """A size-bounded, thread-safe disk cache of downloads keyed by URL.
+
+    Each entry is kept as two files named after the SHA-256 of the URL: the
+    content (`.bin`) and its `CachedDownload` metadata (`.json`), which is
+    evicted along with the content.
+    """
+
+    _COMPANION_SUFFIXES = (".json",)
+
+    def _paths(self, url: str) -> tuple[str, str]:
+        """Returns the content and metadata paths of a URL's entry.
+
+        Args:
+            url: The URL of the entry.
+
+        Returns:
+            A tuple with the content path and the metadata path.
+        """
+        key = hashlib.sha256(url.encode()).hexdigest()
+        base = os.path.join(self.directory, key)
+        return f"{base}.bin", f"{base}.json"
+
+    def lookup(self, url: str) -> CachedDownload | None:
+        """Returns the metadata of a URL's entry, if it is cached.
+
+        Args:
+            url: The URL to look up.
+
+        Returns:
+            The cached metadata, or `None` if the URL is not cached.
+        """
+        content_path, metadata_path = self._paths(url)
+        try:
+            with open(metadata_path, encoding="utf-8") as metadata_file:
+                entry = CachedDownload.model_validate(json.load(metadata_file))
+        except (OSError, ValueError):
+            return None
+        if entry.url != url or not os.path.exists(content_path):
+            return None
+        return entry
+
+    def open(self, url: str) -> IO[bytes] | None:
+        """Opens a URL's cached content and records a cache hit.
+
+        Args:
+            url: The URL whose content was confirmed as unchanged.
+
+        Returns:
+            A handle to the cached content, or `None` if the entry vanished
+            in the meantime (for example, evicted by another process).
+        """
+        content_path, _ = self._paths(url)
+        try:
+            cached_file = open(content_path, "rb")
+            os.utime(content_path)
+        except OSError:
+            return None
+        self.record_hit()
+        return cached_file
+
+    def store(self, entry: CachedDownload, content: IO[bytes]) -> None:
+        """Stores a download, then evicts old entries beyond the size budget.
+
+        Responses without validators are not cached, since they could never
+        be revalidated. The handle is rewound to its start afterwards.
+
+        Args:
+            entry: The metadata of the download.
+            content: A seekable handle to the downloaded content.
+        """
+        if not entry.validators or entry.size > self.max_bytes:
+            return
+        content_path, metadata_path = self._paths(entry.url)
+        content.seek(0)
+        self._write_atomically(content_path, content)
+        self._write_atomically(metadata_path, entry.model_dump_json().encode())
+        content.seek(0)
+        self._record_store()
@@ -1,9 +1,67 @@
 """This module provides a service for identifying file types."""
 
+import tarfile
+from enum import StrEnum
+
 import magic
 from public_detective.providers.logging import Logger, LoggingProvider
 
 SPECIALIZED_IMAGE = "SPECIALIZED_IMAGE"
+ARCHIVE_SNIFF_BYTES = 4096
+MAGIC_SNIFF_BYTES = 1024 * 1024
+
+
+class ArchiveFormat(StrEnum):
+    """The archive and compression formats recognized from magic bytes.
+
+    The value of each member is the file extension of the format.
+    """
+
+    ZIP = ".zip"
+    RAR = ".rar"
+    SEVEN_ZIP = ".7z"
+    TAR = ".tar"
+    GZIP = ".gz"
+    BZIP2 = ".bz2"
+    XZ = ".xz"
+
+
+_ARCHIVE_SIGNATURES: tuple[tuple[bytes, ArchiveFormat], ...] = (
+    (b"PK\x03\x04", ArchiveFormat.ZIP),
+    (b"PK\x05\x06", ArchiveFormat.ZIP),
+    (b"Rar!\x1a\x07", ArchiveFormat.RAR),
+    (b"7z\xbc\xaf\x27\x1c", ArchiveFormat.SEVEN_ZIP),
+    (b"\x1f\x8b", ArchiveFormat.GZIP),
+    (b"BZh", ArchiveFormat.BZIP2),
+    (b"\xfd7zXZ\x00", ArchiveFormat.XZ),
+)
+
+
+def sniff_archive_format(head: bytes) -> ArchiveFormat | None:
+    """Classifies content as an archive from its first bytes.
+
+    Only the first `ARCHIVE_SNIFF_BYTES` bytes are needed. TAR archives are
+    recognized by the `ustar` magic of their first header or, for the old
+    V7 format, by a valid header checksum.
+
+    Args:
+        head: The first bytes of the content.
+
+    Returns:
+        The archive format, or None if the content is not an archive.
+    """
+    for signature, archive_format in _ARCHIVE_SIGNATURES:
+        if head.startswith(signature):
+            return archive_format
+    if head[257:262] == b"ustar":
+        return ArchiveFormat.TAR
+    if len(head) >= tarfile.BLOCKSIZE:
+        try:
+            tarfile.TarInfo.frombuf(head[: tarfile.BLOCKSIZE], tarfile.ENCODING, "surrogateescape")
+        except tarfile.HeaderError:
+            return None
+        return ArchiveFormat.TAR
+    return None
 
 
 class FileTypeProvider:
@@ -13,18 +71,28 @@ class FileTypeProvider:
         """Initializes the FileTypeProvider."""
         self.logger: Logger = LoggingProvider().get_logger()
 
-    def infer_extension(self, content: bytes) -> str | None:
+    def infer_extension(self, content: bytes, archive_format: ArchiveFormat | None = None) -> str | None:
         """Infers the file extension from its content.
 
+        If the content was already classified by `sniff_archive_format`, the
+        result is reused instead of sniffing it again. ZIP content is still
+        passed to libmagic, since office documents are ZIP containers too.
+        libmagic is only given the first `MAGIC_SNIFF_BYTES` bytes, which is
+        as far as its default configuration reads.
+
         Args:
             content: The byte content of the file.
+            archive_format: The archive format the content was classified
+                as, if it is an archive.
 
         Returns:
             The inferred file extension (e.g., ".pdf"), or None if the
             type could not be determined.
         """
+        if archive_format and archive_format != ArchiveFormat.ZIP:
+            return archive_format.value
         try:
-            mime_type = magic.from_buffer(content, mime=True)
+            mime_type = magic.from_buffer(content[:MAGIC_SNIFF_BYTES], mime=True)
             extension = self._get_extension_from_mime(mime_type)
             if extension:
                 return f".{extension}"
@@ -6,6 +6,7 @@ and downloading files.
 
 from typing import cast
 
+from google.api_core.exceptions import NotFound
 from google.auth.credentials import AnonymousCredentials
 from google.cloud.storage import Client
 from public_detective.providers.config import ConfigProvider
@@ -76,6 +77,20 @@ class GcsProvider:
         blob = bucket.blob(source_blob_name)
         return cast(bytes, blob.download_as_bytes())
 
+    def delete_file(self, bucket_name: str, blob_name: str) -> None:
+        """Deletes a file from a GCS bucket, ignoring files that do not exist.
+
+        Args:
+            bucket_name: The name of the GCS bucket.
+            blob_name: The name of the blob to delete.
+        """
+        client = self.get_client()
+        bucket = client.bucket(bucket_name)
+        try:
+            bucket.blob(blob_name).delete()
+        except NotFound:
+            pass
+
     def list_blobs(self, bucket_name: str, prefix: str | None = None) -> list:
         """Lists all the blobs in the bucket with a given prefix.
 
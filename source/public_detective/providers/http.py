@@ -1,62 +1,175 @@
 """This module provides a centralized HTTP client for the application."""
 
-import time
+import threading
 from typing import Any
 
 import requests
 from public_detective.providers.config import Config, ConfigProvider
 from public_detective.providers.logging import Logger, LoggingProvider
+from public_detective.providers.rate_limiter import THROTTLING_STATUS_CODES, RateLimiter
+from requests.adapters import HTTPAdapter
 from requests.exceptions import ConnectTimeout, ReadTimeout
-from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_random_exponential
+from tenacity import (
+    RetryCallState,
+    retry,
+    retry_if_exception_type,
+    retry_if_result,
+    stop_after_attempt,
+    wait_random_exponential,
+)
+
+_backoff = wait_random_exponential(multiplier=1, max=10)
+
+
+def _is_throttled(response: requests.Response) -> bool:
+    """Checks whether the host answered that it is overloaded.
+
+    Args:
+        response: The response received from the host.
+
+    Returns:
+        True if the response is a 429 or 503 answer that should be retried.
+    """
+    return response.status_code in THROTTLING_STATUS_CODES
+
+
+def _wait_before_retry(retry_state: RetryCallState) -> float:
+    """Computes the pause before the next attempt.
+
+    When the rate limiter is enabled, throttled answers are retried without
+    an extra pause because the host's bucket already holds the next request
+    back for as long as the host asked. Without a bucket, a throttled answer
+    waits for its `Retry-After` or, if the host gave none, for the same
+    randomized exponential backoff used for timeouts.
+
+    Args:
+        retry_state: The state of the current retry loop.
+
+    Returns:
+        The number of seconds to wait before the next attempt.
+    """
+    if retry_state.outcome is not None and not retry_state.outcome.failed:
+        rate_limiter: RateLimiter = retry_state.args[0]._rate_limiter
+        if rate_limiter.enabled:
+            return 0.0
+        response: requests.Response = retry_state.outcome.result()
+        retry_after = rate_limiter.parse_retry_after(response.headers.get("Retry-After"))
+        if retry_after is not None:
+            return float(retry_after)
+    return float(_backoff(retry_state))
+
+
+def _release_throttled_response(retry_state: RetryCallState) -> None:
+    """Closes a throttled response before it is retried.
+
+    Streamed responses keep their connection checked out of the pool until
+    they are closed, so the discarded response is released explicitly.
+
+    Args:
+        retry_state: The state of the current retry loop.
+    """
+    if retry_state.outcome is not None and not retry_state.outcome.failed:
+        retry_state.outcome.result().close()
+
+
+def _return_last_outcome(retry_state: RetryCallState) -> requests.Response:
+    """Returns the last response, or re-raises the last error, once retries are exhausted.
+
+    Args:
+        retry_state: The state of the finished retry loop.
+
+    Returns:
+        The last response received from the host.
+
+    Raises:
+        RuntimeError: If the retry loop finished without any attempt.
+    """
+    if retry_state.outcome is None:  # pragma: no cover
+        raise RuntimeError("Retry loop finished without an outcome.")
+    response: requests.Response = retry_state.outcome.result()
+    return response
+
+
+_retry_policy = retry(
+    stop=stop_after_attempt(3),
+    wait=_wait_before_retry,
+    retry=(
+        retry_if_exception_type(ConnectTimeout) | retry_if_exception_type(ReadTimeout) | retry_if_result(_is_throttled)
+    ),
+    before_sleep=_release_throttled_response,
+    retry_error_callback=_return_last_outcome,
+)
 
 
 class HttpProvider:
-    """A centralized HTTP client that manages a requests.Session."""
+    """A centralized HTTP client that manages a requests.Session.
+
+    The provider is safe to share between threads: the session is created
+    once under a lock and keeps a pool of keep-alive connections per host, so
+    consecutive requests to the same server reuse the same TCP and TLS
+    handshake. Every request also goes through the same per-host rate
+    limiter. Throttling answers (429 and 503) slow that host's budget down,
+    honour `Retry-After` and are retried like timeouts, backing off on their
+    own when the rate limiter is disabled.
+    """
 
     _session: requests.Session | None = None
     _config: Config
     _logger: Logger
+    _session_lock: threading.Lock
+    _rate_limiter: RateLimiter
 
     def __init__(self) -> None:
         """Initializes the HttpProvider."""
         self._config = ConfigProvider.get_config()
         self._logger = LoggingProvider().get_logger()
+        self._session_lock = threading.Lock()
+        self._rate_limiter = RateLimiter(self._config)
 
     def _get_session(self) -> requests.Session:
         """Initializes and returns a singleton requests.Session object.
 
         The session is configured to ignore system-level proxy settings by
-        setting `trust_env` to `False`.
+        setting `trust_env` to `False`, and mounts adapters whose connection
+        pools are sized from `HTTP_POOL_CONNECTIONS` (number of hosts kept)
+        and `HTTP_POOL_MAXSIZE` (connections kept per host).
 
         Returns:
             A configured `requests.Session` instance.
         """
         if self._session is None:
-            self._session = requests.Session()
-            self._session.trust_env = False
-            self._session.headers.update(
-                {
-                    "User-Agent": (
-                        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                        "AppleWebKit/537.36 (KHTML, like Gecko) "
-                        "Chrome/91.0.4472.124 Safari/537.36"
-                    ),
-                    "Connection": "close",
-                }
-            )
+            with self._session_lock:
+                if self._session is None:
+                    session = requests.Session()
+                    session.trust_env = False
+                    session.headers.update(
+                        {
+                            "User-Agent": (
+                                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+                                "AppleWebKit/537.36 (KHTML, like Gecko) "
+                                "Chrome/91.0.4472.124 Safari/537.36"
+                            ),
+                        }
+                    )
+                    for prefix in ("http://", "https://"):
+                        session.mount(
+                            prefix,
+                            HTTPAdapter(
+                                pool_connections=self._config.HTTP_POOL_CONNECTIONS,
+                                pool_maxsize=self._config.HTTP_POOL_MAXSIZE,
+                            ),
+                        )
+                    self._session = session
         return self._session
 
-    @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_random_exponential(multiplier=1, max=10),
-        retry=(retry_if_exception_type(ConnectTimeout) | retry_if_exception_type(ReadTimeout)),
-        reraise=True,
-    )
+    @_retry_policy
     def get(self, url: str, **kwargs: Any) -> requests.Response:
         """Performs a GET request with a retry mechanism.
 
         It uses a granular timeout of 5 seconds for the connection and 30
-        seconds for the read.
+        seconds for the read, and waits for the host's rate limiter before
+        sending the request. If the host keeps throttling after the last
+        attempt, the throttled response is returned to the caller.
 
         Args:
             url: The URL to request.
@@ -65,25 +178,23 @@ class HttpProvider:
         Returns:
             The requests.Response object.
         """
-        time.sleep(self._config.HTTP_REQUEST_DELAY_SECONDS)
+        self._rate_limiter.acquire(url)
         session = self._get_session()
         kwargs.setdefault("timeout", (5, 30))
         self._logger.debug(f"Fetching URL: {url} with params: {kwargs.get('params')}")
         response = session.get(url, **kwargs)
+        self._rate_limiter.record_response(url, response)
         self._logger.debug(f"Request to {response.url} completed with status: {response.status_code}")
         return response
 
-    @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_random_exponential(multiplier=1, max=10),
-        retry=(retry_if_exception_type(ConnectTimeout) | retry_if_exception_type(ReadTimeout)),
-        reraise=True,
-    )
+    @_retry_policy
     def head(self, url: str, **kwargs: Any) -> requests.Response:
         """Performs a HEAD request with a retry mechanism.
 
         It uses a granular timeout of 5 seconds for the connection and 30
-        seconds for the read.
+        seconds for the read, and waits for the host's rate limiter before
+        sending the request. If the host keeps throttling after the last
+        attempt, the throttled response is returned to the caller.
 
         Args:
             url: The URL to request.
@@ -92,14 +203,56 @@ class HttpProvider:
         Returns:
             The requests.Response object.
         """
-        time.sleep(self._config.HTTP_REQUEST_DELAY_SECONDS)
+        self._rate_limiter.acquire(url)
         session = self._get_session()
         kwargs.setdefault("timeout", (5, 30))
         self._logger.debug(f"Fetching HEAD for URL: {url}")
         response = session.head(url, **kwargs)
+        self._rate_limiter.record_response(url, response)
         self._logger.debug(f"HEAD request to {response.url} completed with status: {response.status_code}")
         return response
 
+    def share_rate_limit(self, process_count: int) -> None:
+        """Splits the per-host request budget between cooperating processes.
+
+        Args:
+            process_count: The number of processes, including this one, that
+                send requests to the same hosts at the same time.
+        """
+        self._rate_limiter.share_between_processes(process_count)
+
+    def get_connection_stats(self) -> dict[str, int]:
+        """Summarizes how often pooled connections were reused.
+
+        The figures are read from the connection pools currently held by the
+        session, so they cover the hosts still in the pool and reset when the
+        session is closed.
+
+        Returns:
+            A dictionary with the number of `requests` sent, the number of
+            `connections` opened (one handshake each) and the number of
+            requests that `reused` an already open connection.
+        """
+        requests_sent = 0
+        connections_opened = 0
+        session = self._session
+        if session is not None:
+            for adapter in session.adapters.values():
+                if not isinstance(adapter, HTTPAdapter):
+                    continue
+                pools = adapter.poolmanager.pools
+                for key in pools.keys():
+                    pool = pools.get(key)
+                    if pool is None:
+                        continue
+                    requests_sent += pool.num_requests
+                    connections_opened += pool.num_connections
+        return {
+            "requests": requests_sent,
+            "connections": connections_opened,
+            "reused": max(0, requests_sent - connections_opened),
+        }
+
     def close(self) -> None:
         """Closes the session."""
         if self._session:
@@ -1,9 +1,19 @@
-"""Providers for converting image files with ImageMagick."""
+"""Providers for converting image files with Pillow and ImageMagick.
 
+Formats Pillow can read are converted in process. Everything else is piped
+through ImageMagick's `convert` on stdin and stdout, so input and output never
+touch the disk. Its memory, memory-map and disk limits are taken from the
+configuration: large scans spill their pixel cache to temporary files, up to
+the disk limit, instead of exhausting the worker's memory.
+"""
+
+import io
 import subprocess  # nosec B404
-import tempfile
-from pathlib import Path
 
+import PIL
+from PIL import Image
+from public_detective.providers.config import Config, ConfigProvider
+from public_detective.providers.conversion_cache import ConversionCache, get_command_version
 from public_detective.providers.logging import Logger, LoggingProvider
 
 
@@ -11,13 +21,59 @@ class ImageConverterProvider:
     """A provider for converting image files using ImageMagick."""
 
     logger: Logger
+    config: Config
+    conversion_cache: ConversionCache | None
+    _PILLOW_EXTENSIONS: tuple[str, ...] = (".psd", ".tif", ".tiff")
+    _PNG_MODES: tuple[str, ...] = ("1", "L", "LA", "P", "RGB", "RGBA", "I", "I;16")
 
     def __init__(self) -> None:
         """Initializes the provider."""
         self.logger = LoggingProvider().get_logger()
+        self.config = ConfigProvider.get_config()
+        self.conversion_cache = ConversionCache.get_instance()
 
     def to_png(self, file_content: bytes, original_extension: str) -> bytes:
-        """Converts an image file to PNG.
+        """Converts an image file to PNG, reusing a cached result if any.
+
+        Args:
+            file_content: The content of the file to convert.
+            original_extension: The original extension of the file.
+
+        Returns:
+            The content of the converted PNG file.
+        """
+        if self.conversion_cache is None:
+            return self._convert_to_png(file_content, original_extension)
+        png_content: bytes = self.conversion_cache.get_or_convert(
+            file_content,
+            original_extension,
+            "png",
+            self._get_converter_version(original_extension),
+            lambda: self._convert_to_png(file_content, original_extension),
+        )
+        return png_content
+
+    def _get_converter_version(self, original_extension: str) -> str | None:
+        """Returns the version of the tools that may convert an extension.
+
+        Args:
+            original_extension: The original extension of the file.
+
+        Returns:
+            The version, or `None` if ImageMagick's version is unknown.
+        """
+        imagemagick_version: str | None = get_command_version(["convert", "-version"])
+        if imagemagick_version is None:
+            return None
+        if original_extension.lower() in self._PILLOW_EXTENSIONS:
+            return f"{imagemagick_version}; pillow {PIL.__version__}"
+        return imagemagick_version
+
+    def _convert_to_png(self, file_content: bytes, original_extension: str) -> bytes:
+        """Converts an image file to PNG with Pillow or ImageMagick.
+
+        Only the first frame is kept: the flattened composite of a PSD or the
+        first page of a multi-page TIFF or EPS.
 
         Args:
             file_content: The content of the file to convert.
@@ -26,38 +82,65 @@ class ImageConverterProvider:
         Returns:
             The content of the converted PNG file.
         """
-        with tempfile.TemporaryDirectory() as td:
-            tmp_dir = Path(td)
-            in_path = tmp_dir / f"input{original_extension}"
-            in_path.write_bytes(file_content)
-            out_path = tmp_dir / "output.png"
+        if original_extension.lower() in self._PILLOW_EXTENSIONS:
+            try:
+                return self._convert_with_pillow(file_content)
+            except (OSError, ValueError, Image.DecompressionBombError) as e:
+                self.logger.info(f"Pillow could not convert {original_extension}, using ImageMagick: {e}")
+        return self._run_convert(file_content, original_extension)
 
-            self._run_convert(in_path, out_path)
+    def _convert_with_pillow(self, file_content: bytes) -> bytes:
+        """Converts an image to PNG in process with Pillow.
 
-            if not out_path.exists():
-                raise RuntimeError("ImageMagick conversion failed to produce a PNG file.")
+        Args:
+            file_content: The content of the file to convert.
 
-            return out_path.read_bytes()
+        Returns:
+            The content of the converted PNG file.
+        """
+        with Image.open(io.BytesIO(file_content)) as img:
+            frame: Image.Image = img
+            if img.mode not in self._PNG_MODES:
+                frame = img.convert("RGBA" if "A" in img.mode else "RGB")
+            with io.BytesIO() as output_buffer:
+                frame.save(output_buffer, format="PNG")
+                return output_buffer.getvalue()
 
-    def _run_convert(
-        self,
-        input_path: Path,
-        output_path: Path,
-    ) -> None:
-        """Runs the convert command to convert a file.
+    def _run_convert(self, file_content: bytes, original_extension: str) -> bytes:
+        """Pipes a file through ImageMagick's convert command.
 
         Args:
-            input_path: The path to the input file.
-            output_path: The path to the output file.
+            file_content: The content of the file to convert.
+            original_extension: The original extension of the file, used to
+                tell ImageMagick the input format.
+
+        Returns:
+            The content of the converted PNG file.
+
+        Raises:
+            RuntimeError: If ImageMagick exits with an error or writes no PNG.
         """
+        input_format = original_extension.lstrip(".").lower()
         cmd = [
             "convert",
-            str(input_path),
-            str(output_path),
+            "-limit",
+            "memory",
+            self.config.IMAGE_CONVERTER_MEMORY_LIMIT,
+            "-limit",
+            "map",
+            self.config.IMAGE_CONVERTER_MAP_LIMIT,
+            "-limit",
+            "disk",
+            self.config.IMAGE_CONVERTER_DISK_LIMIT,
+            f"{input_format}:-[0]" if input_format else "-[0]",
+            "png:-",
         ]
         self.logger.info(f"Running command: {' '.join(cmd)}")
-        completed = subprocess.run(cmd, capture_output=True, text=True, timeout=120)  # nosec B603
+        completed = subprocess.run(cmd, input=file_content, capture_output=True, timeout=120)  # nosec B603
+        stderr = completed.stderr.decode(errors="replace")[:500]
         if completed.returncode != 0:
-            self.logger.error(f"ImageMagick failed: {completed.stderr[:500]}")
-            raise RuntimeError(f"ImageMagick failed: {completed.stderr[:500]}")
-        self.logger.info(f"ImageMagick output: {completed.stdout[:500]}")
+            self.logger.error(f"ImageMagick failed: {stderr}")
+            raise RuntimeError(f"ImageMagick failed: {stderr}")
+        if not completed.stdout:
+            raise RuntimeError("ImageMagick conversion failed to produce a PNG file.")
+        return bytes(completed.stdout)
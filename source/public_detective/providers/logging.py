@@ -1,29 +1,31 @@
 """This module sets up a centralized, context-aware logging system.
 
 It provides a `LoggingProvider` singleton that configures and dispenses a
-logger. A key feature is the `ContextualFilter`, which uses thread-local
-storage to inject a `correlation_id` into every log message, making it
+logger. A key feature is the `ContextualFilter`, which uses a context
+variable to inject a `correlation_id` into every log message, making it
 easier to trace requests or tasks as they flow through the application.
+Context variables are local to each thread and to each asyncio task, so
+messages processed concurrently on the same event loop keep their own IDs.
 """
 
 from __future__ import annotations
 
 import sys
-import threading
 from collections.abc import Generator
 from contextlib import contextmanager
+from contextvars import ContextVar
 from logging import Filter, Formatter, Logger, LogRecord, StreamHandler, _nameToLevel, getLogger
 
 from public_detective.providers.config import ConfigProvider
 
-_log_context = threading.local()
+_correlation_id: ContextVar[str | None] = ContextVar("correlation_id", default=None)
 
 
 class ContextualFilter(Filter):
     """A logging filter that makes a correlation ID available to the log formatter."""
 
     def filter(self, record: LogRecord) -> bool:
-        """Adds the correlation ID to the log record from thread-local context.
+        """Adds the correlation ID of the current context to the log record.
 
         Args:
             record: The log record to be filtered.
@@ -31,7 +33,7 @@ class ContextualFilter(Filter):
         Returns:
             Always True to ensure the log record is processed.
         """
-        record.correlation_id = getattr(_log_context, "correlation_id", "-")
+        record.correlation_id = _correlation_id.get() or "-"
         return True
 
 
@@ -125,8 +127,8 @@ class LoggingProvider:
         Yields:
             None.
         """
+        token = _correlation_id.set(correlation_id)
         try:
-            _log_context.correlation_id = correlation_id
             yield
         finally:
-            _log_context.correlation_id = None
+            _correlation_id.reset(token)
@@ -1,25 +1,417 @@
-"""Providers for converting office documents with LibreOffice."""
+"""Providers for converting office documents with LibreOffice.
+
+Conversions are sent to a pool of long-lived `unoserver` processes, each
+wrapping a warm LibreOffice instance, so the seconds LibreOffice takes to
+start are paid once per worker instead of once per file. When the server
+command is not installed, or the pool is disabled, every conversion falls
+back to a one-shot headless `soffice` run.
+"""
 
 import json
+import os
+import queue
+import shlex
+import shutil
+import signal
+import socket
 import subprocess  # nosec B404
 import tempfile
+import threading
+import time
+from http.client import HTTPConnection
+from multiprocessing.util import Finalize
 from pathlib import Path
+from typing import Any, cast
+from xmlrpc.client import Binary, Error, Fault, ServerProxy, Transport
 
+from public_detective.exceptions.office_converter import OfficeServerUnavailableError
+from public_detective.providers.config import Config, ConfigProvider
+from public_detective.providers.conversion_cache import ConversionCache, get_command_version
 from public_detective.providers.logging import Logger, LoggingProvider
 
+SPREADSHEET_EXPORT_OPTIONS: dict[str, Any] = {"AllSheets": True, "ScaleToPagesX": 1, "ScaleToPagesY": 1}
+
+
+def _find_free_port() -> int:
+    """Asks the operating system for a free local TCP port.
+
+    Returns:
+        A port number that was free at the time of the call.
+    """
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as probe:
+        probe.bind(("127.0.0.1", 0))
+        port: int = probe.getsockname()[1]
+        return port
+
+
+class _TimeoutTransport(Transport):
+    """An XML-RPC transport whose connections give up after a timeout."""
+
+    timeout: float
+
+    def __init__(self, timeout: float) -> None:
+        """Initializes the transport.
+
+        Args:
+            timeout: The number of seconds to wait on the socket.
+        """
+        super().__init__()
+        self.timeout = timeout
+
+    def make_connection(self, host: str | tuple[str, dict[str, str]]) -> HTTPConnection:
+        """Creates the HTTP connection with the configured timeout.
+
+        Args:
+            host: The host to connect to.
+
+        Returns:
+            The HTTP connection.
+        """
+        connection = super().make_connection(host)
+        connection.timeout = self.timeout
+        return connection
+
+
+class OfficeServerWorker:
+    """A long-lived `unoserver` process wrapping one warm LibreOffice instance.
+
+    Each worker listens on its own pair of local ports and keeps its own
+    LibreOffice user profile, so workers never share state. The process is
+    started in its own session, so a hung worker can be killed together with
+    the LibreOffice process it spawned.
+    """
+
+    _PING_TIMEOUT_SECONDS = 5.0
+    _STOP_TIMEOUT_SECONDS = 10.0
+
+    command: list[str]
+    job_timeout: float
+    startup_timeout: float
+    port: int
+    jobs_done: int
+    last_checked_at: float
+    _process: subprocess.Popen[bytes] | None
+    _profile_dir: str | None
+
+    def __init__(self, command: list[str], job_timeout: float, startup_timeout: float) -> None:
+        """Initializes the worker without starting it.
+
+        Args:
+            command: The command that runs `unoserver`, split into arguments.
+            job_timeout: The number of seconds a single conversion may take.
+            startup_timeout: The number of seconds LibreOffice may take to
+                start accepting jobs.
+        """
+        self.command = command
+        self.job_timeout = job_timeout
+        self.startup_timeout = startup_timeout
+        self.port = 0
+        self.jobs_done = 0
+        self.last_checked_at = 0.0
+        self._process = None
+        self._profile_dir = None
+
+    def launch(self) -> None:
+        """Starts the server process without waiting for it to accept jobs."""
+        self.port = _find_free_port()
+        uno_port = _find_free_port()
+        self._profile_dir = tempfile.mkdtemp(prefix="lo-profile-")
+        cmd = [
+            *self.command,
+            "--interface",
+            "127.0.0.1",
+            "--port",
+            str(self.port),
+            "--uno-port",
+            str(uno_port),
+            "--user-installation",
+            Path(self._profile_dir).as_uri(),
+        ]
+        self._process = subprocess.Popen(  # nosec B603
+            cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True
+        )
+        self.jobs_done = 0
+
+    def wait_until_ready(self) -> None:
+        """Blocks until the server answers a health check.
+
+        Raises:
+            RuntimeError: If the process exits or does not answer in time.
+        """
+        deadline = time.monotonic() + self.startup_timeout
+        while not self.ping():
+            if not self.is_alive():
+                raise RuntimeError(f"LibreOffice server on port {self.port} exited during startup.")
+            if time.monotonic() >= deadline:
+                raise RuntimeError(
+                    f"LibreOffice server on port {self.port} did not start within {self.startup_timeout} seconds."
+                )
+            time.sleep(0.5)
+
+    def is_alive(self) -> bool:
+        """Checks whether the server process is running.
+
+        Returns:
+            True if the process was started and has not exited.
+        """
+        return self._process is not None and self._process.poll() is None
+
+    def ping(self) -> bool:
+        """Runs a health check against the server.
+
+        Returns:
+            True if the server answered its `info` call.
+        """
+        if not self.is_alive():
+            return False
+        try:
+            self._get_proxy(self._PING_TIMEOUT_SECONDS).info()
+        except (OSError, Error):
+            return False
+        self.last_checked_at = time.monotonic()
+        return True
+
+    def convert(self, content: bytes, filter_name: str | None, filter_options: list[str]) -> bytes:
+        """Converts a document to PDF on this worker.
+
+        Args:
+            content: The content of the document.
+            filter_name: The LibreOffice export filter, or `None` to let
+                LibreOffice pick one for the document type.
+            filter_options: The export filter options, as `Name=Value` strings.
+
+        Returns:
+            The content of the converted PDF file.
+
+        Raises:
+            RuntimeError: If the server answered without any content.
+        """
+        result = self._get_proxy(self.job_timeout).convert(
+            None, Binary(content), None, "pdf", filter_name, filter_options, True, None
+        )
+        self.jobs_done += 1
+        self.last_checked_at = time.monotonic()
+        if not isinstance(result, Binary):
+            raise RuntimeError("LibreOffice server returned no content.")
+        return result.data
+
+    def stop(self) -> None:
+        """Stops the server process and removes its user profile."""
+        process = self._process
+        self._process = None
+        if process is not None and process.poll() is None:
+            process.terminate()
+            try:
+                process.wait(timeout=self._STOP_TIMEOUT_SECONDS)
+            except subprocess.TimeoutExpired:
+                try:
+                    os.killpg(process.pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+                process.wait()
+        if self._profile_dir:
+            shutil.rmtree(self._profile_dir, ignore_errors=True)
+            self._profile_dir = None
+
+    def _get_proxy(self, timeout: float) -> ServerProxy:
+        """Creates an XML-RPC proxy to the server.
+
+        Args:
+            timeout: The number of seconds to wait for an answer.
+
+        Returns:
+            The proxy.
+        """
+        return ServerProxy(f"http://127.0.0.1:{self.port}", transport=_TimeoutTransport(timeout), allow_none=True)
+
+
+class OfficeServerPool:
+    """A fixed-size pool of warm LibreOffice servers shared by a process.
+
+    Jobs wait for an idle worker, so at most `OFFICE_CONVERTER_POOL_SIZE`
+    conversions run at once. Before a job, a worker is restarted if its
+    process died, if it did not answer a health check, or if it already
+    ran `OFFICE_CONVERTER_MAX_JOBS_PER_WORKER` jobs. A job that times out or
+    loses its connection gets its worker restarted and fails, so a broken
+    document cannot hang the pool.
+    """
+
+    _HEALTH_CHECK_INTERVAL_SECONDS = 30.0
+
+    _instance: "OfficeServerPool | None" = None
+    _instance_pid: int | None = None
+    _unavailable: bool = False
+    _instance_lock = threading.Lock()
+
+    config: Config
+    logger: Logger
+    workers: list[OfficeServerWorker]
+    _idle_workers: "queue.Queue[OfficeServerWorker]"
+
+    def __init__(self, config: Config) -> None:
+        """Initializes the pool without starting its workers.
+
+        Args:
+            config: The application configuration holding the pool settings.
+        """
+        self.config = config
+        self.logger = LoggingProvider().get_logger()
+        command = shlex.split(config.OFFICE_CONVERTER_SERVER_COMMAND)
+        self.workers = [
+            OfficeServerWorker(
+                command,
+                job_timeout=config.OFFICE_CONVERTER_JOB_TIMEOUT_SECONDS,
+                startup_timeout=config.OFFICE_CONVERTER_STARTUP_TIMEOUT_SECONDS,
+            )
+            for _ in range(config.OFFICE_CONVERTER_POOL_SIZE)
+        ]
+        self._idle_workers = queue.Queue()
+
+    @classmethod
+    def get_instance(cls) -> "OfficeServerPool | None":
+        """Returns the pool of the current process, starting it on first use.
+
+        A pool inherited from a parent process through `fork` is discarded,
+        since its servers belong to the parent. The servers run in their own
+        sessions, so they are stopped explicitly when the process exits,
+        including pre-analysis worker processes.
+
+        Returns:
+            The started pool, or `None` if the pool is disabled or none of its
+            servers could be started.
+        """
+        config = ConfigProvider.get_config()
+        if config.OFFICE_CONVERTER_POOL_SIZE <= 0:
+            return None
+        with cls._instance_lock:
+            if cls._instance_pid != os.getpid():
+                cls._instance = None
+                cls._unavailable = False
+                cls._instance_pid = os.getpid()
+            if cls._instance is None and not cls._unavailable:
+                pool = cls(config)
+                try:
+                    pool.start()
+                except (OSError, OfficeServerUnavailableError) as e:
+                    pool.logger.warning(
+                        f"Could not start the LibreOffice server command "
+                        f"'{config.OFFICE_CONVERTER_SERVER_COMMAND}'; converting one file per soffice run. "
+                        f"Error: {e}"
+                    )
+                    pool.stop()
+                    cls._unavailable = True
+                else:
+                    Finalize(None, pool.stop, exitpriority=10)
+                    cls._instance = pool
+            return cls._instance
+
+    def start(self) -> None:
+        """Starts every worker and waits for them to become ready.
+
+        The processes are launched together, so LibreOffice instances warm up
+        in parallel. A worker that fails to become ready is restarted when a
+        job first needs it.
+
+        Raises:
+            OfficeServerUnavailableError: If no worker became ready, which
+                usually means the server command cannot run at all.
+        """
+        self.logger.info(f"Starting {len(self.workers)} LibreOffice server(s).")
+        for worker in self.workers:
+            worker.launch()
+        failures = []
+        for worker in self.workers:
+            try:
+                worker.wait_until_ready()
+            except RuntimeError as e:
+                failures.append(str(e))
+                worker.stop()
+        if len(failures) == len(self.workers):
+            raise OfficeServerUnavailableError(f"No LibreOffice server became ready. {' '.join(failures)}")
+        for error in failures:
+            self.logger.warning(f"{error} It will be restarted on its next job.")
+        for worker in self.workers:
+            self._idle_workers.put(worker)
+
+    def stop(self) -> None:
+        """Stops every worker."""
+        for worker in self.workers:
+            worker.stop()
+
+    def convert(self, content: bytes, filter_name: str | None, filter_options: list[str]) -> bytes:
+        """Converts a document to PDF on the next idle worker.
+
+        Args:
+            content: The content of the document.
+            filter_name: The LibreOffice export filter, or `None` to let
+                LibreOffice pick one for the document type.
+            filter_options: The export filter options, as `Name=Value` strings.
+
+        Returns:
+            The content of the converted PDF file.
+
+        Raises:
+            OfficeServerUnavailableError: If the worker could not be restarted.
+            RuntimeError: If the conversion fails or its worker stops responding.
+        """
+        worker = self._idle_workers.get()
+        try:
+            self._ensure_ready(worker)
+            try:
+                return worker.convert(content, filter_name, filter_options)
+            except Fault as e:
+                raise RuntimeError(f"LibreOffice failed: {e.faultString[:500]}") from e
+            except (OSError, Error) as e:
+                self.logger.warning(
+                    f"LibreOffice server on port {worker.port} stopped responding during a job; restarting it. "
+                    f"Error: {e}"
+                )
+                worker.stop()
+                raise RuntimeError(f"LibreOffice server failed: {e}") from e
+        finally:
+            self._idle_workers.put(worker)
+
+    def _ensure_ready(self, worker: OfficeServerWorker) -> None:
+        """Restarts a worker that crashed, is unhealthy or is due for recycling.
+
+        Args:
+            worker: The worker about to run a job.
+
+        Raises:
+            OfficeServerUnavailableError: If the worker could not be restarted.
+        """
+        recently_checked = time.monotonic() - worker.last_checked_at < self._HEALTH_CHECK_INTERVAL_SECONDS
+        if (
+            worker.is_alive()
+            and worker.jobs_done < self.config.OFFICE_CONVERTER_MAX_JOBS_PER_WORKER
+            and (recently_checked or worker.ping())
+        ):
+            return
+
+        self.logger.info(f"Restarting LibreOffice server on port {worker.port}.")
+        worker.stop()
+        try:
+            worker.launch()
+            worker.wait_until_ready()
+        except (OSError, RuntimeError) as e:
+            worker.stop()
+            raise OfficeServerUnavailableError(f"Could not restart the LibreOffice server: {e}") from e
+
 
 class OfficeConverterProvider:
     """A provider for converting office files using LibreOffice."""
 
     logger: Logger
+    conversion_cache: ConversionCache | None
     _SPREADSHEET_EXTENSIONS: tuple[str, ...] = (".xlsx", ".xls", ".xlsb", ".ods", ".xlsm")
 
     def __init__(self) -> None:
         """Initializes the provider."""
         self.logger = LoggingProvider().get_logger()
+        self.conversion_cache = ConversionCache.get_instance()
 
     def to_pdf(self, file_content: bytes, original_extension: str) -> bytes:
-        """Converts an office file to PDF.
+        """Converts an office file to PDF, reusing a cached result if any.
 
         Args:
             file_content: The content of the file to convert.
@@ -28,12 +420,54 @@ class OfficeConverterProvider:
         Returns:
             The content of the converted PDF file.
         """
+        if self.conversion_cache is None:
+            return self._convert_to_pdf(file_content, original_extension)
+        return cast(
+            bytes,
+            self.conversion_cache.get_or_convert(
+                file_content,
+                original_extension,
+                "pdf",
+                get_command_version(["soffice", "--version"]),
+                lambda: self._convert_to_pdf(file_content, original_extension),
+            ),
+        )
+
+    def _convert_to_pdf(self, file_content: bytes, original_extension: str) -> bytes:
+        """Converts an office file to PDF with LibreOffice.
+
+        The conversion runs on the LibreOffice server pool when it is
+        available, and on a one-shot `soffice` process otherwise, including
+        when the pool cannot restart the server picked for the job.
+
+        Args:
+            file_content: The content of the file to convert.
+            original_extension: The original extension of the file.
+
+        Returns:
+            The content of the converted PDF file.
+
+        Raises:
+            RuntimeError: If LibreOffice does not produce a PDF file.
+        """
+        is_spreadsheet = original_extension.lower() in self._SPREADSHEET_EXTENSIONS
+        pool = OfficeServerPool.get_instance()
+        if pool is not None:
+            if is_spreadsheet:
+                filter_name: str | None = "calc_pdf_Export"
+                filter_options = [f"{name}={json.dumps(value)}" for name, value in SPREADSHEET_EXPORT_OPTIONS.items()]
+            else:
+                filter_name, filter_options = None, []
+            try:
+                return pool.convert(file_content, filter_name, filter_options)
+            except OfficeServerUnavailableError as e:
+                self.logger.warning(f"{e} Converting the file with a one-shot soffice run instead.")
+
         with tempfile.TemporaryDirectory() as td:
             tmp_dir = Path(td)
             in_path = tmp_dir / f"input{original_extension}"
             in_path.write_bytes(file_content)
 
-            is_spreadsheet = original_extension.lower() in self._SPREADSHEET_EXTENSIONS
             self._run_soffice(in_path, tmp_dir, is_spreadsheet=is_spreadsheet)
 
             produced_files = list(tmp_dir.glob("*.pdf"))
@@ -55,10 +489,12 @@ class OfficeConverterProvider:
             input_path: The path to the input file.
             output_dir: The path to the output directory.
             is_spreadsheet: Whether the file is a spreadsheet.
+
+        Raises:
+            RuntimeError: If soffice exits with an error.
         """
         if is_spreadsheet:
-            filter_options = {"AllSheets": True, "ScaleToPagesX": 1, "ScaleToPagesY": 1}
-            target = f"pdf:calc_pdf_Export:{json.dumps(filter_options)}"
+            target = f"pdf:calc_pdf_Export:{json.dumps(SPREADSHEET_EXPORT_OPTIONS)}"
         else:
             target = "pdf:writer_pdf_Export"
 
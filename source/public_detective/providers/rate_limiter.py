@@ -0,0 +1,255 @@
+"""This module provides per-host rate limiting for outgoing HTTP requests.
+
+It defines a thread-safe `TokenBucket` that adapts its refill rate to the
+feedback given by the remote host, and a `RateLimiter` registry that keeps
+one bucket per host so that every thread talking to the same server shares
+the same budget.
+"""
+
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from http import HTTPStatus
+from urllib.parse import urlparse
+
+import requests
+from public_detective.providers.config import Config
+
+THROTTLING_STATUS_CODES = (HTTPStatus.TOO_MANY_REQUESTS, HTTPStatus.SERVICE_UNAVAILABLE)
+
+
+class TokenBucket:
+    """A token bucket whose refill rate backs off and recovers adaptively.
+
+    Every request consumes one token. Tokens refill continuously at the
+    current rate, up to `capacity`. When the host signals that it is
+    overloaded the rate is cut multiplicatively and, if the host asked for
+    it, the bucket stays closed until the `Retry-After` deadline. Each normal
+    answer then ramps the rate back up additively towards `max_rate`.
+    """
+
+    _BACKOFF_FACTOR = 0.5
+    _RECOVERY_STEP = 0.1
+
+    max_rate: float
+    min_rate: float
+    capacity: float
+    rate: float
+    _tokens: float
+    _last_refill: float
+    _blocked_until: float
+    _lock: threading.Lock
+
+    def __init__(self, max_rate: float, capacity: float, min_rate: float) -> None:
+        """Initializes the bucket full and at its maximum rate.
+
+        Args:
+            max_rate: The highest refill rate, in requests per second.
+            capacity: The maximum number of tokens, i.e. the allowed burst.
+            min_rate: The lowest refill rate the bucket backs off to.
+        """
+        self.max_rate = max_rate
+        self.min_rate = min(min_rate, max_rate)
+        self.capacity = max(1.0, capacity)
+        self.rate = max_rate
+        self._tokens = self.capacity
+        self._last_refill = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        """Adds the tokens accumulated since the last refill.
+
+        Args:
+            now: The current monotonic time.
+        """
+        elapsed = max(0.0, now - self._last_refill)
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+        self._last_refill = now
+
+    def acquire(self) -> None:
+        """Blocks until a token is available and consumes it."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now < self._blocked_until:
+                    wait_seconds = self._blocked_until - now
+                elif self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                else:
+                    wait_seconds = (1 - self._tokens) / self.rate
+            time.sleep(wait_seconds)
+
+    def penalize(self, retry_after: float | None = None) -> None:
+        """Slows the bucket down after the host signalled overload.
+
+        Args:
+            retry_after: The number of seconds the host asked clients to
+                wait before the next request, if any.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.rate = max(self.min_rate, self.rate * self._BACKOFF_FACTOR)
+            self._tokens = 0.0
+            if retry_after:
+                self._blocked_until = max(self._blocked_until, now + retry_after)
+
+    def reward(self) -> None:
+        """Ramps the rate back up after the host answered normally."""
+        with self._lock:
+            if self.rate < self.max_rate:
+                self._refill(time.monotonic())
+                self.rate = min(self.max_rate, self.rate + self.max_rate * self._RECOVERY_STEP)
+
+    def resize(self, max_rate: float, capacity: float, min_rate: float) -> None:
+        """Changes the limits of the bucket, keeping its current backoff.
+
+        Args:
+            max_rate: The new highest refill rate, in requests per second.
+            capacity: The new maximum number of tokens.
+            min_rate: The new lowest refill rate.
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            scale = max_rate / self.max_rate if self.max_rate else 1.0
+            self.max_rate = max_rate
+            self.min_rate = min(min_rate, max_rate)
+            self.capacity = max(1.0, capacity)
+            self.rate = min(self.max_rate, max(self.min_rate, self.rate * scale))
+            self._tokens = min(self.capacity, self._tokens)
+
+
+class RateLimiter:
+    """A thread-safe registry of token buckets, one per remote host.
+
+    The configured limits are the budget of the whole run. When several
+    processes talk to the same hosts, each one takes an equal share of it.
+    """
+
+    config: Config
+    process_count: int
+    _buckets: dict[str, TokenBucket]
+    _lock: threading.Lock
+
+    def __init__(self, config: Config) -> None:
+        """Initializes the rate limiter.
+
+        Args:
+            config: The application configuration holding the bucket limits.
+        """
+        self.config = config
+        self.process_count = 1
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        """Whether requests should be rate limited at all.
+
+        Returns:
+            True if a positive request rate is configured.
+        """
+        return bool(self.config.HTTP_MAX_REQUESTS_PER_SECOND > 0)
+
+    def _bucket_limits(self) -> tuple[float, float, float]:
+        """Returns this process's share of the configured limits.
+
+        Returns:
+            The maximum rate, burst capacity and minimum rate of a bucket.
+        """
+        return (
+            self.config.HTTP_MAX_REQUESTS_PER_SECOND / self.process_count,
+            self.config.HTTP_RATE_LIMIT_BURST / self.process_count,
+            self.config.HTTP_RATE_LIMIT_MIN_REQUESTS_PER_SECOND / self.process_count,
+        )
+
+    def share_between_processes(self, process_count: int) -> None:
+        """Splits the per-host budget evenly between cooperating processes.
+
+        Every process of the run must call this with the same count so that,
+        together, they stay within the configured rate. Buckets that already
+        exist are resized and keep their backoff.
+
+        Args:
+            process_count: The number of processes sending requests.
+        """
+        with self._lock:
+            self.process_count = max(1, process_count)
+            max_rate, capacity, min_rate = self._bucket_limits()
+            for bucket in self._buckets.values():
+                bucket.resize(max_rate=max_rate, capacity=capacity, min_rate=min_rate)
+
+    def get_bucket(self, url: str) -> TokenBucket:
+        """Returns the bucket shared by every request to the URL's host.
+
+        Args:
+            url: The URL about to be requested.
+
+        Returns:
+            The token bucket for the URL's host.
+        """
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                max_rate, capacity, min_rate = self._bucket_limits()
+                bucket = TokenBucket(max_rate=max_rate, capacity=capacity, min_rate=min_rate)
+                self._buckets[host] = bucket
+        return bucket
+
+    def acquire(self, url: str) -> None:
+        """Blocks until a request to the URL's host may be sent.
+
+        Args:
+            url: The URL about to be requested.
+        """
+        if self.enabled:
+            self.get_bucket(url).acquire()
+
+    def record_response(self, url: str, response: requests.Response) -> None:
+        """Feeds a response back into the host's bucket.
+
+        Throttling answers (429 and 503) slow the bucket down and honour the
+        `Retry-After` header; any other answer lets it recover.
+
+        Args:
+            url: The URL that was requested.
+            response: The response received from the host.
+        """
+        if not self.enabled:
+            return
+        bucket = self.get_bucket(url)
+        if response.status_code in THROTTLING_STATUS_CODES:
+            retry_after = self.parse_retry_after(response.headers.get("Retry-After"))
+            bucket.penalize(retry_after)
+        else:
+            bucket.reward()
+
+    def parse_retry_after(self, value: str | None) -> float | None:
+        """Parses a `Retry-After` header given in seconds or as an HTTP date.
+
+        Args:
+            value: The raw header value.
+
+        Returns:
+            The number of seconds to wait, capped by
+            `HTTP_RETRY_AFTER_MAX_SECONDS`, or `None` if absent or invalid.
+        """
+        if not value:
+            return None
+        value = value.strip()
+        if value.isdigit():
+            seconds = float(value)
+        else:
+            try:
+                retry_at = parsedate_to_datetime(value)
+            except (TypeError, ValueError):
+                return None
+            if retry_at.tzinfo is None:
+                retry_at = retry_at.replace(tzinfo=timezone.utc)
+            seconds = (retry_at - datetime.now(timezone.utc)).total_seconds()
+        return float(min(max(0.0, seconds), self.config.HTTP_RETRY_AFTER_MAX_SECONDS))
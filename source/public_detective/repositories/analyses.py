@@ -104,6 +104,7 @@ class AnalysisRepository:
         total_cost: Decimal,
         search_queries_used: int = 0,
         analysis_prompt: str = "",
+        cached_input_tokens: int = 0,
     ) -> None:
         """Updates an existing analysis record with the full analysis results.
 
@@ -127,6 +128,8 @@ class AnalysisRepository:
             total_cost: The total calculated cost of the analysis.
             search_queries_used: The number of search queries performed.
             analysis_prompt: The prompt used for the analysis.
+            cached_input_tokens: The part of the input tokens read from a
+                context cache.
         """
         self.logger.info(f"Updating analysis for analysis_id {analysis_id}.")
 
@@ -145,6 +148,8 @@ class AnalysisRepository:
                 processed_documents_gcs_path = :processed_documents_gcs_path,
                 status = :status,
                 input_tokens_used = :input_tokens_used,
+                input_tokens_estimated = FALSE,
+                cached_input_tokens_used = :cached_input_tokens_used,
                 output_tokens_used = :output_tokens_used,
                 thinking_tokens_used = :thinking_tokens_used,
                 cost_input_tokens = :cost_input_tokens,
@@ -177,6 +182,7 @@ class AnalysisRepository:
             "status": ProcurementAnalysisStatus.ANALYSIS_SUCCESSFUL.value,
             "analysis_prompt": result.analysis_prompt,
             "input_tokens_used": input_tokens,
+            "cached_input_tokens_used": cached_input_tokens,
             "output_tokens_used": output_tokens,
             "thinking_tokens_used": thinking_tokens,
             "cost_input_tokens": input_cost,
@@ -352,6 +358,8 @@ class AnalysisRepository:
         total_cost: Decimal,
         search_queries_used: int = 0,
         analysis_prompt: str = "",
+        estimated_input_tokens: int | None = None,
+        input_tokens_estimated: bool = False,
     ) -> None:
         """Updates an existing analysis record with token counts and costs.
 
@@ -368,6 +376,10 @@ class AnalysisRepository:
             total_cost: The total calculated cost of the analysis.
             search_queries_used: The number of search queries performed.
             analysis_prompt: The prompt used for the analysis.
+            estimated_input_tokens: The local, uncalibrated estimate of the
+                input tokens, if one was made.
+            input_tokens_estimated: Whether `input_tokens_used` is a
+                calibrated estimate instead of a count made by the model.
         """
         self.logger.info(f"Updating pre-analysis record {analysis_id} with token counts.")
         sql = text(
@@ -375,6 +387,8 @@ class AnalysisRepository:
             UPDATE procurement_analyses
             SET
                 input_tokens_used = :input_tokens_used,
+                estimated_input_tokens = :estimated_input_tokens,
+                input_tokens_estimated = :input_tokens_estimated,
                 output_tokens_used = :output_tokens_used,
                 thinking_tokens_used = :thinking_tokens_used,
                 cost_input_tokens = :cost_input_tokens,
@@ -399,12 +413,40 @@ class AnalysisRepository:
             "search_queries_used": search_queries_used,
             "total_cost": total_cost,
             "analysis_prompt": analysis_prompt,
+            "estimated_input_tokens": estimated_input_tokens,
+            "input_tokens_estimated": input_tokens_estimated,
         }
         with self.engine.connect() as conn:
             conn.execute(sql, params)
             conn.commit()
         self.logger.info(f"Pre-analysis record {analysis_id} updated successfully.")
 
+    def get_token_estimation_samples(self, limit: int) -> list[tuple[int, int]]:
+        """Retrieves recent analyses with both an estimated and an exact token count.
+
+        Args:
+            limit: The maximum number of analyses to return.
+
+        Returns:
+            The `(estimated_input_tokens, input_tokens_used)` pairs of the most
+            recently updated analyses whose input tokens were counted by the
+            model.
+        """
+        sql = text(
+            """
+            SELECT estimated_input_tokens, input_tokens_used
+            FROM procurement_analyses
+            WHERE NOT input_tokens_estimated
+                AND estimated_input_tokens > 0
+                AND input_tokens_used > 0
+            ORDER BY updated_at DESC
+            LIMIT :limit;
+            """
+        )
+        with self.engine.connect() as conn:
+            rows = conn.execute(sql, {"limit": limit}).fetchall()
+        return [(int(row[0]), int(row[1])) for row in rows]
+
     def get_analysis_by_id(self, analysis_id: UUID) -> AnalysisResult | None:
         """Retrieves a single analysis record by its primary key.
 
@@ -431,6 +473,8 @@ class AnalysisRepository:
                 original_documents_gcs_path,
                 processed_documents_gcs_path,
                 input_tokens_used,
+                estimated_input_tokens,
+                input_tokens_estimated,
                 output_tokens_used,
                 thinking_tokens_used,
                 created_at,
@@ -671,6 +715,8 @@ class AnalysisRepository:
                 procurement_analyses.processed_documents_gcs_path,
                 procurement_analyses.analysis_prompt,
                 procurement_analyses.input_tokens_used,
+                procurement_analyses.estimated_input_tokens,
+                procurement_analyses.input_tokens_estimated,
                 procurement_analyses.output_tokens_used,
                 procurement_analyses.thinking_tokens_used,
                 procurement_analyses.created_at,
@@ -0,0 +1,184 @@
+"""This module defines the repository for the content-addressed file store."""
+
+from datetime import datetime
+
+from public_detective.models.file_contents import FileContent
+from public_detective.providers.logging import Logger, LoggingProvider
+from sqlalchemy import Engine, text
+
+
+class FileContentsRepository:
+    """Handles database operations for the content-addressed file store.
+
+    Each row of the `file_contents` table describes one distinct file content,
+    keyed by the SHA-256 of its original bytes. File records point to it
+    through their `content_hash` column, and `reference_count` counts them so
+    that unreferenced contents can be garbage-collected.
+    """
+
+    logger: Logger
+    engine: Engine
+
+    def __init__(self, engine: Engine) -> None:
+        """Initializes the repository with a database engine.
+
+        Args:
+            engine: The SQLAlchemy Engine to be used for all database
+                communications.
+        """
+        self.logger = LoggingProvider().get_logger()
+        self.engine = engine
+
+    def get_file_contents(self, content_hashes: list[str]) -> dict[str, FileContent]:
+        """Retrieves the stored contents among the given hashes and marks them as used.
+
+        Refreshing `last_used_at` keeps garbage collection from deleting a
+        content between the moment it is looked up for reuse and the moment
+        the file record pointing to it is saved.
+
+        Args:
+            content_hashes: The SHA-256 hex digests to look up.
+
+        Returns:
+            A dictionary mapping each stored hash to its content record.
+        """
+        if not content_hashes:
+            return {}
+        sql = text(
+            """
+            UPDATE file_contents
+            SET last_used_at = NOW()
+            WHERE content_hash = ANY(:content_hashes)
+            RETURNING
+                content_hash, extension, size_bytes, original_gcs_path,
+                prepared_content_gcs_uris, inferred_extension,
+                used_fallback_conversion, ai_content_hash,
+                estimated_tokens, reference_count;
+            """
+        )
+        with self.engine.connect() as conn:
+            rows = conn.execute(sql, {"content_hashes": list(set(content_hashes))}).mappings().all()
+            conn.commit()
+        return {row["content_hash"]: FileContent.model_validate(dict(row)) for row in rows}
+
+    def save_file_content(self, file_content: FileContent) -> None:
+        """Saves a content record, keeping the existing one if it was stored concurrently.
+
+        Args:
+            file_content: The content record to save.
+        """
+        sql = text(
+            """
+            INSERT INTO file_contents (
+                content_hash, extension, size_bytes, original_gcs_path,
+                prepared_content_gcs_uris, inferred_extension,
+                used_fallback_conversion, ai_content_hash,
+                estimated_tokens
+            ) VALUES (
+                :content_hash, :extension, :size_bytes, :original_gcs_path,
+                :prepared_content_gcs_uris, :inferred_extension,
+                :used_fallback_conversion, :ai_content_hash,
+                :estimated_tokens
+            )
+            ON CONFLICT (content_hash) DO NOTHING;
+            """
+        )
+        with self.engine.connect() as conn:
+            conn.execute(sql, file_content.model_dump(exclude={"reference_count"}))
+            conn.commit()
+
+    def add_reference(self, content_hash: str) -> None:
+        """Records a new file record pointing to a content.
+
+        Args:
+            content_hash: The hash of the referenced content.
+        """
+        sql = text(
+            """
+            UPDATE file_contents
+            SET reference_count = reference_count + 1, last_used_at = NOW()
+            WHERE content_hash = :content_hash;
+            """
+        )
+        with self.engine.connect() as conn:
+            conn.execute(sql, {"content_hash": content_hash})
+            conn.commit()
+
+    def save_estimated_tokens(self, estimated_tokens: dict[str, int]) -> None:
+        """Saves the local token estimate made for each content.
+
+        Args:
+            estimated_tokens: A dictionary mapping content hashes to estimates.
+        """
+        if not estimated_tokens:
+            return
+        sql = text(
+            """
+            UPDATE file_contents
+            SET estimated_tokens = :estimated_tokens
+            WHERE content_hash = :content_hash;
+            """
+        )
+        with self.engine.connect() as conn:
+            conn.execute(
+                sql,
+                [
+                    {"content_hash": content_hash, "estimated_tokens": estimate}
+                    for content_hash, estimate in estimated_tokens.items()
+                ],
+            )
+            conn.commit()
+
+    def collect_garbage(self, unused_since: datetime) -> list[FileContent]:
+        """Deletes the contents no file record points to anymore.
+
+        Reference counts are first recomputed from the `file_records` table,
+        so they are correct even if file records were removed directly. The
+        recount locks every content row until the deletion is committed, so
+        concurrent lookups and new references wait for it, and the deletion
+        checks `file_records` again to spare contents referenced meanwhile.
+
+        Args:
+            unused_since: Contents last used after this moment are kept even
+                if unreferenced, since an analysis may be about to use them.
+                It must leave analyses time to save the file records of the
+                contents they looked up.
+
+        Returns:
+            The deleted content records, whose GCS objects can be removed.
+        """
+        self.logger.info(f"Collecting file contents unreferenced since {unused_since}.")
+        with self.engine.connect() as conn:
+            conn.execute(
+                text(
+                    """
+                    UPDATE file_contents fc
+                    SET reference_count = (
+                        SELECT COUNT(*) FROM file_records fr WHERE fr.content_hash = fc.content_hash
+                    );
+                    """
+                )
+            )
+            rows = (
+                conn.execute(
+                    text(
+                        """
+                        DELETE FROM file_contents fc
+                        WHERE reference_count = 0
+                            AND last_used_at < :unused_since
+                            AND NOT EXISTS (SELECT 1 FROM file_records fr WHERE fr.content_hash = fc.content_hash)
+                        RETURNING
+                            content_hash, extension, size_bytes, original_gcs_path,
+                            prepared_content_gcs_uris, inferred_extension,
+                            used_fallback_conversion, ai_content_hash,
+                            estimated_tokens, reference_count;
+                        """
+                    ),
+                    {"unused_since": unused_since},
+                )
+                .mappings()
+                .all()
+            )
+            conn.commit()
+        self.logger.info(f"Deleted {len(rows)} unreferenced file contents.")
+        return [FileContent.model_validate(dict(row)) for row in rows]
@@ -49,13 +49,13 @@ class FileRecordsRepository:
                 nesting_level, included_in_analysis, exclusion_reason,
                 prioritization_logic, prioritization_keyword, applied_token_limit,
                 prepared_content_gcs_uris, inferred_extension,
-                used_fallback_conversion
+                used_fallback_conversion, content_hash, ai_content_hash
             ) VALUES (
                 :source_document_id, :file_name, :gcs_path, :extension, :size_bytes,
                 :nesting_level, :included_in_analysis, :exclusion_reason,
                 :prioritization_logic, :prioritization_keyword, :applied_token_limit,
                 :prepared_content_gcs_uris, :inferred_extension,
-                :used_fallback_conversion
+                :used_fallback_conversion, :content_hash, :ai_content_hash
             ) RETURNING id;
         """
         )
@@ -93,6 +93,27 @@ class FileRecordsRepository:
             conn.commit()
         self.logger.info("File records updated successfully.")
 
+    def set_files_as_excluded(self, file_ids: list[UUID]) -> None:
+        """Sets the `included_in_analysis` flag to False for a list of file IDs.
+
+        Args:
+            file_ids: A list of file record UUIDs to update.
+        """
+        if not file_ids:
+            return
+
+        self.logger.info(f"Marking {len(file_ids)} file(s) as excluded from the analysis.")
+        sql = text(
+            """
+            UPDATE file_records
+            SET included_in_analysis = FALSE
+            WHERE id = ANY(:file_ids);
+        """
+        )
+        with self.engine.connect() as conn:
+            conn.execute(sql, {"file_ids": file_ids})
+            conn.commit()
+
     def get_all_file_records_by_analysis_id(self, analysis_id: str) -> list[dict[str, Any]]:
         """Retrieves all file records for a given analysis ID.
 
@@ -121,6 +142,8 @@ class FileRecordsRepository:
                 fr.prioritization_keyword,
                 fr.applied_token_limit,
                 fr.prepared_content_gcs_uris,
+                fr.content_hash,
+                fr.ai_content_hash,
                 fr.raw_document_metadata
             FROM
                 file_records fr
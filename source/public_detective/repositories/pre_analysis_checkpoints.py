@@ -0,0 +1,206 @@
+"""This module defines the repository for pre-analysis run checkpoints."""
+
+from datetime import date
+
+from public_detective.models.pre_analysis_checkpoints import PreAnalysisCheckpoint
+from public_detective.providers.logging import Logger, LoggingProvider
+from sqlalchemy import Engine, text
+
+
+class PreAnalysisCheckpointRepository:
+    """Handles database operations for pre-analysis checkpoints.
+
+    Each pre-analysis run over a date range keeps one row in the
+    `pre_analysis_checkpoints` table with the last completed day and search
+    page, and one row in `pre_analysis_checkpoint_procurements` per
+    procurement already processed on the day in progress. Together they let
+    an interrupted run continue where it stopped instead of starting over.
+    """
+
+    logger: Logger
+    engine: Engine
+
+    def __init__(self, engine: Engine) -> None:
+        """Initializes the repository with a database engine.
+
+        Args:
+            engine: The SQLAlchemy Engine to be used for all database
+                communications.
+        """
+        self.logger = LoggingProvider().get_logger()
+        self.engine = engine
+
+    def get_checkpoint(self, start_date: date, end_date: date) -> PreAnalysisCheckpoint | None:
+        """Retrieves the checkpoint of a run.
+
+        Args:
+            start_date: The first day of the run.
+            end_date: The last day of the run.
+
+        Returns:
+            The checkpoint, or `None` if the run never started.
+        """
+        sql = text(
+            """
+            SELECT start_date, end_date, last_completed_date, page_date, city_code, modality, page
+            FROM pre_analysis_checkpoints
+            WHERE start_date = :start_date AND end_date = :end_date;
+            """
+        )
+        with self.engine.connect() as conn:
+            row = conn.execute(sql, {"start_date": start_date, "end_date": end_date}).mappings().first()
+        if not row:
+            return None
+        return PreAnalysisCheckpoint.model_validate(dict(row))
+
+    def start_run(self, start_date: date, end_date: date) -> None:
+        """Creates a blank checkpoint for a run, discarding any previous progress.
+
+        Args:
+            start_date: The first day of the run.
+            end_date: The last day of the run.
+        """
+        self.logger.info(f"Starting pre-analysis checkpoint for {start_date} to {end_date}.")
+        params = {"start_date": start_date, "end_date": end_date}
+        with self.engine.connect() as conn:
+            conn.execute(
+                text(
+                    """
+                    DELETE FROM pre_analysis_checkpoints
+                    WHERE start_date = :start_date AND end_date = :end_date;
+                    """
+                ),
+                params,
+            )
+            conn.execute(
+                text(
+                    """
+                    INSERT INTO pre_analysis_checkpoints (start_date, end_date)
+                    VALUES (:start_date, :end_date);
+                    """
+                ),
+                params,
+            )
+            conn.commit()
+
+    def save_page(
+        self,
+        start_date: date,
+        end_date: date,
+        target_date: date,
+        city_code: int | None,
+        modality: int,
+        page: int,
+    ) -> None:
+        """Records a search page whose procurements were all processed.
+
+        Args:
+            start_date: The first day of the run.
+            end_date: The last day of the run.
+            target_date: The day the page belongs to.
+            city_code: The IBGE code of the city searched, or `None` for a
+                nationwide search.
+            modality: The code of the procurement modality searched.
+            page: The number of the page.
+        """
+        sql = text(
+            """
+            UPDATE pre_analysis_checkpoints
+            SET page_date = :target_date, city_code = :city_code, modality = :modality, page = :page,
+                updated_at = NOW()
+            WHERE start_date = :start_date AND end_date = :end_date;
+            """
+        )
+        params = {
+            "start_date": start_date,
+            "end_date": end_date,
+            "target_date": target_date,
+            "city_code": city_code,
+            "modality": modality,
+            "page": page,
+        }
+        with self.engine.connect() as conn:
+            conn.execute(sql, params)
+            conn.commit()
+
+    def save_completed_day(self, start_date: date, end_date: date, target_date: date) -> None:
+        """Records a fully processed day and drops its per-procurement progress.
+
+        Args:
+            start_date: The first day of the run.
+            end_date: The last day of the run.
+            target_date: The day that was completed.
+        """
+        params = {"start_date": start_date, "end_date": end_date, "target_date": target_date}
+        with self.engine.connect() as conn:
+            conn.execute(
+                text(
+                    """
+                    UPDATE pre_analysis_checkpoints
+                    SET last_completed_date = :target_date, page_date = NULL, city_code = NULL,
+                        modality = NULL, page = NULL, updated_at = NOW()
+                    WHERE start_date = :start_date AND end_date = :end_date;
+                    """
+                ),
+                params,
+            )
+            conn.execute(
+                text(
+                    """
+                    DELETE FROM pre_analysis_checkpoint_procurements
+                    WHERE start_date = :start_date AND end_date = :end_date AND target_date = :target_date;
+                    """
+                ),
+                params,
+            )
+            conn.commit()
+
+    def mark_processed(self, start_date: date, end_date: date, target_date: date, pncp_control_number: str) -> None:
+        """Records a procurement processed on the day in progress.
+
+        Args:
+            start_date: The first day of the run.
+            end_date: The last day of the run.
+            target_date: The day the procurement was found on.
+            pncp_control_number: The PNCP control number of the procurement.
+        """
+        sql = text(
+            """
+            INSERT INTO pre_analysis_checkpoint_procurements
+                (start_date, end_date, target_date, pncp_control_number)
+            VALUES (:start_date, :end_date, :target_date, :pncp_control_number)
+            ON CONFLICT DO NOTHING;
+            """
+        )
+        params = {
+            "start_date": start_date,
+            "end_date": end_date,
+            "target_date": target_date,
+            "pncp_control_number": pncp_control_number,
+        }
+        with self.engine.connect() as conn:
+            conn.execute(sql, params)
+            conn.commit()
+
+    def get_processed_control_numbers(self, start_date: date, end_date: date, target_date: date) -> set[str]:
+        """Retrieves the procurements already processed on a day.
+
+        Args:
+            start_date: The first day of the run.
+            end_date: The last day of the run.
+            target_date: The day to look up.
+
+        Returns:
+            The PNCP control numbers processed on that day.
+        """
+        sql = text(
+            """
+            SELECT pncp_control_number
+            FROM pre_analysis_checkpoint_procurements
+            WHERE start_date = :start_date AND end_date = :end_date AND target_date = :target_date;
+            """
+        )
+        params = {"start_date": start_date, "end_date": end_date, "target_date": target_date}
+        with self.engine.connect() as conn:
+            result = conn.execute(sql, params).scalars().all()
+        return set(result)
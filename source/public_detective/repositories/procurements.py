@@ -13,14 +13,20 @@ import io
 import json
 import lzma
 import os
+import queue
 import re
+import resource
+import shutil
+import sys
 import tarfile
 import tempfile
+import threading
 import zipfile
-from collections.abc import Callable, Iterator
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 from datetime import date
 from http import HTTPStatus
-from typing import Any, cast
+from typing import IO, Any, BinaryIO, cast
 from urllib.parse import urljoin
 from uuid import UUID
 
@@ -28,6 +34,7 @@ import py7zr
 import rarfile
 import requests
 from google.api_core import exceptions
+from public_detective.exceptions.extraction import ExtractionLimitError
 from public_detective.models.procurements import (
     DocumentType,
     Procurement,
@@ -36,10 +43,13 @@ from public_detective.models.procurements import (
     ProcurementModality,
 )
 from public_detective.providers.config import Config, ConfigProvider
+from public_detective.providers.download_cache import CachedDownload, DownloadCache
+from public_detective.providers.file_type import ARCHIVE_SNIFF_BYTES, ArchiveFormat, sniff_archive_format
 from public_detective.providers.http import HttpProvider
 from public_detective.providers.logging import Logger, LoggingProvider
 from public_detective.providers.pubsub import PubSubProvider
-from pydantic import BaseModel, ValidationError
+from py7zr.io import Py7zIO, WriterFactory
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr, SkipValidation, ValidationError
 from sqlalchemy import Engine, text
 
 
@@ -54,6 +64,15 @@ class ProcessedFile(BaseModel):
             archive, it includes the archive's path structure.
         content: The raw byte content of the file.
         raw_document_metadata: The raw JSON dictionary of the source document.
+        extraction_failed: Whether the file is an archive that could not be
+            extracted.
+        size_limit_exceeded: Whether the download was aborted because the
+            file is larger than `PNCP_DOWNLOAD_MAX_BYTES`. The content is
+            empty in that case.
+        extraction_limit_exceeded: Whether the file is an archive that was not
+            extracted because it exceeded the procurement's extraction budget.
+        archive_format: The archive format sniffed from the file's first
+            bytes, if it looks like an archive.
     """
 
     source_document_id: str
@@ -61,6 +80,477 @@ class ProcessedFile(BaseModel):
     content: bytes
     raw_document_metadata: dict
     extraction_failed: bool = False
+    size_limit_exceeded: bool = False
+    extraction_limit_exceeded: bool = False
+    archive_format: ArchiveFormat | None = None
+
+
+class ExtractionBudget(BaseModel):
+    """The limits applied while extracting the archives of one procurement.
+
+    Attributes:
+        max_depth: The deepest nesting level at which archives are still
+            extracted.
+        max_total_bytes: The total number of bytes that may be decompressed.
+        max_members: The total number of archive members that may be extracted.
+        max_ratio: The highest ratio between the bytes decompressed from an
+            archive and its compressed size.
+        ratio_min_bytes: The number of bytes an archive must produce before
+            its ratio is checked, so small, highly compressible files pass.
+    """
+
+    max_depth: int
+    max_total_bytes: int
+    max_members: int
+    max_ratio: float
+    ratio_min_bytes: int = 1024 * 1024
+
+
+class ExtractionStats(BaseModel):
+    """Tracks the extraction of one procurement's archives against its budget.
+
+    Members are yielded one at a time by the extractors and released once
+    they are processed, so `peak_held_bytes` stays close to the size of the
+    largest member (plus its parents, for nested archives) instead of the
+    total size of the archives. Decompressed bytes are charged as they are
+    read, so a budget violation stops the extraction before the offending
+    member is fully inflated.
+
+    Attributes:
+        budget: The limits to enforce, or `None` to only collect metrics.
+        members: The number of archive members extracted.
+        largest_member_bytes: The size of the largest member extracted.
+        held_bytes: The size of the members currently being processed.
+        peak_held_bytes: The highest value reached by `held_bytes`.
+        total_bytes: The number of bytes decompressed so far.
+        limits_exceeded: How many archives were excluded per exceeded limit.
+    """
+
+    budget: ExtractionBudget | None = None
+    members: int = 0
+    largest_member_bytes: int = 0
+    held_bytes: int = 0
+    peak_held_bytes: int = 0
+    total_bytes: int = 0
+    limits_exceeded: dict[str, int] = Field(default_factory=dict)
+    _archive_stack: list[list[int]] = PrivateAttr(default_factory=list)
+
+    def hold(self, size: int) -> None:
+        """Records a member taken out of an archive.
+
+        Args:
+            size: The size of the member, in bytes.
+
+        Raises:
+            ExtractionLimitError: If the member count exceeds the budget.
+        """
+        self.members += 1
+        self.largest_member_bytes = max(self.largest_member_bytes, size)
+        self.held_bytes += size
+        self.peak_held_bytes = max(self.peak_held_bytes, self.held_bytes)
+        if self.budget and self.members > self.budget.max_members:
+            raise ExtractionLimitError("members", f"more than {self.budget.max_members} archive members")
+
+    def buffer(self, size: int) -> None:
+        """Records bytes decompressed into memory ahead of being yielded.
+
+        Extractors that cannot hand a member over while it is being read
+        record its bytes here, and release them just before yielding it, so
+        `peak_held_bytes` also covers members waiting in memory.
+
+        Args:
+            size: The number of bytes buffered.
+        """
+        self.held_bytes += size
+        self.peak_held_bytes = max(self.peak_held_bytes, self.held_bytes)
+
+    def release(self, size: int) -> None:
+        """Records a member whose processing finished.
+
+        Args:
+            size: The size of the member, in bytes.
+        """
+        self.held_bytes -= size
+
+    def check_depth(self, nesting_level: int) -> None:
+        """Checks that an archive at the given nesting level may be extracted.
+
+        Args:
+            nesting_level: The nesting level of the archive.
+
+        Raises:
+            ExtractionLimitError: If the archive is nested too deeply.
+        """
+        if self.budget and nesting_level >= self.budget.max_depth:
+            raise ExtractionLimitError("depth", f"archive nested deeper than {self.budget.max_depth} levels")
+
+    def enter_archive(self, compressed_size: int) -> None:
+        """Starts charging decompressed bytes to a new archive.
+
+        Args:
+            compressed_size: The size of the archive itself, in bytes.
+        """
+        self._archive_stack.append([compressed_size, 0])
+
+    def exit_archive(self) -> None:
+        """Stops charging decompressed bytes to the innermost archive."""
+        self._archive_stack.pop()
+
+    def consume(self, size: int) -> None:
+        """Charges bytes decompressed from the innermost archive.
+
+        Args:
+            size: The number of bytes just decompressed.
+
+        Raises:
+            ExtractionLimitError: If the total size or the compression ratio
+                exceeds the budget.
+        """
+        self.total_bytes += size
+        if not self.budget:
+            return
+        if self.total_bytes > self.budget.max_total_bytes:
+            raise ExtractionLimitError("total_bytes", f"more than {self.budget.max_total_bytes} bytes decompressed")
+        if self._archive_stack:
+            archive = self._archive_stack[-1]
+            archive[1] += size
+            compressed_size, decompressed_size = archive
+            if (
+                decompressed_size > self.budget.ratio_min_bytes
+                and decompressed_size > max(1, compressed_size) * self.budget.max_ratio
+            ):
+                raise ExtractionLimitError(
+                    "ratio", f"compression ratio above {self.budget.max_ratio:g} ({decompressed_size} bytes)"
+                )
+
+    def check_declared_size(self, size: int) -> None:
+        """Checks the uncompressed size an archive declares before extracting it.
+
+        Args:
+            size: The total uncompressed size declared by the archive.
+
+        Raises:
+            ExtractionLimitError: If extracting it would exceed the total size.
+        """
+        if self.budget and self.total_bytes + size > self.budget.max_total_bytes:
+            raise ExtractionLimitError("total_bytes", f"archive declares {size} uncompressed bytes")
+
+    def record_limit(self, limit: str) -> None:
+        """Counts an archive excluded for exceeding a limit.
+
+        Args:
+            limit: The name of the limit that was exceeded.
+        """
+        self.limits_exceeded[limit] = self.limits_exceeded.get(limit, 0) + 1
+
+
+class SevenZipMemberWriter(Py7zIO):
+    """An in-memory buffer that receives one member decompressed by `py7zr`."""
+
+    _buffer: io.BytesIO
+    _charge: Callable[[int], None]
+
+    def __init__(self, charge: Callable[[int], None]) -> None:
+        """Initializes an empty buffer.
+
+        Args:
+            charge: Called with the size of every write before it is buffered.
+        """
+        self._buffer = io.BytesIO()
+        self._charge = charge
+
+    def write(self, data: bytes | bytearray) -> int:
+        """Charges and buffers decompressed bytes.
+
+        Args:
+            data: The decompressed bytes.
+
+        Returns:
+            The number of bytes written.
+        """
+        self._charge(len(data))
+        return self._buffer.write(data)
+
+    def read(self, size: int | None = None) -> bytes:
+        """Reads from the buffer.
+
+        Args:
+            size: The maximum number of bytes to read.
+
+        Returns:
+            The bytes read.
+        """
+        return self._buffer.read(size)
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        """Moves the buffer position.
+
+        Args:
+            offset: The new position, relative to `whence`.
+            whence: The reference position.
+
+        Returns:
+            The new absolute position.
+        """
+        return self._buffer.seek(offset, whence)
+
+    def flush(self) -> None:
+        """Does nothing, since the buffer lives in memory."""
+
+    def size(self) -> int:
+        """Returns the number of bytes buffered.
+
+        Returns:
+            The size of the buffer.
+        """
+        return self._buffer.getbuffer().nbytes
+
+    def getvalue(self) -> bytes:
+        """Returns the buffered member.
+
+        Returns:
+            The decompressed content of the member.
+        """
+        return self._buffer.getvalue()
+
+
+class SevenZipMemberFactory(WriterFactory):
+    """Creates the in-memory buffers `py7zr` extracts 7z members into.
+
+    Writes may come from several threads when blocks are decompressed in
+    parallel, so they are charged to the extraction budget under a lock.
+    Buffered bytes are also counted as held until the member is taken out
+    of the factory, so the extraction stats see every member in memory.
+
+    Attributes:
+        members: The buffer of each extracted member, by member name.
+    """
+
+    members: dict[str, SevenZipMemberWriter]
+    _stats: ExtractionStats
+    _lock: threading.Lock
+
+    def __init__(self, stats: ExtractionStats) -> None:
+        """Initializes the factory.
+
+        Args:
+            stats: The extraction budget charged by every write.
+        """
+        self.members = {}
+        self._stats = stats
+        self._lock = threading.Lock()
+
+    def create(self, filename: str) -> Py7zIO:
+        """Creates the buffer of a member.
+
+        Args:
+            filename: The name of the member inside the archive.
+
+        Returns:
+            An empty buffer for the member.
+        """
+        writer = SevenZipMemberWriter(self._charge)
+        with self._lock:
+            self.members[filename] = writer
+        return writer
+
+    def take(self, filename: str) -> bytes | None:
+        """Removes a member from the factory and returns its content.
+
+        Args:
+            filename: The name of the member inside the archive.
+
+        Returns:
+            The decompressed content of the member, or None if it was not
+            extracted.
+        """
+        with self._lock:
+            writer = self.members.pop(filename, None)
+            if writer is None:
+                return None
+            self._stats.release(writer.size())
+        return writer.getvalue()
+
+    def discard(self) -> None:
+        """Drops every member still buffered."""
+        with self._lock:
+            for writer in self.members.values():
+                self._stats.release(writer.size())
+            self.members.clear()
+
+    def _charge(self, size: int) -> None:
+        """Charges decompressed bytes to the extraction budget.
+
+        Args:
+            size: The number of bytes decompressed.
+        """
+        with self._lock:
+            self._stats.consume(size)
+            self._stats.buffer(size)
+
+
+class SevenZipMemberStream(SevenZipMemberFactory):
+    """Hands the members of a 7z archive over one at a time while it is extracted.
+
+    A single `extractall` runs on a producer thread, so every block is
+    decompressed once, front to back, even when the archive is solid. A
+    member is complete when `py7zr` asks for the buffer of the next one or
+    when the extraction ends. It is then passed through a queue holding one
+    member, and the producer waits until the consumer asks for the next
+    member before decompressing any further, so only one member is held in
+    memory at a time.
+    """
+
+    _finished: queue.Queue[str | Exception | None]
+    _consumed: threading.Event
+    _cancelled: threading.Event
+    _current: str | None
+
+    def __init__(self, stats: ExtractionStats) -> None:
+        """Initializes the stream.
+
+        Args:
+            stats: The extraction budget charged by every write.
+        """
+        super().__init__(stats)
+        self._finished = queue.Queue(maxsize=1)
+        self._consumed = threading.Event()
+        self._cancelled = threading.Event()
+        self._current = None
+
+    def create(self, filename: str) -> Py7zIO:
+        """Hands the previous member over and creates the buffer of the next one.
+
+        Args:
+            filename: The name of the member inside the archive.
+
+        Returns:
+            An empty buffer for the member.
+
+        Raises:
+            RuntimeError: If the consumer stopped reading the members.
+        """
+        self._hand_over_current()
+        writer = super().create(filename)
+        self._current = filename
+        return writer
+
+    def extract(self, archive: py7zr.SevenZipFile) -> None:
+        """Extracts every member of the archive. This runs on the producer thread.
+
+        The stream always ends with a `None` sentinel, or with the error that
+        stopped the extraction, unless the consumer cancelled it.
+
+        Args:
+            archive: The open archive.
+        """
+        try:
+            archive.extractall(factory=self)
+            self._hand_over_current()
+        except Exception as error:
+            self._put(error)
+            return
+        self._put(None)
+
+    def finished_members(self) -> Iterator[tuple[str, bytes]]:
+        """Yields the members as the producer thread finishes them.
+
+        Yields:
+            The relative path and byte content of each member file, in
+            archive order.
+
+        Raises:
+            Exception: The error that stopped the extraction, if any.
+        """
+        while (item := self._finished.get()) is not None:
+            if isinstance(item, Exception):
+                raise item
+            member_content = self.take(item)
+            if member_content is not None:
+                yield item, member_content
+            self._consumed.set()
+
+    def cancel(self) -> None:
+        """Stops the producer thread at its next write or hand-over."""
+        self._cancelled.set()
+
+    def _hand_over_current(self) -> None:
+        """Passes the finished member to the consumer and waits until it is done.
+
+        Raises:
+            RuntimeError: If the consumer stopped reading the members.
+        """
+        if self._current is None:
+            return
+        member_name, self._current = self._current, None
+        self._consumed.clear()
+        if not self._put(member_name):
+            raise RuntimeError("7z extraction was cancelled")
+        while not self._consumed.wait(timeout=0.1):
+            if self._cancelled.is_set():
+                raise RuntimeError("7z extraction was cancelled")
+
+    def _put(self, item: str | Exception | None) -> bool:
+        """Puts an item on the queue, waiting while the queue is full.
+
+        Args:
+            item: A finished member name, the error that stopped the
+                extraction, or `None` to mark its end.
+
+        Returns:
+            True if the item was queued, False if the consumer cancelled the
+            extraction while waiting for room.
+        """
+        while not self._cancelled.is_set():
+            try:
+                self._finished.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _charge(self, size: int) -> None:
+        """Charges decompressed bytes, unless the consumer stopped reading.
+
+        Args:
+            size: The number of bytes decompressed.
+
+        Raises:
+            RuntimeError: If the consumer stopped reading the members.
+        """
+        if self._cancelled.is_set():
+            raise RuntimeError("7z extraction was cancelled")
+        super()._charge(size)
+
+
+class DownloadedFile(BaseModel):
+    """Represents a downloaded file and the metadata of its HTTP response.
+
+    Attributes:
+        content: A file handle positioned at the start of the content. It is
+            kept in memory for small files and spooled to disk for larger
+            ones; the caller is responsible for closing it.
+        size: The number of bytes downloaded.
+        size_limit_exceeded: Whether the download was aborted because the
+            file is larger than `PNCP_DOWNLOAD_MAX_BYTES`.
+        filename: The original filename from the `Content-Disposition`
+            header, if the server sent one.
+        content_type: The value of the `Content-Type` header.
+        content_length: The value of the `Content-Length` header.
+        etag: The value of the `ETag` header.
+        last_modified: The value of the `Last-Modified` header.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    content: SkipValidation[IO[bytes]]
+    size: int
+    size_limit_exceeded: bool = False
+    filename: str | None = None
+    content_type: str | None = None
+    content_length: int | None = None
+    etag: str | None = None
+    last_modified: str | None = None
 
 
 class ProcurementsRepository:
@@ -77,19 +567,22 @@ class ProcurementsRepository:
         engine: An SQLAlchemy Engine for database connections.
     """
 
-    _SINGLE_FILE_COMPRESSION_HANDLERS: dict[str, Callable[[bytes], bytes]] = {
-        ".gz": gzip.decompress,
-        ".bz2": bz2.decompress,
-        ".bz": bz2.decompress,
-        ".xz": lzma.decompress,
+    _SINGLE_FILE_COMPRESSION_HANDLERS: dict[str, Callable[[IO[bytes]], io.BufferedIOBase]] = {
+        ".gz": lambda stream: gzip.GzipFile(fileobj=stream),
+        ".bz2": bz2.BZ2File,
+        ".bz": bz2.BZ2File,
+        ".xz": lzma.LZMAFile,
     }
     _TAR_LIKE_SUFFIXES = (".tar.gz", ".tgz", ".tar.bz2", ".tbz", ".tbz2", ".tar.xz")
+    _DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+    _EXTRACTION_CHUNK_SIZE = 1024 * 1024
 
     logger: Logger
     config: Config
     pubsub_provider: PubSubProvider
     engine: Engine
     http_provider: HttpProvider
+    download_cache: DownloadCache | None
 
     def __init__(self, engine: Engine, pubsub_provider: PubSubProvider, http_provider: HttpProvider) -> None:
         """Initializes the repository with its dependencies.
@@ -104,6 +597,11 @@ class ProcurementsRepository:
         self.pubsub_provider = pubsub_provider
         self.engine = engine
         self.http_provider = http_provider
+        self.download_cache = (
+            DownloadCache(self.config.PNCP_DOWNLOAD_CACHE_DIR, self.config.PNCP_DOWNLOAD_CACHE_MAX_BYTES)
+            if self.config.PNCP_DOWNLOAD_CACHE_DIR
+            else None
+        )
 
     def get_latest_version(self, pncp_control_number: str) -> int:
         """Retrieves the latest version number for a given procurement.
@@ -367,101 +865,201 @@ class ProcurementsRepository:
             self.logger.error(f"Failed to get/validate procurement for {pncp_control_number}: {e}")
             return None, None
 
-    def process_procurement_documents(self, procurement: Procurement) -> list[ProcessedFile]:
+    def process_procurement_documents(
+        self,
+        procurement: Procurement,
+        documents: list[tuple[ProcurementDocument, dict]] | None = None,
+    ) -> list[ProcessedFile]:
         """Downloads and processes all documents for a given procurement.
 
         This method orchestrates the entire document handling pipeline:
-        1. Fetches metadata for all associated documents from the PNCP API.
+        1. Fetches metadata for all associated documents from the PNCP API,
+           unless it was already fetched by the caller.
         2. Downloads the content of each document.
         3. Recursively extracts files from any archives (ZIP, RAR, etc.).
         4. Collects all non-archive files into a final list of `ProcessedFile` objects.
 
+        Downloads run in a bounded thread pool of `PNCP_DOWNLOAD_MAX_WORKERS`
+        threads, and each document is extracted as soon as its download
+        finishes. The extracted files are still returned in document order, so
+        the result does not depend on which download finished first.
+
+        Downloads are streamed to a spooled temporary file, and archives are
+        extracted straight from it, so a large attachment is never held in
+        memory as a whole. Documents larger than `PNCP_DOWNLOAD_MAX_BYTES`
+        are returned as empty files flagged with `size_limit_exceeded`. The
+        peak memory used by archive members and the process peak RSS are
+        logged for each procurement.
+
+        Archives are extracted within a per-procurement budget (nesting depth,
+        decompressed bytes, member count and compression ratio, all taken
+        from the `PNCP_EXTRACTION_*` settings). An archive that exceeds it is
+        kept as a single file flagged with `extraction_limit_exceeded`, and the
+        exceeded limits are logged.
+
         Args:
             procurement: The procurement whose documents are to be processed.
+            documents: The document metadata returned by
+                `get_all_documents_metadata`, if already fetched.
 
         Returns:
             A list of `ProcessedFile` objects, each containing the file content
             and metadata about its origin.
         """
-        documents_to_download = self._get_all_documents_metadata(procurement)
+        documents_to_download = documents if documents is not None else self.get_all_documents_metadata(procurement)
         if not documents_to_download:
             return []
 
-        final_files: list[ProcessedFile] = []
+        files_by_document: list[list[ProcessedFile]] = [[] for _ in documents_to_download]
+        extraction_stats = ExtractionStats(
+            budget=ExtractionBudget(
+                max_depth=self.config.PNCP_EXTRACTION_MAX_DEPTH,
+                max_total_bytes=self.config.PNCP_EXTRACTION_MAX_TOTAL_BYTES,
+                max_members=self.config.PNCP_EXTRACTION_MAX_MEMBERS,
+                max_ratio=self.config.PNCP_EXTRACTION_MAX_RATIO,
+            )
+        )
+        rss_before = self._get_peak_rss_bytes()
+        max_workers = max(1, min(self.config.PNCP_DOWNLOAD_MAX_WORKERS, len(documents_to_download)))
+        executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pncp-download")
+        futures: dict[Future[DownloadedFile | None], int] = {}
+        try:
+            futures = {
+                executor.submit(self._download_file, doc.url): index
+                for index, (doc, _) in enumerate(documents_to_download)
+            }
+            for future in as_completed(futures):
+                index = futures[future]
+                downloaded = future.result()
+                if downloaded is None:
+                    continue
+
+                doc, raw_doc_metadata = documents_to_download[index]
+                original_filename = downloaded.filename or doc.title
+                synthetic_document_id = (
+                    f"{doc.cnpj}-{doc.procurement_year}-" f"{doc.procurement_sequence}-{doc.document_sequence}"
+                )
 
-        for doc, raw_doc_metadata in documents_to_download:
-            content = self._download_file_content(doc.url)
-            if not content:
-                continue
+                with downloaded.content:
+                    if downloaded.size_limit_exceeded:
+                        files_by_document[index].append(
+                            ProcessedFile(
+                                source_document_id=synthetic_document_id,
+                                relative_path=original_filename,
+                                content=b"",
+                                raw_document_metadata=raw_doc_metadata,
+                                size_limit_exceeded=True,
+                            )
+                        )
+                        continue
 
-            original_filename = self._determine_original_filename(doc.url) or doc.title
-            synthetic_document_id = (
-                f"{doc.cnpj}-{doc.procurement_year}-" f"{doc.procurement_sequence}-{doc.document_sequence}"
-            )
+                    self._recursive_file_processing(
+                        source_document_id=synthetic_document_id,
+                        content=downloaded.content,
+                        current_path=original_filename,
+                        nesting_level=0,
+                        file_collection=files_by_document[index],
+                        raw_document_metadata=raw_doc_metadata,
+                        extraction_stats=extraction_stats,
+                    )
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+            self._close_downloads(futures)
 
-            self._recursive_file_processing(
-                source_document_id=synthetic_document_id,
-                content=content,
-                current_path=original_filename,
-                nesting_level=0,
-                file_collection=final_files,
-                raw_document_metadata=raw_doc_metadata,
+        rss_after = self._get_peak_rss_bytes()
+        self.logger.info(
+            f"Extraction memory for {procurement.pncp_control_number}: {extraction_stats.members} archive members, "
+            f"largest {extraction_stats.largest_member_bytes} bytes, at most {extraction_stats.peak_held_bytes} "
+            f"bytes held at once, {extraction_stats.total_bytes} bytes decompressed. "
+            f"Process peak RSS: {rss_after / (1024 * 1024):.1f} MiB "
+            f"(+{(rss_after - rss_before) / (1024 * 1024):.1f} MiB)."
+        )
+        if extraction_stats.limits_exceeded:
+            self.logger.warning(
+                f"Extraction limits exceeded for {procurement.pncp_control_number}: "
+                + ", ".join(f"{limit}={count}" for limit, count in sorted(extraction_stats.limits_exceeded.items()))
             )
 
-        return final_files
+        if self.download_cache:
+            stats = self.download_cache.get_stats()
+            self.logger.info(
+                f"Download cache: {stats['hits']} hits, {stats['misses']} misses, "
+                f"{stats['evictions']} evictions so far."
+            )
+        return [file for files in files_by_document for file in files]
 
     def _recursive_file_processing(
         self,
         source_document_id: str,
-        content: bytes,
+        content: bytes | IO[bytes],
         current_path: str,
         nesting_level: int,
         file_collection: list[ProcessedFile],
         raw_document_metadata: dict,
+        extraction_stats: ExtractionStats | None = None,
     ) -> None:
         """Recursively processes file content, handling nested archives.
 
         This method checks if the given content is an archive (ZIP, RAR,
-        etc.). If it is, it extracts the contents and calls itself for each
-        member. If it's not an archive, it adds the content to the final
-        `file_collection` as a `ProcessedFile` object.
+        etc.) from its extension and from the magic bytes at its start, which
+        are read once per file. If it is, it extracts the members one at a time and calls
+        itself for each member before the next one is read, so only the
+        members on the current nesting path are held in memory. If it's not
+        an archive, it adds the content to the final `file_collection` as a
+        `ProcessedFile` object. If an archive fails midway, the files already
+        collected from it are discarded and the archive is kept as a single
+        file flagged with `extraction_failed`, or with
+        `extraction_limit_exceeded` if it exceeded the extraction budget.
 
         Args:
             source_document_id: The ID of the source `ProcurementDocument`.
-            content: The byte content of the file to process.
+            content: The content of the file to process, either as bytes or
+                as a seekable file handle.
             current_path: The path of the file being processed, including
                 any parent archive names.
             nesting_level: The current depth of recursion.
             file_collection: A list where final `ProcessedFile` objects are
                 collected.
             raw_document_metadata: The raw JSON dictionary of the source document.
+            extraction_stats: The extraction budget and counters of the
+                procurement, if they are tracked.
         """
+        stats = extraction_stats or ExtractionStats()
         lower_path = current_path.lower()
-        handler = None
-
-        if lower_path.endswith(".zip"):
-            handler = self._extract_from_zip
-        elif lower_path.endswith(".rar"):
-            handler = self._extract_from_rar
-        elif lower_path.endswith(".7z"):
-            handler = self._extract_from_7z
-        elif tarfile.is_tarfile(io.BytesIO(content)):
-            handler = self._extract_from_tar
+        archive_format = sniff_archive_format(self._read_head(content))
+        handler = self._get_archive_handler(lower_path, archive_format)
 
         if handler:
+            collected_before = len(file_collection)
             try:
-                nested_files = handler(content)
-                for member_name, member_content in nested_files:
-                    new_path = os.path.join(current_path, member_name)
-                    self._recursive_file_processing(
-                        source_document_id=source_document_id,
-                        content=member_content,
-                        current_path=new_path,
-                        nesting_level=nesting_level + 1,
-                        file_collection=file_collection,
-                        raw_document_metadata=raw_document_metadata,
-                    )
+                stats.check_depth(nesting_level)
+                stats.enter_archive(self._get_content_size(content))
+                try:
+                    for member_name, member_content in handler(content, stats):
+                        member_size = len(member_content)
+                        stats.hold(member_size)
+                        try:
+                            self._recursive_file_processing(
+                                source_document_id=source_document_id,
+                                content=member_content,
+                                current_path=os.path.join(current_path, member_name),
+                                nesting_level=nesting_level + 1,
+                                file_collection=file_collection,
+                                raw_document_metadata=raw_document_metadata,
+                                extraction_stats=stats,
+                            )
+                        finally:
+                            stats.release(member_size)
+                            del member_content
+                finally:
+                    stats.exit_archive()
+            except ExtractionLimitError as e:
+                del file_collection[collected_before:]
+                self._exclude_over_limit_archive(
+                    source_document_id, content, current_path, file_collection, raw_document_metadata, stats, e
+                )
             except Exception as e:
+                del file_collection[collected_before:]
                 self.logger.warning(
                     "Could not process archive '%s': %s. " "Treating as a single file with extraction flag.",
                     current_path,
@@ -471,38 +1069,55 @@ class ProcurementsRepository:
                     ProcessedFile(
                         source_document_id=source_document_id,
                         relative_path=current_path,
-                        content=content,
+                        content=self._read_content(content),
                         raw_document_metadata=raw_document_metadata,
                         extraction_failed=True,
                     )
                 )
             return
 
-        for suffix, decompressor in self._SINGLE_FILE_COMPRESSION_HANDLERS.items():
-            if lower_path.endswith(suffix) and not any(
-                lower_path.endswith(tar_suffix) for tar_suffix in self._TAR_LIKE_SUFFIXES
-            ):
+        decompression = self._get_single_file_decompression(lower_path, archive_format)
+        if decompression:
+            suffix, decompressor = decompression
+            try:
+                stats.check_depth(nesting_level)
+                stats.enter_archive(self._get_content_size(content))
                 try:
-                    decompressed_content = decompressor(content)
-                except Exception as e:
-                    self.logger.warning(
-                        "Could not decompress single-file archive '%s': %s. "
-                        "Treating as a single file with extraction flag.",
-                        current_path,
-                        e,
-                    )
-                    file_collection.append(
-                        ProcessedFile(
-                            source_document_id=source_document_id,
-                            relative_path=current_path,
-                            content=content,
-                            raw_document_metadata=raw_document_metadata,
-                            extraction_failed=True,
-                        )
+                    with decompressor(self._open_stream(content)) as decompressed_stream:
+                        decompressed_content = self._read_member(decompressed_stream, stats)
+                finally:
+                    stats.exit_archive()
+                decompressed_size = len(decompressed_content)
+                stats.hold(decompressed_size)
+            except ExtractionLimitError as e:
+                self._exclude_over_limit_archive(
+                    source_document_id, content, current_path, file_collection, raw_document_metadata, stats, e
+                )
+                return
+            except Exception as e:
+                self.logger.warning(
+                    "Could not decompress single-file archive '%s': %s. "
+                    "Treating as a single file with extraction flag.",
+                    current_path,
+                    e,
+                )
+                file_collection.append(
+                    ProcessedFile(
+                        source_document_id=source_document_id,
+                        relative_path=current_path,
+                        content=self._read_content(content),
+                        raw_document_metadata=raw_document_metadata,
+                        extraction_failed=True,
                     )
-                    return
+                )
+                return
 
-                stripped_path = current_path[: -len(suffix)] or f"{current_path}_decompressed"
+            stripped_path = (
+                current_path[: -len(suffix)] or f"{current_path}_decompressed"
+                if lower_path.endswith(suffix)
+                else current_path
+            )
+            try:
                 self._recursive_file_processing(
                     source_document_id=source_document_id,
                     content=decompressed_content,
@@ -510,19 +1125,216 @@ class ProcurementsRepository:
                     nesting_level=nesting_level + 1,
                     file_collection=file_collection,
                     raw_document_metadata=raw_document_metadata,
+                    extraction_stats=stats,
                 )
-                return
+            finally:
+                stats.release(decompressed_size)
+            return
 
         file_collection.append(
             ProcessedFile(
                 source_document_id=source_document_id,
                 relative_path=current_path,
-                content=content,
+                content=self._read_content(content),
                 raw_document_metadata=raw_document_metadata,
                 extraction_failed=False,
+                archive_format=archive_format,
             )
         )
 
+    def _get_archive_handler(
+        self, lower_path: str, archive_format: ArchiveFormat | None
+    ) -> Callable[[bytes | IO[bytes], ExtractionStats], Iterator[tuple[str, bytes]]] | None:
+        """Chooses the extractor of a multi-file archive.
+
+        ZIP archives are only extracted when named `.zip`, since office
+        documents are ZIP containers too. RAR, 7z and TAR archives are
+        recognized by their extension or their magic bytes, and compressed
+        TAR archives by their extension.
+
+        Args:
+            lower_path: The lowercase path of the file.
+            archive_format: The format sniffed from the file's first bytes.
+
+        Returns:
+            The extractor to use, or None if the file is not a multi-file archive.
+        """
+        if lower_path.endswith(".zip"):
+            return self._extract_from_zip
+        if lower_path.endswith(".rar") or archive_format == ArchiveFormat.RAR:
+            return self._extract_from_rar
+        if lower_path.endswith(".7z") or archive_format == ArchiveFormat.SEVEN_ZIP:
+            return self._extract_from_7z
+        if archive_format == ArchiveFormat.TAR or (
+            archive_format in (ArchiveFormat.GZIP, ArchiveFormat.BZIP2, ArchiveFormat.XZ)
+            and lower_path.endswith(self._TAR_LIKE_SUFFIXES)
+        ):
+            return self._extract_from_tar
+        return None
+
+    def _get_single_file_decompression(
+        self, lower_path: str, archive_format: ArchiveFormat | None
+    ) -> tuple[str, Callable[[IO[bytes]], io.BufferedIOBase]] | None:
+        """Chooses the decompressor of a single-file compressed file.
+
+        Args:
+            lower_path: The lowercase path of the file.
+            archive_format: The format sniffed from the file's first bytes.
+
+        Returns:
+            The suffix of the compression format and its decompressor, or
+            None if the file is not compressed.
+        """
+        for suffix, decompressor in self._SINGLE_FILE_COMPRESSION_HANDLERS.items():
+            if lower_path.endswith(suffix):
+                return suffix, decompressor
+        if archive_format in self._SINGLE_FILE_COMPRESSION_HANDLERS:
+            return archive_format, self._SINGLE_FILE_COMPRESSION_HANDLERS[archive_format]
+        return None
+
+    def _exclude_over_limit_archive(
+        self,
+        source_document_id: str,
+        content: bytes | IO[bytes],
+        current_path: str,
+        file_collection: list[ProcessedFile],
+        raw_document_metadata: dict,
+        stats: ExtractionStats,
+        error: ExtractionLimitError,
+    ) -> None:
+        """Keeps an archive that exceeded the extraction budget as a single file.
+
+        Args:
+            source_document_id: The ID of the source `ProcurementDocument`.
+            content: The content of the archive.
+            current_path: The path of the archive.
+            file_collection: The list the flagged archive is appended to.
+            raw_document_metadata: The raw JSON dictionary of the source document.
+            stats: The extraction counters of the procurement.
+            error: The budget violation.
+        """
+        stats.record_limit(error.limit)
+        self.logger.warning(
+            "Stopped extracting archive '%s': %s. Excluding it as a single file.",
+            current_path,
+            error,
+        )
+        file_collection.append(
+            ProcessedFile(
+                source_document_id=source_document_id,
+                relative_path=current_path,
+                content=self._read_content(content),
+                raw_document_metadata=raw_document_metadata,
+                extraction_limit_exceeded=True,
+            )
+        )
+
+    @staticmethod
+    def _open_stream(content: bytes | IO[bytes]) -> IO[bytes]:
+        """Returns a seekable stream over the content, rewound to its start.
+
+        Args:
+            content: The content as bytes or as a seekable file handle.
+
+        Returns:
+            A new in-memory stream for bytes, or the same handle rewound.
+        """
+        if isinstance(content, bytes):
+            return io.BytesIO(content)
+        content.seek(0)
+        return content
+
+    @classmethod
+    def _read_content(cls, content: bytes | IO[bytes]) -> bytes:
+        """Reads the whole content into memory.
+
+        Args:
+            content: The content as bytes or as a seekable file handle.
+
+        Returns:
+            The byte content.
+        """
+        if isinstance(content, bytes):
+            return content
+        return cls._open_stream(content).read()
+
+    @staticmethod
+    def _read_head(content: bytes | IO[bytes]) -> bytes:
+        """Returns the first bytes of the content, as needed to sniff its format.
+
+        Args:
+            content: The content as bytes or as a seekable file handle.
+
+        Returns:
+            Up to `ARCHIVE_SNIFF_BYTES` bytes from the start of the content.
+        """
+        if isinstance(content, bytes):
+            return content[:ARCHIVE_SNIFF_BYTES]
+        content.seek(0)
+        head = content.read(ARCHIVE_SNIFF_BYTES)
+        content.seek(0)
+        return head
+
+    @classmethod
+    def _get_content_size(cls, content: bytes | IO[bytes]) -> int:
+        """Returns the size of the content without reading it.
+
+        Args:
+            content: The content as bytes or as a seekable file handle.
+
+        Returns:
+            The size of the content, in bytes.
+        """
+        if isinstance(content, bytes):
+            return len(content)
+        return content.seek(0, io.SEEK_END)
+
+    @classmethod
+    def _read_member(cls, stream: IO[bytes] | io.BufferedIOBase, stats: ExtractionStats) -> bytes:
+        """Reads a decompressing stream in chunks, charging them to the budget.
+
+        Args:
+            stream: The stream of an archive member being decompressed.
+            stats: The extraction budget and counters of the procurement.
+
+        Returns:
+            The decompressed content of the member.
+        """
+        chunks = []
+        while chunk := stream.read(cls._EXTRACTION_CHUNK_SIZE):
+            stats.consume(len(chunk))
+            chunks.append(chunk)
+        return b"".join(chunks)
+
+    @staticmethod
+    def _close_downloads(futures: Iterable[Future[DownloadedFile | None]]) -> None:
+        """Closes the content of every finished download.
+
+        Processing stops at the first document that fails, which leaves the
+        downloads finished before or during it unconsumed. Their spooled files
+        are closed here; closing a download that was already consumed is a
+        no-op.
+
+        Args:
+            futures: The download futures, all of them done or cancelled.
+        """
+        for future in futures:
+            if future.cancelled() or future.exception() is not None:
+                continue
+            downloaded = future.result()
+            if downloaded is not None:
+                downloaded.content.close()
+
+    @staticmethod
+    def _get_peak_rss_bytes() -> int:
+        """Returns the peak resident memory of the process so far.
+
+        Returns:
+            The peak resident set size, in bytes.
+        """
+        peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return int(peak_rss if sys.platform == "darwin" else peak_rss * 1024)
+
     def create_zip_from_files(self, files: list[tuple[str, bytes]], control_number: str) -> bytes | None:
         """Creates a single, flat ZIP archive in memory from a list of files.
 
@@ -551,57 +1363,66 @@ class ProcurementsRepository:
             self.logger.error(f"Failed to create final ZIP archive for {control_number}: {e}")
             return None
 
-    def _extract_from_zip(self, content: bytes) -> list[tuple[str, bytes]]:
-        """Extracts all members from a ZIP archive in memory.
+    def _extract_from_zip(
+        self, content: bytes | IO[bytes], extraction_stats: ExtractionStats | None = None
+    ) -> Iterator[tuple[str, bytes]]:
+        """Extracts the members of a ZIP archive one at a time.
 
         Args:
-            content: The byte content of the ZIP file.
+            content: The content of the ZIP file, as bytes or a file handle.
+            extraction_stats: The extraction budget charged while reading.
 
-        Returns:
-            A list of tuples, each containing the filename and byte content
-            of a member file.
+        Yields:
+            The filename and byte content of each member file.
         """
-        extracted = []
-        with io.BytesIO(content) as stream:
-            with zipfile.ZipFile(stream, strict_timestamps=False) as archive:
-                for member_info in archive.infolist():
-                    if member_info.is_dir():
-                        continue
-                    try:
-                        extracted.append((member_info.filename, archive.read(member_info)))
-                    except ValueError as error:
-                        self.logger.warning(
-                            "Failed to extract member '%s' from ZIP archive: %s", member_info.filename, error
-                        )
-                        raise
-        return extracted
+        stats = extraction_stats or ExtractionStats()
+        with zipfile.ZipFile(self._open_stream(content), strict_timestamps=False) as archive:
+            for member_info in archive.infolist():
+                if member_info.is_dir():
+                    continue
+                try:
+                    with archive.open(member_info) as member_file:
+                        member_content = self._read_member(member_file, stats)
+                except ValueError as error:
+                    self.logger.warning(
+                        "Failed to extract member '%s' from ZIP archive: %s", member_info.filename, error
+                    )
+                    raise
+                yield member_info.filename, member_content
 
-    def _extract_from_rar(self, content: bytes) -> list[tuple[str, bytes]]:
-        """Extracts all members from a RAR archive in memory.
+    def _extract_from_rar(
+        self, content: bytes | IO[bytes], extraction_stats: ExtractionStats | None = None
+    ) -> Iterator[tuple[str, bytes]]:
+        """Extracts the members of a RAR archive one at a time.
 
         Args:
-            content: The byte content of the RAR file.
+            content: The content of the RAR file, as bytes or a file handle.
+            extraction_stats: The extraction budget charged while reading.
 
-        Returns:
-            A list of tuples, each containing the filename and byte content
-            of a member file. Returns an empty list if the archive is invalid.
+        Yields:
+            The filename and byte content of each member file.
+
+        Raises:
+            RuntimeError: If the archive is corrupted, password-protected or
+                a member cannot be read.
         """
-        extracted = []
+        stats = extraction_stats or ExtractionStats()
         try:
-            with io.BytesIO(content) as stream:
-                with rarfile.RarFile(stream) as archive:
-                    for member_info in archive.infolist():
-                        if member_info.isdir():
-                            continue
-                        try:
-                            extracted.append((member_info.filename, archive.read(member_info.filename)))
-                        except rarfile.Error as error:
-                            self.logger.warning(
-                                "Failed to read member '%s' from RAR archive: %s", member_info.filename, error
-                            )
-                            raise RuntimeError(
-                                f"Failed to read member '{member_info.filename}' from RAR archive"
-                            ) from error
+            with rarfile.RarFile(self._open_stream(content)) as archive:
+                for member_info in archive.infolist():
+                    if member_info.isdir():
+                        continue
+                    try:
+                        with archive.open(member_info) as member_file:
+                            member_content = self._read_member(member_file, stats)
+                    except rarfile.Error as error:
+                        self.logger.warning(
+                            "Failed to read member '%s' from RAR archive: %s", member_info.filename, error
+                        )
+                        raise RuntimeError(
+                            f"Failed to read member '{member_info.filename}' from RAR archive"
+                        ) from error
+                    yield member_info.filename, member_content
         except rarfile.BadRarFile as error:
             self.logger.warning("Failed to extract from a corrupted or invalid RAR file: %s", error)
             raise RuntimeError("Failed to extract from RAR archive") from error
@@ -611,65 +1432,109 @@ class ProcurementsRepository:
         except rarfile.Error as error:
             self.logger.warning("Unexpected RAR extraction error: %s", error)
             raise RuntimeError("Unexpected RAR extraction error") from error
-        return extracted
 
-    def _extract_from_7z(self, content: bytes) -> list[tuple[str, bytes]]:
-        """Extracts all members from a 7z archive in memory.
+    def _extract_from_7z(
+        self, content: bytes | IO[bytes], extraction_stats: ExtractionStats | None = None
+    ) -> Iterator[tuple[str, bytes]]:
+        """Extracts the members of a 7z archive in memory.
 
-        This method writes the content to a temporary directory to perform the
-        extraction, as `py7zr` works most reliably with file paths.
+        Members are decompressed straight into memory buffers, whose writes
+        are charged to the extraction budget, so nothing is written to disk
+        and a bomb is stopped while it is being inflated. The uncompressed
+        size declared by the archive is checked against the budget first.
+
+        The archive is decompressed once, on a producer thread, and each
+        member is yielded before the next one is decompressed, so only one
+        member is held in memory and solid blocks are not decompressed again
+        for every member.
+
+        `py7zr` only decompresses the blocks of an archive in parallel when it
+        is opened from a file path. If `PNCP_EXTRACTION_7Z_PARALLEL` is
+        enabled, archives with several blocks are therefore copied to a
+        temporary file and decompressed with one thread per block. Every
+        member is then buffered before the first one is yielded, and the
+        buffered bytes are counted as held in the extraction stats.
+
+        Args:
+            content: The content of the 7z file, as bytes or a file handle.
+            extraction_stats: The extraction budget charged while reading.
+
+        Yields:
+            The relative path and byte content of each member file, in
+            archive order.
+        """
+        stats = extraction_stats or ExtractionStats()
+        factory = SevenZipMemberFactory(stats)
+        try:
+            with py7zr.SevenZipFile(cast(BinaryIO, self._open_stream(content)), mode="r") as archive:
+                entries = archive.list()
+                stats.check_declared_size(sum(entry.uncompressed or 0 for entry in entries))
+                member_names = [entry.filename for entry in entries if not entry.is_directory]
+                parallel = self.config.PNCP_EXTRACTION_7Z_PARALLEL and self._count_7z_blocks(archive) > 1
+                if not parallel:
+                    stream = SevenZipMemberStream(stats)
+                    producer = threading.Thread(
+                        target=stream.extract, args=(archive,), name="7z-extract", daemon=True
+                    )
+                    producer.start()
+                    try:
+                        yield from stream.finished_members()
+                    finally:
+                        stream.cancel()
+                        producer.join()
+                        stream.discard()
+
+            if parallel:
+                with tempfile.NamedTemporaryFile(suffix=".7z") as archive_file:
+                    shutil.copyfileobj(self._open_stream(content), archive_file)
+                    archive_file.flush()
+                    with py7zr.SevenZipFile(archive_file.name, mode="r") as archive:
+                        archive.extractall(factory=factory)
+                for member_name in member_names:
+                    member_content = factory.take(member_name)
+                    if member_content is not None:
+                        yield member_name, member_content
+        finally:
+            factory.discard()
+
+    @staticmethod
+    def _count_7z_blocks(archive: py7zr.SevenZipFile) -> int:
+        """Counts the independently compressed blocks (folders) of a 7z archive.
 
         Args:
-            content: The byte content of the 7z file.
+            archive: The open archive.
 
         Returns:
-            A list of tuples, each containing the filename and byte content
-            of a member file.
+            The number of blocks, or 0 if the archive has no content streams.
         """
-        extracted = []
-        with tempfile.TemporaryDirectory() as tmpdir:
-            with io.BytesIO(content) as stream:
-                with py7zr.SevenZipFile(stream, mode="r", mp=False) as archive:
-                    archive.extractall(path=tmpdir)
+        main_streams = getattr(archive.header, "main_streams", None)
+        if main_streams is None:
+            return 0
+        return int(main_streams.unpackinfo.numfolders)
 
-            for root, _, files in os.walk(tmpdir):
-                for filename in files:
-                    filepath = os.path.join(root, filename)
-                    try:
-                        with open(filepath, "rb") as file:
-                            file_content = file.read()
-                    except PermissionError:
-                        os.chmod(filepath, 0o644)
-                        with open(filepath, "rb") as file:
-                            file_content = file.read()
-                    relative_path = os.path.relpath(filepath, tmpdir)
-                    extracted.append((relative_path, file_content))
-        return extracted
-
-    def _extract_from_tar(self, content: bytes) -> list[tuple[str, bytes]]:
-        """Extracts all members from a TAR archive in memory.
+    def _extract_from_tar(
+        self, content: bytes | IO[bytes], extraction_stats: ExtractionStats | None = None
+    ) -> Iterator[tuple[str, bytes]]:
+        """Extracts the members of a TAR archive one at a time.
 
         This method can handle various TAR compressions like .gz and .bz2.
 
         Args:
-            content: The byte content of the TAR file.
+            content: The content of the TAR file, as bytes or a file handle.
+            extraction_stats: The extraction budget charged while reading.
 
-        Returns:
-            A list of tuples, each containing the filename and byte content
-            of a member file.
+        Yields:
+            The filename and byte content of each member file.
         """
-        extracted = []
-        with io.BytesIO(content) as stream:
-            with tarfile.open(fileobj=stream, mode="r:*") as archive:
-                for member_info in archive.getmembers():
-                    if member_info.isfile():
-                        file_obj = archive.extractfile(member_info)
-                        if file_obj:
-                            file_content = file_obj.read()
-                            extracted.append((member_info.name, file_content))
-        return extracted
-
-    def _get_all_documents_metadata(self, procurement: Procurement) -> list[tuple[ProcurementDocument, dict]]:
+        stats = extraction_stats or ExtractionStats()
+        with tarfile.open(fileobj=self._open_stream(content), mode="r:*") as archive:
+            for member_info in archive:
+                if member_info.isfile():
+                    file_obj = archive.extractfile(member_info)
+                    if file_obj:
+                        yield member_info.name, self._read_member(file_obj, stats)
+
+    def get_all_documents_metadata(self, procurement: Procurement) -> list[tuple[ProcurementDocument, dict]]:
         """Fetches metadata for all of a procurement's documents from the API.
 
         This method retrieves the list of all documents associated with a
@@ -709,48 +1574,142 @@ class ProcurementsRepository:
             self.logger.error(f"Failed to get/validate document list for {procurement.pncp_control_number}: {e}")
             return []
 
-    def _download_file_content(self, url: str) -> bytes | None:
-        """Downloads the binary content of a file from a URL.
+    def _download_file(self, url: str, use_cache: bool = True) -> DownloadedFile | None:
+        """Streams a file to a spooled temporary file, with its response metadata.
+
+        The body is read in chunks into a `SpooledTemporaryFile` that stays in
+        memory up to `PNCP_DOWNLOAD_SPOOL_MAX_MEMORY_BYTES` and moves to disk
+        beyond that. Downloads larger than `PNCP_DOWNLOAD_MAX_BYTES`, either
+        announced by `Content-Length` or observed while streaming, are
+        aborted and returned empty with `size_limit_exceeded` set. The
+        original filename is read from the `Content-Disposition` header of the
+        same GET request, so no separate HEAD request is needed.
+
+        When the download cache is enabled and holds the URL, the request is
+        sent as a conditional GET; a `304 Not Modified` answer is served from
+        the cache, and fresh downloads are stored in it. The spool is closed
+        on any error raised before it is handed over, so a spool that already
+        moved to disk does not leak its temporary file.
 
         Args:
             url: The URL of the file to download.
+            use_cache: Whether the download cache may be used.
 
         Returns:
-            The byte content of the file, or `None` if the download fails.
+            A `DownloadedFile` with the content handle and response metadata,
+            or `None` if the download fails or returns no content.
         """
+        cache = self.download_cache if use_cache else None
+        cached = cache.lookup(url) if cache else None
+        request_kwargs: dict[str, Any] = {"timeout": 90, "stream": True}
+        if cached and cached.validators:
+            request_kwargs["headers"] = cached.validators
+
+        spool: IO[bytes] | None = None
         try:
-            response = self.http_provider.get(url, timeout=90)
-            response.raise_for_status()
-            if response.content:
-                return cast(bytes, response.content)
-            return None
+            response = self.http_provider.get(url, **request_kwargs)
+            try:
+                if cache and cached and response.status_code == HTTPStatus.NOT_MODIFIED:
+                    cached_file = cache.open(url)
+                    if cached_file is None:
+                        return self._download_file(url, use_cache=False)
+                    self.logger.debug(f"Serving {url} from the download cache.")
+                    return DownloadedFile(
+                        content=cached_file, size=cached.size, **cached.model_dump(exclude={"url", "size"})
+                    )
+
+                response.raise_for_status()
+                headers = response.headers
+                raw_content_length = headers.get("Content-Length")
+                content_length = (
+                    int(raw_content_length) if raw_content_length and raw_content_length.isdigit() else None
+                )
+                metadata: dict[str, Any] = {
+                    "filename": self._parse_content_disposition_filename(headers.get("Content-Disposition")),
+                    "content_type": headers.get("Content-Type"),
+                    "content_length": content_length,
+                    "etag": headers.get("ETag"),
+                    "last_modified": headers.get("Last-Modified"),
+                }
+                max_bytes = self.config.PNCP_DOWNLOAD_MAX_BYTES
+                if content_length is not None and content_length > max_bytes:
+                    return self._oversized_download(url, content_length, metadata)
+
+                spool = tempfile.SpooledTemporaryFile(max_size=self.config.PNCP_DOWNLOAD_SPOOL_MAX_MEMORY_BYTES)
+                size = 0
+                for chunk in response.iter_content(chunk_size=self._DOWNLOAD_CHUNK_SIZE):
+                    size += len(chunk)
+                    if size > max_bytes:
+                        spool.close()
+                        return self._oversized_download(url, size, metadata)
+                    spool.write(chunk)
+            finally:
+                response.close()
+
+            if not size:
+                spool.close()
+                return None
+            spool.seek(0)
+            if cache:
+                cache.record_miss()
+                self._store_in_download_cache(cache, CachedDownload(url=url, size=size, **metadata), spool)
+            return DownloadedFile(content=spool, size=size, **metadata)
         except requests.RequestException as e:
+            if spool is not None:
+                spool.close()
             self.logger.error(f"Failed to download content from {url}: {e}")
             return None
+        except BaseException:
+            if spool is not None:
+                spool.close()
+            raise
 
-    def _determine_original_filename(self, url: str) -> str | None:
-        """Determines a file's original name from the Content-Disposition header.
+    def _store_in_download_cache(self, cache: DownloadCache, entry: CachedDownload, content: IO[bytes]) -> None:
+        """Stores a fresh download in the cache without failing the download.
 
-        This method makes a HEAD request to the file's URL to efficiently
-        check the `Content-Disposition` header without downloading the entire
-        file.
+        Args:
+            cache: The download cache.
+            entry: The metadata of the download.
+            content: A seekable handle to the downloaded content.
+        """
+        try:
+            cache.store(entry, content)
+        except OSError as e:
+            self.logger.warning(f"Could not store {entry.url} in the download cache: {e}")
+            content.seek(0)
+
+    def _oversized_download(self, url: str, size: int, metadata: dict[str, Any]) -> DownloadedFile:
+        """Builds the empty result of a download aborted for being too large.
 
         Args:
             url: The URL of the file.
+            size: The announced or observed size, in bytes.
+            metadata: The response metadata collected so far.
 
         Returns:
-            The original filename if found in the header, otherwise `None`.
+            An empty `DownloadedFile` flagged with `size_limit_exceeded`.
         """
-        try:
-            response = self.http_provider.head(url, allow_redirects=True)
-            response.raise_for_status()
-            content_disposition = response.headers.get("Content-Disposition")
-            if content_disposition:
-                match = re.search(r'filename="?([^"+]+)"?', content_disposition, re.IGNORECASE)
-                if match:
-                    return match.group(1)
-        except requests.RequestException as e:
-            self.logger.warning(f"Could not determine filename from headers for {url}: {e}")
+        self.logger.warning(
+            f"Skipping download of {url}: size of at least {size} bytes exceeds the limit of "
+            f"{self.config.PNCP_DOWNLOAD_MAX_BYTES} bytes."
+        )
+        return DownloadedFile(content=io.BytesIO(), size=0, size_limit_exceeded=True, **metadata)
+
+    @staticmethod
+    def _parse_content_disposition_filename(content_disposition: str | None) -> str | None:
+        """Extracts the filename from a `Content-Disposition` header.
+
+        Args:
+            content_disposition: The raw header value, if present.
+
+        Returns:
+            The filename declared in the header, otherwise `None`.
+        """
+        if not content_disposition:
+            return None
+        match = re.search(r'filename="?([^"+]+)"?', content_disposition, re.IGNORECASE)
+        if match:
+            return match.group(1)
         return None
 
     def get_updated_procurements(self, target_date: date) -> list[Procurement]:
@@ -819,26 +1778,42 @@ class ProcurementsRepository:
         return all_procurements
 
     def get_updated_procurements_with_raw_data(
-        self, target_date: date
+        self, target_date: date, resume_after: tuple[int | None, int, int] | None = None
     ) -> Iterator[tuple[str, Any | tuple[Procurement, dict]]]:
         """Fetches updated procurements with raw data as a generator.
 
         This method queries the PNCP API for procurements updated on a specific
-        date. It yields events to report progress, such as when a modality
-        search begins, the total number of pages found, and each batch of
-        procurements as it is fetched.
+        date. Every (city, modality) search is fetched concurrently on a
+        bounded thread pool of `PNCP_FETCH_MAX_WORKERS` threads, while the
+        per-host `HttpProvider` rate limiter keeps the overall request rate
+        within budget. Events are still yielded one search at a time and in
+        the same order as a sequential scan, so consumers see an unchanged
+        event stream. Each search buffers at most
+        `PNCP_FETCH_QUEUE_MAX_EVENTS` events ahead of the consumer, so a slow
+        early search holds the later ones back instead of letting them load
+        every page into memory.
+
+        When `resume_after` points to a (city, modality, page) of a previous
+        scan, the searches before it are skipped and its search continues
+        from the following page.
 
         Args:
             target_date: The date to query for procurement updates.
+            resume_after: The city code, modality code and page number of the
+                last page already handled, if the scan should resume.
 
         Yields:
             Tuples representing different stages of the fetching process:
+            - ("search_started", (city_code, modality_code)): Identifies the
+              (city, modality) search the next events belong to.
             - ("modality_started", modality_name): Indicates the start of
               fetching for a new procurement modality.
             - ("pages_total", total_pages): Provides the total number of pages
               to be fetched for the current modality.
             - ("procurements_page", (procurement, raw_data)): Yields a tuple
               containing a `Procurement` object and its raw JSON data.
+            - ("page_fetched", page_number): Indicates that a page has been
+              fully yielded.
         """
         modalities_to_check = [
             ProcurementModality.ELECTRONIC_REVERSE_AUCTION,
@@ -851,46 +1826,148 @@ class ProcurementsRepository:
         if not codes_to_check:
             self.logger.warning("No TARGET_IBGE_CODES configured. The search will be nationwide.")
             codes_to_check = [None]
-        for city_code in codes_to_check:
-            if city_code:
-                self.logger.info(f"Searching for city with IBGE code: {city_code}")
-            for modality in modalities_to_check:
+
+        searches = [(city_code, modality, 1) for city_code in codes_to_check for modality in modalities_to_check]
+        if resume_after:
+            resume_city_code, resume_modality, resume_page = resume_after
+            resume_index = next(
+                (
+                    index
+                    for index, (city_code, modality, _) in enumerate(searches)
+                    if city_code == resume_city_code and modality.value == resume_modality
+                ),
+                None,
+            )
+            if resume_index is None:
+                self.logger.warning(f"Resume point {resume_after} does not match any search. Fetching every page.")
+            else:
+                city_code, modality, _ = searches[resume_index]
+                searches = [(city_code, modality, resume_page + 1)] + searches[resume_index + 1 :]
+        executor = ThreadPoolExecutor(
+            max_workers=max(1, self.config.PNCP_FETCH_MAX_WORKERS), thread_name_prefix="pncp-fetch"
+        )
+        cancelled = threading.Event()
+        try:
+            pending_searches = []
+            for city_code, modality, start_page in searches:
+                events: queue.Queue[tuple[str, Any] | None] = queue.Queue(
+                    maxsize=max(1, self.config.PNCP_FETCH_QUEUE_MAX_EVENTS)
+                )
+                future = executor.submit(
+                    self._fetch_modality_pages, target_date, city_code, modality, events, cancelled, start_page
+                )
+                pending_searches.append((city_code, modality, events, future))
+
+            current_city_code = None
+            for city_code, modality, events, future in pending_searches:
+                if city_code and city_code != current_city_code:
+                    self.logger.info(f"Searching for city with IBGE code: {city_code}")
+                current_city_code = city_code
+                yield "search_started", (city_code, modality.value)
                 yield "modality_started", modality.name
-                page = 1
-                total_pages = 1
-                while page <= total_pages:
-                    endpoint = "contratacoes/atualizacao"
-                    params = {
-                        "dataInicial": target_date.strftime("%Y%m%d"),
-                        "dataFinal": target_date.strftime("%Y%m%d"),
-                        "codigoModalidadeContratacao": str(modality.value),
-                        "pagina": str(page),
-                    }
-                    if city_code:
-                        params["codigoMunicipioIbge"] = city_code
-                    try:
-                        api_url = urljoin(self.config.PNCP_PUBLIC_QUERY_API_URL, endpoint)
-                        response = self.http_provider.get(api_url, params=params)
-                        if response.status_code == HTTPStatus.NO_CONTENT:
-                            break
-                        response.raise_for_status()
-                        raw_json = response.json()
-                        parsed_data = ProcurementListResponse.model_validate(raw_json)
-                        if page == 1:
-                            total_pages = parsed_data.total_pages
-                            yield "pages_total", total_pages
-                        if not parsed_data.data:
-                            break
-                        for i, procurement_model in enumerate(parsed_data.data):
-                            yield "procurements_page", (procurement_model, raw_json["data"][i])
-                        yield "page_fetched", page
-                        page += 1
-                    except requests.RequestException as e:
-                        self.logger.error(f"Error fetching updates on page {page}: {e}")
+                while (event := events.get()) is not None:
+                    yield event
+                future.result()
+        finally:
+            cancelled.set()
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def _put_search_event(
+        self,
+        events: queue.Queue[tuple[str, Any] | None],
+        event: tuple[str, Any] | None,
+        cancelled: threading.Event,
+    ) -> bool:
+        """Puts an event on a search queue, waiting while the queue is full.
+
+        Args:
+            events: The queue that receives the search events.
+            event: The event to put, or `None` to mark the end of the search.
+            cancelled: Set when the consumer stopped reading the events.
+
+        Returns:
+            True if the event was queued, False if the scan was cancelled
+            while waiting for room.
+        """
+        while not cancelled.is_set():
+            try:
+                events.put(event, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _fetch_modality_pages(
+        self,
+        target_date: date,
+        city_code: int | None,
+        modality: ProcurementModality,
+        events: queue.Queue[tuple[str, Any] | None],
+        cancelled: threading.Event,
+        start_page: int = 1,
+    ) -> None:
+        """Fetches every page of a single (city, modality) search.
+
+        This runs on a worker thread. Instead of yielding, it pushes the same
+        events a sequential scan would produce onto `events`, always finishing
+        with a `None` sentinel so the consumer knows the search is over. When
+        the queue is full it waits for the consumer, and it stops fetching as
+        soon as `cancelled` is set.
+
+        Args:
+            target_date: The date to query for procurement updates.
+            city_code: The IBGE code of the city, or `None` for a nationwide
+                search.
+            modality: The procurement modality to search for.
+            events: The queue that receives the search events.
+            cancelled: Set when the consumer stopped reading the events.
+            start_page: The first page to fetch.
+        """
+        try:
+            page = start_page
+            total_pages = start_page
+            while page <= total_pages and not cancelled.is_set():
+                endpoint = "contratacoes/atualizacao"
+                params = {
+                    "dataInicial": target_date.strftime("%Y%m%d"),
+                    "dataFinal": target_date.strftime("%Y%m%d"),
+                    "codigoModalidadeContratacao": str(modality.value),
+                    "pagina": str(page),
+                }
+                if city_code:
+                    params["codigoMunicipioIbge"] = str(city_code)
+                try:
+                    api_url = urljoin(self.config.PNCP_PUBLIC_QUERY_API_URL, endpoint)
+                    response = self.http_provider.get(api_url, params=params)
+                    if response.status_code == HTTPStatus.NO_CONTENT:
                         break
-                    except ValidationError as e:
-                        self.logger.error(f"Data validation error on page {page}: {e}")
+                    response.raise_for_status()
+                    raw_json = response.json()
+                    parsed_data = ProcurementListResponse.model_validate(raw_json)
+                    if page == start_page:
+                        total_pages = parsed_data.total_pages
+                        if not self._put_search_event(
+                            events, ("pages_total", max(0, total_pages - start_page + 1)), cancelled
+                        ):
+                            return
+                    if not parsed_data.data:
                         break
+                    for i, procurement_model in enumerate(parsed_data.data):
+                        if not self._put_search_event(
+                            events, ("procurements_page", (procurement_model, raw_json["data"][i])), cancelled
+                        ):
+                            return
+                    if not self._put_search_event(events, ("page_fetched", page), cancelled):
+                        return
+                    page += 1
+                except requests.RequestException as e:
+                    self.logger.error(f"Error fetching updates on page {page}: {e}")
+                    break
+                except ValidationError as e:
+                    self.logger.error(f"Data validation error on page {page}: {e}")
+                    break
+        finally:
+            self._put_search_event(events, None, cancelled)
 
     def publish_procurement_to_pubsub(self, procurement: Procurement) -> bool:
         """Publishes a procurement object to the configured Pub/Sub topic.
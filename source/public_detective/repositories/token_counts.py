@@ -0,0 +1,84 @@
+"""This module defines the repository for the persistent token count cache."""
+
+from public_detective.providers.logging import Logger, LoggingProvider
+from sqlalchemy import Engine, text
+
+
+class TokenCountsRepository:
+    """Handles database operations for the token count cache.
+
+    Each row of the `token_counts` table holds the number of tokens a model
+    counted for a content sent to it, keyed by the SHA-256 of the content as
+    sent, its MIME type and the model. The same content counted by another
+    model, or sent under another MIME type, gets its own row.
+    """
+
+    logger: Logger
+    engine: Engine
+
+    def __init__(self, engine: Engine) -> None:
+        """Initializes the repository with a database engine.
+
+        Args:
+            engine: The SQLAlchemy Engine to be used for all database
+                communications.
+        """
+        self.logger = LoggingProvider().get_logger()
+        self.engine = engine
+
+    def get_token_counts(self, model: str, content_keys: list[tuple[str, str]]) -> dict[tuple[str, str], int]:
+        """Retrieves the token counts stored for the given contents.
+
+        Args:
+            model: The model the tokens were counted with.
+            content_keys: The `(content_hash, mime_type)` pairs to look up.
+
+        Returns:
+            A dictionary mapping each stored pair to its token count.
+        """
+        if not content_keys:
+            return {}
+        sql = text(
+            """
+            SELECT content_hash, mime_type, token_count
+            FROM token_counts
+            WHERE model = :model AND content_hash = ANY(:content_hashes);
+            """
+        )
+        with self.engine.connect() as conn:
+            rows = (
+                conn.execute(
+                    sql, {"model": model, "content_hashes": list({content_hash for content_hash, _ in content_keys})}
+                )
+                .mappings()
+                .all()
+            )
+        wanted = set(content_keys)
+        return {
+            (row["content_hash"], row["mime_type"]): row["token_count"]
+            for row in rows
+            if (row["content_hash"], row["mime_type"]) in wanted
+        }
+
+    def save_token_count(self, model: str, content_hash: str, mime_type: str, token_count: int) -> None:
+        """Saves the token count of a content, keeping the one stored concurrently.
+
+        Args:
+            model: The model the tokens were counted with.
+            content_hash: The SHA-256 hex digest of the content as sent.
+            mime_type: The MIME type the content was sent under.
+            token_count: The number of tokens of the content.
+        """
+        sql = text(
+            """
+            INSERT INTO token_counts (content_hash, mime_type, model, token_count)
+            VALUES (:content_hash, :mime_type, :model, :token_count)
+            ON CONFLICT (content_hash, mime_type, model) DO NOTHING;
+            """
+        )
+        with self.engine.connect() as conn:
+            conn.execute(
+                sql,
+                {"content_hash": content_hash, "mime_type": mime_type, "model": model, "token_count": token_count},
+            )
+            conn.commit()
@@ -1,26 +1,34 @@
 """This module defines the core service for handling procurement analyses."""
 
+import asyncio
 import hashlib
 import json
+import multiprocessing
 import os
 import time
 import uuid
 from collections import defaultdict
-from collections.abc import Iterator
+from collections.abc import Generator, Iterator
+from concurrent.futures import Executor, ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
 from datetime import date, datetime, timedelta, timezone
 from decimal import Decimal
-from typing import Any
+from functools import partial
+from typing import Any, cast
 from uuid import UUID
 
 from public_detective.exceptions.analysis import AnalysisError
-from public_detective.models.analyses import AnalysisResult, GroundingMetadata, GroundingSource
+from public_detective.models.analyses import Analysis, AnalysisResult, GroundingMetadata, GroundingSource
 from public_detective.models.candidates import AIFileCandidate
+from public_detective.models.file_contents import FileContent
 from public_detective.models.file_records import ExclusionReason, NewFileRecord, PrioritizationLogic
+from public_detective.models.pre_analysis_checkpoints import PreAnalysisCheckpoint
 from public_detective.models.procurement_analysis_status import ProcurementAnalysisStatus
 from public_detective.models.procurements import Procurement
 from public_detective.models.source_documents import NewSourceDocument
 from public_detective.providers.ai import AiProvider
 from public_detective.providers.config import Config, ConfigProvider
+from public_detective.providers.database import DatabaseManager
 from public_detective.providers.file_type import SPECIALIZED_IMAGE, FileTypeProvider
 from public_detective.providers.gcs import GcsProvider
 from public_detective.providers.http import HttpProvider
@@ -29,13 +37,123 @@ from public_detective.providers.logging import Logger, LoggingProvider
 from public_detective.providers.pubsub import PubSubProvider
 from public_detective.repositories.analyses import AnalysisRepository
 from public_detective.repositories.budget_ledgers import BudgetLedgerRepository
+from public_detective.repositories.file_contents import FileContentsRepository
 from public_detective.repositories.file_records import FileRecordsRepository
+from public_detective.repositories.pre_analysis_checkpoints import PreAnalysisCheckpointRepository
 from public_detective.repositories.procurements import ProcessedFile, ProcurementsRepository
 from public_detective.repositories.source_documents import SourceDocumentsRepository
 from public_detective.repositories.status_histories import StatusHistoryRepository
-from public_detective.services.converter import ConverterService
+from public_detective.repositories.token_counts import TokenCountsRepository
+from public_detective.services.converter import ConversionBackend, ConversionExecutor, ConverterService
 from public_detective.services.pricing import Modality, PricingService
 from public_detective.services.ranking import RankingService
+from public_detective.services.token_counter import TokenCounter
+from public_detective.services.token_estimator import TokenEstimator
+
+ANALYSIS_INSTRUCTIONS = """
+Você é um Auditor de Controle Externo do Tribunal de Contas da União (TCU), especializado em análise forense de licitações públicas no Brasil, atuando sob a égide da Lei 14.133/2021 e da jurisprudência consolidada.
+
+--- PRINCÍPIOS ORIENTADORES (RIGOR E CETICISMO) ---
+1. **Ceticismo Profissional:** Assuma uma postura neutra e investigativa. O ônus da prova da irregularidade é seu.
+2. **Materialidade e Relevância:** Concentre-se em achados que tenham impacto financeiro significativo ou que violem princípios legais fundamentais.
+3. **Verificação de Fatos:** Toda informação externa utilizada (preços, notícias, dados de empresas) deve vir de fontes confiáveis e verificáveis. Priorize dados governamentais oficiais.
+4. **Restrição Negativa (Anti-Falso Positivo):** Se a evidência for ambígua, fraca ou a pesquisa de mercado for inconclusiva, NÃO reporte a irregularidade. Prefira errar por omissão do que acusar sem provas robustas.
+--- FIM DOS PRINCÍPIOS ---
+
+### PROTOCOLO DE ANÁLISE OBRIGATÓRIO (Chain-of-Thought)
+
+1. **Análise da Fase Interna e Competitividade:** Examine a conformidade do Termo de Referência/Edital, buscando direcionamentos (marca sem justificativa técnica) ou restrições indevidas à competitividade.
+2. **Análise da Pesquisa de Preços do Órgão:** Avalie a metodologia utilizada pelo órgão. Eles seguiram a hierarquia legal? A pesquisa foi ampla? Há indícios de simulação ou cotações viciadas?
+3. **Auditoria de Economicidade (Verificação de Sobrepreço):** Etapa crítica. Utilize as ferramentas de busca (ex: Google Search) seguindo a metodologia abaixo. Inicie as buscas obrigatoriamente por termos como: "Painel de Preços [Objeto]", "Licitação Homologada [Objeto]", "Ata de Registro de Preços [Objeto]".
+
+---
+#### METODOLOGIA DE ANÁLISE DE PREÇOS (OBRIGATÓRIA)
+
+Ao analisar Sobrepreço ou Superfaturamento, siga esta hierarquia e aplique as regras de validação:
+
+**I. HIERARQUIA DE FONTES (Siga a ordem estritamente):**
+    A. **Fontes Públicas Oficiais:** Painel de Preços (Gov.br), Bancos de Preços Estaduais/Municipais (ex: BEC/SP), Contratações similares recentes no PNCP, Atas de Registro de Preço (ARP) vigentes.
+    B. **Tabelas Indexadas:** SINAPI (obras), SIGTAP/BPS (saúde), ou outras tabelas setoriais oficiais.
+    C. **Fontes B2B (Atacado/Distribuidores):** Sites de atacado ou distribuidores que vendem para empresas/governo.
+    D. **Fontes B2C (Varejo/E-commerce) - USO EXCEPCIONAL:** Utilize APENAS se as fontes A-C forem exauridas.
+
+**II. REGRAS DE VALIDAÇÃO E CONTEXTUALIZAÇÃO:**
+
+    1. **Temporalidade (CRÍTICO):** A pesquisa DEVE focar em preços contemporâneos à Data de Referência da licitação (janela de +/- 6 meses). Se utilizar preços fora desta janela, você DEVE mencionar a necessidade de ajuste inflacionário (ex: IPCA/INPC) no campo `rationale`.
+    2. **Comparabilidade:** Garanta que a especificação técnica, marca, modelo e quantidade sejam idênticos ou funcionalmente equivalentes (justifique a equivalência).
+    3. **Evidência Robusta (OBRIGATÓRIO):**
+        *   **Fontes Privadas (C ou D):** É **PROIBIDO** concluir sobrepreço com base em apenas 1 ou 2 fontes. Você **DEVE** encontrar e citar no mínimo **3 fontes distintas** para formar uma Cesta de Preços de Mercado. Se não encontrar 3, não aponte sobrepreço (Restrição Negativa).
+        *   **Fontes Oficiais (A ou B):** Se encontrar 1 fonte oficial robusta (ex: Painel de Preços ou Licitação similar no PNCP), ela é suficiente e tem preferência sobre fontes privadas.
+    4. **Busca Exaustiva de Fontes Oficiais:** Antes de recorrer ao Google (Varejo), você **DEVE** tentar buscar em fontes oficiais. Se não encontrar, declare explicitamente no `auditor_reasoning`: "Foram realizadas buscas no Painel de Preços e no PNCP para a marca [MARCA], sem identificação de contratos comparáveis; por isso recorreu-se a fontes de varejo...".
+    5. **Tratamento de Fontes de Varejo (B2C - Fonte D):** Se utilizar o varejo:
+        *   **Fator de Desconto (BDI Diferencial):** Aplique um desconto presumido de 20% sobre o preço de varejo. No `rationale`, você **DEVE** escrever a conta: "Preço varejo: R$ X/un. Aplicando fator de desconto de 20%: X * 0.80 = R$ Y/un (preço atacado estimado)."
+        *   **Ressalvas (Custo Brasil):** Pondere o impacto de custos logísticos, tributários (ex: ICMS interestadual) e burocráticos específicos da contratação.
+        *   **Agravante Crítico:** Se o preço contratado (em quantidade de atacado) for SUPERIOR ao preço de varejo unitário (sem desconto), isso é um indício GRAVE de sobrepreço, pois ignora a economia de escala.
+
+---
+
+**III. REGRAS DE PREENCHIMENTO DA LISTA `sources` (CRÍTICO):**
+    1. **Identificação da Fonte (ANTI-ALUCINAÇÃO):** Priorize o preenchimento do campo `name` com o nome da loja ou entidade (ex: "Kalunga", "Mercado Livre", "Painel de Preços"). As URLs de busca (Grounding) serão capturadas automaticamente pelo sistema e vinculadas à análise, portanto, concentre-se em identificar corretamente a origem do preço.
+    2. **Quantidade de Fontes:**
+        *   Cite **todas** as fontes relevantes encontradas que sustentem o achado. Não se limite a 3 fontes se houver mais evidências disponíveis.
+        *   Se encontrar apenas **1 fonte válida** (e não for oficial), o `severity` DEVE ser rebaixado para **MODERADA** ou **LEVE**, pois a prova é frágil.
+        *   Para sustentar `severity` **GRAVE** ou **CRÍTICO** em sobrepreço, é OBRIGATÓRIO citar **3 fontes** ou 1 fonte oficial.
+    3. **Data da Referência:** Se a data não for explícita na página, use a data atual da consulta. **JAMAIS invente datas passadas.** Se a data for antiga (> 6 meses), justifique explicitamente no `rationale` por que ela ainda é válida.
+    4. **Consistência (Checklist):**
+        *   **Quantidade:** Verifique se a quantidade usada no cálculo de economia (ex: 1656) bate com a soma dos itens onde houve sobrepreço. Se excluir itens (ex: item 3), explique: "Considerando apenas os itens 1 e 2...".
+        *   **Marca:** Padronize a grafia da marca (ex: Maxprint vs Maxxprint). Use a grafia do documento, mas mencione variações se necessário.
+        *   **Preço de Referência:** Se usar uma média (ex: R$ 2,13), explique a origem: "Média entre Fonte A (R$ 2,00) e Fonte B (R$ 2,26)". **ATENÇÃO:** Se você estiver usando o maior preço da cesta para ser conservador, NÃO chame de "Média". Chame de "Referência Conservadora".
+
+**CATEGORIAS DE IRREGULARIDADES:**
+[DIRECIONAMENTO, RESTRICAO_COMPETITIVIDADE, SOBREPRECO (requer metodologia acima), SUPERFATURAMENTO (requer prova de dano consumado), FRAUDE (conluio, documentos falsos), DOCUMENTACAO_IRREGULAR, OUTROS]
+
+**ESTRUTURA DO `red_flag`:**
+- `category`: Categoria acima. Se a falha for metodológica (ex: ignorar fontes oficiais), use RESTRICAO_COMPETITIVIDADE.
+- `severity`: `LEVE`, `MODERADA` ou `GRAVE`.
+- `description`: Descrição objetiva (pt-br). Se você citar fontes para itens diferentes (ex: Pilha AA e Pilha C), mencione TODOS os itens na descrição.
+- `evidence_quote`: Citação literal (pt-br) do documento da licitação.
+- `auditor_reasoning`: Justificativa técnica (pt-br). Explique o risco e a norma violada.
+    *   **OBRIGATÓRIO 1 (Fontes Oficiais):** No início do texto, declare explicitamente: "Foram realizadas buscas no Painel de Preços, PNCP e BEC/SP... sem sucesso" (se for o caso).
+    *   **OBRIGATÓRIO 2 (Justificativa de Severidade):** Se o sobrepreço for alto (>35%) mas a severidade for rebaixada para MODERADA por baixa materialidade OU por insuficiência de fontes (menos de 3 fontes fortes), JUSTIFIQUE: "Apesar do percentual elevado (>35%), a severidade foi classificada como MODERADA em razão da baixa materialidade global/insuficiência de 3 fontes robustas...".
+    *   **OBRIGATÓRIO 3 (Cálculo Global):** Ao final do texto, você **DEVE** escrever a fórmula completa: "Considerando preço referência R$ X (média/menor/conservador), a economia potencial global é: (Preço Contratado - Preço Ref) * Quantidade = R$ Y".
+- `potential_savings` (opcional): Valor monetário estimado da economia potencial. Deve bater com o cálculo do `auditor_reasoning`.
+- `sources` (Obrigatório para SOBREPRECO/SUPERFATURAMENTO):
+    - `name`: nome ou título da fonte.
+    - `type`: Classificação da fonte conforme hierarquia: "OFICIAL", "TABELA", "B2B" ou "VAREJO".
+    - `reference_price`: preço de referência por unidade (quando disponível).
+    - `price_unit`: unidade do valor (ex.: “unidade”, “metro”).
+    - `reference_date`: data em que o preço foi válido ou coletado.
+    - `evidence`: Trecho literal da fonte que apoia a comparação.
+    - `rationale`: **(CRÍTICO)** Explicação detalhada da comparação. DEVE incluir: o tipo da fonte usada (ex: Oficial, Varejo), o preço unitário contratado, o preço de referência médio (da cesta), o cálculo da diferença percentual, a contextualização temporal. **SE A FONTE FOR VAREJO, É OBRIGATÓRIO MOSTRAR A CONTA DO DESCONTO:** "X * 0.80 = Y".
+
+**CLASSIFICAÇÃO DE SEVERIDADE (Calibrada para Rigor e Materialidade):**
+- **Leve:** Falhas formais sem impacto material, ou sobrepreço < 15% acima da Cesta de Preços Aceitável.
+- **Moderada:** Restrição de competitividade, sobrepreço entre 15% e 35%, ou pesquisa de preços metodologicamente falha (ex: ignorar fontes oficiais sem justificativa). **ATENÇÃO:** Se você encontrar menos de 3 fontes robustas para o item principal, a severidade DEVE ser MODERADA, mesmo que o sobrepreço seja alto.
+- **Grave:** Direcionamento claro, ausência de pesquisa de preços válida, sobrepreço > 35% comprovado por fontes robustas (A, B ou C), Preço de atacado superior ao de varejo (Agravante Crítico), ou qualquer indício de fraude/dano consumado. **REQUISITO:** Mínimo de 3 fontes distintas ou 1 fonte oficial para classificar como GRAVE.
+
+**CRITÉRIOS PARA A NOTA DE RISCO (0 a 100):**
+A nota deve refletir a probabilidade de irregularidade E o impacto material (financeiro).
+
+**Escala de Risco:**
+- **0-10 (Mínimo):** Processo regular ou falhas formais irrelevantes.
+- **11-30 (Baixo):** Falhas formais leves sem dano ao erário comprovado.
+- **31-50 (Moderado):** Indícios de restrição à competitividade (ex: ignorar fontes oficiais) ou sobrepreço em itens de baixo impacto financeiro.
+- **51-70 (Alto):** Sobrepreço significativo (>25%) em itens relevantes, direcionamento evidente ou restrição grave sem justificativa.
+- **71-90 (Crítico):** Sobrepreço grosseiro (>50%), "Jogo de Planilha", ou direcionamento flagrante em licitação de grande vulto.
+- **91-100 (Máximo):** Prova documental de fraude (conluio, falsificação) ou superfaturamento consumado com alto dano.
+
+**Fator de Correção por Materialidade (OBRIGATÓRIO):**
+- Para licitações de **baixo valor total** (ex: Dispensa < R$ 50k) ou itens de valor irrisório: **REDUZA a nota de risco em 20 a 30 pontos**, a menos que haja prova inequívoca de fraude (conluio/falsificação).
+- **Exemplo:** Um sobrepreço de 100% em uma compra de R$ 1.000,00 (dano potencial de R$ 500,00) deve ter risco **BAIXO a MODERADO (Nota 20-40)**, jamais Alto ou Crítico, pois o custo do controle excede o benefício.
+
+**FORMATO DA RESPOSTA (JSON):**
+Sua resposta deve ser um objeto JSON único e válido. Preencha os campos `procurement_summary`, `analysis_summary`, `risk_score_rationale` (pt-br, máx 3 sentenças cada) e `seo_keywords` (5-10 palavras-chave estratégicas: Objeto, Órgão, Cidade/Estado, Tipo de Irregularidade).
+No `analysis_summary`:
+- Use linguagem neutra se o sobrepreço não for comprovado. Prefira "não foi possível demonstrar, com robustez metodológica, a existência de sobrepreço relevante" em vez de "preços alinhados".
+No `risk_score_rationale`:
+- Seja preciso com percentuais (ex: "11% a 29%" em vez de "aproximadamente 28%").
+- Use terminologia coerente com a severidade (ex: se severidade é MODERADA, use "irregularidade relevante" ou "gravidade moderada", evite "irregularidade grave").
+"""  # noqa: E501
 
 
 class AnalysisService:
@@ -51,6 +169,9 @@ class AnalysisService:
     gcs_provider: GcsProvider
     http_provider: HttpProvider
     converter_service: ConverterService
+    conversion_executor: ConversionExecutor
+    token_counter: TokenCounter
+    token_estimator: TokenEstimator
     pubsub_provider: PubSubProvider | None
     logger: Logger
     config: Config
@@ -98,6 +219,7 @@ class AnalysisService:
     _AUDIO_EXTENSIONS = (".mp3", ".wav", ".flac", ".ogg")
     _IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".gif", ".bmp")
     _SPECIALIZED_IMAGE_EXTENSIONS = (".ai", ".psd", ".eps", ".cdr")
+    _NORMALIZED_IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
     _SPREADSHEET_EXTENSIONS = (".xlsx", ".xls", ".xlsb", ".ods")
     _FILE_PRIORITY_ORDER = [
         "edital",
@@ -123,6 +245,9 @@ class AnalysisService:
         http_provider: HttpProvider,
         pubsub_provider: PubSubProvider | None = None,
         gcs_path_prefix: str | None = None,
+        pre_analysis_checkpoint_repo: PreAnalysisCheckpointRepository | None = None,
+        file_content_repo: FileContentsRepository | None = None,
+        token_count_repo: TokenCountsRepository | None = None,
     ) -> None:
         """Initializes the service with its dependencies.
 
@@ -138,6 +263,13 @@ class AnalysisService:
             http_provider: The provider for HTTP requests.
             pubsub_provider: The provider for Pub/Sub services.
             gcs_path_prefix: Overwrites the base GCS path for uploads.
+            pre_analysis_checkpoint_repo: The repository for pre-analysis
+                checkpoints. Without it, pre-analysis runs are not resumable.
+            file_content_repo: The repository for the content-addressed file
+                store. Without it, identical files are only deduplicated
+                within a single procurement and stored once per analysis.
+            token_count_repo: The repository of the persistent token count
+                cache. Without it, every run counts its files with the model.
         """
         self.procurement_repo = procurement_repo
         self.analysis_repo = analysis_repo
@@ -154,11 +286,16 @@ class AnalysisService:
         self.pubsub_provider = pubsub_provider
         self.logger = LoggingProvider().get_logger()
         self.config = ConfigProvider.get_config()
+        self.conversion_executor = ConversionExecutor(self.config)
+        self.token_counter = TokenCounter(self.ai_provider, token_count_repo)
+        self.token_estimator = TokenEstimator(self.analysis_repo, self.config)
         self.pricing_service = PricingService()
         self.ranking_service = RankingService(
             analysis_repo=self.analysis_repo, pricing_service=self.pricing_service, config=self.config
         )
         self.gcs_path_prefix = gcs_path_prefix
+        self.pre_analysis_checkpoint_repo = pre_analysis_checkpoint_repo
+        self.file_content_repo = file_content_repo
 
     def _get_modality_from_exts(self, extensions: list[str | None]) -> Modality:
         """Determines the modality of an analysis based on file extensions.
@@ -205,23 +342,10 @@ class AnalysisService:
             max_output_tokens: The maximum number of output tokens for the AI model.
         """
         try:
-            analysis = self.analysis_repo.get_analysis_by_id(analysis_id)
-            if not analysis:
-                self.logger.error(f"Analysis with ID {analysis_id} not found.")
-                return
-
-            analysis_record = self.analysis_repo.get_analysis_by_id(analysis_id)
-            if not analysis_record:
-                raise AnalysisError(f"Analysis record {analysis_id} not found.")
-
-            procurement = self.procurement_repo.get_procurement_by_id_and_version(
-                analysis.procurement_control_number, analysis.version_number
-            )
-            if not procurement:
-                self.logger.error(
-                    f"Procurement {analysis.procurement_control_number} version {analysis.version_number} not found."
-                )
+            loaded = self._load_analysis_for_processing(analysis_id)
+            if loaded is None:
                 return
+            analysis, procurement = loaded
 
             try:
                 self.analyze_procurement(procurement, analysis.version_number, analysis_id, max_output_tokens)
@@ -235,6 +359,77 @@ class AnalysisService:
         except Exception as e:
             raise AnalysisError(f"Failed to process analysis from message: {e}") from e
 
+    async def process_analysis_from_message_async(
+        self, analysis_id: UUID, ai_semaphore: asyncio.Semaphore, max_output_tokens: int | None = None
+    ) -> None:
+        """Processes a single analysis request on an event loop.
+
+        Database, storage and HTTP work runs on the loop's default executor,
+        while the model call is awaited on the async client. Only the model
+        call is bounded by `ai_semaphore`, so many analyses can be loading or
+        saving while others wait for the model.
+
+        Args:
+            analysis_id: The ID of the analysis to process.
+            ai_semaphore: Bounds the model calls in flight.
+            max_output_tokens: The maximum number of output tokens for the AI model.
+        """
+        try:
+            loaded = await asyncio.to_thread(self._load_analysis_for_processing, analysis_id)
+            if loaded is None:
+                return
+            analysis, procurement = loaded
+
+            try:
+                await self.analyze_procurement_async(
+                    procurement, analysis.version_number, analysis_id, ai_semaphore, max_output_tokens
+                )
+                await asyncio.to_thread(
+                    self._update_status_with_history,
+                    analysis_id,
+                    ProcurementAnalysisStatus.ANALYSIS_SUCCESSFUL,
+                    "Analysis completed successfully.",
+                )
+            except Exception as e:
+                self.logger.error(f"Analysis pipeline failed for analysis {analysis_id}: {e}", exc_info=True)
+                await asyncio.to_thread(
+                    self._update_status_with_history, analysis_id, ProcurementAnalysisStatus.ANALYSIS_FAILED, str(e)
+                )
+                raise
+        except Exception as e:
+            raise AnalysisError(f"Failed to process analysis from message: {e}") from e
+
+    def _load_analysis_for_processing(self, analysis_id: UUID) -> tuple[AnalysisResult, Procurement] | None:
+        """Loads the analysis of a message and the procurement it analyzes.
+
+        Args:
+            analysis_id: The ID of the analysis to process.
+
+        Returns:
+            The analysis and its procurement, or `None` if either is missing.
+
+        Raises:
+            AnalysisError: If the analysis record disappears while loading.
+        """
+        analysis = self.analysis_repo.get_analysis_by_id(analysis_id)
+        if not analysis:
+            self.logger.error(f"Analysis with ID {analysis_id} not found.")
+            return None
+
+        analysis_record = self.analysis_repo.get_analysis_by_id(analysis_id)
+        if not analysis_record:
+            raise AnalysisError(f"Analysis record {analysis_id} not found.")
+
+        procurement = self.procurement_repo.get_procurement_by_id_and_version(
+            analysis.procurement_control_number, analysis.version_number
+        )
+        if not procurement:
+            self.logger.error(
+                f"Procurement {analysis.procurement_control_number} version {analysis.version_number} not found."
+            )
+            return None
+        return analysis, procurement
+
     def _resolve_redirects(self, url: str) -> str:
         """Resolves redirects for a given URL to find the final destination.
 
@@ -261,6 +456,7 @@ class AnalysisService:
                 return str(response.url)
 
             response = self.http_provider.get(url, allow_redirects=True, stream=True)
+            response.close()
             self.logger.info(f"Resolved (fallback GET) to: {response.url}")
             return str(response.url)
         except Exception as e:
@@ -311,125 +507,91 @@ class AnalysisService:
             version_number: The version number of the procurement data.
             analysis_id: The unique identifier for this analysis.
             max_output_tokens: Optional token limit for the AI response.
-
-        Raises:
-            AnalysisError: If any step of the analysis pipeline fails.
         """
         control_number = procurement.pncp_control_number
         self.logger.info(f"Starting analysis for procurement {control_number} (v{version_number})...")
 
-        try:
-            procurement_id = self.procurement_repo.get_procurement_uuid(procurement.pncp_control_number, version_number)
-            if not procurement_id:
-                self.logger.warning(
-                    f"Could not find procurement UUID for {control_number} "
-                    f"v{version_number}. Proceeding with analysis without documents."
-                )
-            file_records = self.file_record_repo.get_all_file_records_by_analysis_id(str(analysis_id))
-            if not file_records:
-                self.logger.warning(f"No file records found for analysis {analysis_id}. Proceeding with metadata only.")
-
-            included_records = [rec for rec in file_records if rec.get("included_in_analysis")]
-            if not included_records and file_records:
-                self.logger.warning(
-                    f"No files were selected for analysis for {control_number}. " "Proceeding with metadata only."
-                )
-
-            files_for_ai_uris = [
-                uri
-                for rec in included_records
-                if rec.get("prepared_content_gcs_uris")
-                for uri in rec["prepared_content_gcs_uris"]
-            ]
-            if not files_for_ai_uris and included_records:
-                self.logger.warning(
-                    f"No prepared content URIs found for {control_number} " f"despite having included records."
-                )
-
-            candidates = []
-            for rec in included_records:
-                cand = AIFileCandidate(
-                    synthetic_id=str(rec.get("source_document_id", "")),
-                    raw_document_metadata=rec.get("raw_document_metadata") or {},
-                    original_path=rec.get("original_filename", ""),
-                    original_content=b"",
-                    extraction_failed=False,
-                )
-                cand.ai_path = rec.get("ai_path") or rec.get("original_filename", "unknown_file")
-                cand.prepared_content_gcs_uris = rec.get("prepared_content_gcs_uris")
-                candidates.append(cand)
-
-            prompt = self._build_analysis_prompt(procurement, candidates)
-
-            (
-                ai_analysis,
-                input_tokens,
-                output_tokens,
-                thinking_tokens,
-                raw_grounding_metadata,
-                thoughts,
-            ) = self.ai_provider.get_structured_analysis(
-                prompt=prompt, file_uris=files_for_ai_uris, max_output_tokens=max_output_tokens
+        with self._analysis_pipeline_errors(control_number):
+            prompt, file_uris, included_records, procurement_id, analysis_record = self._build_analysis_request(
+                procurement, version_number, analysis_id
+            )
+            ai_result = self.ai_provider.get_structured_analysis(
+                prompt=prompt,
+                file_uris=file_uris,
+                max_output_tokens=max_output_tokens,
+                system_instruction=ANALYSIS_INSTRUCTIONS,
+                document_hash=self._get_document_cache_hash(analysis_record),
+            )
+            self._save_analysis_result(
+                procurement,
+                version_number,
+                analysis_id,
+                procurement_id,
+                prompt,
+                included_records,
+                analysis_record,
+                ai_result,
             )
 
-            grounding_metadata = self._process_grounding_metadata(raw_grounding_metadata)
-
-            gcs_base_path = f"{procurement_id}/{analysis_id}"
-
-            analysis_record = self.analysis_repo.get_analysis_by_id(analysis_id)
-            document_hash = analysis_record.document_hash if analysis_record else None
+    async def analyze_procurement_async(
+        self,
+        procurement: Procurement,
+        version_number: int,
+        analysis_id: UUID,
+        ai_semaphore: asyncio.Semaphore,
+        max_output_tokens: int | None = None,
+    ) -> None:
+        """Orchestrates the analysis of a procurement on an event loop.
 
-            final_result = AnalysisResult(
-                procurement_control_number=control_number,
-                version_number=version_number,
-                ai_analysis=ai_analysis,
-                document_hash=document_hash,
-                original_documents_gcs_path=gcs_base_path,
-                processed_documents_gcs_path=None,
-                analysis_prompt=prompt,
-                grounding_metadata=grounding_metadata,
-                thoughts=thoughts,
-            )
+        Args:
+            procurement: The procurement object to analyze.
+            version_number: The version number of the procurement data.
+            analysis_id: The unique identifier for this analysis.
+            ai_semaphore: Bounds the model calls in flight.
+            max_output_tokens: Optional token limit for the AI response.
+        """
+        control_number = procurement.pncp_control_number
+        self.logger.info(f"Starting analysis for procurement {control_number} (v{version_number})...")
 
-            exts = [rec.get("extension") for rec in included_records]
-            modality = self._get_modality_from_exts(exts)
-
-            search_queries_count = len(grounding_metadata.search_queries)
-            (
-                input_cost,
-                output_cost,
-                thinking_cost,
-                search_cost,
-                total_cost,
-            ) = self.pricing_service.calculate_total_cost(
-                input_tokens,
-                output_tokens,
-                thinking_tokens,
-                modality=modality,
-                search_queries_count=search_queries_count,
+        with self._analysis_pipeline_errors(control_number):
+            prompt, file_uris, included_records, procurement_id, analysis_record = await asyncio.to_thread(
+                self._build_analysis_request, procurement, version_number, analysis_id
             )
-            self.analysis_repo.save_analysis(
-                analysis_id=analysis_id,
-                result=final_result,
-                input_tokens=input_tokens,
-                output_tokens=output_tokens,
-                thinking_tokens=thinking_tokens,
-                input_cost=input_cost,
-                output_cost=output_cost,
-                thinking_cost=thinking_cost,
-                search_cost=search_cost,
-                total_cost=total_cost,
-                search_queries_used=search_queries_count,
-            )
-
-            self.budget_ledger_repo.save_expense(
+            async with ai_semaphore:
+                ai_result = await self.ai_provider.get_structured_analysis_async(
+                    prompt=prompt,
+                    file_uris=file_uris,
+                    max_output_tokens=max_output_tokens,
+                    system_instruction=ANALYSIS_INSTRUCTIONS,
+                    document_hash=self._get_document_cache_hash(analysis_record),
+                )
+            await asyncio.to_thread(
+                self._save_analysis_result,
+                procurement,
+                version_number,
                 analysis_id,
-                total_cost,
-                f"Análise da licitação {procurement.pncp_control_number} (v{version_number}).",
+                procurement_id,
+                prompt,
+                included_records,
+                analysis_record,
+                ai_result,
             )
 
-            self.logger.info(f"Successfully completed analysis for {control_number}.")
+    @contextmanager
+    def _analysis_pipeline_errors(self, control_number: str) -> Iterator[None]:
+        """Logs failures of the analysis pipeline and wraps them in `AnalysisError`.
+
+        Args:
+            control_number: The control number of the procurement being analyzed.
+
+        Yields:
+            Control to the pipeline steps.
 
+        Raises:
+            AnalysisError: If any step of the analysis pipeline fails.
+        """
+        try:
+            yield
         except AnalysisError:
             raise
         except ValueError as e:
@@ -443,96 +605,460 @@ class AnalysisService:
             )
             raise AnalysisError(f"Unexpected Error: {e}") from e
 
+    def _build_analysis_request(
+        self, procurement: Procurement, version_number: int, analysis_id: UUID
+    ) -> tuple[str, list[str], list[dict], UUID | None, AnalysisResult | None]:
+        """Builds the prompt and the file list sent to the AI model.
+
+        The prompt holds the procurement context only; the instructions are
+        sent apart, as the system instruction.
+
+        Args:
+            procurement: The procurement object to analyze.
+            version_number: The version number of the procurement data.
+            analysis_id: The unique identifier for this analysis.
+
+        Returns:
+            The prompt, the GCS URIs of the files, the file records included
+            in the analysis, the UUID of the procurement, if found, and the
+            analysis record, if found.
+        """
+        control_number = procurement.pncp_control_number
+        procurement_id = self.procurement_repo.get_procurement_uuid(control_number, version_number)
+        if not procurement_id:
+            self.logger.warning(
+                f"Could not find procurement UUID for {control_number} "
+                f"v{version_number}. Proceeding with analysis without documents."
+            )
+        file_records = self.file_record_repo.get_all_file_records_by_analysis_id(str(analysis_id))
+        if not file_records:
+            self.logger.warning(f"No file records found for analysis {analysis_id}. Proceeding with metadata only.")
+
+        included_records = [rec for rec in file_records if rec.get("included_in_analysis")]
+        if not included_records and file_records:
+            self.logger.warning(
+                f"No files were selected for analysis for {control_number}. " "Proceeding with metadata only."
+            )
+
+        files_for_ai_uris = list(
+            dict.fromkeys(
+                uri
+                for rec in included_records
+                if rec.get("prepared_content_gcs_uris")
+                for uri in rec["prepared_content_gcs_uris"]
+            )
+        )
+        if not files_for_ai_uris and included_records:
+            self.logger.warning(
+                f"No prepared content URIs found for {control_number} " f"despite having included records."
+            )
+
+        candidates = []
+        for rec in included_records:
+            cand = AIFileCandidate(
+                synthetic_id=str(rec.get("source_document_id", "")),
+                raw_document_metadata=rec.get("raw_document_metadata") or {},
+                original_path=rec.get("original_filename", ""),
+                original_content=b"",
+                extraction_failed=False,
+            )
+            cand.ai_path = rec.get("ai_path") or rec.get("original_filename", "unknown_file")
+            cand.prepared_content_gcs_uris = rec.get("prepared_content_gcs_uris")
+            candidates.append(cand)
+
+        prompt = self._build_procurement_context(procurement, candidates)
+        analysis_record = self.analysis_repo.get_analysis_by_id(analysis_id)
+        return prompt, files_for_ai_uris, included_records, procurement_id, analysis_record
+
+    def _get_document_cache_hash(self, analysis_record: AnalysisResult | None) -> str | None:
+        """Returns the hash the files of an analysis are cached under, if any.
+
+        Only retries send documents the AI model has already read, so only
+        they are worth a context cache holding their files.
+
+        Args:
+            analysis_record: The record of the analysis.
+
+        Returns:
+            The document hash of a retried analysis, or `None`.
+        """
+        if analysis_record and analysis_record.retry_count:
+            return cast(str | None, analysis_record.document_hash)
+        return None
+
+    def _save_analysis_result(
+        self,
+        procurement: Procurement,
+        version_number: int,
+        analysis_id: UUID,
+        procurement_id: UUID | None,
+        prompt: str,
+        included_records: list[dict],
+        analysis_record: AnalysisResult | None,
+        ai_result: tuple[Analysis, int, int, int, dict, str | None, int],
+    ) -> None:
+        """Prices the AI response and saves it with its expense.
+
+        Args:
+            procurement: The analyzed procurement.
+            version_number: The version number of the procurement data.
+            analysis_id: The unique identifier for this analysis.
+            procurement_id: The UUID of the procurement, if found.
+            prompt: The procurement context sent to the AI model.
+            included_records: The file records included in the analysis.
+            analysis_record: The record of the analysis, if found.
+            ai_result: The tuple returned by the AI provider.
+        """
+        control_number = procurement.pncp_control_number
+        (
+            ai_analysis,
+            input_tokens,
+            output_tokens,
+            thinking_tokens,
+            raw_grounding_metadata,
+            thoughts,
+            cached_input_tokens,
+        ) = ai_result
+
+        grounding_metadata = self._process_grounding_metadata(raw_grounding_metadata)
+
+        gcs_base_path = f"{procurement_id}/{analysis_id}"
+
+        document_hash = analysis_record.document_hash if analysis_record else None
+
+        final_result = AnalysisResult(
+            procurement_control_number=control_number,
+            version_number=version_number,
+            ai_analysis=ai_analysis,
+            document_hash=document_hash,
+            original_documents_gcs_path=gcs_base_path,
+            processed_documents_gcs_path=None,
+            analysis_prompt=ANALYSIS_INSTRUCTIONS + prompt,
+            grounding_metadata=grounding_metadata,
+            thoughts=thoughts,
+        )
+
+        exts = [rec.get("extension") for rec in included_records]
+        modality = self._get_modality_from_exts(exts)
+
+        search_queries_count = len(grounding_metadata.search_queries)
+        (
+            input_cost,
+            output_cost,
+            thinking_cost,
+            search_cost,
+            total_cost,
+        ) = self.pricing_service.calculate_total_cost(
+            input_tokens,
+            output_tokens,
+            thinking_tokens,
+            modality=modality,
+            search_queries_count=search_queries_count,
+            cached_input_tokens=cached_input_tokens,
+        )
+        self.analysis_repo.save_analysis(
+            analysis_id=analysis_id,
+            result=final_result,
+            input_tokens=input_tokens,
+            cached_input_tokens=cached_input_tokens,
+            output_tokens=output_tokens,
+            thinking_tokens=thinking_tokens,
+            input_cost=input_cost,
+            output_cost=output_cost,
+            thinking_cost=thinking_cost,
+            search_cost=search_cost,
+            total_cost=total_cost,
+            search_queries_used=search_queries_count,
+        )
+
+        self.budget_ledger_repo.save_expense(
+            analysis_id,
+            total_cost,
+            f"Análise da licitação {procurement.pncp_control_number} (v{version_number}).",
+        )
+
+        self.logger.info(f"Successfully completed analysis for {control_number}.")
+
     def _prepare_ai_candidates(self, all_files: list[ProcessedFile]) -> list[AIFileCandidate]:
         """Prepares a list of AIFileCandidate objects from raw file data.
 
+        Files are identified by the SHA-256 of their content. A file whose
+        content was already prepared earlier in the same run, or is found in
+        the content store under the same extension, reuses that preparation
+        instead of being converted again. The remaining files are converted
+        in parallel by the conversion executor, within each backend's limit.
+
         Args:
             all_files: A list of `ProcessedFile` objects from the repository.
 
         Returns:
-            A list of AIFileCandidate objects.
+            A list of AIFileCandidate objects, in the order of `all_files`.
         """
-        candidates = []
-        for processed_file in all_files:
-            candidate = AIFileCandidate(
-                synthetic_id=processed_file.source_document_id,
-                raw_document_metadata=processed_file.raw_document_metadata,
-                original_path=processed_file.relative_path,
-                original_content=processed_file.content,
-                extraction_failed=processed_file.extraction_failed,
-            )
+        content_hashes = [hashlib.sha256(processed_file.content).hexdigest() for processed_file in all_files]
+        stored_contents = self.file_content_repo.get_file_contents(content_hashes) if self.file_content_repo else {}
+        candidates: dict[int, AIFileCandidate] = {}
+        first_indexes: dict[str, int] = {}
+        duplicate_of: dict[int, int] = {}
+        to_prepare: list[int] = []
+        for index, (processed_file, content_hash) in enumerate(zip(all_files, content_hashes)):
             ext = os.path.splitext(processed_file.relative_path)[1].lower()
+            stored_content = stored_contents.get(content_hash)
+            first_index = first_indexes.get(content_hash)
+            if self._get_flagged_exclusion(processed_file):
+                to_prepare.append(index)
+            elif stored_content and stored_content.extension == ext:
+                candidates[index] = self._reuse_stored_content(processed_file, stored_content)
+                candidates[index].content_hash = content_hash
+            elif first_index is not None and os.path.splitext(all_files[first_index].relative_path)[1].lower() == ext:
+                duplicate_of[index] = first_index
+            else:
+                to_prepare.append(index)
+                if not stored_content and first_index is None:
+                    first_indexes[content_hash] = index
+
+        tasks = []
+        for index in to_prepare:
+            processed_file = all_files[index]
+            backend = None
+            if not self._get_flagged_exclusion(processed_file):
+                backend = self._get_conversion_backend(os.path.splitext(processed_file.relative_path)[1].lower())
+            tasks.append((backend, partial(self._prepare_ai_candidate, processed_file)))
+        prepared = self.conversion_executor.run(tasks)
+        candidates.update(zip(to_prepare, prepared))
+        for content_hash, index in first_indexes.items():
+            candidates[index].content_hash = content_hash
+        for index, first_index in duplicate_of.items():
+            candidates[index] = self._reuse_prepared_candidate(all_files[index], candidates[first_index])
+        return [candidates[index] for index in range(len(all_files))]
+
+    def _get_conversion_backend(self, ext: str) -> ConversionBackend | None:
+        """Returns the backend a file's conversion is expected to run on.
+
+        Files with an unknown extension are expected to go to LibreOffice,
+        the first fallback tried once their type is inferred.
 
-            if os.path.basename(candidate.original_path).startswith("~$"):
-                candidate.exclusion_reason = ExclusionReason.LOCK_FILE
-                candidates.append(candidate)
-                continue
+        Args:
+            ext: The lowercase extension of the file, with its leading dot.
 
-            if processed_file.extraction_failed:
-                candidate.exclusion_reason = ExclusionReason.EXTRACTION_FAILED
-                candidates.append(candidate)
-                continue
+        Returns:
+            The backend, or `None` if the file is not converted or is
+            converted in process.
+        """
+        if self.file_type_provider.get_file_type(ext) == SPECIALIZED_IMAGE:
+            return ConversionBackend.IMAGEMAGICK
+        if ext == ".gif":
+            return ConversionBackend.IMAGEIO
+        if ext not in self._SUPPORTED_EXTENSIONS or self.converter_service.is_supported_for_conversion(ext):
+            return ConversionBackend.LIBREOFFICE
+        return None
 
-            if self.file_type_provider.get_file_type(ext) == SPECIALIZED_IMAGE:
-                try:
+    def _get_flagged_exclusion(self, processed_file: ProcessedFile) -> ExclusionReason | None:
+        """Returns why a file must be excluded regardless of its content.
+
+        Args:
+            processed_file: The file as returned by the repository.
+
+        Returns:
+            The exclusion reason, or `None` if the file can be prepared.
+        """
+        if os.path.basename(processed_file.relative_path).startswith("~$"):
+            return ExclusionReason.LOCK_FILE
+        if processed_file.size_limit_exceeded:
+            return ExclusionReason.FILE_TOO_LARGE
+        if processed_file.extraction_limit_exceeded:
+            return ExclusionReason.EXTRACTION_LIMIT_EXCEEDED
+        if processed_file.extraction_failed:
+            return ExclusionReason.EXTRACTION_FAILED
+        return None
+
+    def _reuse_stored_content(self, processed_file: ProcessedFile, stored_content: FileContent) -> AIFileCandidate:
+        """Builds a candidate from a content already prepared by an earlier run.
+
+        Nothing is converted or uploaded again: the candidate points to the
+        stored GCS objects, and its tokens are counted through the token
+        count cache, keyed by the hash of its prepared content. The prepared
+        content is only kept in GCS, so a candidate whose content was
+        converted has no `ai_content` and is identified by its
+        `ai_content_hash` instead.
+
+        Args:
+            processed_file: The file as returned by the repository.
+            stored_content: The stored content with the same hash and extension.
+
+        Returns:
+            The candidate for the file.
+        """
+        stem, original_ext = os.path.splitext(processed_file.relative_path)
+        candidate = AIFileCandidate(
+            synthetic_id=processed_file.source_document_id,
+            raw_document_metadata=processed_file.raw_document_metadata,
+            original_path=processed_file.relative_path,
+            original_content=processed_file.content,
+            inferred_extension=stored_content.inferred_extension,
+            used_fallback_conversion=stored_content.used_fallback_conversion,
+            estimated_tokens=stored_content.estimated_tokens,
+            ai_content_hash=stored_content.ai_content_hash or "",
+            stored_content=stored_content,
+        )
+        if stored_content.prepared_content_gcs_uris:
+            prepared_ext = os.path.splitext(stored_content.prepared_content_gcs_uris[0])[1]
+            candidate.ai_path = f"{stem}{prepared_ext}"
+            candidate.ai_content = b""
+            candidate.prepared_content_gcs_uris = list(stored_content.prepared_content_gcs_uris)
+            candidate.ai_gcs_uris = list(stored_content.prepared_content_gcs_uris)
+        else:
+            bucket_name = self.config.GCP_GCS_BUCKET_PROCUREMENTS
+            candidate.ai_path = f"{stem}{stored_content.inferred_extension or original_ext}"
+            candidate.ai_gcs_uris = [f"gs://{bucket_name}/{stored_content.original_gcs_path}"]
+        return candidate
+
+    def _reuse_prepared_candidate(
+        self, processed_file: ProcessedFile, previous_candidate: AIFileCandidate
+    ) -> AIFileCandidate:
+        """Builds a candidate from an identical file prepared earlier in the same run.
+
+        Args:
+            processed_file: The file as returned by the repository.
+            previous_candidate: The candidate of the first file with the same
+                content and extension.
+
+        Returns:
+            The candidate for the file, sharing the previous conversion.
+        """
+        ai_path = processed_file.relative_path
+        if previous_candidate.ai_path != previous_candidate.original_path:
+            stem = os.path.splitext(processed_file.relative_path)[0]
+            ai_path = f"{stem}{os.path.splitext(previous_candidate.ai_path)[1]}"
+        return previous_candidate.model_copy(
+            update={
+                "synthetic_id": processed_file.source_document_id,
+                "raw_document_metadata": processed_file.raw_document_metadata,
+                "original_path": processed_file.relative_path,
+                "ai_path": ai_path,
+                "prepared_content_gcs_uris": [ai_path] if previous_candidate.prepared_content_gcs_uris else None,
+                "ai_gcs_uris": [],
+                "exclusion_reason_args": dict(previous_candidate.exclusion_reason_args),
+            }
+        )
+
+    def _prepare_ai_candidate(self, processed_file: ProcessedFile) -> AIFileCandidate:
+        """Prepares the candidate of a single file, converting and normalizing it.
+
+        Images sent to the AI model, whether converted or not, are downscaled
+        to the configured maximum dimension. The content finally sent to the
+        model is hashed, keying its entry in the token count cache.
+
+        Args:
+            processed_file: The file as returned by the repository.
+
+        Returns:
+            The candidate for the file, with its exclusion reason set if it
+            cannot be sent to the AI model.
+        """
+        candidate = self._convert_ai_candidate(processed_file)
+        ai_ext = os.path.splitext(candidate.ai_path)[1].lower()
+        if (
+            not candidate.exclusion_reason
+            and ai_ext in self._NORMALIZED_IMAGE_EXTENSIONS
+            and isinstance(candidate.ai_content, bytes)
+        ):
+            normalized_content = self.converter_service.normalize_image(
+                candidate.ai_content, processed_file.relative_path
+            )
+            if normalized_content != candidate.ai_content:
+                candidate.ai_content = normalized_content
+                candidate.prepared_content_gcs_uris = [candidate.ai_path]
+        if not candidate.exclusion_reason and isinstance(candidate.ai_content, bytes):
+            candidate.ai_content_hash = hashlib.sha256(candidate.ai_content).hexdigest()
+        return candidate
+
+    def _convert_ai_candidate(self, processed_file: ProcessedFile) -> AIFileCandidate:
+        """Builds the candidate of a single file, converting it if needed.
+
+        Args:
+            processed_file: The file as returned by the repository.
+
+        Returns:
+            The candidate for the file, with its exclusion reason set if it
+            cannot be sent to the AI model.
+        """
+        candidate = AIFileCandidate(
+            synthetic_id=processed_file.source_document_id,
+            raw_document_metadata=processed_file.raw_document_metadata,
+            original_path=processed_file.relative_path,
+            original_content=processed_file.content,
+            extraction_failed=processed_file.extraction_failed,
+        )
+        ext = os.path.splitext(processed_file.relative_path)[1].lower()
+
+        flagged_exclusion = self._get_flagged_exclusion(processed_file)
+        if flagged_exclusion:
+            candidate.exclusion_reason = flagged_exclusion
+            return candidate
+
+        if self.file_type_provider.get_file_type(ext) == SPECIALIZED_IMAGE:
+            try:
+                with self.conversion_executor.limit(ConversionBackend.IMAGEMAGICK):
                     converted_content = self.image_converter_provider.to_png(processed_file.content, ext)
+                candidate.ai_content = converted_content
+                candidate.ai_path = f"{os.path.splitext(processed_file.relative_path)[0]}.png"
+                candidate.prepared_content_gcs_uris = [candidate.ai_path]
+            except Exception as e:
+                self.logger.error(
+                    f"Failed to process specialized image {processed_file.relative_path}: {e}", exc_info=True
+                )
+                candidate.exclusion_reason = ExclusionReason.CONVERSION_FAILED
+            return candidate
+
+        if ext not in self._SUPPORTED_EXTENSIONS:
+            inferred_ext = self.file_type_provider.infer_extension(
+                processed_file.content, processed_file.archive_format
+            )
+            candidate.inferred_extension = inferred_ext
+
+            if inferred_ext and self.converter_service.is_supported_for_conversion(inferred_ext):
+                try:
+                    self.logger.info(
+                        f"Attempting fallback conversion to PDF for {processed_file.relative_path} "
+                        f"(inferred type: {inferred_ext})"
+                    )
+                    with self.conversion_executor.limit(ConversionBackend.LIBREOFFICE):
+                        converted_content = self.converter_service.convert_to_pdf(processed_file.content, inferred_ext)
                     candidate.ai_content = converted_content
-                    candidate.ai_path = f"{os.path.splitext(processed_file.relative_path)[0]}.png"
+                    candidate.ai_path = f"{os.path.splitext(processed_file.relative_path)[0]}.pdf"
                     candidate.prepared_content_gcs_uris = [candidate.ai_path]
+                    candidate.used_fallback_conversion = True
                 except Exception as e:
-                    self.logger.error(
-                        f"Failed to process specialized image {processed_file.relative_path}: {e}", exc_info=True
+                    self.logger.warning(
+                        f"Fallback conversion to PDF failed for {processed_file.relative_path}. "
+                        f"Attempting secondary fallback to PNG with ImageMagick. Error: {e}",
                     )
-                    candidate.exclusion_reason = ExclusionReason.CONVERSION_FAILED
-                candidates.append(candidate)
-                continue
-
-            if ext not in self._SUPPORTED_EXTENSIONS:
-                inferred_ext = self.file_type_provider.infer_extension(processed_file.content)
-                candidate.inferred_extension = inferred_ext
-
-                if inferred_ext and self.converter_service.is_supported_for_conversion(inferred_ext):
                     try:
-                        self.logger.info(
-                            f"Attempting fallback conversion to PDF for {processed_file.relative_path} "
-                            f"(inferred type: {inferred_ext})"
-                        )
-                        converted_content = self.converter_service.convert_to_pdf(processed_file.content, inferred_ext)
+                        with self.conversion_executor.limit(ConversionBackend.IMAGEMAGICK):
+                            converted_content = self.image_converter_provider.to_png(
+                                processed_file.content, inferred_ext
+                            )
                         candidate.ai_content = converted_content
-                        candidate.ai_path = f"{os.path.splitext(processed_file.relative_path)[0]}.pdf"
+                        candidate.ai_path = f"{os.path.splitext(processed_file.relative_path)[0]}.png"
                         candidate.prepared_content_gcs_uris = [candidate.ai_path]
                         candidate.used_fallback_conversion = True
-                    except Exception as e:
+                    except Exception as e2:
                         self.logger.warning(
-                            f"Fallback conversion to PDF failed for {processed_file.relative_path}. "
-                            f"Attempting secondary fallback to PNG with ImageMagick. Error: {e}",
+                            f"Secondary fallback conversion to PNG also failed for "
+                            f"{processed_file.relative_path}. Error: {e2}",
+                            exc_info=True,
                         )
-                        try:
-                            converted_content = self.image_converter_provider.to_png(
-                                processed_file.content, inferred_ext
-                            )
-                            candidate.ai_content = converted_content
-                            candidate.ai_path = f"{os.path.splitext(processed_file.relative_path)[0]}.png"
-                            candidate.prepared_content_gcs_uris = [candidate.ai_path]
-                            candidate.used_fallback_conversion = True
-                        except Exception as e2:
-                            self.logger.warning(
-                                f"Secondary fallback conversion to PNG also failed for "
-                                f"{processed_file.relative_path}. Error: {e2}",
-                                exc_info=True,
-                            )
-                            candidate.exclusion_reason = ExclusionReason.CONVERSION_FAILED
-                    candidates.append(candidate)
-                    continue
-                elif inferred_ext in self._SUPPORTED_EXTENSIONS:
-                    ext = inferred_ext
-                    candidate.ai_path = f"{os.path.splitext(processed_file.relative_path)[0]}{inferred_ext}"
-                else:
-                    candidate.exclusion_reason = ExclusionReason.UNSUPPORTED_EXTENSION
-                    candidates.append(candidate)
-                    continue
+                        candidate.exclusion_reason = ExclusionReason.CONVERSION_FAILED
+                return candidate
+            elif inferred_ext in self._SUPPORTED_EXTENSIONS:
+                ext = inferred_ext
+                candidate.ai_path = f"{os.path.splitext(processed_file.relative_path)[0]}{inferred_ext}"
+            else:
+                candidate.exclusion_reason = ExclusionReason.UNSUPPORTED_EXTENSION
+                return candidate
 
-            try:
+        try:
+            with self.conversion_executor.limit(self._get_conversion_backend(ext)):
                 if ext == ".docx":
                     converted_content = self.converter_service.docx_to_pdf(processed_file.content)
                     candidate.ai_content = converted_content
@@ -564,7 +1090,9 @@ class AnalysisService:
                     candidate.ai_path = f"{os.path.splitext(processed_file.relative_path)[0]}.png"
                     candidate.prepared_content_gcs_uris = [candidate.ai_path]
                 elif ext == ".gif":
-                    converted_content = self.converter_service.gif_to_mp4(processed_file.content)
+                    converted_content = self.converter_service.gif_to_mp4(
+                        processed_file.content, processed_file.relative_path
+                    )
                     candidate.ai_content = converted_content
                     candidate.ai_path = f"{os.path.splitext(processed_file.relative_path)[0]}.mp4"
                     candidate.prepared_content_gcs_uris = [candidate.ai_path]
@@ -593,12 +1121,11 @@ class AnalysisService:
                     if not candidate.prepared_content_gcs_uris:
                         candidate.prepared_content_gcs_uris = [candidate.ai_path]
 
-            except Exception as e:
-                self.logger.error(f"Failed to process file {processed_file.relative_path}: {e}", exc_info=True)
-                candidate.exclusion_reason = ExclusionReason.CONVERSION_FAILED
+        except Exception as e:
+            self.logger.error(f"Failed to process file {processed_file.relative_path}: {e}", exc_info=True)
+            candidate.exclusion_reason = ExclusionReason.CONVERSION_FAILED
 
-            candidates.append(candidate)
-        return candidates
+        return candidate
 
     def _select_files_by_token_limit(
         self,
@@ -614,27 +1141,149 @@ class AnalysisService:
         Returns:
             The list of candidates with updated inclusion status and warnings.
         """
+        selected_candidates, _ = self._select_files_and_count_tokens(candidates, procurement)
+        return selected_candidates
+
+    def _select_files_and_count_tokens(
+        self,
+        candidates: list[AIFileCandidate],
+        procurement: Procurement,
+    ) -> tuple[list[AIFileCandidate], int]:
+        """Selects the files that fit the token limit and counts the final request.
+
+        The prompt and each file are counted once, files already in the
+        token count cache for the configured model are not sent to be
+        counted, and the greedy fit adds the counts up locally. The final prompt is then counted once with the selected
+        files; should that exact count still exceed the limit, the selected
+        files with the lowest priority are dropped until it fits.
+
+        Args:
+            candidates: A list of AIFileCandidate objects to select from.
+            procurement: The procurement being analyzed.
+
+        Returns:
+            The list of candidates with updated inclusion status and warnings,
+            and the input tokens of the final request.
+        """
         candidates.sort(key=self._get_priority)
         max_tokens = self.config.GCP_GEMINI_MAX_INPUT_TOKENS
 
         base_prompt_text = self._build_analysis_prompt(procurement, candidates)
+        current_tokens = self.token_counter.count_prompt(base_prompt_text)
         files_for_ai_uris: list[str] = []
+        included_candidates: list[AIFileCandidate] = []
+        self.token_counter.register_contents(
+            {
+                candidate.ai_gcs_uris[0]: candidate.ai_content_hash
+                for candidate in candidates
+                if candidate.ai_content_hash and len(candidate.ai_gcs_uris) == 1
+            }
+        )
         for candidate in candidates:
             if candidate.exclusion_reason:
                 continue
 
-            uris_to_test = files_for_ai_uris + candidate.ai_gcs_uris
-            tokens, _, _ = self.ai_provider.count_tokens_for_analysis(base_prompt_text, uris_to_test)
+            new_uris = [uri for uri in candidate.ai_gcs_uris if uri not in files_for_ai_uris]
+            file_tokens = self.token_counter.count_files(new_uris)
+            if new_uris == candidate.ai_gcs_uris:
+                candidate.token_count = file_tokens
 
-            if tokens <= max_tokens:
-                files_for_ai_uris.extend(candidate.ai_gcs_uris)
+            if current_tokens + file_tokens <= max_tokens:
+                files_for_ai_uris.extend(new_uris)
+                included_candidates.append(candidate)
                 candidate.is_included = True
+                current_tokens += file_tokens
             else:
-                candidate.exclusion_reason = ExclusionReason.TOKEN_LIMIT_EXCEEDED
-                candidate.applied_token_limit = max_tokens
-                candidate.exclusion_reason_args = {"max_tokens": max_tokens}
+                self._exclude_for_token_limit(candidate, max_tokens)
 
-        return candidates
+        while True:
+            prompt = self._build_analysis_prompt(procurement, candidates)
+            uris = list(dict.fromkeys(uri for c in included_candidates for uri in c.ai_gcs_uris))
+            input_tokens = self.token_counter.count_request(prompt, uris)
+            if input_tokens <= max_tokens or not included_candidates:
+                return candidates, input_tokens
+            self.logger.warning(
+                f"Selected files use {input_tokens} tokens, above the {max_tokens} limit; "
+                f"dropping {included_candidates[-1].original_path}."
+            )
+            self._exclude_for_token_limit(included_candidates.pop(), max_tokens)
+
+    def _select_files_and_estimate_tokens(
+        self,
+        candidates: list[AIFileCandidate],
+        procurement: Procurement,
+    ) -> tuple[list[AIFileCandidate], int]:
+        """Selects the files that fit the token limit from local estimates.
+
+        No call is made to the AI model: the prompt and the files are
+        estimated locally, and the calibrated estimates are checked against
+        the limit.
+
+        Args:
+            candidates: A list of AIFileCandidate objects to select from.
+            procurement: The procurement being analyzed.
+
+        Returns:
+            The list of candidates with updated inclusion status and warnings,
+            and the uncalibrated estimate of the final request.
+        """
+        candidates.sort(key=self._get_priority)
+        max_tokens = self.config.GCP_GEMINI_MAX_INPUT_TOKENS
+        calibration_factor = self.token_estimator.get_calibration_factor()
+
+        estimated_tokens = self.token_estimator.estimate_prompt(self._build_analysis_prompt(procurement, candidates))
+        files_for_ai_uris: set[str] = set()
+        for candidate in candidates:
+            if candidate.exclusion_reason:
+                continue
+
+            file_tokens = 0
+            if not candidate.ai_gcs_uris or not files_for_ai_uris.issuperset(candidate.ai_gcs_uris):
+                file_tokens = self.token_estimator.estimate_candidate(candidate)
+            if (estimated_tokens + file_tokens) * calibration_factor <= max_tokens:
+                files_for_ai_uris.update(candidate.ai_gcs_uris)
+                candidate.is_included = True
+                estimated_tokens += file_tokens
+            else:
+                self._exclude_for_token_limit(candidate, max_tokens)
+
+        prompt = self._build_analysis_prompt(procurement, candidates)
+        return candidates, self._estimate_input_tokens(prompt, candidates)
+
+    def _estimate_input_tokens(self, prompt: str, candidates: list[AIFileCandidate]) -> int:
+        """Estimates the input tokens of a prompt sent with the included files.
+
+        Files sharing the same GCS objects are only estimated once.
+
+        Args:
+            prompt: The prompt text.
+            candidates: The candidates, of which only the included ones count.
+
+        Returns:
+            The uncalibrated estimate of the request.
+        """
+        estimated_tokens = self.token_estimator.estimate_prompt(prompt)
+        estimated_uris: set[str] = set()
+        for candidate in candidates:
+            if not candidate.is_included:
+                continue
+            if candidate.ai_gcs_uris and estimated_uris.issuperset(candidate.ai_gcs_uris):
+                continue
+            estimated_uris.update(candidate.ai_gcs_uris)
+            estimated_tokens += self.token_estimator.estimate_candidate(candidate)
+        return int(estimated_tokens)
+
+    def _exclude_for_token_limit(self, candidate: AIFileCandidate, max_tokens: int) -> None:
+        """Marks a candidate as excluded for not fitting the token limit.
+
+        Args:
+            candidate: The candidate to exclude.
+            max_tokens: The token limit it did not fit.
+        """
+        candidate.is_included = False
+        candidate.exclusion_reason = ExclusionReason.TOKEN_LIMIT_EXCEEDED
+        candidate.applied_token_limit = max_tokens
+        candidate.exclusion_reason_args = {"max_tokens": max_tokens}
 
     def _process_and_save_source_documents(
         self,
@@ -692,6 +1341,9 @@ class AnalysisService:
         This method uploads both original and prepared files, populates the
         candidate objects with real GCS URIs, and saves the initial file
         record to the database with `included_in_analysis` set to False.
+        When the content store is available, files that can be analyzed are
+        uploaded once per content instead of once per analysis, and each file
+        record adds a reference to its content.
 
         Args:
             procurement: The procurement object.
@@ -700,36 +1352,51 @@ class AnalysisService:
             candidates: A list of AIFileCandidate objects to upload and save.
             source_docs_map: A map of synthetic source IDs to database UUIDs.
         """
-        bucket_name = self.config.GCP_GCS_BUCKET_PROCUREMENTS
-        for candidate in candidates:
-            source_document_db_id = source_docs_map[candidate.synthetic_id]
-            ibge_code = procurement.entity_unit.ibge_code
-            standard_path = f"{ibge_code}/{procurement_id}/{analysis_id}/{source_document_db_id}"
-            base_gcs_path = f"{self.gcs_path_prefix}/{standard_path}" if self.gcs_path_prefix else standard_path
-            original_gcs_path = f"{base_gcs_path}/{os.path.basename(candidate.original_path)}"
-
-            self.gcs_provider.upload_file(
-                bucket_name=bucket_name,
-                destination_blob_name=original_gcs_path,
-                content=candidate.original_content,
-                content_type="application/octet-stream",
-            )
+        bucket_name = self.config.GCP_GCS_BUCKET_PROCUREMENTS
+        stored_contents: dict[str, FileContent] = {}
+        for candidate in candidates:
+            source_document_db_id = source_docs_map[candidate.synthetic_id]
+            content_hash = None
+            if self.file_content_repo and candidate.content_hash and not candidate.exclusion_reason:
+                content_hash = candidate.content_hash
+                stored_content = candidate.stored_content or stored_contents.get(content_hash)
+                if not stored_content:
+                    stored_content = self._upload_file_content(candidate)
+                    self.file_content_repo.save_file_content(stored_content)
+                stored_contents[content_hash] = stored_content
+                original_gcs_path = stored_content.original_gcs_path
+                if stored_content.prepared_content_gcs_uris:
+                    candidate.ai_gcs_uris = list(stored_content.prepared_content_gcs_uris)
+                    candidate.prepared_content_gcs_uris = list(stored_content.prepared_content_gcs_uris)
+                else:
+                    candidate.ai_gcs_uris = [f"gs://{bucket_name}/{original_gcs_path}"]
+            else:
+                ibge_code = procurement.entity_unit.ibge_code
+                standard_path = f"{ibge_code}/{procurement_id}/{analysis_id}/{source_document_db_id}"
+                base_gcs_path = f"{self.gcs_path_prefix}/{standard_path}" if self.gcs_path_prefix else standard_path
+                original_gcs_path = f"{base_gcs_path}/{os.path.basename(candidate.original_path)}"
 
-            final_converted_uris = []
-            if candidate.prepared_content_gcs_uris:
-                prepared_gcs_path = f"{base_gcs_path}/prepared_content/{os.path.basename(candidate.ai_path)}"
                 self.gcs_provider.upload_file(
                     bucket_name=bucket_name,
-                    destination_blob_name=prepared_gcs_path,
-                    content=candidate.ai_content,
+                    destination_blob_name=original_gcs_path,
+                    content=candidate.original_content,
                     content_type="application/octet-stream",
                 )
-                final_converted_uris = [f"gs://{bucket_name}/{prepared_gcs_path}"]
 
-                candidate.ai_gcs_uris = final_converted_uris
-                candidate.prepared_content_gcs_uris = final_converted_uris
-            else:
-                candidate.ai_gcs_uris = [f"gs://{bucket_name}/{original_gcs_path}"]
+                if candidate.prepared_content_gcs_uris:
+                    prepared_gcs_path = f"{base_gcs_path}/prepared_content/{os.path.basename(candidate.ai_path)}"
+                    self.gcs_provider.upload_file(
+                        bucket_name=bucket_name,
+                        destination_blob_name=prepared_gcs_path,
+                        content=candidate.ai_content,
+                        content_type="application/octet-stream",
+                    )
+                    final_converted_uris = [f"gs://{bucket_name}/{prepared_gcs_path}"]
+
+                    candidate.ai_gcs_uris = final_converted_uris
+                    candidate.prepared_content_gcs_uris = final_converted_uris
+                else:
+                    candidate.ai_gcs_uris = [f"gs://{bucket_name}/{original_gcs_path}"]
 
             prioritization_logic, prioritization_keyword = self._get_prioritization_logic(candidate)
             file_record = NewFileRecord(
@@ -747,8 +1414,100 @@ class AnalysisService:
                 prepared_content_gcs_uris=candidate.prepared_content_gcs_uris,
                 inferred_extension=candidate.inferred_extension,
                 used_fallback_conversion=candidate.used_fallback_conversion,
+                content_hash=content_hash,
+                ai_content_hash=candidate.ai_content_hash or None,
             )
             candidate.file_record_id = self.file_record_repo.save_file_record(file_record)
+            if self.file_content_repo and content_hash:
+                self.file_content_repo.add_reference(content_hash)
+
+    def _upload_file_content(self, candidate: AIFileCandidate) -> FileContent:
+        """Uploads a file to the content-addressed area of the bucket.
+
+        The objects are named after the content hash instead of the analysis,
+        so every procurement sharing the same file points to the same objects.
+        The content is estimated while it is still held locally, and the
+        estimate is stored with it for the candidates that reuse it later.
+
+        Args:
+            candidate: The first candidate found with this content.
+
+        Returns:
+            The content record describing the uploaded objects.
+        """
+        bucket_name = self.config.GCP_GCS_BUCKET_PROCUREMENTS
+        content_path = f"contents/{candidate.content_hash}"
+        base_gcs_path = f"{self.gcs_path_prefix}/{content_path}" if self.gcs_path_prefix else content_path
+        extension = os.path.splitext(candidate.original_path)[1].lower()
+        original_gcs_path = f"{base_gcs_path}/original{extension}"
+        self.gcs_provider.upload_file(
+            bucket_name=bucket_name,
+            destination_blob_name=original_gcs_path,
+            content=candidate.original_content,
+            content_type="application/octet-stream",
+        )
+
+        prepared_content_gcs_uris = None
+        if candidate.prepared_content_gcs_uris:
+            prepared_gcs_path = f"{base_gcs_path}/prepared{os.path.splitext(candidate.ai_path)[1].lower()}"
+            self.gcs_provider.upload_file(
+                bucket_name=bucket_name,
+                destination_blob_name=prepared_gcs_path,
+                content=candidate.ai_content,
+                content_type="application/octet-stream",
+            )
+            prepared_content_gcs_uris = [f"gs://{bucket_name}/{prepared_gcs_path}"]
+
+        candidate.estimated_tokens = self.token_estimator.estimate_candidate(candidate)
+        return FileContent(
+            content_hash=candidate.content_hash,
+            extension=extension,
+            size_bytes=len(candidate.original_content),
+            original_gcs_path=original_gcs_path,
+            prepared_content_gcs_uris=prepared_content_gcs_uris,
+            inferred_extension=candidate.inferred_extension,
+            used_fallback_conversion=candidate.used_fallback_conversion,
+            ai_content_hash=candidate.ai_content_hash or None,
+            estimated_tokens=candidate.estimated_tokens,
+        )
+
+    def _estimate_stored_contents(self, candidates: list[AIFileCandidate]) -> None:
+        """Gives the candidates reusing a stored content their token estimate.
+
+        Contents stored before their estimate was saved are estimated once,
+        from the prepared content downloaded from GCS when they were
+        converted, and the estimate is saved for later runs.
+
+        Args:
+            candidates: The candidates of the analysis.
+        """
+        estimated_tokens: dict[str, int] = {}
+        for candidate in candidates:
+            if candidate.exclusion_reason or candidate.stored_content is None or candidate.estimated_tokens is not None:
+                continue
+            if candidate.content_hash not in estimated_tokens:
+                if candidate.prepared_content_gcs_uris:
+                    estimated_tokens[candidate.content_hash] = sum(
+                        self.token_estimator.estimate_file(uri, self._download_gcs_uri(uri))
+                        for uri in candidate.prepared_content_gcs_uris
+                    )
+                else:
+                    estimated_tokens[candidate.content_hash] = self.token_estimator.estimate_candidate(candidate)
+            candidate.estimated_tokens = estimated_tokens[candidate.content_hash]
+        if self.file_content_repo and estimated_tokens:
+            self.file_content_repo.save_estimated_tokens(estimated_tokens)
+
+    def _download_gcs_uri(self, uri: str) -> bytes:
+        """Downloads an object given by its GCS URI.
+
+        Args:
+            uri: The URI of the object, as `gs://bucket/object`.
+
+        Returns:
+            The content of the object.
+        """
+        bucket_name, _, blob_name = uri.removeprefix("gs://").partition("/")
+        return cast(bytes, self.gcs_provider.download_file(bucket_name, blob_name))
 
     def _get_priority(self, candidate: AIFileCandidate) -> int:
         """Determines the priority of a file based on its metadata and name.
@@ -795,7 +1554,11 @@ class AnalysisService:
         procurement: Procurement,
         candidates: list[AIFileCandidate],
     ) -> str:
-        """Constructs the prompt for the AI, including contextual warnings.
+        """Constructs the full prompt of an analysis, as the AI model reads it.
+
+        The analysis request sends the instructions apart from the
+        procurement context, so they can be cached; this text joins both and
+        is the one counted, estimated and stored with the analysis.
 
         Args:
             procurement: The procurement to build the prompt for.
@@ -804,6 +1567,22 @@ class AnalysisService:
         Returns:
             The prompt for the AI.
         """
+        return ANALYSIS_INSTRUCTIONS + self._build_procurement_context(procurement, candidates)
+
+    def _build_procurement_context(
+        self,
+        procurement: Procurement,
+        candidates: list[AIFileCandidate],
+    ) -> str:
+        """Constructs the procurement part of the prompt, including contextual warnings.
+
+        Args:
+            procurement: The procurement to build the prompt for.
+            candidates: The list of file candidates for the analysis.
+
+        Returns:
+            The summary of the procurement and the context of its documents.
+        """
         procurement_summary = {
             "Objeto": procurement.object_description,
             "Modalidade": procurement.modality,
@@ -876,15 +1655,6 @@ class AnalysisService:
             document_context_section = "\n\n---\n\n".join(document_context_parts)
 
         return f"""
-        Você é um Auditor de Controle Externo do Tribunal de Contas da União (TCU), especializado em análise forense de licitações públicas no Brasil, atuando sob a égide da Lei 14.133/2021 e da jurisprudência consolidada.
-
-        --- PRINCÍPIOS ORIENTADORES (RIGOR E CETICISMO) ---
-        1. **Ceticismo Profissional:** Assuma uma postura neutra e investigativa. O ônus da prova da irregularidade é seu.
-        2. **Materialidade e Relevância:** Concentre-se em achados que tenham impacto financeiro significativo ou que violem princípios legais fundamentais.
-        3. **Verificação de Fatos:** Toda informação externa utilizada (preços, notícias, dados de empresas) deve vir de fontes confiáveis e verificáveis. Priorize dados governamentais oficiais.
-        4. **Restrição Negativa (Anti-Falso Positivo):** Se a evidência for ambígua, fraca ou a pesquisa de mercado for inconclusiva, NÃO reporte a irregularidade. Prefira errar por omissão do que acusar sem provas robustas.
-        --- FIM DOS PRINCÍPIOS ---
-
         Revise os metadados e os documentos anexos para realizar a auditoria.
 
         --- SUMÁRIO DA LICITAÇÃO (Contexto) ---
@@ -895,101 +1665,7 @@ class AnalysisService:
         --- CONTEXTO DOS DOCUMENTOS ANEXADOS ---
         {document_context_section}
         --- FIM DO CONTEXTO ---
-
-        ### PROTOCOLO DE ANÁLISE OBRIGATÓRIO (Chain-of-Thought)
-
-        1. **Análise da Fase Interna e Competitividade:** Examine a conformidade do Termo de Referência/Edital, buscando direcionamentos (marca sem justificativa técnica) ou restrições indevidas à competitividade.
-        2. **Análise da Pesquisa de Preços do Órgão:** Avalie a metodologia utilizada pelo órgão. Eles seguiram a hierarquia legal? A pesquisa foi ampla? Há indícios de simulação ou cotações viciadas?
-        3. **Auditoria de Economicidade (Verificação de Sobrepreço):** Etapa crítica. Utilize as ferramentas de busca (ex: Google Search) seguindo a metodologia abaixo. Inicie as buscas obrigatoriamente por termos como: "Painel de Preços [Objeto]", "Licitação Homologada [Objeto]", "Ata de Registro de Preços [Objeto]".
-
-        ---
-        #### METODOLOGIA DE ANÁLISE DE PREÇOS (OBRIGATÓRIA)
-
-        Ao analisar Sobrepreço ou Superfaturamento, siga esta hierarquia e aplique as regras de validação:
-
-        **I. HIERARQUIA DE FONTES (Siga a ordem estritamente):**
-            A. **Fontes Públicas Oficiais:** Painel de Preços (Gov.br), Bancos de Preços Estaduais/Municipais (ex: BEC/SP), Contratações similares recentes no PNCP, Atas de Registro de Preço (ARP) vigentes.
-            B. **Tabelas Indexadas:** SINAPI (obras), SIGTAP/BPS (saúde), ou outras tabelas setoriais oficiais.
-            C. **Fontes B2B (Atacado/Distribuidores):** Sites de atacado ou distribuidores que vendem para empresas/governo.
-            D. **Fontes B2C (Varejo/E-commerce) - USO EXCEPCIONAL:** Utilize APENAS se as fontes A-C forem exauridas.
-
-        **II. REGRAS DE VALIDAÇÃO E CONTEXTUALIZAÇÃO:**
-
-            1. **Temporalidade (CRÍTICO):** A pesquisa DEVE focar em preços contemporâneos à Data de Referência da licitação (janela de +/- 6 meses). Se utilizar preços fora desta janela, você DEVE mencionar a necessidade de ajuste inflacionário (ex: IPCA/INPC) no campo `rationale`.
-            2. **Comparabilidade:** Garanta que a especificação técnica, marca, modelo e quantidade sejam idênticos ou funcionalmente equivalentes (justifique a equivalência).
-            3. **Evidência Robusta (OBRIGATÓRIO):**
-                *   **Fontes Privadas (C ou D):** É **PROIBIDO** concluir sobrepreço com base em apenas 1 ou 2 fontes. Você **DEVE** encontrar e citar no mínimo **3 fontes distintas** para formar uma Cesta de Preços de Mercado. Se não encontrar 3, não aponte sobrepreço (Restrição Negativa).
-                *   **Fontes Oficiais (A ou B):** Se encontrar 1 fonte oficial robusta (ex: Painel de Preços ou Licitação similar no PNCP), ela é suficiente e tem preferência sobre fontes privadas.
-            4. **Busca Exaustiva de Fontes Oficiais:** Antes de recorrer ao Google (Varejo), você **DEVE** tentar buscar em fontes oficiais. Se não encontrar, declare explicitamente no `auditor_reasoning`: "Foram realizadas buscas no Painel de Preços e no PNCP para a marca [MARCA], sem identificação de contratos comparáveis; por isso recorreu-se a fontes de varejo...".
-            5. **Tratamento de Fontes de Varejo (B2C - Fonte D):** Se utilizar o varejo:
-                *   **Fator de Desconto (BDI Diferencial):** Aplique um desconto presumido de 20% sobre o preço de varejo. No `rationale`, você **DEVE** escrever a conta: "Preço varejo: R$ X/un. Aplicando fator de desconto de 20%: X * 0.80 = R$ Y/un (preço atacado estimado)."
-                *   **Ressalvas (Custo Brasil):** Pondere o impacto de custos logísticos, tributários (ex: ICMS interestadual) e burocráticos específicos da contratação.
-                *   **Agravante Crítico:** Se o preço contratado (em quantidade de atacado) for SUPERIOR ao preço de varejo unitário (sem desconto), isso é um indício GRAVE de sobrepreço, pois ignora a economia de escala.
-
-        ---
-
-        **III. REGRAS DE PREENCHIMENTO DA LISTA `sources` (CRÍTICO):**
-            1. **Identificação da Fonte (ANTI-ALUCINAÇÃO):** Priorize o preenchimento do campo `name` com o nome da loja ou entidade (ex: "Kalunga", "Mercado Livre", "Painel de Preços"). As URLs de busca (Grounding) serão capturadas automaticamente pelo sistema e vinculadas à análise, portanto, concentre-se em identificar corretamente a origem do preço.
-            2. **Quantidade de Fontes:**
-                *   Cite **todas** as fontes relevantes encontradas que sustentem o achado. Não se limite a 3 fontes se houver mais evidências disponíveis.
-                *   Se encontrar apenas **1 fonte válida** (e não for oficial), o `severity` DEVE ser rebaixado para **MODERADA** ou **LEVE**, pois a prova é frágil.
-                *   Para sustentar `severity` **GRAVE** ou **CRÍTICO** em sobrepreço, é OBRIGATÓRIO citar **3 fontes** ou 1 fonte oficial.
-            3. **Data da Referência:** Se a data não for explícita na página, use a data atual da consulta. **JAMAIS invente datas passadas.** Se a data for antiga (> 6 meses), justifique explicitamente no `rationale` por que ela ainda é válida.
-            4. **Consistência (Checklist):**
-                *   **Quantidade:** Verifique se a quantidade usada no cálculo de economia (ex: 1656) bate com a soma dos itens onde houve sobrepreço. Se excluir itens (ex: item 3), explique: "Considerando apenas os itens 1 e 2...".
-                *   **Marca:** Padronize a grafia da marca (ex: Maxprint vs Maxxprint). Use a grafia do documento, mas mencione variações se necessário.
-                *   **Preço de Referência:** Se usar uma média (ex: R$ 2,13), explique a origem: "Média entre Fonte A (R$ 2,00) e Fonte B (R$ 2,26)". **ATENÇÃO:** Se você estiver usando o maior preço da cesta para ser conservador, NÃO chame de "Média". Chame de "Referência Conservadora".
-
-        **CATEGORIAS DE IRREGULARIDADES:**
-        [DIRECIONAMENTO, RESTRICAO_COMPETITIVIDADE, SOBREPRECO (requer metodologia acima), SUPERFATURAMENTO (requer prova de dano consumado), FRAUDE (conluio, documentos falsos), DOCUMENTACAO_IRREGULAR, OUTROS]
-
-        **ESTRUTURA DO `red_flag`:**
-        - `category`: Categoria acima. Se a falha for metodológica (ex: ignorar fontes oficiais), use RESTRICAO_COMPETITIVIDADE.
-        - `severity`: `LEVE`, `MODERADA` ou `GRAVE`.
-        - `description`: Descrição objetiva (pt-br). Se você citar fontes para itens diferentes (ex: Pilha AA e Pilha C), mencione TODOS os itens na descrição.
-        - `evidence_quote`: Citação literal (pt-br) do documento da licitação.
-        - `auditor_reasoning`: Justificativa técnica (pt-br). Explique o risco e a norma violada.
-            *   **OBRIGATÓRIO 1 (Fontes Oficiais):** No início do texto, declare explicitamente: "Foram realizadas buscas no Painel de Preços, PNCP e BEC/SP... sem sucesso" (se for o caso).
-            *   **OBRIGATÓRIO 2 (Justificativa de Severidade):** Se o sobrepreço for alto (>35%) mas a severidade for rebaixada para MODERADA por baixa materialidade OU por insuficiência de fontes (menos de 3 fontes fortes), JUSTIFIQUE: "Apesar do percentual elevado (>35%), a severidade foi classificada como MODERADA em razão da baixa materialidade global/insuficiência de 3 fontes robustas...".
-            *   **OBRIGATÓRIO 3 (Cálculo Global):** Ao final do texto, você **DEVE** escrever a fórmula completa: "Considerando preço referência R$ X (média/menor/conservador), a economia potencial global é: (Preço Contratado - Preço Ref) * Quantidade = R$ Y".
-        - `potential_savings` (opcional): Valor monetário estimado da economia potencial. Deve bater com o cálculo do `auditor_reasoning`.
-        - `sources` (Obrigatório para SOBREPRECO/SUPERFATURAMENTO):
-            - `name`: nome ou título da fonte.
-            - `type`: Classificação da fonte conforme hierarquia: "OFICIAL", "TABELA", "B2B" ou "VAREJO".
-            - `reference_price`: preço de referência por unidade (quando disponível).
-            - `price_unit`: unidade do valor (ex.: “unidade”, “metro”).
-            - `reference_date`: data em que o preço foi válido ou coletado.
-            - `evidence`: Trecho literal da fonte que apoia a comparação.
-            - `rationale`: **(CRÍTICO)** Explicação detalhada da comparação. DEVE incluir: o tipo da fonte usada (ex: Oficial, Varejo), o preço unitário contratado, o preço de referência médio (da cesta), o cálculo da diferença percentual, a contextualização temporal. **SE A FONTE FOR VAREJO, É OBRIGATÓRIO MOSTRAR A CONTA DO DESCONTO:** "X * 0.80 = Y".
-
-        **CLASSIFICAÇÃO DE SEVERIDADE (Calibrada para Rigor e Materialidade):**
-        - **Leve:** Falhas formais sem impacto material, ou sobrepreço < 15% acima da Cesta de Preços Aceitável.
-        - **Moderada:** Restrição de competitividade, sobrepreço entre 15% e 35%, ou pesquisa de preços metodologicamente falha (ex: ignorar fontes oficiais sem justificativa). **ATENÇÃO:** Se você encontrar menos de 3 fontes robustas para o item principal, a severidade DEVE ser MODERADA, mesmo que o sobrepreço seja alto.
-        - **Grave:** Direcionamento claro, ausência de pesquisa de preços válida, sobrepreço > 35% comprovado por fontes robustas (A, B ou C), Preço de atacado superior ao de varejo (Agravante Crítico), ou qualquer indício de fraude/dano consumado. **REQUISITO:** Mínimo de 3 fontes distintas ou 1 fonte oficial para classificar como GRAVE.
-
-        **CRITÉRIOS PARA A NOTA DE RISCO (0 a 100):**
-        A nota deve refletir a probabilidade de irregularidade E o impacto material (financeiro).
-
-        **Escala de Risco:**
-        - **0-10 (Mínimo):** Processo regular ou falhas formais irrelevantes.
-        - **11-30 (Baixo):** Falhas formais leves sem dano ao erário comprovado.
-        - **31-50 (Moderado):** Indícios de restrição à competitividade (ex: ignorar fontes oficiais) ou sobrepreço em itens de baixo impacto financeiro.
-        - **51-70 (Alto):** Sobrepreço significativo (>25%) em itens relevantes, direcionamento evidente ou restrição grave sem justificativa.
-        - **71-90 (Crítico):** Sobrepreço grosseiro (>50%), "Jogo de Planilha", ou direcionamento flagrante em licitação de grande vulto.
-        - **91-100 (Máximo):** Prova documental de fraude (conluio, falsificação) ou superfaturamento consumado com alto dano.
-
-        **Fator de Correção por Materialidade (OBRIGATÓRIO):**
-        - Para licitações de **baixo valor total** (ex: Dispensa < R$ 50k) ou itens de valor irrisório: **REDUZA a nota de risco em 20 a 30 pontos**, a menos que haja prova inequívoca de fraude (conluio/falsificação).
-        - **Exemplo:** Um sobrepreço de 100% em uma compra de R$ 1.000,00 (dano potencial de R$ 500,00) deve ter risco **BAIXO a MODERADO (Nota 20-40)**, jamais Alto ou Crítico, pois o custo do controle excede o benefício.
-
-        **FORMATO DA RESPOSTA (JSON):**
-        Sua resposta deve ser um objeto JSON único e válido. Preencha os campos `procurement_summary`, `analysis_summary`, `risk_score_rationale` (pt-br, máx 3 sentenças cada) e `seo_keywords` (5-10 palavras-chave estratégicas: Objeto, Órgão, Cidade/Estado, Tipo de Irregularidade).
-        No `analysis_summary`:
-        - Use linguagem neutra se o sobrepreço não for comprovado. Prefira "não foi possível demonstrar, com robustez metodológica, a existência de sobrepreço relevante" em vez de "preços alinhados".
-        No `risk_score_rationale`:
-        - Seja preciso com percentuais (ex: "11% a 29%" em vez de "aproximadamente 28%").
-        - Use terminologia coerente com a severidade (ex: se severidade é MODERADA, use "irregularidade relevante" ou "gravidade moderada", evite "irregularidade grave").
-        """  # noqa: E501
+        """
 
     def _calculate_hash(self, files: list[tuple[str, bytes | list[bytes]]]) -> str:
         """Calculates a SHA-256 hash from the content of a list of files.
@@ -1009,12 +1685,35 @@ class AnalysisService:
                 hasher.update(content)
         return hasher.hexdigest()
 
-    def _calculate_procurement_hash(self, procurement: Procurement, files: list[ProcessedFile]) -> str:
-        """Calculates a SHA-256 hash for a procurement based on key fields and file metadata.
+    def _get_candidate_content_hash(self, candidate: AIFileCandidate) -> str:
+        """Returns the hash of the content a candidate sends to the AI model.
+
+        The hash of the prepared content is used when known, then the hash
+        of the original content, so a file hashes the same whether it was
+        just converted or reused from the content store.
+
+        Args:
+            candidate: The candidate to identify.
+
+        Returns:
+            The SHA-256 hex digest identifying the candidate's content.
+        """
+        if candidate.ai_content_hash:
+            return cast(str, candidate.ai_content_hash)
+        if candidate.content_hash:
+            return cast(str, candidate.content_hash)
+        return self._calculate_hash([(candidate.ai_path, candidate.ai_content)])
+
+    def _calculate_procurement_hash(self, procurement: Procurement, documents_metadata: list[dict]) -> str:
+        """Calculates a SHA-256 hash for a procurement based on key fields and document metadata.
+
+        The hash only depends on the procurement fields and the raw metadata
+        of its documents as listed by the PNCP API, so it can be computed
+        before any document is downloaded.
 
         Args:
             procurement: The procurement to hash.
-            files: The list of files to include in the hash.
+            documents_metadata: The raw metadata of the procurement's documents.
 
         Returns:
             The SHA-256 hash of the procurement.
@@ -1036,15 +1735,12 @@ class AnalysisService:
             "dispute_method": procurement.dispute_method,
         }
 
-        files_metadata = [
-            {"relative_path": file.relative_path, "metadata": file.raw_document_metadata}
-            for file in sorted(files, key=lambda x: x.relative_path)
-        ]
+        documents_metadata_str = sorted(
+            json.dumps(metadata, sort_keys=True, default=str) for metadata in documents_metadata
+        )
 
         procurement_data_str = json.dumps(procurement_key_data, sort_keys=True, default=str)
-        files_metadata_str = json.dumps(files_metadata, sort_keys=True)
-
-        combined_data = procurement_data_str + files_metadata_str
+        combined_data = procurement_data_str + json.dumps(documents_metadata_str)
         return hashlib.sha256(combined_data.encode("utf-8")).hexdigest()
 
     def run_specific_analysis(self, analysis_id: UUID) -> None:
@@ -1092,13 +1788,29 @@ class AnalysisService:
         batch_size: int,
         sleep_seconds: int,
         max_messages: int | None = None,
+        resume: bool = False,
+        workers: int = 1,
     ) -> Iterator[tuple[str, Any]]:
         """Runs the pre-analysis job for a given date range as a generator.
 
         This method iterates through each day in the date range, fetches the
-        procurements for that day, and processes them incrementally. It yields
-        events to allow the caller (e.g., a CLI) to display detailed, real-time
-        progress.
+        procurements for that day page by page, and processes each page as
+        soon as it arrives. It yields events to allow the caller (e.g., a CLI)
+        to display detailed, real-time progress.
+
+        When a checkpoint repository is configured, progress is recorded after
+        every processed procurement, search page and day. With `resume`, the
+        run continues from the checkpoint of the same date range: completed
+        days are skipped, the day in progress restarts after its last
+        completed search page, and procurements already processed on that
+        day are not processed again.
+
+        With more than one worker, the procurements are pre-analyzed on a pool
+        of `workers` processes. Each process builds its own service, database
+        engine and clients from the same configuration, while this generator
+        keeps publishing the progress events and checkpoints as jobs finish.
+        The per-host HTTP rate limit is split evenly between this process and
+        the workers, so the whole run stays within the configured budget.
 
         Args:
             start_date: The start date of the date range.
@@ -1106,60 +1818,235 @@ class AnalysisService:
             batch_size: The number of procurements to process in each batch.
             sleep_seconds: The number of seconds to sleep between batches.
             max_messages: The maximum number of messages to publish.
+            resume: Whether to continue from the checkpoint of a previous run.
+            workers: The number of processes pre-analyzing procurements. With
+                a single worker, procurements are handled in this process.
 
         Yields:
             Tuples representing progress events:
             - ("day_started", (current_date, total_days))
-            - ("procurements_fetched", procurements_for_the_day)
-            - ("procurement_processed", (procurement, raw_data))
             - ("fetching_pages_started", (modality_name, total_pages))
             - ("page_fetched", page_number)
+            - ("procurements_fetched", procurements_of_the_page)
+            - ("procurement_processed", (procurement, raw_data))
         """
+        executor = None
         try:
             self.logger.info(f"Starting pre-analysis job for date range: {start_date} to {end_date}")
-            total_days = (end_date - start_date).days + 1
-            messages_published_count = 0
-            processed_in_batch = 0
+            if workers > 1:
+                self.logger.info(f"Pre-analyzing procurements on {workers} worker processes.")
+                self.http_provider.share_rate_limit(workers + 1)
+                executor = ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_initialize_pre_analysis_worker,
+                    initargs=(self.gcs_path_prefix, workers + 1),
+                )
+            checkpoint = self._load_pre_analysis_checkpoint(start_date, end_date, resume)
+            first_date = start_date
+            if checkpoint and checkpoint.last_completed_date:
+                first_date = max(start_date, checkpoint.last_completed_date + timedelta(days=1))
+                self.logger.info(f"Resuming pre-analysis after {checkpoint.last_completed_date}.")
+            total_days = (end_date - first_date).days + 1
+            run_state = {"published": 0, "in_batch": 0}
             for day_index in range(total_days):
-                current_date = start_date + timedelta(days=day_index)
+                current_date = first_date + timedelta(days=day_index)
                 yield "day_started", (current_date, total_days)
-                procurements_for_the_day = []
-                event_generator = self.procurement_repo.get_updated_procurements_with_raw_data(target_date=current_date)
+                resume_after = None
+                processed_control_numbers: set[str] = set()
+                if checkpoint and checkpoint.page_date == current_date and checkpoint.modality and checkpoint.page:
+                    resume_after = (checkpoint.city_code, checkpoint.modality, checkpoint.page)
+                    self.logger.info(f"Resuming {current_date} after search page {resume_after}.")
+                if checkpoint and self.pre_analysis_checkpoint_repo:
+                    processed_control_numbers = self.pre_analysis_checkpoint_repo.get_processed_control_numbers(
+                        start_date, end_date, current_date
+                    )
+
+                search: tuple[int | None, int] | None = None
+                page_procurements: list[tuple[Procurement, dict]] = []
+                event_generator = self.procurement_repo.get_updated_procurements_with_raw_data(
+                    target_date=current_date, resume_after=resume_after
+                )
                 for event, data in event_generator:
-                    if event == "modality_started":
+                    if event == "search_started":
+                        search = data
+                    elif event == "modality_started":
                         modality_name = data
                     elif event == "pages_total":
                         yield "fetching_pages_started", (modality_name, data)
                     elif event == "procurements_page":
-                        procurements_for_the_day.append(data)
+                        page_procurements.append(data)
                     elif event == "page_fetched":
                         yield "page_fetched", data
-                yield "procurements_fetched", procurements_for_the_day
-                if not procurements_for_the_day:
-                    continue
-                for procurement, raw_data in procurements_for_the_day:
-                    if max_messages is not None and messages_published_count >= max_messages:
-                        self.logger.info(f"Reached max_messages ({max_messages}). Stopping pre-analysis.")
-                        return
-                    try:
-                        self._pre_analyze_procurement(procurement, raw_data)
-                        messages_published_count += 1
-                        processed_in_batch += 1
-                        yield "procurement_processed", (procurement, raw_data)
-                        is_last_item = (procurement, raw_data) == procurements_for_the_day[-1]
-                        if processed_in_batch % batch_size == 0 and not is_last_item:
-                            self.logger.info(
-                                f"Batch of {batch_size} processed. " f"Sleeping for {sleep_seconds} seconds."
-                            )
-                            time.sleep(sleep_seconds)
-                    except Exception as e:
-                        self.logger.error(
-                            f"Failed to pre-analyze procurement {procurement.pncp_control_number}: {e}",
-                            exc_info=True,
+                        finished = yield from self._pre_analyze_page(
+                            page_procurements,
+                            (start_date, end_date, current_date),
+                            processed_control_numbers,
+                            run_state,
+                            batch_size,
+                            sleep_seconds,
+                            max_messages,
+                            executor,
                         )
+                        if finished:
+                            return
+                        page_procurements = []
+                        if search and self.pre_analysis_checkpoint_repo:
+                            self.pre_analysis_checkpoint_repo.save_page(
+                                start_date, end_date, current_date, search[0], search[1], data
+                            )
+                if page_procurements:
+                    finished = yield from self._pre_analyze_page(
+                        page_procurements,
+                        (start_date, end_date, current_date),
+                        processed_control_numbers,
+                        run_state,
+                        batch_size,
+                        sleep_seconds,
+                        max_messages,
+                        executor,
+                    )
+                    if finished:
+                        return
+                if self.pre_analysis_checkpoint_repo:
+                    self.pre_analysis_checkpoint_repo.save_completed_day(start_date, end_date, current_date)
             self.logger.info("Pre-analysis job for the entire date range has been completed.")
         except Exception as e:
             raise AnalysisError(f"An unexpected error occurred during pre-analysis: {e}") from e
+        finally:
+            if executor:
+                executor.shutdown(wait=True, cancel_futures=True)
+                self.http_provider.share_rate_limit(1)
+
+    def _load_pre_analysis_checkpoint(
+        self, start_date: date, end_date: date, resume: bool
+    ) -> PreAnalysisCheckpoint | None:
+        """Loads the checkpoint to resume from, or starts a fresh one.
+
+        Args:
+            start_date: The start date of the date range.
+            end_date: The end date of the date range.
+            resume: Whether to continue from the checkpoint of a previous run.
+
+        Returns:
+            The checkpoint to resume from, or `None` to start from the
+            beginning of the date range.
+        """
+        if not self.pre_analysis_checkpoint_repo:
+            if resume:
+                self.logger.warning("No checkpoint repository configured. Starting from the beginning.")
+            return None
+        if resume:
+            checkpoint = self.pre_analysis_checkpoint_repo.get_checkpoint(start_date, end_date)
+            if checkpoint:
+                return checkpoint
+            self.logger.info("No checkpoint found for this date range. Starting from the beginning.")
+        self.pre_analysis_checkpoint_repo.start_run(start_date, end_date)
+        return None
+
+    def _pre_analyze_page(
+        self,
+        page_procurements: list[tuple[Procurement, dict]],
+        run_key: tuple[date, date, date],
+        processed_control_numbers: set[str],
+        run_state: dict[str, int],
+        batch_size: int,
+        sleep_seconds: int,
+        max_messages: int | None,
+        executor: Executor | None = None,
+    ) -> Generator[tuple[str, Any], None, bool]:
+        """Pre-analyzes the procurements of one search page.
+
+        Procurements are handed out in chunks that end at the next batch
+        boundary, so the pause between batches still separates them when a
+        worker pool pre-analyzes each chunk concurrently. Without a pool the
+        chunks hold a single procurement.
+
+        Args:
+            page_procurements: The procurements of the page with their raw data.
+            run_key: The start and end dates of the run and the day in progress.
+            processed_control_numbers: The control numbers already processed
+                on the day in progress, which are skipped.
+            run_state: The `published` and `in_batch` counters of the run,
+                updated in place.
+            batch_size: The number of procurements to process in each batch.
+            sleep_seconds: The number of seconds to sleep between batches.
+            max_messages: The maximum number of messages to publish.
+            executor: The worker pool, or `None` to pre-analyze in this process.
+
+        Yields:
+            The ("procurements_fetched", ...) event for the page, then a
+            ("procurement_processed", ...) event per procurement.
+
+        Returns:
+            True if `max_messages` was reached and the run must stop.
+        """
+        pending = [
+            (procurement, raw_data)
+            for procurement, raw_data in page_procurements
+            if procurement.pncp_control_number not in processed_control_numbers
+        ]
+        yield "procurements_fetched", pending
+        index = 0
+        while index < len(pending):
+            if max_messages is not None and run_state["published"] >= max_messages:
+                self.logger.info(f"Reached max_messages ({max_messages}). Stopping pre-analysis.")
+                return True
+            chunk_size = batch_size - run_state["in_batch"] % batch_size if executor else 1
+            if max_messages is not None:
+                chunk_size = min(chunk_size, max_messages - run_state["published"])
+            chunk = pending[index : index + chunk_size]
+            index += len(chunk)
+            chunk_published = 0
+            for procurement, raw_data, error in self._run_pre_analysis_jobs(chunk, executor):
+                if error:
+                    self.logger.error(
+                        f"Failed to pre-analyze procurement {procurement.pncp_control_number}: {error}",
+                        exc_info=error,
+                    )
+                    continue
+                chunk_published += 1
+                run_state["published"] += 1
+                run_state["in_batch"] += 1
+                processed_control_numbers.add(procurement.pncp_control_number)
+                if self.pre_analysis_checkpoint_repo:
+                    self.pre_analysis_checkpoint_repo.mark_processed(*run_key, procurement.pncp_control_number)
+                yield "procurement_processed", (procurement, raw_data)
+            if chunk_published and run_state["in_batch"] % batch_size == 0 and index < len(pending):
+                self.logger.info(f"Batch of {batch_size} processed. " f"Sleeping for {sleep_seconds} seconds.")
+                time.sleep(sleep_seconds)
+        return False
+
+    def _run_pre_analysis_jobs(
+        self, chunk: list[tuple[Procurement, dict]], executor: Executor | None
+    ) -> Iterator[tuple[Procurement, dict, BaseException | None]]:
+        """Pre-analyzes a chunk of procurements, in this process or on the pool.
+
+        Args:
+            chunk: The procurements to pre-analyze with their raw data.
+            executor: The worker pool, or `None` to pre-analyze in this process.
+
+        Yields:
+            The procurement, its raw data and the error raised while
+            pre-analyzing it, if any. Pool jobs are yielded as they finish.
+        """
+        if executor is None:
+            for procurement, raw_data in chunk:
+                try:
+                    self._pre_analyze_procurement(procurement, raw_data)
+                except Exception as e:
+                    yield procurement, raw_data, e
+                else:
+                    yield procurement, raw_data, None
+            return
+
+        futures = {
+            executor.submit(_run_pre_analysis_job, procurement, raw_data): (procurement, raw_data)
+            for procurement, raw_data in chunk
+        }
+        for future in as_completed(futures):
+            procurement, raw_data = futures[future]
+            yield procurement, raw_data, future.exception()
 
     def run_pre_analysis_by_control_number(
         self,
@@ -1206,18 +2093,42 @@ class AnalysisService:
         based on token limits, and calculating the final estimated cost and
         priority score.
 
+        The procurement hash is computed from the document listing alone, so
+        procurements that did not change are skipped before any document is
+        downloaded. Documents that could not be downloaded are then left out
+        of the hash that is saved, so a version saved after a transient
+        download failure does not match the full listing and the procurement
+        is retried on its next scan.
+
         Args:
             procurement: The procurement to pre-analyze.
             raw_data: The raw data of the procurement.
         """
-        all_original_files = self.procurement_repo.process_procurement_documents(procurement)
-        procurement_content_hash = self._calculate_procurement_hash(procurement, all_original_files)
+        documents = self.procurement_repo.get_all_documents_metadata(procurement)
+        procurement_content_hash = self._calculate_procurement_hash(procurement, [raw for _, raw in documents])
         if self.procurement_repo.get_procurement_by_hash(procurement_content_hash):
             self.logger.info(f"Procurement with hash {procurement_content_hash} already exists. Skipping.")
             return
 
+        all_original_files = self.procurement_repo.process_procurement_documents(procurement, documents)
+        downloaded_documents = [
+            raw for _, raw in documents if any(file.raw_document_metadata == raw for file in all_original_files)
+        ]
+        if len(downloaded_documents) < len(documents):
+            self.logger.warning(
+                f"{len(documents) - len(downloaded_documents)} of {len(documents)} documents of "
+                f"{procurement.pncp_control_number} could not be downloaded. "
+                "They are left out of the procurement hash so it is retried on its next scan."
+            )
+            procurement_content_hash = self._calculate_procurement_hash(procurement, downloaded_documents)
+            if self.procurement_repo.get_procurement_by_hash(procurement_content_hash):
+                self.logger.info(f"Procurement with hash {procurement_content_hash} already exists. Skipping.")
+                return
+
         all_candidates = self._prepare_ai_candidates(all_original_files)
-        files_for_hash = [(c.ai_path, c.ai_content) for c in all_candidates if not c.exclusion_reason]
+        files_for_hash: list[tuple[str, bytes | list[bytes]]] = [
+            (c.ai_path, self._get_candidate_content_hash(c).encode()) for c in all_candidates if not c.exclusion_reason
+        ]
         analysis_document_hash = self._calculate_hash(files_for_hash)
 
         latest_version = self.procurement_repo.get_latest_version(procurement.pncp_control_number)
@@ -1245,56 +2156,139 @@ class AnalysisService:
             self._upload_and_save_initial_records(
                 procurement, procurement_id, analysis_id, all_candidates, source_docs_map
             )
+            self._estimate_stored_contents(all_candidates)
 
-            final_candidates = self._select_files_by_token_limit(all_candidates, procurement)
-            prompt = self._build_analysis_prompt(procurement, final_candidates)
-            uris_for_token_count = [uri for c in final_candidates if c.is_included for uri in c.ai_gcs_uris]
-            input_tokens, _, _ = self.ai_provider.count_tokens_for_analysis(prompt, uris_for_token_count)
-
-            output_tokens = self.config.GCP_GEMINI_MAX_OUTPUT_TOKENS
-            thinking_tokens = 0
-            modality = self._get_modality_from_exts([os.path.splitext(c.ai_path)[1] for c in final_candidates])
-            (
-                input_cost,
-                output_cost,
-                thinking_cost,
-                search_cost,
-                total_cost,
-            ) = self.pricing_service.calculate_total_cost(
+            if self.config.TOKEN_ESTIMATION_ENABLED:
+                final_candidates, estimated_input_tokens = self._select_files_and_estimate_tokens(
+                    all_candidates, procurement
+                )
+                input_tokens = self.token_estimator.calibrate(estimated_input_tokens)
+                prompt = self._build_analysis_prompt(procurement, final_candidates)
+            else:
+                final_candidates, input_tokens = self._select_files_and_count_tokens(all_candidates, procurement)
+                prompt = self._build_analysis_prompt(procurement, final_candidates)
+                estimated_input_tokens = self._estimate_input_tokens(prompt, final_candidates)
+
+            self._save_pre_analysis_tokens(
+                analysis_id,
+                procurement,
+                new_version,
+                final_candidates,
+                prompt,
                 input_tokens,
-                output_tokens,
-                thinking_tokens,
-                modality=modality,
-                search_queries_count=10,
+                estimated_input_tokens=estimated_input_tokens,
+                input_tokens_estimated=self.config.TOKEN_ESTIMATION_ENABLED,
             )
-
-            self.analysis_repo.update_pre_analysis_with_tokens(
-                analysis_id=analysis_id,
-                input_tokens_used=input_tokens,
-                output_tokens_used=output_tokens,
-                thinking_tokens_used=thinking_tokens,
-                input_cost=input_cost,
-                output_cost=output_cost,
-                thinking_cost=thinking_cost,
-                search_cost=search_cost,
-                total_cost=total_cost,
-                search_queries_used=10,
-                analysis_prompt=prompt,
+            self._update_status_with_history(
+                analysis_id, ProcurementAnalysisStatus.PENDING_ANALYSIS, "Pre-analysis completed."
             )
 
-            db_procurement = self.procurement_repo.get_procurement_by_id_and_version(
-                procurement.pncp_control_number, new_version
-            )
-            if db_procurement:
-                db_procurement = self.ranking_service.calculate_priority(
-                    db_procurement, all_candidates, analysis_id, input_tokens
-                )
-                self.procurement_repo.update_procurement_ranking_data(db_procurement, new_version)
+    def _save_pre_analysis_tokens(
+        self,
+        analysis_id: UUID,
+        procurement: Procurement,
+        version_number: int,
+        candidates: list[AIFileCandidate],
+        prompt: str,
+        input_tokens: int,
+        estimated_input_tokens: int | None = None,
+        input_tokens_estimated: bool = False,
+    ) -> Decimal:
+        """Prices a pre-analysis, saves its tokens and updates the procurement ranking.
 
-            self._update_selected_file_records(final_candidates)
-            self._update_status_with_history(
-                analysis_id, ProcurementAnalysisStatus.PENDING_ANALYSIS, "Pre-analysis completed."
+        Args:
+            analysis_id: The ID of the pre-analysis record.
+            procurement: The procurement being analyzed.
+            version_number: The version of the procurement being analyzed.
+            candidates: The candidates, after the file selection.
+            prompt: The final prompt of the analysis.
+            input_tokens: The input tokens of the analysis.
+            estimated_input_tokens: The local, uncalibrated estimate of the
+                input tokens, if one was made.
+            input_tokens_estimated: Whether `input_tokens` is a calibrated
+                estimate instead of a count made by the model.
+
+        Returns:
+            The estimated total cost of the analysis.
+        """
+        output_tokens = self.config.GCP_GEMINI_MAX_OUTPUT_TOKENS
+        thinking_tokens = 0
+        modality = self._get_modality_from_exts([os.path.splitext(c.ai_path)[1] for c in candidates])
+        (
+            input_cost,
+            output_cost,
+            thinking_cost,
+            search_cost,
+            total_cost,
+        ) = self.pricing_service.calculate_total_cost(
+            input_tokens,
+            output_tokens,
+            thinking_tokens,
+            modality=modality,
+            search_queries_count=10,
+        )
+
+        self.analysis_repo.update_pre_analysis_with_tokens(
+            analysis_id=analysis_id,
+            input_tokens_used=input_tokens,
+            output_tokens_used=output_tokens,
+            thinking_tokens_used=thinking_tokens,
+            input_cost=input_cost,
+            output_cost=output_cost,
+            thinking_cost=thinking_cost,
+            search_cost=search_cost,
+            total_cost=total_cost,
+            search_queries_used=10,
+            analysis_prompt=prompt,
+            estimated_input_tokens=estimated_input_tokens,
+            input_tokens_estimated=input_tokens_estimated,
+        )
+
+        db_procurement = self.procurement_repo.get_procurement_by_id_and_version(
+            procurement.pncp_control_number, version_number
+        )
+        if db_procurement:
+            db_procurement = self.ranking_service.calculate_priority(
+                db_procurement, candidates, analysis_id, input_tokens
             )
+            self.procurement_repo.update_procurement_ranking_data(db_procurement, version_number)
+
+        self._update_selected_file_records(candidates)
+        return cast(Decimal, total_cost)
+
+    def _count_estimated_analysis_tokens(self, analysis: AnalysisResult, procurement: Procurement) -> Decimal:
+        """Replaces the estimated tokens of a pending analysis by an exact count.
+
+        The files are selected again with the tokens counted by the AI model,
+        so files the estimate let in may be dropped and the other way around.
+
+        Args:
+            analysis: The pending analysis, whose input tokens were estimated.
+            procurement: The procurement of the analysis.
+
+        Returns:
+            The estimated total cost of the analysis, from the exact count.
+        """
+        analysis_id = cast(UUID, analysis.analysis_id)
+        candidates = self._rebuild_candidates_from_db(analysis_id)
+        final_candidates, input_tokens = self._select_files_and_count_tokens(candidates, procurement)
+        self.file_record_repo.set_files_as_excluded(
+            [c.file_record_id for c in final_candidates if not c.is_included and c.file_record_id]
+        )
+        prompt = self._build_analysis_prompt(procurement, final_candidates)
+        self.logger.info(
+            f"Counted {input_tokens} input tokens for analysis {analysis_id}, "
+            f"estimated at {analysis.input_tokens_used}."
+        )
+        return self._save_pre_analysis_tokens(
+            analysis_id,
+            procurement,
+            cast(int, analysis.version_number),
+            final_candidates,
+            prompt,
+            input_tokens,
+            estimated_input_tokens=analysis.estimated_input_tokens,
+        )
 
     def run_ranked_analysis(
         self,
@@ -1399,6 +2393,14 @@ class AnalysisService:
                 break
 
             estimated_cost = analysis.total_cost or Decimal(0)
+            if analysis.input_tokens_estimated:
+                try:
+                    estimated_cost = self._count_estimated_analysis_tokens(analysis, procurement)
+                except Exception as e:
+                    self.logger.error(
+                        f"Failed to count the tokens of analysis {analysis.analysis_id}: {e}", exc_info=True
+                    )
+                    continue
 
             if estimated_cost > remaining_budget:
                 self.logger.info(
@@ -1610,8 +2612,12 @@ class AnalysisService:
                         raw_document_metadata=old_file.get("raw_document_metadata"),
                         inferred_extension=old_file.get("inferred_extension"),
                         used_fallback_conversion=old_file.get("used_fallback_conversion", False),
+                        content_hash=old_file.get("content_hash"),
+                        ai_content_hash=old_file.get("ai_content_hash"),
                     )
                     self.file_record_repo.save_file_record(new_file_record)
+                    if self.file_content_repo and new_file_record.content_hash:
+                        self.file_content_repo.add_reference(new_file_record.content_hash)
             return
 
         self.logger.warning(
@@ -1685,6 +2691,7 @@ class AnalysisService:
                 ai_gcs_uris=ai_gcs_uris,
                 ai_path=ai_path,
                 exclusion_reason=record.get("exclusion_reason"),
+                ai_content_hash=record.get("ai_content_hash") or "",
             )
             candidates.append(candidate)
         return candidates
@@ -1706,52 +2713,11 @@ class AnalysisService:
 
         all_candidates = self._rebuild_candidates_from_db(analysis_id)
 
-        final_candidates = self._select_files_by_token_limit(all_candidates, procurement)
+        final_candidates, input_tokens = self._select_files_and_count_tokens(all_candidates, procurement)
         prompt = self._build_analysis_prompt(procurement, final_candidates)
-        uris_for_token_count = [uri for c in final_candidates if c.is_included for uri in c.ai_gcs_uris]
-        input_tokens, _, _ = self.ai_provider.count_tokens_for_analysis(prompt, uris_for_token_count)
-
-        output_tokens = self.config.GCP_GEMINI_MAX_OUTPUT_TOKENS
-        thinking_tokens = 0
-        modality = self._get_modality_from_exts([os.path.splitext(c.ai_path)[1] for c in final_candidates])
-        (
-            input_cost,
-            output_cost,
-            thinking_cost,
-            search_cost,
-            total_cost,
-        ) = self.pricing_service.calculate_total_cost(
-            input_tokens,
-            output_tokens,
-            thinking_tokens,
-            modality=modality,
-            search_queries_count=10,
-        )
-
-        self.analysis_repo.update_pre_analysis_with_tokens(
-            analysis_id=analysis_id,
-            input_tokens_used=input_tokens,
-            output_tokens_used=output_tokens,
-            thinking_tokens_used=thinking_tokens,
-            input_cost=input_cost,
-            output_cost=output_cost,
-            thinking_cost=thinking_cost,
-            search_cost=search_cost,
-            total_cost=total_cost,
-            search_queries_used=10,
-            analysis_prompt=prompt,
+        self._save_pre_analysis_tokens(
+            analysis_id, procurement, procurement.version_number, final_candidates, prompt, input_tokens
         )
-
-        db_procurement = self.procurement_repo.get_procurement_by_id_and_version(
-            procurement.pncp_control_number, procurement.version_number
-        )
-        if db_procurement:
-            db_procurement = self.ranking_service.calculate_priority(
-                db_procurement, all_candidates, analysis_id, input_tokens
-            )
-            self.procurement_repo.update_procurement_ranking_data(db_procurement, procurement.version_number)
-
-        self._update_selected_file_records(final_candidates)
         self._update_status_with_history(
             analysis_id, ProcurementAnalysisStatus.PENDING_ANALYSIS, "Pre-analysis resumed and completed."
         )
@@ -1775,6 +2741,38 @@ class AnalysisService:
             return None
         return status_info
 
+    def collect_unused_file_contents(self, min_idle_days: int) -> int:
+        """Deletes stored file contents no file record points to anymore.
+
+        Args:
+            min_idle_days: The number of days a content must have gone unused
+                before it is deleted. At least one day, so contents looked up
+                by a running analysis are never deleted under it.
+
+        Returns:
+            The number of deleted contents.
+
+        Raises:
+            AnalysisError: If the service was built without the content store,
+                or if `min_idle_days` is lower than one.
+        """
+        if not self.file_content_repo:
+            raise AnalysisError("The file content store is not configured.")
+        if min_idle_days < 1:
+            raise AnalysisError("File contents must be unused for at least one day before they are deleted.")
+        unused_since = datetime.now(timezone.utc) - timedelta(days=min_idle_days)
+        deleted_contents = self.file_content_repo.collect_garbage(unused_since)
+
+        bucket_name = self.config.GCP_GCS_BUCKET_PROCUREMENTS
+        bucket_prefix = f"gs://{bucket_name}/"
+        for file_content in deleted_contents:
+            blob_names = [file_content.original_gcs_path]
+            blob_names.extend(uri.removeprefix(bucket_prefix) for uri in file_content.prepared_content_gcs_uris or [])
+            for blob_name in blob_names:
+                self.gcs_provider.delete_file(bucket_name, blob_name)
+        self.logger.info(f"Deleted {len(deleted_contents)} unused file contents from the store.")
+        return len(deleted_contents)
+
     def _calculate_auto_budget(self, budget_period: str) -> Decimal:
         """Calculates the budget for the current run based on donation history and spending pace.
 
@@ -1815,3 +2813,57 @@ class AnalysisService:
         )
 
         return Decimal(max(Decimal("0"), budget_for_this_run))
+
+
+_pre_analysis_worker_service: AnalysisService | None = None
+
+
+def _initialize_pre_analysis_worker(gcs_path_prefix: str | None, process_count: int = 1) -> None:
+    """Builds the service used by a pre-analysis worker process.
+
+    Database engines, HTTP sessions and Google Cloud clients cannot be shared
+    across processes, so each worker creates its own from the configuration.
+    Its HTTP provider only takes its share of the per-host rate limit, since
+    every process keeps its own token buckets.
+
+    Args:
+        gcs_path_prefix: Overwrites the base GCS path for uploads.
+        process_count: The number of processes of the run sending requests.
+    """
+    global _pre_analysis_worker_service
+    db_engine = DatabaseManager.get_engine()
+    pubsub_provider = PubSubProvider()
+    http_provider = HttpProvider()
+    http_provider.share_rate_limit(process_count)
+    _pre_analysis_worker_service = AnalysisService(
+        procurement_repo=ProcurementsRepository(
+            engine=db_engine, pubsub_provider=pubsub_provider, http_provider=http_provider
+        ),
+        analysis_repo=AnalysisRepository(engine=db_engine),
+        source_document_repo=SourceDocumentsRepository(engine=db_engine),
+        file_record_repo=FileRecordsRepository(engine=db_engine),
+        status_history_repo=StatusHistoryRepository(engine=db_engine),
+        budget_ledger_repo=BudgetLedgerRepository(engine=db_engine),
+        ai_provider=AiProvider(Analysis),
+        gcs_provider=GcsProvider(),
+        http_provider=http_provider,
+        pubsub_provider=pubsub_provider,
+        gcs_path_prefix=gcs_path_prefix,
+        file_content_repo=FileContentsRepository(engine=db_engine),
+        token_count_repo=TokenCountsRepository(engine=db_engine),
+    )
+
+
+def _run_pre_analysis_job(procurement: Procurement, raw_data: dict) -> None:
+    """Pre-analyzes one procurement on a worker process.
+
+    Args:
+        procurement: The procurement to pre-analyze.
+        raw_data: The raw data of the procurement.
+
+    Raises:
+        RuntimeError: If the worker process was not initialized.
+    """
+    if _pre_analysis_worker_service is None:
+        raise RuntimeError("Pre-analysis worker process was not initialized.")
+    _pre_analysis_worker_service._pre_analyze_procurement(procurement, raw_data)
@@ -1,19 +1,122 @@
 """This module provides a service for converting files."""
 
 import io
-from typing import cast
-
-import imageio
+import math
+import tempfile
+import threading
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from enum import StrEnum
+from pathlib import Path
+from typing import TypeVar, cast
+
+import imageio_ffmpeg
+import numpy as np
+import PIL
 from PIL import Image
+from public_detective.providers.config import Config, ConfigProvider
+from public_detective.providers.conversion_cache import ConversionCache
 from public_detective.providers.logging import Logger, LoggingProvider
 from public_detective.providers.office_converter import OfficeConverterProvider
+from public_detective.services.token_estimator import estimate_image_tokens, estimate_video_tokens
+
+ResultT = TypeVar("ResultT")
+
+
+class ConversionBackend(StrEnum):
+    """The external tools a file conversion can depend on."""
+
+    LIBREOFFICE = "libreoffice"
+    IMAGEMAGICK = "imagemagick"
+    IMAGEIO = "imageio"
+
+
+class ConversionExecutor:
+    """Runs file conversions side by side, with a concurrency limit per backend.
+
+    Each backend gets its own thread pool, sized by its limit, so a batch of
+    slow LibreOffice conversions does not hold back the ImageMagick or imageio
+    ones queued behind it. Conversions that call a backend other than the one
+    they were scheduled on (such as the ImageMagick fallback of a failed
+    LibreOffice conversion) go through `limit`, which caps the conversions
+    running on a backend at any moment across all batches.
+    """
+
+    max_workers: dict[ConversionBackend, int]
+    _semaphores: dict[ConversionBackend, threading.BoundedSemaphore]
+
+    def __init__(self, config: Config) -> None:
+        """Initializes the executor with the limits from the configuration.
+
+        Args:
+            config: The application configuration.
+        """
+        self.max_workers = {
+            ConversionBackend.LIBREOFFICE: max(1, config.CONVERTER_LIBREOFFICE_MAX_WORKERS),
+            ConversionBackend.IMAGEMAGICK: max(1, config.CONVERTER_IMAGEMAGICK_MAX_WORKERS),
+            ConversionBackend.IMAGEIO: max(1, config.CONVERTER_IMAGEIO_MAX_WORKERS),
+        }
+        self._semaphores = {
+            backend: threading.BoundedSemaphore(max_workers) for backend, max_workers in self.max_workers.items()
+        }
+
+    @contextmanager
+    def limit(self, backend: ConversionBackend | None) -> Iterator[None]:
+        """Holds one of a backend's slots while the block runs.
+
+        Args:
+            backend: The backend the block calls, or `None` if it runs in
+                process and needs no slot.
+
+        Yields:
+            Nothing, once a slot of the backend is free.
+        """
+        if backend is None:
+            yield
+            return
+        with self._semaphores[backend]:
+            yield
+
+    def run(self, tasks: Sequence[tuple[ConversionBackend | None, Callable[[], ResultT]]]) -> list[ResultT]:
+        """Runs a batch of conversions and returns their results in order.
+
+        Tasks without a backend run on the calling thread while the others
+        are converted in the background.
+
+        Args:
+            tasks: Pairs of the backend each task mostly uses and the task.
+
+        Returns:
+            The result of each task, in the order the tasks were given.
+        """
+        backends = {backend for backend, _ in tasks if backend is not None}
+        executors = {
+            backend: ThreadPoolExecutor(max_workers=self.max_workers[backend], thread_name_prefix=f"convert-{backend}")
+            for backend in backends
+        }
+        try:
+            futures: dict[int, Future[ResultT]] = {
+                index: executors[backend].submit(task)
+                for index, (backend, task) in enumerate(tasks)
+                if backend is not None
+            }
+            results = {index: task() for index, (backend, task) in enumerate(tasks) if backend is None}
+            for index, future in futures.items():
+                results[index] = future.result()
+        finally:
+            for executor in executors.values():
+                executor.shutdown(wait=True, cancel_futures=True)
+        return [results[index] for index in range(len(tasks))]
 
 
 class ConverterService:
     """A service for converting various file types for AI analysis."""
 
     logger: Logger
+    config: Config
     office_converter: OfficeConverterProvider
+    conversion_cache: ConversionCache | None
 
     _CONVERTIBLE_TO_PDF = {
         ".docx",
@@ -29,39 +132,303 @@ class ConverterService:
         ".docm",
         ".odg",
     }
+    _DEFAULT_GIF_FRAME_MS = 100
+    _KEYFRAME_DIFFERENCE_THRESHOLD = 8.0
 
     def __init__(self) -> None:
         """Initializes the service."""
         self.logger: Logger = LoggingProvider().get_logger()
+        self.config = ConfigProvider.get_config()
         self.office_converter: OfficeConverterProvider = OfficeConverterProvider()
+        self.conversion_cache = ConversionCache.get_instance()
+
+    def gif_to_mp4(self, gif_content: bytes, name: str = "GIF") -> bytes:
+        """Converts a GIF file content to a normalized MP4 file content.
 
-    def gif_to_mp4(self, gif_content: bytes) -> bytes:
-        """Converts a GIF file content to an MP4 file content.
+        A result cached for the same GIF and normalization settings is reused.
 
         Args:
             gif_content: The content of the GIF file.
+            name: The name of the file, used in the normalization report.
 
         Returns:
             The content of the converted MP4 file.
         """
-        self.logger.info("Converting GIF to MP4.")
-        try:
-            reader = imageio.get_reader(gif_content, format="gif")  # type: ignore[arg-type]
-            fps = reader.get_meta_data().get("fps", 24)
+        if self.conversion_cache is None:
+            return self._gif_to_mp4(gif_content, name)
+        converter_version = (
+            f"imageio-ffmpeg {imageio_ffmpeg.__version__}; {self.config.MEDIA_NORMALIZATION_MAX_DIMENSION}px; "
+            f"{self.config.GIF_TARGET_FPS}fps; keyframes={self.config.GIF_KEYFRAMES_ONLY}; "
+            f"max {self.config.GIF_MAX_DURATION_SECONDS}s"
+        )
+        return cast(
+            bytes,
+            self.conversion_cache.get_or_convert(
+                gif_content, ".gif", "mp4", converter_version, lambda: self._gif_to_mp4(gif_content, name)
+            ),
+        )
+
+    def _gif_to_mp4(self, gif_content: bytes, name: str) -> bytes:
+        """Converts a GIF file content to a normalized MP4 file content.
+
+        Frames are sampled down to `GIF_TARGET_FPS` and downscaled one at a
+        time while decoding, and streamed to ffmpeg as they come, so only a
+        single frame is held in memory. With `GIF_KEYFRAMES_ONLY`, only the
+        frames that differ from the one before are kept, each shown for a
+        single tick of `GIF_TARGET_FPS`. At most the first
+        `GIF_MAX_DURATION_SECONDS` of the GIF are sampled.
 
-            output_buffer = io.BytesIO()
-            with imageio.get_writer(output_buffer, format="mp4", fps=fps) as writer:  # type: ignore[arg-type]
-                for frame in reader:  # type: ignore[attr-defined]
-                    writer.append_data(frame)  # type: ignore[attr-defined]
+        Args:
+            gif_content: The content of the GIF file.
+            name: The name of the file, used in the normalization report.
 
-            return output_buffer.getvalue()
+        Returns:
+            The content of the converted MP4 file.
+        """
+        self.logger.info("Converting GIF to MP4.")
+        try:
+            fps = self.config.GIF_TARGET_FPS
+            sampling = {"duration": 0.0}
+            frames = self._read_gif_frames(gif_content, fps, sampling)
+            if self.config.GIF_KEYFRAMES_ONLY:
+                frames = self._select_keyframes(frames)
+            mp4_content, frame_count = self._write_mp4(frames, fps)
+
+            self._log_normalization(
+                name,
+                len(gif_content),
+                len(mp4_content),
+                estimate_video_tokens(sampling["duration"]),
+                estimate_video_tokens(frame_count / fps),
+            )
+            return mp4_content
         except Exception as e:
             self.logger.error(f"GIF to MP4 conversion failed: {e}", exc_info=True)
             raise
 
+    def _read_gif_frames(
+        self, gif_content: bytes, fps: float, sampling: dict[str, float]
+    ) -> Iterator[tuple[np.ndarray, int]]:
+        """Decodes the frames of a GIF shown at each tick of a target frame rate.
+
+        Frames shown between two ticks are skipped without being converted.
+        Each sampled frame is downscaled and padded to an even size as soon
+        as it is decoded, and yielded once with the number of ticks it is
+        shown for. Sampling stops after `GIF_MAX_DURATION_SECONDS`.
+
+        Args:
+            gif_content: The content of the GIF file.
+            fps: The frame rate to sample at.
+            sampling: Receives the sampled `duration` of the GIF, in seconds.
+
+        Yields:
+            Each sampled RGB frame as a `(height, width, 3)` array, and the
+            number of ticks it is shown for.
+        """
+        max_duration = self.config.GIF_MAX_DURATION_SECONDS
+        elapsed = 0.0
+        with Image.open(io.BytesIO(gif_content)) as img:
+            for index in range(getattr(img, "n_frames", 1)):
+                if max_duration > 0 and elapsed >= max_duration:
+                    self.logger.info(f"Sampled only the first {max_duration:g} seconds of the GIF.")
+                    break
+                img.seek(index)
+                frame_duration = (img.info.get("duration") or self._DEFAULT_GIF_FRAME_MS) / 1000
+                shown_until = elapsed + frame_duration
+                if max_duration > 0:
+                    shown_until = min(shown_until, max_duration)
+                ticks = math.ceil(shown_until * fps - 1e-9) - math.ceil(elapsed * fps - 1e-9)
+                elapsed = shown_until
+                sampling["duration"] = elapsed
+                if ticks > 0:
+                    frame = self._downscale_frame(np.asarray(img.convert("RGB")))
+                    yield self._pad_to_even_size(frame), ticks
+
+    def _downscale_frame(self, frame: np.ndarray) -> np.ndarray:
+        """Downscales a frame to the configured maximum dimension.
+
+        The frame is shrunk by a whole factor, averaging each block of
+        pixels in one array operation.
+
+        Args:
+            frame: The frame as a `(height, width, channels)` array.
+
+        Returns:
+            The downscaled frame.
+        """
+        max_dimension = self.config.MEDIA_NORMALIZATION_MAX_DIMENSION
+        height, width, channels = frame.shape
+        if max_dimension <= 0 or max(height, width) <= max_dimension:
+            return frame
+        factor = math.ceil(max(height, width) / max_dimension)
+        if min(height, width) < factor:
+            frame = np.pad(frame, ((0, max(0, factor - height)), (0, max(0, factor - width)), (0, 0)), mode="edge")
+        height, width = frame.shape[0] // factor, frame.shape[1] // factor
+        blocks = frame[: height * factor, : width * factor].reshape(height, factor, width, factor, channels)
+        block_means: np.ndarray = blocks.mean(axis=(1, 3), dtype=np.float32)
+        return (block_means + 0.5).astype(np.uint8)
+
+    @staticmethod
+    def _pad_to_even_size(frame: np.ndarray) -> np.ndarray:
+        """Repeats the last row and column of a frame to make its size even.
+
+        H.264 with 4:2:0 chroma needs an even width and height.
+
+        Args:
+            frame: The frame as a `(height, width, channels)` array.
+
+        Returns:
+            The frame, with an even height and width.
+        """
+        height, width = frame.shape[:2]
+        if height % 2 == 0 and width % 2 == 0:
+            return frame
+        return np.pad(frame, ((0, height % 2), (0, width % 2), (0, 0)), mode="edge")
+
+    def _select_keyframes(self, frames: Iterable[tuple[np.ndarray, int]]) -> Iterator[tuple[np.ndarray, int]]:
+        """Keeps the first frame and every frame that differs from the one before.
+
+        Args:
+            frames: The sampled frames and the ticks each is shown for.
+
+        Yields:
+            Each keyframe, shown for a single tick.
+        """
+        previous_frame = None
+        for frame, _ticks in frames:
+            if previous_frame is None or (
+                np.abs(frame.astype(np.int16) - previous_frame.astype(np.int16)).mean()
+                > self._KEYFRAME_DIFFERENCE_THRESHOLD
+            ):
+                yield frame, 1
+            previous_frame = frame
+
+    def _write_mp4(self, frames: Iterable[tuple[np.ndarray, int]], fps: float) -> tuple[bytes, int]:
+        """Encodes RGB frames as an H.264 MP4, streaming them to ffmpeg.
+
+        Args:
+            frames: Each frame as a `(height, width, 3)` array with an even
+                height and width, and the number of ticks it is shown for.
+            fps: The frame rate of the video.
+
+        Returns:
+            The content of the MP4 file, and the number of frames it holds.
+
+        Raises:
+            ValueError: If there are no frames to encode.
+            RuntimeError: If ffmpeg did not write the MP4 file.
+        """
+        frame_count = 0
+        with tempfile.TemporaryDirectory() as td:
+            out_path = Path(td) / "output.mp4"
+            writer = None
+            try:
+                for frame, ticks in frames:
+                    if writer is None:
+                        writer = imageio_ffmpeg.write_frames(
+                            str(out_path),
+                            (frame.shape[1], frame.shape[0]),
+                            fps=fps,
+                            codec="libx264",
+                            pix_fmt_out="yuv420p",
+                            macro_block_size=2,
+                            ffmpeg_log_level="error",
+                        )
+                        writer.send(None)
+                    contiguous_frame = np.ascontiguousarray(frame)
+                    for _ in range(ticks):
+                        writer.send(contiguous_frame)
+                    frame_count += ticks
+            finally:
+                if writer is not None:
+                    writer.close()
+            if frame_count == 0:
+                raise ValueError("The GIF has no frames.")
+            if not out_path.exists():
+                raise RuntimeError(f"ffmpeg did not write the MP4 file for {frame_count} frames.")
+            return out_path.read_bytes(), frame_count
+
+    def normalize_image(self, image_content: bytes, name: str) -> bytes:
+        """Downscales an image beyond the configured maximum dimension.
+
+        Images within the limit, and images Pillow cannot read, are returned
+        unchanged. The result keeps the format of the input.
+
+        Args:
+            image_content: The content of the image.
+            name: The name of the file, used in the normalization report.
+
+        Returns:
+            The content of the normalized image.
+        """
+        max_dimension = self.config.MEDIA_NORMALIZATION_MAX_DIMENSION
+        if max_dimension <= 0:
+            return image_content
+        try:
+            with Image.open(io.BytesIO(image_content)) as img:
+                original_size = img.size
+                if max(original_size) <= max_dimension:
+                    return image_content
+                image_format = img.format or "PNG"
+                img.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+                with io.BytesIO() as output_buffer:
+                    img.save(output_buffer, format=image_format)
+                    normalized_content = output_buffer.getvalue()
+                normalized_size = img.size
+        except (OSError, ValueError, Image.DecompressionBombError) as e:
+            self.logger.warning(f"Could not normalize image {name}, keeping it as is: {e}")
+            return image_content
+
+        self._log_normalization(
+            name,
+            len(image_content),
+            len(normalized_content),
+            estimate_image_tokens(*original_size),
+            estimate_image_tokens(*normalized_size),
+        )
+        return normalized_content
+
+    def _log_normalization(
+        self, name: str, original_size: int, normalized_size: int, original_tokens: int, normalized_tokens: int
+    ) -> None:
+        """Logs how much a normalization reduced a file.
+
+        Args:
+            name: The name of the file.
+            original_size: The size of the file before normalization, in bytes.
+            normalized_size: The size of the file after normalization, in bytes.
+            original_tokens: The estimated tokens of the file before normalization.
+            normalized_tokens: The estimated tokens of the file after normalization.
+        """
+        self.logger.info(
+            f"Normalized {name}: {original_size} -> {normalized_size} bytes "
+            f"({1 - normalized_size / max(original_size, 1):.0%} smaller), "
+            f"~{original_tokens} -> ~{normalized_tokens} estimated tokens."
+        )
+
     def bmp_to_png(self, bmp_content: bytes) -> bytes:
         """Converts a BMP file content to a PNG file content.
 
+        A result cached for the same BMP and Pillow version is reused.
+
+        Args:
+            bmp_content: The content of the BMP file.
+
+        Returns:
+            The content of the converted PNG file.
+        """
+        if self.conversion_cache is None:
+            return self._bmp_to_png(bmp_content)
+        return cast(
+            bytes,
+            self.conversion_cache.get_or_convert(
+                bmp_content, ".bmp", "png", f"pillow {PIL.__version__}", lambda: self._bmp_to_png(bmp_content)
+            ),
+        )
+
+    def _bmp_to_png(self, bmp_content: bytes) -> bytes:
+        """Converts a BMP file content to a PNG file content with Pillow.
+
         Args:
             bmp_content: The content of the BMP file.
 
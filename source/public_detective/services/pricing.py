@@ -70,6 +70,19 @@ class PricingService:
 
         raise ValueError(f"Unknown modality or context combination: {modality}, {is_long_context}")
 
+    def _get_cached_input_cost_per_million(self, is_long_context: bool) -> Decimal:
+        """Determines the cost per million input tokens read from a context cache.
+
+        Args:
+            is_long_context: A flag indicating if the context is long.
+
+        Returns:
+            The cost per million cached input tokens.
+        """
+        if is_long_context:
+            return cast(Decimal, self.config.GCP_GEMINI_CACHED_INPUT_LONG_COST)
+        return cast(Decimal, self.config.GCP_GEMINI_CACHED_INPUT_COST)
+
     def _get_output_cost_per_million(self, is_long_context: bool) -> Decimal:
         """Determines the output cost per million tokens based on context length.
 
@@ -103,15 +116,19 @@ class PricingService:
         thinking_tokens: int,
         modality: Modality,
         search_queries_count: int = 0,
+        cached_input_tokens: int = 0,
     ) -> tuple[Decimal, Decimal, Decimal, Decimal, Decimal]:
         """Calculates the cost of an analysis based on token counts and pricing.
 
         Args:
-            input_tokens: The number of input tokens used.
+            input_tokens: The number of input tokens used, including the
+                ones read from a context cache.
             output_tokens: The number of output tokens used.
             thinking_tokens: The number of thinking tokens used.
             modality: The modality of the analysis.
             search_queries_count: The number of search queries performed.
+            cached_input_tokens: The part of `input_tokens` read from a
+                context cache, billed at the cached input rate.
 
         Returns:
             A tuple containing the input cost, output cost, thinking cost,
@@ -120,7 +137,10 @@ class PricingService:
         is_long_context = input_tokens > 200_000
 
         input_cost_per_million = self._get_input_cost_per_million(modality, is_long_context)
-        input_cost = self._calculate_cost(input_tokens, input_cost_per_million)
+        cached_input_tokens = min(cached_input_tokens, input_tokens)
+        input_cost = self._calculate_cost(input_tokens - cached_input_tokens, input_cost_per_million)
+        cached_input_cost_per_million = self._get_cached_input_cost_per_million(is_long_context)
+        input_cost += self._calculate_cost(cached_input_tokens, cached_input_cost_per_million)
 
         output_cost_per_million = self._get_output_cost_per_million(is_long_context)
         output_cost = self._calculate_cost(output_tokens, output_cost_per_million)
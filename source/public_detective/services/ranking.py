@@ -105,8 +105,10 @@ class RankingService:
         score = 100
         penalty_points = {
             ExclusionReason.EXTRACTION_FAILED: 20,
+            ExclusionReason.EXTRACTION_LIMIT_EXCEEDED: 20,
             ExclusionReason.CONVERSION_FAILED: 15,
             ExclusionReason.UNSUPPORTED_EXTENSION: 10,
+            ExclusionReason.FILE_TOO_LARGE: 10,
             ExclusionReason.LOCK_FILE: 5,
             ExclusionReason.TOKEN_LIMIT_EXCEEDED: 5,
         }
@@ -0,0 +1,159 @@
+"""This module provides a token accounting layer over the AI provider."""
+
+import threading
+from collections import OrderedDict
+from mimetypes import guess_type
+
+from public_detective.providers.ai import AiProvider
+from public_detective.providers.config import ConfigProvider
+from public_detective.repositories.token_counts import TokenCountsRepository
+
+
+class TokenCounter:
+    """Counts the tokens of prompts and files, counting each file only once.
+
+    The tokens of a request are taken as the tokens of its prompt plus the
+    tokens of each file counted alone, so a selection of files can be sized
+    by adding up counts locally and checked with a single request at the
+    end. File counts are memoized per GCS URI, keeping the most recently
+    used ones up to a fixed number of entries.
+
+    When the hash of a file's content is registered and the token count
+    repository is available, counts also persist across runs: a content
+    already counted by the configured model, under the same MIME type, is
+    never sent to be counted again, wherever it is stored.
+    """
+
+    _MAX_MEMOIZED_URIS = 10_000
+
+    ai_provider: AiProvider
+    token_count_repo: TokenCountsRepository | None
+    model: str
+    _uri_counts: "OrderedDict[str, int]"
+    _uri_hashes: dict[str, str]
+    _lock: threading.Lock
+
+    def __init__(self, ai_provider: AiProvider, token_count_repo: TokenCountsRepository | None = None) -> None:
+        """Initializes the counter.
+
+        Args:
+            ai_provider: The provider that counts tokens with the AI model.
+            token_count_repo: The repository of the persistent token count
+                cache. Without it, counts only live as long as the counter.
+        """
+        self.ai_provider = ai_provider
+        self.token_count_repo = token_count_repo
+        self.model = ConfigProvider.get_config().GCP_GEMINI_MODEL
+        self._uri_counts = OrderedDict()
+        self._uri_hashes = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def get_mime_type(file_uri: str) -> str:
+        """Returns the MIME type a file is sent to the model under.
+
+        Args:
+            file_uri: The GCS URI of the file.
+
+        Returns:
+            The MIME type guessed from the file's extension.
+        """
+        return guess_type(file_uri)[0] or "application/octet-stream"
+
+    def register_contents(self, uri_hashes: dict[str, str]) -> None:
+        """Records the content hash of files and loads their stored counts.
+
+        The counts already stored for these contents are fetched in a single
+        query and memoized, and the files counted later are saved under
+        their hash.
+
+        Args:
+            uri_hashes: A dictionary mapping GCS URIs to the SHA-256 of the
+                content stored at each of them.
+        """
+        with self._lock:
+            uri_hashes = {uri: content_hash for uri, content_hash in uri_hashes.items() if uri not in self._uri_counts}
+        if not self.token_count_repo or not uri_hashes:
+            return
+        uri_contents = {uri: (content_hash, self.get_mime_type(uri)) for uri, content_hash in uri_hashes.items()}
+        stored_counts = self.token_count_repo.get_token_counts(self.model, list(set(uri_contents.values())))
+        for uri, content in uri_contents.items():
+            if content in stored_counts:
+                self.remember(uri, int(stored_counts[content]))
+            else:
+                with self._lock:
+                    self._uri_hashes[uri] = content[0]
+
+    def count_prompt(self, prompt: str) -> int:
+        """Counts the tokens of a prompt without files.
+
+        Args:
+            prompt: The prompt text.
+
+        Returns:
+            The number of tokens of the prompt.
+        """
+        tokens, _, _ = self.ai_provider.count_tokens_for_analysis(prompt, [])
+        return int(tokens)
+
+    def count_files(self, file_uris: list[str]) -> int:
+        """Counts the tokens a set of files adds to a request.
+
+        Args:
+            file_uris: The GCS URIs of the files.
+
+        Returns:
+            The sum of the tokens of each file.
+        """
+        return sum(self.count_file(file_uri) for file_uri in file_uris)
+
+    def count_file(self, file_uri: str) -> int:
+        """Counts the tokens of a file, asking the model only the first time.
+
+        A file whose content hash was registered is saved to the persistent
+        cache once counted.
+
+        Args:
+            file_uri: The GCS URI of the file.
+
+        Returns:
+            The number of tokens of the file.
+        """
+        with self._lock:
+            if file_uri in self._uri_counts:
+                self._uri_counts.move_to_end(file_uri)
+                return self._uri_counts[file_uri]
+
+        tokens = int(self.ai_provider.count_tokens_for_file(file_uri))
+        self.remember(file_uri, tokens)
+        with self._lock:
+            content_hash = self._uri_hashes.pop(file_uri, None)
+        if self.token_count_repo and content_hash:
+            self.token_count_repo.save_token_count(self.model, content_hash, self.get_mime_type(file_uri), tokens)
+        return tokens
+
+    def remember(self, file_uri: str, tokens: int) -> None:
+        """Memoizes the token count of a file known from elsewhere.
+
+        Args:
+            file_uri: The GCS URI of the file.
+            tokens: The number of tokens of the file.
+        """
+        with self._lock:
+            self._uri_counts[file_uri] = tokens
+            self._uri_counts.move_to_end(file_uri)
+            while len(self._uri_counts) > self._MAX_MEMOIZED_URIS:
+                self._uri_counts.popitem(last=False)
+
+    def count_request(self, prompt: str, file_uris: list[str]) -> int:
+        """Counts the exact tokens of a prompt sent with a set of files.
+
+        Args:
+            prompt: The prompt text.
+            file_uris: The GCS URIs of the files.
+
+        Returns:
+            The number of input tokens of the request.
+        """
+        tokens, _, _ = self.ai_provider.count_tokens_for_analysis(prompt, file_uris)
+        return int(tokens)
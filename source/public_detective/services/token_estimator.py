@@ -0,0 +1,272 @@
+"""This module provides a local, offline estimator of input tokens.
+
+Pre-analysis only counts tokens to price and rank procurements, and the
+ranking does not need exact counts. The estimator sizes each file from what
+drives its tokens in Gemini: the pages of a PDF, the characters of a text,
+the pixels of an image and the duration of an audio or video. The estimates
+are then scaled by a factor calibrated against the input tokens of earlier
+analyses whose count is exact.
+"""
+
+import io
+import math
+import os
+import re
+import subprocess  # nosec B404
+import tempfile
+import threading
+import wave
+import zlib
+
+import imageio_ffmpeg
+from PIL import Image
+from public_detective.models.candidates import AIFileCandidate
+from public_detective.providers.config import Config
+from public_detective.providers.logging import Logger, LoggingProvider
+from public_detective.repositories.analyses import AnalysisRepository
+
+TOKENS_PER_TILE = 258
+TOKENS_PER_PDF_PAGE = 258
+TOKENS_PER_AUDIO_SECOND = 32
+CHARACTERS_PER_TOKEN = 4
+
+_PDF_PAGE_PATTERN = re.compile(rb"/Type\s*/Page(?![A-Za-z])")
+_PDF_PAGE_COUNT_PATTERN = re.compile(rb"/Type\s*/Pages\b[^>]*?/Count\s+(\d+)|/Count\s+(\d+)[^>]*?/Type\s*/Pages\b")
+_PDF_STREAM_PATTERN = re.compile(rb"stream\r?\n(.*?)endstream", re.DOTALL)
+_FFMPEG_DURATION_PATTERN = re.compile(r"Duration:\s*(\d+):(\d{2}):(\d{2}(?:\.\d+)?)")
+
+
+def estimate_image_tokens(width: int, height: int) -> int:
+    """Estimates the tokens Gemini bills for an image.
+
+    Images up to 384 pixels on both sides cost a single tile; larger images
+    are cropped into 768x768 tiles.
+
+    Args:
+        width: The width of the image, in pixels.
+        height: The height of the image, in pixels.
+
+    Returns:
+        The estimated number of tokens.
+    """
+    if width <= 384 and height <= 384:
+        return TOKENS_PER_TILE
+    return math.ceil(width / 768) * math.ceil(height / 768) * TOKENS_PER_TILE
+
+
+def estimate_video_tokens(duration: float) -> int:
+    """Estimates the tokens Gemini bills for a silent video.
+
+    Gemini samples videos at one frame per second.
+
+    Args:
+        duration: The duration of the video, in seconds.
+
+    Returns:
+        The estimated number of tokens.
+    """
+    return max(1, math.ceil(duration)) * TOKENS_PER_TILE
+
+
+def count_pdf_pages(content: bytes) -> int:
+    """Counts the pages of a PDF without parsing it.
+
+    Page objects are looked up in the raw bytes first, then in the
+    compressed streams, where PDF 1.5 files keep them.
+
+    Args:
+        content: The content of the PDF.
+
+    Returns:
+        The number of pages, or 0 if none could be found.
+    """
+    pages = _count_pdf_pages_in(content)
+    if pages:
+        return pages
+    for match in _PDF_STREAM_PATTERN.finditer(content):
+        try:
+            pages += _count_pdf_pages_in(zlib.decompress(match.group(1)))
+        except zlib.error:
+            continue
+    return pages
+
+
+def _count_pdf_pages_in(data: bytes) -> int:
+    """Counts the pages declared in a chunk of PDF syntax.
+
+    Args:
+        data: The raw or decompressed PDF syntax.
+
+    Returns:
+        The page count of the largest page tree, or else the number of page
+        objects.
+    """
+    page_tree_counts = [int(first or second) for first, second in _PDF_PAGE_COUNT_PATTERN.findall(data)]
+    if page_tree_counts:
+        return max(page_tree_counts)
+    return len(_PDF_PAGE_PATTERN.findall(data))
+
+
+class TokenEstimator:
+    """Estimates the input tokens of an analysis from the files' content."""
+
+    _IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp", ".gif", ".bmp")
+    _AUDIO_EXTENSIONS = (".mp3", ".wav", ".ogg", ".flac", ".aac", ".m4a")
+    _VIDEO_EXTENSIONS = (".mp4", ".mov", ".webm", ".avi", ".mpeg", ".mpg")
+
+    analysis_repo: AnalysisRepository
+    config: Config
+    logger: Logger
+    _calibration_factor: float | None
+    _lock: threading.Lock
+
+    def __init__(self, analysis_repo: AnalysisRepository, config: Config) -> None:
+        """Initializes the estimator.
+
+        Args:
+            analysis_repo: The repository the calibration samples are read from.
+            config: The application configuration.
+        """
+        self.analysis_repo = analysis_repo
+        self.config = config
+        self.logger = LoggingProvider().get_logger()
+        self._calibration_factor = None
+        self._lock = threading.Lock()
+
+    def estimate_prompt(self, prompt: str) -> int:
+        """Estimates the tokens of a prompt from its characters.
+
+        Args:
+            prompt: The prompt text.
+
+        Returns:
+            The estimated number of tokens.
+        """
+        return math.ceil(len(prompt) / CHARACTERS_PER_TOKEN)
+
+    def estimate_candidate(self, candidate: AIFileCandidate) -> int:
+        """Estimates the tokens a candidate adds to an analysis.
+
+        A candidate reusing a converted stored content does not hold the
+        converted file locally, so the estimate saved with the content is
+        used whenever the candidate carries one.
+
+        Args:
+            candidate: The candidate to estimate.
+
+        Returns:
+            The estimated number of tokens.
+        """
+        if candidate.estimated_tokens is not None:
+            return int(candidate.estimated_tokens)
+        if isinstance(candidate.ai_content, list):
+            return sum(self.estimate_file(candidate.ai_path, part) for part in candidate.ai_content)
+        return self.estimate_file(candidate.ai_path, candidate.ai_content)
+
+    def estimate_file(self, path: str, content: bytes) -> int:
+        """Estimates the tokens of a file sent to the AI model.
+
+        Files of unknown type, or whose measure cannot be read, are estimated
+        as text.
+
+        Args:
+            path: The path of the file, whose extension tells its type.
+            content: The content of the file.
+
+        Returns:
+            The estimated number of tokens.
+        """
+        ext = os.path.splitext(path)[1].lower()
+        if ext == ".pdf":
+            pages = count_pdf_pages(content)
+            if pages:
+                return pages * TOKENS_PER_PDF_PAGE
+        elif ext in self._IMAGE_EXTENSIONS:
+            try:
+                with Image.open(io.BytesIO(content)) as image:
+                    return estimate_image_tokens(*image.size)
+            except Exception as e:
+                self.logger.debug(f"Could not read the dimensions of {path}: {e}")
+        elif ext in self._AUDIO_EXTENSIONS or ext in self._VIDEO_EXTENSIONS:
+            duration = self._get_duration(content, ext)
+            if duration is not None:
+                if ext in self._AUDIO_EXTENSIONS:
+                    return max(1, math.ceil(duration)) * TOKENS_PER_AUDIO_SECOND
+                return estimate_video_tokens(duration)
+        return math.ceil(len(content.decode("utf-8", errors="replace")) / CHARACTERS_PER_TOKEN)
+
+    def _get_duration(self, content: bytes, ext: str) -> float | None:
+        """Reads the duration of an audio or video file.
+
+        WAV files are read from their header. Other files are probed with
+        `ffmpeg -i`, whose report gives the duration of the container
+        whether or not it holds a video stream.
+
+        Args:
+            content: The content of the file.
+            ext: The extension of the file, with its leading dot.
+
+        Returns:
+            The duration in seconds, or `None` if it could not be read.
+        """
+        if ext == ".wav":
+            try:
+                with wave.open(io.BytesIO(content)) as wav_file:
+                    return float(wav_file.getnframes() / wav_file.getframerate())
+            except (wave.Error, EOFError, ZeroDivisionError) as e:
+                self.logger.debug(f"Could not read the WAV header, probing with FFmpeg: {e}")
+        with tempfile.NamedTemporaryFile(suffix=ext) as media_file:
+            media_file.write(content)
+            media_file.flush()
+            try:
+                completed = subprocess.run(  # nosec B603
+                    [imageio_ffmpeg.get_ffmpeg_exe(), "-hide_banner", "-nostdin", "-i", media_file.name],
+                    capture_output=True,
+                    text=True,
+                    errors="replace",
+                    timeout=30,
+                )
+            except (OSError, RuntimeError, subprocess.SubprocessError) as e:
+                self.logger.debug(f"Could not read the duration of a {ext} file: {e}")
+                return None
+        match = _FFMPEG_DURATION_PATTERN.search(completed.stderr)
+        if not match:
+            self.logger.debug(f"FFmpeg reported no duration for a {ext} file.")
+            return None
+        hours, minutes, seconds = match.groups()
+        return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+    def get_calibration_factor(self) -> float:
+        """Returns the ratio of exact to estimated tokens in earlier analyses.
+
+        The factor is computed once per estimator from the most recent
+        analyses with both an exact input token count and an estimate, and
+        is 1.0 until there are any.
+
+        Returns:
+            The factor estimates are multiplied by.
+        """
+        with self._lock:
+            if self._calibration_factor is None:
+                samples = self.analysis_repo.get_token_estimation_samples(
+                    self.config.TOKEN_ESTIMATION_CALIBRATION_SAMPLES
+                )
+                estimated_tokens = sum(estimated for estimated, _ in samples)
+                exact_tokens = sum(exact for _, exact in samples)
+                self._calibration_factor = exact_tokens / estimated_tokens if estimated_tokens else 1.0
+                self.logger.info(
+                    f"Token estimates calibrated with a factor of {self._calibration_factor:.3f} "
+                    f"from {len(samples)} analyses."
+                )
+            return self._calibration_factor
+
+    def calibrate(self, estimated_tokens: int) -> int:
+        """Scales a raw estimate by the calibration factor.
+
+        Args:
+            estimated_tokens: The raw estimate.
+
+        Returns:
+            The calibrated estimate.
+        """
+        return math.ceil(estimated_tokens * self.get_calibration_factor())
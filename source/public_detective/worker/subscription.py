@@ -5,13 +5,20 @@ listening to a Pub/Sub topic, processing messages, and managing the
 message lifecycle (ACK/NACK). The worker is designed to be robust,
 handling JSON validation, graceful shutdowns, and providing hooks for
 debugging.
+
+By default each message is processed on a thread of the Pub/Sub client. In
+async mode (`WORKER_ASYNC_MODE`), messages are handed to an event loop
+instead: the model call is awaited on the async Gemini client, bounded by a
+semaphore separate from the Pub/Sub flow control, while database, storage
+and HTTP work runs on a small thread pool.
 """
 
+import asyncio
 import json
 import threading
 import uuid
 from collections.abc import Generator
-from concurrent.futures import TimeoutError
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError, wait
 from contextlib import contextmanager
 
 from google.api_core.exceptions import GoogleAPICallError
@@ -50,11 +57,16 @@ class Subscription:
     logger: Logger
     analysis_service: AnalysisService
     procurement_repo: ProcurementsRepository
+    http_provider: HttpProvider
     processed_messages_count: int
     streaming_pull_future: StreamingPullFuture | None
     pubsub_provider: PubSubProvider
     _stop_event: threading.Event
     _processing_complete_event: threading.Event | None
+    _loop: asyncio.AbstractEventLoop | None
+    _loop_thread: threading.Thread | None
+    _ai_semaphore: asyncio.Semaphore | None
+    _pending_messages: set[Future]
 
     def __init__(
         self,
@@ -84,6 +96,7 @@ class Subscription:
         if analysis_service:
             self.analysis_service = analysis_service
             self.procurement_repo = self.analysis_service.procurement_repo
+            self.http_provider = self.analysis_service.http_provider
         else:
             db_engine = DatabaseManager.get_engine()
             gcs_provider = GcsProvider()
@@ -91,6 +104,7 @@ class Subscription:
             ai_provider = AiProvider(Analysis, no_ai_tools=no_ai_tools)
 
             http_provider = HttpProvider()
+            self.http_provider = http_provider
             analysis_repo = AnalysisRepository(engine=db_engine)
             source_document_repo = SourceDocumentsRepository(engine=db_engine)
             file_record_repo = FileRecordsRepository(engine=db_engine)
@@ -117,6 +131,10 @@ class Subscription:
         self.streaming_pull_future = None
         self._stop_event = threading.Event()
         self._lock = threading.Lock()
+        self._loop = None
+        self._loop_thread = None
+        self._ai_semaphore = None
+        self._pending_messages = set()
 
     @contextmanager
     def _debug_context(self, message: Message) -> Generator[None, None, None]:
@@ -157,6 +175,54 @@ class Subscription:
         except EOFError:
             self.logger.debug("No TTY available; skipping pause.")
 
+    def _log_connection_stats(self) -> None:
+        """Logs how many HTTP requests reused a pooled connection so far."""
+        stats = self.http_provider.get_connection_stats()
+        self.logger.info(
+            f"HTTP connection reuse: {stats['requests']} requests over "
+            f"{stats['connections']} connections ({stats['reused']} reused)."
+        )
+
+    def _read_message(self, message: Message) -> tuple[str, str] | None:
+        """Decodes a message and looks up the analysis it requests.
+
+        Messages whose analysis does not exist are NACKed here.
+
+        Args:
+            message: The Pub/Sub message to read.
+
+        Returns:
+            The analysis ID and the procurement control number, or `None` if
+            the analysis was not found.
+        """
+        message_data = json.loads(message.data.decode())
+        analysis_id = message_data["analysis_id"]
+
+        analysis = self.analysis_service.analysis_repo.get_analysis_by_id(analysis_id)
+        if not analysis:
+            self.logger.error(
+                f"Analysis with ID {analysis_id} not found in message {message.message_id}. Sending NACK."
+            )
+            message.nack()
+            return None
+        return analysis_id, analysis.procurement_control_number
+
+    def _nack_failed_message(self, message: Message, error: Exception) -> None:
+        """Logs why a message could not be processed and NACKs it.
+
+        Args:
+            message: The Pub/Sub message that failed.
+            error: The error raised while processing it.
+        """
+        message_id = message.message_id
+        if isinstance(error, (json.JSONDecodeError, ValidationError)):
+            self.logger.error(f"Validation/decoding failed for message {message_id}. Sending NACK.", exc_info=error)
+        elif isinstance(error, AnalysisError):
+            self.logger.error(f"Analysis service error processing message {message_id}: {error}", exc_info=error)
+        else:
+            self.logger.critical(f"Critical unexpected error processing message {message_id}: {error}", exc_info=error)
+        message.nack()
+
     def _process_message(self, message: Message, max_output_tokens: int | None = None) -> None:
         """Decodes, validates, analyzes the message, and manages ACK/NACK.
 
@@ -166,17 +232,10 @@ class Subscription:
         """
         message_id = message.message_id
         try:
-            data_str = message.data.decode()
-            message_data = json.loads(data_str)
-            analysis_id = message_data["analysis_id"]
-
-            analysis = self.analysis_service.analysis_repo.get_analysis_by_id(analysis_id)
-            if not analysis:
-                self.logger.error(f"Analysis with ID {analysis_id} not found in message {message_id}. Sending NACK.")
-                message.nack()
+            read = self._read_message(message)
+            if read is None:
                 return
-
-            procurement_id = analysis.procurement_control_number
+            analysis_id, procurement_id = read
             correlation_id = f"{procurement_id}:{analysis_id}:{uuid.uuid4().hex[:8]}"
 
             with LoggingProvider().set_correlation_id(correlation_id):
@@ -190,30 +249,112 @@ class Subscription:
                 self.logger.info(
                     f"Message {message_id} for procurement {procurement_id} processed successfully. Sending ACK."
                 )
+                self._log_connection_stats()
                 message.ack()
 
-        except (json.JSONDecodeError, ValidationError):
-            self.logger.error(
-                f"Validation/decoding failed for message {message_id}. Sending NACK.",
-                exc_info=True,
-            )
-            message.nack()
-        except AnalysisError as e:
-            self.logger.error(
-                f"Analysis service error processing message {message_id}: {e}",
-                exc_info=True,
-            )
-            message.nack()
         except Exception as e:
-            self.logger.critical(
-                f"Critical unexpected error processing message {message_id}: {e}",
-                exc_info=True,
-            )
-            message.nack()
+            self._nack_failed_message(message, e)
+        finally:
+            if self._processing_complete_event:
+                self._processing_complete_event.set()
+
+    async def _process_message_async(self, message: Message, max_output_tokens: int | None = None) -> None:
+        """Processes a message on the worker's event loop and manages ACK/NACK.
+
+        Args:
+            message: The Pub/Sub message to process.
+            max_output_tokens: An optional token limit for the AI analysis.
+        """
+        assert self._ai_semaphore is not None
+        message_id = message.message_id
+        try:
+            read = await asyncio.to_thread(self._read_message, message)
+            if read is None:
+                return
+            analysis_id, procurement_id = read
+            correlation_id = f"{procurement_id}:{analysis_id}:{uuid.uuid4().hex[:8]}"
+
+            with LoggingProvider().set_correlation_id(correlation_id):
+                self.logger.info(
+                    f"Received message ID: {message_id} for procurement {procurement_id} "
+                    f"(analysis_id: {analysis_id}). Attempting to process..."
+                )
+
+                await self.analysis_service.process_analysis_from_message_async(
+                    analysis_id, self._ai_semaphore, max_output_tokens=max_output_tokens
+                )
+
+                self.logger.info(
+                    f"Message {message_id} for procurement {procurement_id} processed successfully. Sending ACK."
+                )
+                self._log_connection_stats()
+                message.ack()
+
+        except Exception as e:
+            self._nack_failed_message(message, e)
         finally:
             if self._processing_complete_event:
                 self._processing_complete_event.set()
 
+    def _submit_message(self, message: Message, max_output_tokens: int | None = None) -> None:
+        """Schedules a message on the worker's event loop without waiting for it.
+
+        The message stays leased, and counted by the Pub/Sub flow control,
+        until it is ACKed or NACKed on the loop.
+
+        Args:
+            message: The Pub/Sub message to process.
+            max_output_tokens: An optional token limit for the AI analysis.
+        """
+        assert self._loop is not None
+        future = asyncio.run_coroutine_threadsafe(self._process_message_async(message, max_output_tokens), self._loop)
+        with self._lock:
+            self._pending_messages.add(future)
+        future.add_done_callback(self._forget_message)
+
+    def _forget_message(self, future: Future) -> None:
+        """Stops tracking a scheduled message once it is done.
+
+        Args:
+            future: The future of the finished message.
+        """
+        with self._lock:
+            self._pending_messages.discard(future)
+
+    def _start_event_loop(self) -> None:
+        """Starts the event loop of the async mode on a background thread."""
+        loop = asyncio.new_event_loop()
+        loop.set_default_executor(
+            ThreadPoolExecutor(max_workers=self.config.WORKER_ASYNC_IO_THREADS, thread_name_prefix="worker-io")
+        )
+        self._ai_semaphore = asyncio.Semaphore(self.config.WORKER_ASYNC_MAX_AI_CALLS)
+        self._loop_thread = threading.Thread(target=loop.run_forever, name="worker-event-loop", daemon=True)
+        self._loop_thread.start()
+        self._loop = loop
+
+    def _stop_event_loop(self) -> None:
+        """Waits for the scheduled messages, then stops and closes the event loop.
+
+        Pub/Sub callbacks still running when the streaming pull stops may
+        schedule further messages, so the pending set is drained until empty.
+        """
+        loop, loop_thread = self._loop, self._loop_thread
+        if loop is None or loop_thread is None:
+            return
+        while True:
+            with self._lock:
+                pending = list(self._pending_messages)
+            if not pending:
+                break
+            wait(pending)
+        asyncio.run_coroutine_threadsafe(loop.shutdown_default_executor(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        loop_thread.join()
+        loop.close()
+        self._loop = None
+        self._loop_thread = None
+        self._ai_semaphore = None
+
     def _message_callback(
         self,
         message: Message,
@@ -242,7 +383,10 @@ class Subscription:
                 if self.streaming_pull_future:
                     self.streaming_pull_future.cancel()
 
-        self._process_message(message, max_output_tokens)
+        if self._loop is not None:
+            self._submit_message(message, max_output_tokens)
+        else:
+            self._process_message(message, max_output_tokens)
 
     def run(
         self,
@@ -274,18 +418,32 @@ class Subscription:
             """
             self._message_callback(message, max_messages, max_output_tokens)
 
+        async_mode = self.config.WORKER_ASYNC_MODE
+        if async_mode:
+            max_concurrency = self.config.WORKER_ASYNC_MAX_MESSAGES
+            self._start_event_loop()
+        else:
+            max_concurrency = self.config.WORKER_MAX_CONCURRENCY
+
         flow_control = FlowControl(
-            max_messages=self.config.WORKER_MAX_CONCURRENCY,
+            max_messages=max_concurrency,
         )
 
         self.streaming_pull_future = self.pubsub_provider.subscribe(
             subscription_name, callback, flow_control=flow_control
         )
 
-        self.logger.info(
-            f"Worker is now running, waiting for messages "
-            f"(max_concurrency: {self.config.WORKER_MAX_CONCURRENCY}, timeout: {timeout}s)..."
-        )
+        if async_mode:
+            self.logger.info(
+                f"Worker is now running in async mode, waiting for messages "
+                f"(max_concurrency: {max_concurrency}, "
+                f"max_ai_calls: {self.config.WORKER_ASYNC_MAX_AI_CALLS}, timeout: {timeout}s)..."
+            )
+        else:
+            self.logger.info(
+                f"Worker is now running, waiting for messages "
+                f"(max_concurrency: {max_concurrency}, timeout: {timeout}s)..."
+            )
 
         try:
             self.streaming_pull_future.result(timeout=timeout)
@@ -304,4 +462,6 @@ class Subscription:
                     self.streaming_pull_future.result(timeout=10)
                 except Exception:  # nosec B110
                     pass
+            self._stop_event_loop()
+            self._log_connection_stats()
             self.logger.info("Worker has stopped gracefully.")
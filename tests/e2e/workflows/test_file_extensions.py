@@ -566,7 +566,7 @@ def test_file_extension_processing(
     )
 
     # Mock the document processing to avoid actual HTTP calls
-    service.procurement_repo.process_procurement_documents = lambda p: [
+    service.procurement_repo.process_procurement_documents = lambda p, documents=None: [
         ProcessedFile(
             source_document_id=str(file_id),
             raw_document_metadata=mock_pncp_server.file_metadata[0],
@@ -144,6 +144,7 @@ def test_pre_analysis_flow_integration(db_session: Engine, mock_procurement: Pro
                 )
             ],
         ),
+        patch.object(procurement_repo, "get_all_documents_metadata", return_value=[]),
         patch.object(procurement_repo, "get_procurement_by_hash", return_value=False),
         patch.object(analysis_service, "_process_and_save_source_documents", return_value={}),
         patch.object(analysis_service, "_upload_and_save_initial_records"),
@@ -503,6 +503,8 @@ def test_pre_analysis_command_with_valid_dates(
         batch_size=batch_size,
         sleep_seconds=sleep_seconds,
         max_messages=None,
+        resume=False,
+        workers=1,
     )
 
     assert "Pre-analysis completed successfully!" in result.output
@@ -797,12 +799,16 @@ def test_prepare_progress_full_branches(
             self.added_descriptions.append(description)
             return task_id
 
-        def update(self, task_id: int, advance: int = 0, description: str | None = None) -> None:
+        def update(
+            self, task_id: int, advance: int = 0, description: str | None = None, total: int | None = None
+        ) -> None:
             task = self.tasks[task_id]
             if advance:
                 task.progress += advance
             if description:
                 task.description = description
+            if total is not None:
+                task.total = total
 
         def remove_task(self, task_id: int) -> None:
             if task_id in self.tasks:
@@ -865,6 +871,55 @@ def test_prepare_with_pncp_and_explicit_dates_fails() -> None:
     assert "cannot be used with --start-date or --end-date" in result.output
 
 
+@patch("public_detective.cli.analysis.AnalysisService")
+def test_prepare_with_workers_uses_process_pool(mock_analysis_service: MagicMock) -> None:
+    """Com --workers, o número de processos deve ser repassado ao serviço."""
+    runner = CliRunner()
+    cli = create_cli()
+    result = runner.invoke(cli, ["analysis", "prepare", "--workers", "4", "--no-progress"], color=False)
+    assert result.exit_code == 0, result.output
+    assert mock_analysis_service.return_value.run_pre_analysis.call_args.kwargs["workers"] == 4
+
+
+def test_prepare_with_invalid_workers_fails() -> None:
+    """--workers deve ser pelo menos 1."""
+    runner = CliRunner()
+    cli = create_cli()
+    result = runner.invoke(cli, ["analysis", "prepare", "--workers", "0"], color=False)
+    assert result.exit_code != 0
+
+
+def test_prepare_with_pncp_and_resume_fails() -> None:
+    """Quando --pncp-control-number é usado com --resume, deve falhar com UsageError."""
+    runner = CliRunner()
+    cli = create_cli()
+    result = runner.invoke(
+        cli,
+        ["analysis", "prepare", "--pncp-control-number", "BR-123", "--resume"],
+        color=False,
+    )
+    assert result.exit_code != 0
+    assert "cannot be used with --resume" in result.output
+
+
+@patch("public_detective.cli.analysis.PreAnalysisCheckpointRepository")
+@patch("public_detective.cli.analysis.AnalysisService")
+def test_prepare_with_resume_continues_from_checkpoint(
+    mock_analysis_service: MagicMock, mock_checkpoint_repo: MagicMock
+) -> None:
+    """Com --resume, o serviço deve receber resume=True e o repositório de checkpoints."""
+    runner = CliRunner()
+    cli = create_cli()
+    result = runner.invoke(
+        cli,
+        ["analysis", "prepare", "--start-date", "2025-01-01", "--end-date", "2025-01-30", "--resume", "--no-progress"],
+        color=False,
+    )
+    assert result.exit_code == 0, result.output
+    assert mock_analysis_service.call_args.kwargs["pre_analysis_checkpoint_repo"] is mock_checkpoint_repo.return_value
+    assert mock_analysis_service.return_value.run_pre_analysis.call_args.kwargs["resume"] is True
+
+
 @patch("public_detective.cli.analysis.AnalysisService")
 def test_prepare_with_only_pncp_calls_control_number_path(mock_analysis_service: MagicMock) -> None:
     """Quando somente --pncp-control-number é fornecido, deve chamar run_pre_analysis_by_control_number."""
@@ -958,3 +1013,69 @@ def test_retry_command_exception(
 
     assert "An error occurred while retrying analyses" in result.output
     assert result.exit_code != 0
+
+
+# --- Tests for 'gc-contents' command ---
+@patch("public_detective.cli.analysis.DatabaseManager")
+@patch("public_detective.cli.analysis.PubSubProvider")
+@patch("public_detective.cli.analysis.GcsProvider")
+@patch("public_detective.cli.analysis.AiProvider")
+@patch("public_detective.cli.analysis.HttpProvider")
+@patch("public_detective.cli.analysis.FileContentsRepository")
+@patch("public_detective.cli.analysis.AnalysisService")
+def test_gc_contents_command_success(
+    mock_analysis_service: MagicMock,
+    mock_file_content_repo: MagicMock,
+    mock_http_provider: MagicMock,  # noqa: F841
+    mock_ai_provider: MagicMock,  # noqa: F841
+    mock_gcs_provider: MagicMock,  # noqa: F841
+    mock_pubsub_provider: MagicMock,  # noqa: F841
+    mock_db_manager: MagicMock,  # noqa: F841
+) -> None:
+    """Tests that the gc-contents command collects contents with the given idle period."""
+    mock_analysis_service.return_value.collect_unused_file_contents.return_value = 4
+
+    runner = CliRunner()
+    result = runner.invoke(analysis_group, ["gc-contents", "--min-idle-days", "7"], color=False)
+
+    assert result.exit_code == 0, result.output
+    assert "Deleted 4 unused file contents." in result.output
+    mock_analysis_service.return_value.collect_unused_file_contents.assert_called_once_with(7)
+    assert mock_analysis_service.call_args.kwargs["file_content_repo"] is mock_file_content_repo.return_value
+
+
+@patch("public_detective.cli.analysis.DatabaseManager")
+@patch("public_detective.cli.analysis.PubSubProvider")
+@patch("public_detective.cli.analysis.GcsProvider")
+@patch("public_detective.cli.analysis.AiProvider")
+@patch("public_detective.cli.analysis.HttpProvider")
+@patch("public_detective.cli.analysis.FileContentsRepository")
+@patch("public_detective.cli.analysis.AnalysisService")
+def test_gc_contents_command_exception(
+    mock_analysis_service: MagicMock,
+    mock_file_content_repo: MagicMock,  # noqa: F841
+    mock_http_provider: MagicMock,  # noqa: F841
+    mock_ai_provider: MagicMock,  # noqa: F841
+    mock_gcs_provider: MagicMock,  # noqa: F841
+    mock_pubsub_provider: MagicMock,  # noqa: F841
+    mock_db_manager: MagicMock,  # noqa: F841
+) -> None:
+    """Tests that the gc-contents command aborts when the collection fails."""
+    mock_analysis_service.return_value.collect_unused_file_contents.side_effect = Exception("boom")
+
+    runner = CliRunner()
+    result = runner.invoke(analysis_group, ["gc-contents"], color=False)
+
+    assert "An error occurred: boom" in result.output
+    assert result.exit_code != 0
+
+
+@patch("public_detective.cli.analysis.AnalysisService")
+def test_gc_contents_command_rejects_zero_idle_days(mock_analysis_service: MagicMock) -> None:
+    """Tests that contents cannot be collected the moment they become unreferenced."""
+    runner = CliRunner()
+    result = runner.invoke(analysis_group, ["gc-contents", "--min-idle-days", "0"], color=False)
+
+    assert result.exit_code == 2
+    assert "--min-idle-days" in result.output
+    mock_analysis_service.assert_not_called()
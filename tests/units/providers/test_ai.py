@@ -1,5 +1,8 @@
+import asyncio
+import threading
 from collections.abc import Generator
-from unittest.mock import MagicMock, patch
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 from google.genai import types
@@ -61,6 +64,7 @@ def create_mock_response(
     candidates_token_count: int,
     thoughts_token_count: int | None = 0,
     thoughts: list[str] | None = None,
+    cached_content_token_count: int = 0,
 ) -> MagicMock:
     mock_response = MagicMock()
     mock_candidate = MagicMock()
@@ -87,6 +91,7 @@ def create_mock_response(
     mock_usage.prompt_token_count = prompt_token_count
     mock_usage.candidates_token_count = candidates_token_count
     mock_usage.thoughts_token_count = thoughts_token_count
+    mock_usage.cached_content_token_count = cached_content_token_count
     mock_response.usage_metadata = mock_usage
 
     type(mock_response).text = text
@@ -115,6 +120,7 @@ def test_get_structured_analysis(
         thinking_tokens,
         grounding_metadata,
         thoughts,
+        cached_input_tokens,
     ) = ai_provider.get_structured_analysis(prompt="test prompt", file_uris=["gs://test-bucket/file1.pdf"])
 
     assert isinstance(result, MockOutputSchema)
@@ -123,9 +129,40 @@ def test_get_structured_analysis(
     assert output_tokens == 20
     assert thinking_tokens == 5
     assert thoughts is None
+    assert cached_input_tokens == 0
     mock_models_api.generate_content.assert_called_once()
 
 
+def test_get_structured_analysis_async(
+    mock_ai_provider: tuple[MagicMock, MagicMock, MagicMock, MagicMock],
+) -> None:
+    """Tests that the async variant awaits the async client and parses the response the same way."""
+    mock_models_api, _, _, _ = mock_ai_provider
+
+    mock_response = create_mock_response(
+        text="""{"risk_score": 8, "summary": "Test summary"}""",
+        prompt_token_count=10,
+        candidates_token_count=20,
+        thoughts_token_count=5,
+    )
+    ai_provider = AiProvider(output_schema=MockOutputSchema)
+    ai_provider.client.aio.models.generate_content = AsyncMock(return_value=mock_response)
+
+    result, input_tokens, output_tokens, thinking_tokens, _, _, _ = asyncio.run(
+        ai_provider.get_structured_analysis_async(
+            prompt="test prompt", file_uris=["gs://test-bucket/file1.pdf"], max_output_tokens=100
+        )
+    )
+
+    assert isinstance(result, MockOutputSchema)
+    assert (input_tokens, output_tokens, thinking_tokens) == (10, 20, 5)
+    call_kwargs = ai_provider.client.aio.models.generate_content.call_args.kwargs
+    assert call_kwargs["model"] == "gemini-test"
+    assert call_kwargs["config"].max_output_tokens == 100
+    assert call_kwargs["contents"].parts[1].file_data.file_uri == "gs://test-bucket/file1.pdf"
+    mock_models_api.generate_content.assert_not_called()
+
+
 def test_get_structured_analysis_with_max_tokens(
     mock_ai_provider: tuple[MagicMock, MagicMock, MagicMock, MagicMock],
 ) -> None:
@@ -340,6 +377,7 @@ def test_get_structured_analysis_with_grounding_metadata(
         thinking_tokens,
         grounding_metadata,
         thoughts,
+        _,
     ) = ai_provider.get_structured_analysis(prompt="test", file_uris=[])
 
     assert input_tokens == 15
@@ -371,7 +409,7 @@ def test_get_structured_analysis_candidate_without_grounding_metadata(
     mock_models_api.generate_content.return_value = mock_response
 
     ai_provider = AiProvider(output_schema=MockOutputSchema)
-    _, _, _, _, grounding_metadata, _ = ai_provider.get_structured_analysis(prompt="test", file_uris=[])
+    _, _, _, _, grounding_metadata, _, _ = ai_provider.get_structured_analysis(prompt="test", file_uris=[])
 
     assert grounding_metadata["search_queries"] == []
     assert grounding_metadata["sources"] == []
@@ -591,6 +629,200 @@ def test_get_structured_analysis_with_thoughts(
         _,
         _,
         thoughts,
+        _,
     ) = ai_provider.get_structured_analysis(prompt="test prompt", file_uris=[])
 
     assert thoughts == "I am thinking about risk...\n\nRisk seems high."
+
+
+def test_count_tokens_for_file(
+    mock_ai_provider: tuple[MagicMock, MagicMock, MagicMock, MagicMock],
+) -> None:
+    """Test count_tokens_for_file counts a single file without a prompt."""
+    mock_models_api, _, _, _ = mock_ai_provider
+    mock_models_api.count_tokens.return_value = types.CountTokensResponse(total_tokens=42)
+
+    ai_provider = AiProvider(MockOutputSchema)
+
+    assert ai_provider.count_tokens_for_file("gs://bucket/file1.pdf") == 42
+    request_contents = mock_models_api.count_tokens.call_args.kwargs["contents"]
+    assert len(request_contents.parts) == 1
+    assert request_contents.parts[0].file_data.file_uri == "gs://bucket/file1.pdf"
+    assert request_contents.parts[0].file_data.mime_type == "application/pdf"
+
+
+def _enable_context_cache(mock_config: MagicMock) -> None:
+    mock_config.GCP_GEMINI_CONTEXT_CACHE_ENABLED = True
+    mock_config.GCP_GEMINI_CONTEXT_CACHE_TTL_SECONDS = 3600
+
+
+def _cached_content(name: str, display_name: str | None = None) -> types.CachedContent:
+    return types.CachedContent(
+        name=name, display_name=display_name, expire_time=datetime.now(timezone.utc) + timedelta(hours=1)
+    )
+
+
+def test_get_structured_analysis_reads_instructions_from_context_cache(
+    mock_ai_provider: tuple[MagicMock, MagicMock, MagicMock, MagicMock],
+) -> None:
+    """Tests that the system instruction is cached once and referenced by name, with the files still sent."""
+    mock_models_api, _, mock_config, _ = mock_ai_provider
+    _enable_context_cache(mock_config)
+    mock_models_api.generate_content.return_value = create_mock_response(
+        text="""{"risk_score": 8, "summary": "Test summary"}""",
+        prompt_token_count=100,
+        candidates_token_count=20,
+        cached_content_token_count=60,
+    )
+    ai_provider = AiProvider(output_schema=MockOutputSchema)
+    ai_provider.client.caches.list.return_value = []
+    ai_provider.client.caches.create.return_value = _cached_content("cachedContents/instructions")
+
+    for _ in range(2):
+        *_, cached_input_tokens = ai_provider.get_structured_analysis(
+            prompt="context", file_uris=["gs://test-bucket/file1.pdf"], system_instruction="instructions"
+        )
+
+    assert cached_input_tokens == 60
+    ai_provider.client.caches.create.assert_called_once()
+    cache_config = ai_provider.client.caches.create.call_args.kwargs["config"]
+    assert cache_config.system_instruction == "instructions"
+    assert cache_config.contents is None
+    assert cache_config.tools
+    request = mock_models_api.generate_content.call_args.kwargs
+    assert request["config"].cached_content == "cachedContents/instructions"
+    assert request["config"].system_instruction is None
+    assert request["config"].tools is None
+    assert [part.file_data.file_uri for part in request["contents"].parts[1:]] == ["gs://test-bucket/file1.pdf"]
+
+
+def test_get_structured_analysis_caches_files_of_a_document_hash(
+    mock_ai_provider: tuple[MagicMock, MagicMock, MagicMock, MagicMock],
+) -> None:
+    """Tests that a document hash caches the files with the instruction, and the request only sends the prompt."""
+    mock_models_api, _, mock_config, _ = mock_ai_provider
+    _enable_context_cache(mock_config)
+    mock_models_api.generate_content.return_value = create_mock_response(
+        text="""{"risk_score": 8, "summary": "Test summary"}""", prompt_token_count=0, candidates_token_count=0
+    )
+    ai_provider = AiProvider(output_schema=MockOutputSchema)
+    ai_provider.client.caches.list.return_value = []
+    ai_provider.client.caches.create.return_value = _cached_content("cachedContents/documents")
+
+    ai_provider.get_structured_analysis(
+        prompt="context",
+        file_uris=["gs://test-bucket/file1.pdf"],
+        system_instruction="instructions",
+        document_hash="hash",
+    )
+
+    cache_config = ai_provider.client.caches.create.call_args.kwargs["config"]
+    assert [part.file_data.file_uri for part in cache_config.contents[0].parts] == ["gs://test-bucket/file1.pdf"]
+    request = mock_models_api.generate_content.call_args.kwargs
+    assert request["config"].cached_content == "cachedContents/documents"
+    assert [part.text for part in request["contents"].parts] == ["context"]
+
+
+def test_get_structured_analysis_reuses_context_cache_of_another_process(
+    mock_ai_provider: tuple[MagicMock, MagicMock, MagicMock, MagicMock],
+) -> None:
+    """Tests that a live cache created by another provider is found by its display name instead of recreated."""
+    mock_models_api, _, mock_config, _ = mock_ai_provider
+    _enable_context_cache(mock_config)
+    mock_models_api.generate_content.return_value = create_mock_response(
+        text="""{"risk_score": 8, "summary": "Test summary"}""", prompt_token_count=0, candidates_token_count=0
+    )
+    first_provider = AiProvider(output_schema=MockOutputSchema)
+    first_provider.client.caches.list.return_value = []
+    first_provider.client.caches.create.return_value = _cached_content("cachedContents/shared")
+    first_provider.get_structured_analysis(prompt="context", file_uris=[], system_instruction="instructions")
+    display_name = first_provider.client.caches.create.call_args.kwargs["config"].display_name
+
+    second_provider = AiProvider(output_schema=MockOutputSchema)
+    second_provider.client.caches.create.reset_mock()
+    second_provider.client.caches.list.return_value = [
+        _cached_content("cachedContents/other", "public-detective-other"),
+        _cached_content("cachedContents/shared", display_name),
+    ]
+    second_provider.get_structured_analysis(prompt="context", file_uris=[], system_instruction="instructions")
+
+    second_provider.client.caches.create.assert_not_called()
+    assert mock_models_api.generate_content.call_args.kwargs["config"].cached_content == "cachedContents/shared"
+
+
+def test_get_structured_analysis_sends_uncached_when_cache_creation_fails(
+    mock_ai_provider: tuple[MagicMock, MagicMock, MagicMock, MagicMock],
+) -> None:
+    """Tests that a failed cache creation falls back to sending the instruction, and is not retried at once."""
+    mock_models_api, _, mock_config, _ = mock_ai_provider
+    _enable_context_cache(mock_config)
+    mock_models_api.generate_content.return_value = create_mock_response(
+        text="""{"risk_score": 8, "summary": "Test summary"}""", prompt_token_count=0, candidates_token_count=0
+    )
+    ai_provider = AiProvider(output_schema=MockOutputSchema)
+    ai_provider.client.caches.list.return_value = []
+    ai_provider.client.caches.create.side_effect = Exception("Cached content is too small")
+
+    for _ in range(2):
+        ai_provider.get_structured_analysis(prompt="context", file_uris=[], system_instruction="instructions")
+
+    ai_provider.client.caches.create.assert_called_once()
+    request_config = mock_models_api.generate_content.call_args.kwargs["config"]
+    assert request_config.cached_content is None
+    assert request_config.system_instruction == "instructions"
+    assert request_config.tools
+
+
+def test_get_context_cache_lists_the_caches_once_for_new_display_names(
+    mock_ai_provider: tuple[MagicMock, MagicMock, MagicMock, MagicMock],
+) -> None:
+    """Tests that caches of different documents are created after a single listing of the existing caches."""
+    _, _, mock_config, _ = mock_ai_provider
+    _enable_context_cache(mock_config)
+    ai_provider = AiProvider(output_schema=MockOutputSchema)
+    ai_provider.client.caches.list.return_value = []
+    ai_provider.client.caches.create.side_effect = [
+        _cached_content("cachedContents/first"),
+        _cached_content("cachedContents/second"),
+    ]
+
+    first = ai_provider._get_context_cache("instructions", True, ["gs://test-bucket/file1.pdf"], "first")
+    second = ai_provider._get_context_cache("instructions", True, ["gs://test-bucket/file2.pdf"], "second")
+
+    assert (first, second) == ("cachedContents/first", "cachedContents/second")
+    ai_provider.client.caches.list.assert_called_once()
+    assert ai_provider.client.caches.create.call_count == 2
+
+
+def test_get_context_cache_does_not_wait_for_the_creation_of_another_cache(
+    mock_ai_provider: tuple[MagicMock, MagicMock, MagicMock, MagicMock],
+) -> None:
+    """Tests that a slow cache creation only holds back the requests for that same cache."""
+    _, _, mock_config, _ = mock_ai_provider
+    _enable_context_cache(mock_config)
+    ai_provider = AiProvider(output_schema=MockOutputSchema)
+    ai_provider.client.caches.list.return_value = []
+    slow_creation_started = threading.Event()
+    release_slow_creation = threading.Event()
+    slow_creation_finished = threading.Event()
+
+    def create(model: str, config: types.CreateCachedContentConfig) -> types.CachedContent:
+        if config.system_instruction == "slow":
+            slow_creation_started.set()
+            release_slow_creation.wait(timeout=5)
+            slow_creation_finished.set()
+        return _cached_content(f"cachedContents/{config.system_instruction}")
+
+    ai_provider.client.caches.create.side_effect = create
+    slow_thread = threading.Thread(target=ai_provider._get_context_cache, args=("slow", True))
+    slow_thread.start()
+    assert slow_creation_started.wait(timeout=5)
+
+    try:
+        assert ai_provider._get_context_cache("fast", True) == "cachedContents/fast"
+        assert not slow_creation_finished.is_set()
+    finally:
+        release_slow_creation.set()
+        slow_thread.join()
+    assert ai_provider._get_context_cache("slow", True) == "cachedContents/slow"
+    assert ai_provider.client.caches.create.call_count == 2
@@ -0,0 +1,128 @@
+"""Unit tests for the ConversionCache."""
+
+import os
+import subprocess
+from pathlib import Path
+from unittest.mock import MagicMock, Mock, patch
+
+import pytest
+from public_detective.providers import conversion_cache
+from public_detective.providers.conversion_cache import ConversionCache, get_command_version
+
+
+@pytest.fixture(autouse=True)
+def clear_versions() -> None:
+    """Forgets the converter versions computed by previous tests."""
+    conversion_cache._command_versions.clear()
+
+
+def test_make_key_depends_on_every_part() -> None:
+    """Tests that the key changes with the input, extensions, format and version."""
+    key = ConversionCache.make_key(b"content", ".docx", "pdf", "LibreOffice 7.6")
+
+    assert key == ConversionCache.make_key(b"content", ".DOCX", "pdf", "LibreOffice 7.6")
+    assert key != ConversionCache.make_key(b"other", ".docx", "pdf", "LibreOffice 7.6")
+    assert key != ConversionCache.make_key(b"content", ".doc", "pdf", "LibreOffice 7.6")
+    assert key != ConversionCache.make_key(b"content", ".docx", "png", "LibreOffice 7.6")
+    assert key != ConversionCache.make_key(b"content", ".docx", "pdf", "LibreOffice 24.2")
+
+
+def test_get_or_convert_converts_once(tmp_path: Path) -> None:
+    """Tests that an identical conversion is served from the cache."""
+    cache = ConversionCache(str(tmp_path), max_bytes=1024)
+    convert = MagicMock(return_value=b"pdf")
+
+    first = cache.get_or_convert(b"docx", ".docx", "pdf", "v1", convert)
+    second = cache.get_or_convert(b"docx", ".docx", "pdf", "v1", convert)
+
+    assert first == second == b"pdf"
+    convert.assert_called_once()
+    assert cache.get_stats() == {"hits": 1, "misses": 1, "stores": 1, "evictions": 0, "hit_ratio": 0.5}
+
+
+def test_get_or_convert_misses_on_new_version(tmp_path: Path) -> None:
+    """Tests that upgrading the converter invalidates the cached results."""
+    cache = ConversionCache(str(tmp_path), max_bytes=1024)
+    cache.get_or_convert(b"docx", ".docx", "pdf", "v1", lambda: b"old pdf")
+
+    assert cache.get_or_convert(b"docx", ".docx", "pdf", "v2", lambda: b"new pdf") == b"new pdf"
+
+
+def test_get_or_convert_bypasses_unknown_version(tmp_path: Path) -> None:
+    """Tests that nothing is cached when the converter version is unknown."""
+    cache = ConversionCache(str(tmp_path), max_bytes=1024)
+
+    assert cache.get_or_convert(b"docx", ".docx", "pdf", None, lambda: b"pdf") == b"pdf"
+    assert os.listdir(tmp_path) == []
+
+
+def test_failed_conversion_is_not_cached(tmp_path: Path) -> None:
+    """Tests that a conversion error is raised and leaves no entry behind."""
+    cache = ConversionCache(str(tmp_path), max_bytes=1024)
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_convert(b"docx", ".docx", "pdf", "v1", Mock(side_effect=RuntimeError("LibreOffice failed")))
+
+    assert os.listdir(tmp_path) == []
+
+
+def test_put_evicts_least_recently_used(tmp_path: Path) -> None:
+    """Tests that the oldest results are evicted once over the budget."""
+    cache = ConversionCache(str(tmp_path), max_bytes=10)
+    cache.put("old", b"123456")
+    os.utime(tmp_path / "old.bin", (0, 0))
+    cache.put("new", b"123456")
+
+    assert cache.get("old") is None
+    assert cache.get("new") == b"123456"
+    assert cache.evictions == 1
+
+
+def test_put_skips_results_larger_than_budget(tmp_path: Path) -> None:
+    """Tests that a result larger than the whole cache is not stored."""
+    cache = ConversionCache(str(tmp_path), max_bytes=4)
+
+    cache.put("key", b"123456")
+
+    assert cache.get("key") is None
+
+
+@patch("public_detective.providers.conversion_cache.ConfigProvider")
+def test_get_instance_disabled_without_directory(mock_config_provider: MagicMock) -> None:
+    """Tests that no cache is used when its directory is not configured."""
+    mock_config_provider.get_config.return_value = MagicMock(CONVERTER_CACHE_DIR=None)
+
+    assert ConversionCache.get_instance() is None
+
+
+@patch("public_detective.providers.conversion_cache.ConfigProvider")
+def test_get_instance_is_shared(mock_config_provider: MagicMock, tmp_path: Path) -> None:
+    """Tests that the converters of a process share one cache."""
+    mock_config_provider.get_config.return_value = MagicMock(
+        CONVERTER_CACHE_DIR=str(tmp_path), CONVERTER_CACHE_MAX_BYTES=1024
+    )
+
+    cache = ConversionCache.get_instance()
+
+    assert cache is not None
+    assert cache.directory == str(tmp_path)
+    assert ConversionCache.get_instance() is cache
+
+
+@patch("public_detective.providers.conversion_cache.subprocess.run")
+def test_get_command_version_runs_once(mock_run: MagicMock) -> None:
+    """Tests that the version command runs once and its first line is kept."""
+    mock_run.return_value = Mock(returncode=0, stdout="LibreOffice 7.6.4.1 60(Build:1)\nmore\n")
+
+    assert get_command_version(["soffice", "--version"]) == "LibreOffice 7.6.4.1 60(Build:1)"
+    assert get_command_version(["soffice", "--version"]) == "LibreOffice 7.6.4.1 60(Build:1)"
+    mock_run.assert_called_once()
+
+
+@patch("public_detective.providers.conversion_cache.subprocess.run")
+def test_get_command_version_unknown_on_failure(mock_run: MagicMock) -> None:
+    """Tests that a missing or failing converter has no version."""
+    mock_run.side_effect = [FileNotFoundError(), subprocess.TimeoutExpired("convert", 30)]
+
+    assert get_command_version(["soffice", "--version"]) is None
+    assert get_command_version(["convert", "-version"]) is None
@@ -0,0 +1,75 @@
+"""Unit tests for the DiskCache base class."""
+
+import io
+import os
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from public_detective.providers.disk_cache import DiskCache
+
+
+class _CacheWithMetadata(DiskCache):
+    """A cache keeping a metadata file next to each entry."""
+
+    _COMPANION_SUFFIXES = (".json",)
+
+
+def test_write_atomically_from_bytes_and_handle(tmp_path: Path) -> None:
+    """Tests that both bytes and file handles are written in place."""
+    cache = DiskCache(str(tmp_path), max_bytes=100)
+
+    cache._write_atomically(str(tmp_path / "a.bin"), b"bytes")
+    cache._write_atomically(str(tmp_path / "b.bin"), io.BytesIO(b"handle"))
+
+    assert (tmp_path / "a.bin").read_bytes() == b"bytes"
+    assert (tmp_path / "b.bin").read_bytes() == b"handle"
+    assert sorted(os.listdir(tmp_path)) == ["a.bin", "b.bin"]
+
+
+def test_write_atomically_removes_temporary_file_on_failure(tmp_path: Path) -> None:
+    """Tests that a write failing partway leaves neither the entry nor a `.tmp` file behind."""
+    cache = DiskCache(str(tmp_path), max_bytes=100)
+
+    with patch("public_detective.providers.disk_cache.shutil.copyfileobj", side_effect=OSError("disk full")):
+        with pytest.raises(OSError, match="disk full"):
+            cache._write_atomically(str(tmp_path / "a.bin"), io.BytesIO(b"content"))
+
+    assert os.listdir(tmp_path) == []
+
+
+def test_write_atomically_removes_temporary_file_when_replace_fails(tmp_path: Path) -> None:
+    """Tests that the temporary file is removed when it cannot be moved into place."""
+    cache = DiskCache(str(tmp_path), max_bytes=100)
+
+    with patch("public_detective.providers.disk_cache.os.replace", side_effect=OSError("busy")):
+        with pytest.raises(OSError, match="busy"):
+            cache._write_atomically(str(tmp_path / "a.bin"), b"content")
+
+    assert os.listdir(tmp_path) == []
+
+
+def test_record_store_evicts_entries_with_their_companions(tmp_path: Path) -> None:
+    """Tests that eviction removes the oldest entries and their companion files."""
+    cache = _CacheWithMetadata(str(tmp_path), max_bytes=10)
+    for index, name in enumerate(("old", "new")):
+        cache._write_atomically(str(tmp_path / f"{name}.bin"), b"x" * 6)
+        cache._write_atomically(str(tmp_path / f"{name}.json"), b"{}")
+        os.utime(tmp_path / f"{name}.bin", (index, index))
+
+    cache._record_store()
+
+    assert sorted(os.listdir(tmp_path)) == ["new.bin", "new.json"]
+    assert cache.get_stats() == {"hits": 0, "misses": 0, "stores": 1, "evictions": 1, "hit_ratio": 0.0}
+
+
+def test_get_stats_hit_ratio(tmp_path: Path) -> None:
+    """Tests the hit ratio over recorded hits and misses."""
+    cache = DiskCache(str(tmp_path), max_bytes=100)
+
+    cache.record_hit()
+    cache.record_hit()
+    cache.record_hit()
+    cache.record_miss()
+
+    assert cache.get_stats()["hit_ratio"] == 0.75
@@ -0,0 +1,96 @@
+"""Unit tests for the DownloadCache."""
+
+import io
+import os
+from pathlib import Path
+
+from public_detective.providers.download_cache import CachedDownload, DownloadCache
+
+
+def _store(cache: DownloadCache, url: str, content: bytes, etag: str | None = '"v1"') -> None:
+    """Stores a download in the cache."""
+    cache.store(CachedDownload(url=url, size=len(content), etag=etag), io.BytesIO(content))
+
+
+def test_validators_build_conditional_headers() -> None:
+    """Tests that both validators are turned into conditional request headers."""
+    entry = CachedDownload(url="http://x", size=1, etag='"abc"', last_modified="Wed, 21 Oct 2015 07:28:00 GMT")
+
+    assert entry.validators == {
+        "If-None-Match": '"abc"',
+        "If-Modified-Since": "Wed, 21 Oct 2015 07:28:00 GMT",
+    }
+
+
+def test_store_and_open_round_trip(tmp_path: Path) -> None:
+    """Tests that a stored download can be looked up and reopened."""
+    cache = DownloadCache(str(tmp_path), max_bytes=1024)
+    content = io.BytesIO(b"content")
+
+    cache.store(CachedDownload(url="http://x/a.pdf", size=7, etag='"v1"', filename="a.pdf"), content)
+    entry = cache.lookup("http://x/a.pdf")
+    cached_file = cache.open("http://x/a.pdf")
+
+    assert content.tell() == 0
+    assert entry is not None
+    assert entry.filename == "a.pdf"
+    assert cached_file is not None
+    with cached_file:
+        assert cached_file.read() == b"content"
+    assert cache.get_stats()["hits"] == 1
+
+
+def test_lookup_missing_entry(tmp_path: Path) -> None:
+    """Tests that an unknown URL is not found."""
+    cache = DownloadCache(str(tmp_path), max_bytes=1024)
+
+    assert cache.lookup("http://x/missing") is None
+    assert cache.open("http://x/missing") is None
+
+
+def test_store_skips_responses_without_validators(tmp_path: Path) -> None:
+    """Tests that downloads that can never be revalidated are not cached."""
+    cache = DownloadCache(str(tmp_path), max_bytes=1024)
+
+    _store(cache, "http://x/a.pdf", b"content", etag=None)
+
+    assert cache.lookup("http://x/a.pdf") is None
+    assert cache.get_stats()["stores"] == 0
+
+
+def test_store_evicts_least_recently_used_entries(tmp_path: Path) -> None:
+    """Tests that the oldest entries are evicted once the budget is exceeded."""
+    cache = DownloadCache(str(tmp_path), max_bytes=10)
+    _store(cache, "http://x/old", b"12345")
+    _store(cache, "http://x/used", b"12345")
+    old_content_path, _ = cache._paths("http://x/old")
+    used_content_path, _ = cache._paths("http://x/used")
+    os.utime(old_content_path, (1, 1))
+    os.utime(used_content_path, (2, 2))
+    cached_file = cache.open("http://x/used")
+    assert cached_file is not None
+    cached_file.close()
+
+    _store(cache, "http://x/new", b"12345")
+
+    assert cache.lookup("http://x/old") is None
+    assert cache.lookup("http://x/used") is not None
+    assert cache.lookup("http://x/new") is not None
+    assert cache.get_stats()["evictions"] == 1
+
+
+def test_get_stats_hit_ratio(tmp_path: Path) -> None:
+    """Tests the hit ratio over hits and misses."""
+    cache = DownloadCache(str(tmp_path), max_bytes=1024)
+    _store(cache, "http://x/a", b"a")
+    cached_file = cache.open("http://x/a")
+    assert cached_file is not None
+    cached_file.close()
+    cache.record_miss()
+    cache.record_miss()
+    cache.record_miss()
+
+    stats = cache.get_stats()
+
+    assert stats["hit_ratio"] == 0.25
+    assert stats["misses"] == 3
@@ -1,9 +1,21 @@
 """This module contains unit tests for the FileTypeProvider."""
 
+import bz2
+import gzip
+import io
+import lzma
+import tarfile
+import zipfile
 from unittest.mock import MagicMock, patch
 
+import py7zr
 import pytest
-from public_detective.providers.file_type import FileTypeProvider
+from public_detective.providers.file_type import (
+    MAGIC_SNIFF_BYTES,
+    ArchiveFormat,
+    FileTypeProvider,
+    sniff_archive_format,
+)
 
 
 @pytest.fixture
@@ -79,3 +91,68 @@ def test_infer_extension_logs_error(mock_from_buffer: MagicMock, file_type_provi
     file_type_provider.logger.error.assert_called_once()
     logged_message = file_type_provider.logger.error.call_args[0][0]
     assert "Failed to infer file type" in logged_message
+
+
+def _tar_bytes(tar_format: int) -> bytes:
+    """Builds a TAR archive with one member in the given format."""
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w", format=tar_format) as archive:
+        info = tarfile.TarInfo("member.txt")
+        info.size = 4
+        archive.addfile(info, io.BytesIO(b"data"))
+    return buffer.getvalue()
+
+
+def _zip_bytes() -> bytes:
+    """Builds a ZIP archive with one member."""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("member.txt", b"data")
+    return buffer.getvalue()
+
+
+def _7z_bytes() -> bytes:
+    """Builds a 7z archive with one member."""
+    buffer = io.BytesIO()
+    with py7zr.SevenZipFile(buffer, "w") as archive:
+        archive.writestr(b"data", "member.txt")
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize(
+    ("content", "expected_format"),
+    [
+        (_zip_bytes(), ArchiveFormat.ZIP),
+        (b"Rar!\x1a\x07\x01\x00" + b"\0" * 32, ArchiveFormat.RAR),
+        (_7z_bytes(), ArchiveFormat.SEVEN_ZIP),
+        (_tar_bytes(tarfile.PAX_FORMAT), ArchiveFormat.TAR),
+        (_tar_bytes(tarfile.GNU_FORMAT), ArchiveFormat.TAR),
+        (gzip.compress(b"data"), ArchiveFormat.GZIP),
+        (bz2.compress(b"data"), ArchiveFormat.BZIP2),
+        (lzma.compress(b"data"), ArchiveFormat.XZ),
+        (b"%PDF-1.7\n" + b"\0" * 1024, None),
+        (b"\0" * 4096, None),
+        (b"", None),
+    ],
+)
+def test_sniff_archive_format(content: bytes, expected_format: ArchiveFormat | None) -> None:
+    """Tests that archives are classified from their first bytes."""
+    assert sniff_archive_format(content[:4096]) == expected_format
+
+
+@patch("magic.from_buffer")
+def test_infer_extension_reuses_archive_format(
+    mock_from_buffer: MagicMock, file_type_provider: FileTypeProvider
+) -> None:
+    """Tests that a known archive format is not sniffed again with libmagic."""
+    assert file_type_provider.infer_extension(b"content", ArchiveFormat.SEVEN_ZIP) == ".7z"
+    mock_from_buffer.assert_not_called()
+
+
+@patch("magic.from_buffer", return_value="application/pdf")
+def test_infer_extension_reads_only_the_head(mock_from_buffer: MagicMock, file_type_provider: FileTypeProvider) -> None:
+    """Tests that libmagic only receives the start of large contents, and still sniffs ZIP containers."""
+    content = b"PK\x03\x04" + b"\0" * (2 * MAGIC_SNIFF_BYTES)
+
+    assert file_type_provider.infer_extension(content, ArchiveFormat.ZIP) == ".pdf"
+    assert len(mock_from_buffer.call_args.args[0]) == MAGIC_SNIFF_BYTES
@@ -1,6 +1,7 @@
 from unittest.mock import MagicMock, patch
 
 import pytest
+from google.api_core.exceptions import NotFound
 from public_detective.providers.gcs import GcsProvider
 
 
@@ -180,3 +181,24 @@ def test_list_blobs() -> None:
     mock_bucket.list_blobs.assert_called_once_with(prefix="documents/")
     assert len(blobs) == 2
     assert blobs == [mock_blob1, mock_blob2]
+
+
+def test_delete_file_ignores_missing_blob() -> None:
+    """
+    Should delete a blob and ignore blobs that no longer exist.
+    """
+    # Arrange
+    gcs_provider = GcsProvider()
+    mock_client = MagicMock()
+    mock_blob = MagicMock()
+    mock_blob.delete.side_effect = NotFound("gone")
+    gcs_provider._client = mock_client
+    mock_client.bucket.return_value.blob.return_value = mock_blob
+
+    # Act
+    gcs_provider.delete_file("test-bucket", "contents/abc/original.pdf")
+
+    # Assert
+    mock_client.bucket.assert_called_once_with("test-bucket")
+    mock_client.bucket.return_value.blob.assert_called_once_with("contents/abc/original.pdf")
+    mock_blob.delete.assert_called_once()
@@ -6,6 +6,7 @@ from unittest.mock import MagicMock, patch
 import pytest
 import requests
 from public_detective.providers.http import HttpProvider
+from requests.adapters import HTTPAdapter
 from requests.exceptions import ConnectTimeout, ReadTimeout
 
 
@@ -14,7 +15,12 @@ def mock_config() -> Generator[MagicMock, None, None]:
     """Fixture for a mocked ConfigProvider."""
     with patch("public_detective.providers.config.ConfigProvider.get_config") as mock_get_config:
         mock_config_instance = MagicMock()
-        mock_config_instance.HTTP_REQUEST_DELAY_SECONDS = 0
+        mock_config_instance.HTTP_MAX_REQUESTS_PER_SECOND = 0
+        mock_config_instance.HTTP_RATE_LIMIT_BURST = 1
+        mock_config_instance.HTTP_RATE_LIMIT_MIN_REQUESTS_PER_SECOND = 0.5
+        mock_config_instance.HTTP_RETRY_AFTER_MAX_SECONDS = 60
+        mock_config_instance.HTTP_POOL_CONNECTIONS = 3
+        mock_config_instance.HTTP_POOL_MAXSIZE = 7
         mock_get_config.return_value = mock_config_instance
         yield mock_config_instance
 
@@ -28,6 +34,48 @@ def test_get_session_creates_new_session(mock_config: MagicMock) -> None:
     assert provider._session is session
 
 
+def test_get_session_keeps_connections_alive(mock_config: MagicMock) -> None:
+    """Tests that the session no longer forces a new connection per request."""
+    provider = HttpProvider()
+    session = provider._get_session()
+
+    assert "close" not in session.headers.get("Connection", "").lower()
+
+
+def test_get_session_mounts_pooled_adapters(mock_config: MagicMock) -> None:
+    """Tests that both schemes use adapters sized from the configuration."""
+    provider = HttpProvider()
+    with patch("public_detective.providers.http.HTTPAdapter", wraps=HTTPAdapter) as adapter_spy:
+        session = provider._get_session()
+
+    assert adapter_spy.call_count == 2
+    for call in adapter_spy.call_args_list:
+        assert call.kwargs == {"pool_connections": 3, "pool_maxsize": 7}
+    for prefix in ("http://", "https://"):
+        adapter = session.get_adapter(f"{prefix}example.com")
+        assert isinstance(adapter, HTTPAdapter)
+        assert adapter.poolmanager.connection_pool_kw["maxsize"] == 7
+
+
+def test_get_connection_stats_without_session(mock_config: MagicMock) -> None:
+    """Tests that the stats are empty before any request is sent."""
+    provider = HttpProvider()
+
+    assert provider.get_connection_stats() == {"requests": 0, "connections": 0, "reused": 0}
+
+
+def test_get_connection_stats_counts_reused_connections(mock_config: MagicMock) -> None:
+    """Tests that the stats aggregate the connection pools of every host."""
+    provider = HttpProvider()
+    session = provider._get_session()
+    adapter = session.get_adapter("https://pncp.gov.br")
+    assert isinstance(adapter, HTTPAdapter)
+    adapter.poolmanager.pools["pncp"] = MagicMock(num_requests=9, num_connections=1)
+    adapter.poolmanager.pools["storage"] = MagicMock(num_requests=3, num_connections=2)
+
+    assert provider.get_connection_stats() == {"requests": 12, "connections": 3, "reused": 9}
+
+
 def test_get_session_returns_existing_session(mock_config: MagicMock) -> None:
     """Tests that an existing session is returned."""
     provider = HttpProvider()
@@ -106,3 +154,58 @@ def test_close_no_session(mock_config: MagicMock) -> None:
     provider = HttpProvider()
     provider.close()
     assert provider._session is None
+
+
+@patch("public_detective.providers.rate_limiter.time.sleep")
+@patch("requests.Session.get")
+def test_get_retries_throttled_response_after_retry_after(
+    mock_get: MagicMock, mock_sleep: MagicMock, mock_config: MagicMock
+) -> None:
+    """Tests that a 429 answer is retried once the host's Retry-After has passed."""
+    mock_config.HTTP_MAX_REQUESTS_PER_SECOND = 100
+    throttled = MagicMock(status_code=429, headers={"Retry-After": "7"})
+    ok = MagicMock(status_code=200, headers={})
+    mock_get.side_effect = [throttled, ok]
+    provider = HttpProvider()
+
+    response = provider.get("http://example.com/a")
+
+    assert response is ok
+    assert mock_get.call_count == 2
+    throttled.close.assert_called_once()
+    assert any(call.args[0] > 6 for call in mock_sleep.call_args_list)
+
+
+@patch("public_detective.providers.rate_limiter.time.sleep")
+@patch("requests.Session.get")
+def test_get_returns_last_throttled_response_when_retries_exhausted(
+    mock_get: MagicMock, mock_sleep: MagicMock, mock_config: MagicMock
+) -> None:
+    """Tests that a host that keeps throttling yields its last response instead of an error."""
+    throttled = MagicMock(status_code=503, headers={})
+    mock_get.return_value = throttled
+    provider = HttpProvider()
+
+    response = provider.get("http://example.com")
+
+    assert response is throttled
+    assert mock_get.call_count == 3
+    assert len(mock_sleep.call_args_list) == 2
+    assert all(call.args[0] > 0 for call in mock_sleep.call_args_list)
+
+
+@patch("public_detective.providers.rate_limiter.time.sleep")
+@patch("requests.Session.get")
+def test_get_honours_retry_after_without_rate_limiter(
+    mock_get: MagicMock, mock_sleep: MagicMock, mock_config: MagicMock
+) -> None:
+    """Tests that a throttled answer waits for its Retry-After when no bucket paces the retry."""
+    throttled = MagicMock(status_code=429, headers={"Retry-After": "7"})
+    ok = MagicMock(status_code=200, headers={})
+    mock_get.side_effect = [throttled, ok]
+    provider = HttpProvider()
+
+    response = provider.get("http://example.com")
+
+    assert response is ok
+    mock_sleep.assert_called_once_with(7.0)
@@ -1,73 +1,127 @@
 """Unit tests for the ImageConverterProvider."""
 
+import io
 from pathlib import Path
 from unittest.mock import Mock, patch
 
 import pytest
+from PIL import Image
+from public_detective.providers.conversion_cache import ConversionCache
 from public_detective.providers.image_converter import ImageConverterProvider
 
 
+def _image_bytes(image_format: str, mode: str = "RGB") -> bytes:
+    """Builds a small image.
+
+    Args:
+        image_format: The Pillow format to save the image in.
+        mode: The Pillow mode of the image.
+
+    Returns:
+        The content of the image.
+    """
+    with io.BytesIO() as buffer:
+        Image.new(mode, (4, 3)).save(buffer, format=image_format)
+        return buffer.getvalue()
+
+
 def test_to_png_success() -> None:
     """Tests that the to_png method successfully converts a file."""
     provider = ImageConverterProvider()
-    content = b"fake image content"
-    extension = ".ai"
-
-    def mock_run_convert(_input_path: Path, output_path: Path) -> None:
-        output_path.write_bytes(b"fake png content")
 
-    with patch.object(provider, "_run_convert", side_effect=mock_run_convert):
-        result = provider.to_png(content, extension)
+    with patch.object(provider, "_run_convert", return_value=b"fake png content") as mock_run_convert:
+        result = provider.to_png(b"fake image content", ".ai")
 
     assert result == b"fake png content"
+    mock_run_convert.assert_called_once_with(b"fake image content", ".ai")
 
 
 @patch("subprocess.run")
 def test_to_png_failure(mock_subprocess_run: Mock) -> None:
     """Tests that the to_png method raises an exception when conversion fails."""
-    mock_subprocess_run.return_value = Mock(returncode=1, stdout="", stderr="conversion failed")
+    mock_subprocess_run.return_value = Mock(returncode=1, stdout=b"", stderr=b"conversion failed")
     provider = ImageConverterProvider()
-    content = b"fake image content"
-    extension = ".ai"
 
-    with pytest.raises(RuntimeError):
-        provider.to_png(content, extension)
+    with pytest.raises(RuntimeError, match="conversion failed"):
+        provider.to_png(b"fake image content", ".ai")
 
     mock_subprocess_run.assert_called_once()
 
 
-def test_to_png_no_output_file() -> None:
-    """Tests that to_png raises RuntimeError when output file is not created."""
+@patch("subprocess.run")
+def test_to_png_no_output(mock_subprocess_run: Mock) -> None:
+    """Tests that to_png raises RuntimeError when ImageMagick writes nothing."""
+    mock_subprocess_run.return_value = Mock(returncode=0, stdout=b"", stderr=b"")
     provider = ImageConverterProvider()
-    content = b"fake image content"
-    extension = ".ai"
 
-    # Mock _run_convert to succeed but not create the output file
-    def mock_run_convert(_input_path: Path, _output_path: Path) -> None:
-        # Do nothing - simulates successful conversion but no output file
-        pass
+    with pytest.raises(RuntimeError, match="ImageMagick conversion failed to produce a PNG file"):
+        provider.to_png(b"fake image content", ".ai")
+
 
-    with patch.object(provider, "_run_convert", side_effect=mock_run_convert):
-        with pytest.raises(RuntimeError, match="ImageMagick conversion failed to produce a PNG file"):
-            provider.to_png(content, extension)
+@patch("subprocess.run")
+def test_run_convert_pipes_through_stdin_and_stdout(mock_subprocess_run: Mock) -> None:
+    """Tests that ImageMagick reads stdin and writes stdout within the configured limits."""
+    mock_subprocess_run.return_value = Mock(returncode=0, stdout=b"png", stderr=b"")
+    provider = ImageConverterProvider()
+    provider.config = Mock(
+        IMAGE_CONVERTER_MEMORY_LIMIT="64MiB", IMAGE_CONVERTER_MAP_LIMIT="128MiB", IMAGE_CONVERTER_DISK_LIMIT="1GiB"
+    )
+
+    result = provider._run_convert(b"eps content", ".EPS")
+
+    assert result == b"png"
+    cmd = mock_subprocess_run.call_args.args[0]
+    assert cmd == [
+        "convert",
+        "-limit",
+        "memory",
+        "64MiB",
+        "-limit",
+        "map",
+        "128MiB",
+        "-limit",
+        "disk",
+        "1GiB",
+        "eps:-[0]",
+        "png:-",
+    ]
+    assert mock_subprocess_run.call_args.kwargs["input"] == b"eps content"
 
 
 @patch("subprocess.run")
-def test_run_convert_success_logging(mock_subprocess_run: Mock) -> None:
-    """Tests that _run_convert logs success output."""
-    mock_subprocess_run.return_value = Mock(returncode=0, stdout="conversion successful", stderr="")
+def test_to_png_converts_tiff_with_pillow(mock_subprocess_run: Mock) -> None:
+    """Tests that formats Pillow reads are converted without ImageMagick."""
     provider = ImageConverterProvider()
 
-    import tempfile
-    from pathlib import Path
+    result = provider.to_png(_image_bytes("TIFF", mode="CMYK"), ".tif")
 
-    with tempfile.TemporaryDirectory() as td:
-        tmp_dir = Path(td)
-        in_path = tmp_dir / "input.ai"
-        out_path = tmp_dir / "output.png"
-        in_path.write_bytes(b"fake content")
+    with Image.open(io.BytesIO(result)) as img:
+        assert img.format == "PNG"
+        assert img.mode == "RGB"
+        assert img.size == (4, 3)
+    mock_subprocess_run.assert_not_called()
 
-        # This should not raise and should log success
-        provider._run_convert(in_path, out_path)
 
-    mock_subprocess_run.assert_called_once()
+def test_to_png_falls_back_to_imagemagick_when_pillow_fails() -> None:
+    """Tests that a file Pillow cannot read is handed to ImageMagick."""
+    provider = ImageConverterProvider()
+
+    with patch.object(provider, "_run_convert", return_value=b"png") as mock_run_convert:
+        result = provider.to_png(b"not really a psd", ".psd")
+
+    assert result == b"png"
+    mock_run_convert.assert_called_once_with(b"not really a psd", ".psd")
+
+
+@patch("public_detective.providers.image_converter.get_command_version", return_value="ImageMagick 6.9")
+def test_to_png_uses_conversion_cache(_mock_version: Mock, tmp_path: Path) -> None:
+    """Tests that a converted image is served from the cache the second time."""
+    provider = ImageConverterProvider()
+    provider.conversion_cache = ConversionCache(str(tmp_path), max_bytes=1024)
+
+    with patch.object(provider, "_run_convert", return_value=b"fake png content") as mock_run_convert:
+        first = provider.to_png(b"fake image content", ".ai")
+        second = provider.to_png(b"fake image content", ".ai")
+
+    assert first == second == b"fake png content"
+    mock_run_convert.assert_called_once()
@@ -1,8 +1,52 @@
+import subprocess  # nosec B404
+from collections.abc import Iterator
 from pathlib import Path
 from unittest.mock import MagicMock, patch
+from xmlrpc.client import Binary, Fault
 
 import pytest
-from public_detective.providers.office_converter import OfficeConverterProvider
+from public_detective.exceptions.office_converter import OfficeServerUnavailableError
+from public_detective.providers.conversion_cache import ConversionCache
+from public_detective.providers.office_converter import OfficeConverterProvider, OfficeServerPool, OfficeServerWorker
+
+
+@pytest.fixture(autouse=True)
+def disable_server_pool() -> Iterator[None]:
+    """Keeps tests from starting real LibreOffice servers.
+
+    Yields:
+        None.
+    """
+    with patch("public_detective.providers.office_converter.ConfigProvider") as mock_config_provider:
+        mock_config_provider.get_config.return_value.OFFICE_CONVERTER_POOL_SIZE = 0
+        yield
+
+
+@pytest.fixture
+def pool_config() -> MagicMock:
+    """Creates a configuration for a pool with a single worker.
+
+    Returns:
+        The mocked configuration.
+    """
+    config = MagicMock()
+    config.OFFICE_CONVERTER_POOL_SIZE = 1
+    config.OFFICE_CONVERTER_SERVER_COMMAND = "/usr/bin/python3 -m unoserver.server"
+    config.OFFICE_CONVERTER_JOB_TIMEOUT_SECONDS = 30.0
+    config.OFFICE_CONVERTER_STARTUP_TIMEOUT_SECONDS = 5.0
+    config.OFFICE_CONVERTER_MAX_JOBS_PER_WORKER = 2
+    return config
+
+
+def _running_process() -> MagicMock:
+    """Creates a mock of a running server process.
+
+    Returns:
+        The mocked process.
+    """
+    process = MagicMock(pid=4242)
+    process.poll.return_value = None
+    return process
 
 
 @patch("subprocess.run")
@@ -60,3 +104,252 @@ def test_to_pdf_without_output_file(mock_run: MagicMock) -> None:
     with patch("pathlib.Path.glob", return_value=[]):
         with pytest.raises(RuntimeError, match="failed to produce a PDF"):
             provider.to_pdf(b"test", ".doc")
+
+
+@patch("public_detective.providers.office_converter.subprocess.Popen")
+def test_worker_launch_uses_own_ports_and_profile(mock_popen: MagicMock) -> None:
+    """Tests that each worker starts unoserver on its own ports and user profile."""
+    worker = OfficeServerWorker(["unoserver"], job_timeout=30.0, startup_timeout=5.0)
+
+    worker.launch()
+    try:
+        command = mock_popen.call_args.args[0]
+        assert command[0] == "unoserver"
+        assert command[command.index("--port") + 1] == str(worker.port)
+        assert command[command.index("--uno-port") + 1] != str(worker.port)
+        assert command[command.index("--user-installation") + 1].startswith("file://")
+        assert mock_popen.call_args.kwargs["start_new_session"] is True
+    finally:
+        worker.stop()
+
+
+@patch("public_detective.providers.office_converter.ServerProxy")
+def test_worker_convert_returns_pdf(mock_proxy: MagicMock) -> None:
+    """Tests that a job sends the document and returns the converted bytes."""
+    mock_proxy.return_value.convert.return_value = Binary(b"%PDF")
+    worker = OfficeServerWorker(["unoserver"], job_timeout=30.0, startup_timeout=5.0)
+
+    result = worker.convert(b"document", "calc_pdf_Export", ["AllSheets=true"])
+
+    assert result == b"%PDF"
+    args = mock_proxy.return_value.convert.call_args.args
+    assert args[1].data == b"document"
+    assert args[3:6] == ("pdf", "calc_pdf_Export", ["AllSheets=true"])
+    assert worker.jobs_done == 1
+
+
+@patch("public_detective.providers.office_converter.time.sleep")
+@patch("public_detective.providers.office_converter.ServerProxy")
+def test_worker_wait_until_ready_fails_when_process_exits(mock_proxy: MagicMock, _mock_sleep: MagicMock) -> None:
+    """Tests that a server dying during startup is reported instead of awaited."""
+    worker = OfficeServerWorker(["unoserver"], job_timeout=30.0, startup_timeout=5.0)
+    process = _running_process()
+    process.poll.side_effect = [None, 1, 1]
+    worker._process = process
+    mock_proxy.return_value.info.side_effect = ConnectionRefusedError()
+
+    with pytest.raises(RuntimeError, match="exited during startup"):
+        worker.wait_until_ready()
+
+
+def test_worker_stop_kills_hung_process() -> None:
+    """Tests that a server ignoring SIGTERM is killed with its whole session."""
+    worker = OfficeServerWorker(["unoserver"], job_timeout=30.0, startup_timeout=5.0)
+    process = _running_process()
+    process.wait.side_effect = [subprocess.TimeoutExpired("unoserver", 10), 0]
+    worker._process = process
+
+    with patch("public_detective.providers.office_converter.os.killpg") as mock_killpg:
+        worker.stop()
+
+    process.terminate.assert_called_once()
+    mock_killpg.assert_called_once()
+    assert not worker.is_alive()
+
+
+@patch("public_detective.providers.office_converter.OfficeServerWorker")
+def test_pool_restarts_crashed_worker_before_job(mock_worker_class: MagicMock, pool_config: MagicMock) -> None:
+    """Tests that a worker whose process died is restarted before running a job."""
+    worker = mock_worker_class.return_value
+    worker.is_alive.return_value = False
+    worker.jobs_done = 0
+    worker.last_checked_at = 0.0
+    worker.convert.return_value = b"%PDF"
+    pool = OfficeServerPool(pool_config)
+    pool.start()
+    worker.reset_mock()
+
+    assert pool.convert(b"document", None, []) == b"%PDF"
+
+    worker.stop.assert_called_once()
+    worker.launch.assert_called_once()
+    worker.wait_until_ready.assert_called_once()
+
+
+@patch("public_detective.providers.office_converter.OfficeServerWorker")
+def test_pool_recycles_worker_after_max_jobs(mock_worker_class: MagicMock, pool_config: MagicMock) -> None:
+    """Tests that a worker is restarted once it ran its maximum number of jobs."""
+    worker = mock_worker_class.return_value
+    worker.is_alive.return_value = True
+    worker.jobs_done = 2
+    worker.last_checked_at = 0.0
+    worker.convert.return_value = b"%PDF"
+    pool = OfficeServerPool(pool_config)
+    pool.start()
+    worker.reset_mock()
+
+    pool.convert(b"document", None, [])
+
+    worker.launch.assert_called_once()
+
+
+@patch("public_detective.providers.office_converter.OfficeServerWorker")
+def test_pool_restarts_worker_after_timeout(mock_worker_class: MagicMock, pool_config: MagicMock) -> None:
+    """Tests that a job timing out fails and stops its worker for a restart."""
+    worker = mock_worker_class.return_value
+    worker.is_alive.return_value = True
+    worker.jobs_done = 0
+    worker.last_checked_at = 0.0
+    worker.ping.return_value = True
+    worker.convert.side_effect = TimeoutError("timed out")
+    pool = OfficeServerPool(pool_config)
+    pool.start()
+    worker.reset_mock()
+
+    with pytest.raises(RuntimeError, match="LibreOffice server failed"):
+        pool.convert(b"document", None, [])
+
+    worker.stop.assert_called_once()
+    assert pool._idle_workers.qsize() == 1
+
+
+@patch("public_detective.providers.office_converter.OfficeServerWorker")
+def test_pool_reports_conversion_fault(mock_worker_class: MagicMock, pool_config: MagicMock) -> None:
+    """Tests that a document LibreOffice cannot convert fails without restarting the worker."""
+    worker = mock_worker_class.return_value
+    worker.is_alive.return_value = True
+    worker.jobs_done = 0
+    worker.last_checked_at = 0.0
+    worker.ping.return_value = True
+    worker.convert.side_effect = Fault(1, "Could not load document")
+    pool = OfficeServerPool(pool_config)
+    pool.start()
+    worker.reset_mock()
+
+    with pytest.raises(RuntimeError, match="Could not load document"):
+        pool.convert(b"document", None, [])
+
+    worker.stop.assert_not_called()
+
+
+@patch("public_detective.providers.office_converter.ConfigProvider")
+@patch("public_detective.providers.office_converter.OfficeServerWorker")
+def test_get_instance_falls_back_when_command_is_missing(
+    mock_worker_class: MagicMock, mock_config_provider: MagicMock, pool_config: MagicMock
+) -> None:
+    """Tests that a missing unoserver disables the pool for the process."""
+    mock_config_provider.get_config.return_value = pool_config
+    mock_worker_class.return_value.launch.side_effect = FileNotFoundError("unoserver")
+
+    with patch.object(OfficeServerPool, "_instance", None), patch.object(OfficeServerPool, "_instance_pid", None):
+        assert OfficeServerPool.get_instance() is None
+        assert OfficeServerPool.get_instance() is None
+
+    mock_worker_class.return_value.launch.assert_called_once()
+
+
+@patch("subprocess.run")
+@patch("pathlib.Path.read_bytes", return_value=b"%PDF")
+@patch("public_detective.providers.office_converter.ConfigProvider")
+@patch("public_detective.providers.office_converter.OfficeServerWorker")
+def test_to_pdf_falls_back_to_soffice_when_no_server_starts(
+    mock_worker_class: MagicMock,
+    mock_config_provider: MagicMock,
+    _mock_read_bytes: MagicMock,
+    mock_run: MagicMock,
+    pool_config: MagicMock,
+) -> None:
+    """Tests that a server command that never becomes ready disables the pool for one-shot soffice runs."""
+    mock_config_provider.get_config.return_value = pool_config
+    worker = mock_worker_class.return_value
+    worker.wait_until_ready.side_effect = RuntimeError("LibreOffice server on port 1 did not start within 5.0 seconds.")
+    mock_run.return_value = MagicMock(returncode=0, stdout="OK", stderr="")
+
+    with (
+        patch.object(OfficeServerPool, "_instance", None),
+        patch.object(OfficeServerPool, "_instance_pid", None),
+        patch.object(OfficeServerPool, "_unavailable", False),
+        patch("pathlib.Path.glob", return_value=[Path("input.pdf")]),
+    ):
+        provider = OfficeConverterProvider()
+        provider.conversion_cache = None
+        assert provider.to_pdf(b"document", ".docx") == b"%PDF"
+        assert provider.to_pdf(b"document", ".docx") == b"%PDF"
+        assert OfficeServerPool._unavailable
+
+    worker.launch.assert_called_once()
+    worker.wait_until_ready.assert_called_once()
+    worker.convert.assert_not_called()
+    assert mock_run.call_count == 2
+    assert mock_run.call_args.args[0][0] == "soffice"
+
+
+@patch("subprocess.run")
+@patch("pathlib.Path.read_bytes", return_value=b"%PDF")
+def test_to_pdf_falls_back_to_soffice_when_server_cannot_restart(
+    _mock_read_bytes: MagicMock, mock_run: MagicMock
+) -> None:
+    """Tests that a file is converted by a one-shot soffice run when its server fails to restart."""
+    pool = MagicMock()
+    pool.convert.side_effect = OfficeServerUnavailableError("Could not restart the LibreOffice server.")
+    mock_run.return_value = MagicMock(returncode=0, stdout="OK", stderr="")
+
+    with (
+        patch.object(OfficeServerPool, "get_instance", return_value=pool),
+        patch("pathlib.Path.glob", return_value=[Path("input.pdf")]),
+    ):
+        provider = OfficeConverterProvider()
+        provider.conversion_cache = None
+        assert provider.to_pdf(b"document", ".docx") == b"%PDF"
+
+    pool.convert.assert_called_once()
+    assert mock_run.call_args.args[0][0] == "soffice"
+
+
+@patch("public_detective.providers.office_converter.ConfigProvider")
+def test_get_instance_disabled_by_config(mock_config_provider: MagicMock, pool_config: MagicMock) -> None:
+    """Tests that a pool size of zero keeps the one-shot soffice conversions."""
+    pool_config.OFFICE_CONVERTER_POOL_SIZE = 0
+    mock_config_provider.get_config.return_value = pool_config
+
+    assert OfficeServerPool.get_instance() is None
+
+
+@patch("subprocess.run")
+def test_to_pdf_uses_pool_for_spreadsheets(mock_run: MagicMock) -> None:
+    """Tests that spreadsheets are sent to the pool with the calc export options."""
+    pool = MagicMock()
+    pool.convert.return_value = b"%PDF"
+    with patch.object(OfficeServerPool, "get_instance", return_value=pool):
+        result = OfficeConverterProvider().to_pdf(b"sheet", ".xlsx")
+
+    assert result == b"%PDF"
+    pool.convert.assert_called_once_with(
+        b"sheet", "calc_pdf_Export", ["AllSheets=true", "ScaleToPagesX=1", "ScaleToPagesY=1"]
+    )
+    mock_run.assert_not_called()
+
+
+@patch("public_detective.providers.office_converter.get_command_version", return_value="LibreOffice 7.6")
+def test_to_pdf_uses_conversion_cache(_mock_version: MagicMock, tmp_path: Path) -> None:
+    """Tests that an identical document is converted by LibreOffice only once."""
+    provider = OfficeConverterProvider()
+    provider.conversion_cache = ConversionCache(str(tmp_path), max_bytes=1024)
+
+    with patch.object(provider, "_convert_to_pdf", return_value=b"pdf") as mock_convert:
+        first = provider.to_pdf(b"docx", ".docx")
+        second = provider.to_pdf(b"docx", ".docx")
+        provider.to_pdf(b"docx", ".odt")
+
+    assert first == second == b"pdf"
+    assert mock_convert.call_count == 2
@@ -0,0 +1,153 @@
+"""Unit tests for the per-host rate limiter."""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+from public_detective.providers.rate_limiter import RateLimiter, TokenBucket
+
+
+@pytest.fixture
+def mock_config() -> MagicMock:
+    """Fixture for a mocked configuration with rate limiting enabled."""
+    config = MagicMock()
+    config.HTTP_MAX_REQUESTS_PER_SECOND = 2.0
+    config.HTTP_RATE_LIMIT_BURST = 1
+    config.HTTP_RATE_LIMIT_MIN_REQUESTS_PER_SECOND = 0.5
+    config.HTTP_RETRY_AFTER_MAX_SECONDS = 60
+    return config
+
+
+def _response(status_code: int, retry_after: str | None = None) -> MagicMock:
+    """Builds a mocked response with an optional Retry-After header."""
+    headers = {"Retry-After": retry_after} if retry_after is not None else {}
+    return MagicMock(status_code=status_code, headers=headers)
+
+
+@patch("public_detective.providers.rate_limiter.time.sleep")
+@patch("public_detective.providers.rate_limiter.time.monotonic")
+def test_token_bucket_spends_burst_then_waits(mock_monotonic: MagicMock, mock_sleep: MagicMock) -> None:
+    """Tests that the bucket lets a burst through and then waits for a refill."""
+    clock = [100.0]
+    mock_monotonic.side_effect = lambda: clock[0]
+    mock_sleep.side_effect = lambda seconds: clock.__setitem__(0, clock[0] + seconds)
+    bucket = TokenBucket(max_rate=2.0, capacity=2, min_rate=0.5)
+
+    bucket.acquire()
+    bucket.acquire()
+    bucket.acquire()
+
+    assert [call.args[0] for call in mock_sleep.call_args_list] == [0.5]
+
+
+@patch("public_detective.providers.rate_limiter.time.sleep")
+@patch("public_detective.providers.rate_limiter.time.monotonic")
+def test_token_bucket_does_not_wait_when_idle(mock_monotonic: MagicMock, mock_sleep: MagicMock) -> None:
+    """Tests that a request issued after the bucket refilled goes out immediately."""
+    mock_monotonic.side_effect = [100.0, 100.0, 105.0]
+    bucket = TokenBucket(max_rate=2.0, capacity=1, min_rate=0.5)
+
+    bucket.acquire()
+    bucket.acquire()
+
+    mock_sleep.assert_not_called()
+
+
+@patch("public_detective.providers.rate_limiter.time.sleep")
+@patch("public_detective.providers.rate_limiter.time.monotonic")
+def test_token_bucket_penalize_blocks_until_retry_after(mock_monotonic: MagicMock, mock_sleep: MagicMock) -> None:
+    """Tests that a penalty halves the rate and holds requests until Retry-After."""
+    clock = [100.0]
+    mock_monotonic.side_effect = lambda: clock[0]
+    mock_sleep.side_effect = lambda seconds: clock.__setitem__(0, clock[0] + seconds)
+    bucket = TokenBucket(max_rate=2.0, capacity=1, min_rate=0.5)
+
+    bucket.penalize(retry_after=10)
+    bucket.acquire()
+
+    assert bucket.rate == 1.0
+    assert mock_sleep.call_args_list[0].args[0] == 10
+
+
+def test_token_bucket_rate_backs_off_to_floor_and_recovers() -> None:
+    """Tests the multiplicative decrease and additive increase of the rate."""
+    bucket = TokenBucket(max_rate=2.0, capacity=1, min_rate=0.5)
+
+    for _ in range(5):
+        bucket.penalize()
+    assert bucket.rate == 0.5
+
+    for _ in range(20):
+        bucket.reward()
+    assert bucket.rate == 2.0
+
+
+def test_rate_limiter_keeps_one_bucket_per_host(mock_config: MagicMock) -> None:
+    """Tests that buckets are shared by host and isolated between hosts."""
+    limiter = RateLimiter(mock_config)
+
+    first = limiter.get_bucket("https://pncp.gov.br/api/a")
+    second = limiter.get_bucket("https://PNCP.gov.br/api/b?x=1")
+    other = limiter.get_bucket("https://example.com/file.pdf")
+
+    assert first is second
+    assert first is not other
+
+
+def test_rate_limiter_penalizes_only_throttled_host(mock_config: MagicMock) -> None:
+    """Tests that a 429 slows down its own host and leaves others untouched."""
+    limiter = RateLimiter(mock_config)
+
+    limiter.record_response("https://pncp.gov.br/api", _response(429))
+    limiter.record_response("https://example.com", _response(200))
+
+    assert limiter.get_bucket("https://pncp.gov.br").rate == 1.0
+    assert limiter.get_bucket("https://example.com").rate == 2.0
+
+
+def test_rate_limiter_shares_budget_between_processes(mock_config: MagicMock) -> None:
+    """Tests that each process takes an equal share of the per-host limits."""
+    limiter = RateLimiter(mock_config)
+    limiter.record_response("https://pncp.gov.br/api", _response(429))
+
+    limiter.share_between_processes(4)
+
+    existing = limiter.get_bucket("https://pncp.gov.br")
+    assert existing.max_rate == 0.5
+    assert existing.min_rate == 0.125
+    assert existing.rate == 0.25
+    assert existing.capacity == 1.0
+    new = limiter.get_bucket("https://example.com")
+    assert new.max_rate == 0.5
+    assert new.rate == 0.5
+
+
+@patch("public_detective.providers.rate_limiter.time.sleep")
+def test_rate_limiter_disabled(mock_sleep: MagicMock, mock_config: MagicMock) -> None:
+    """Tests that a non-positive rate disables the limiter."""
+    mock_config.HTTP_MAX_REQUESTS_PER_SECOND = 0
+    limiter = RateLimiter(mock_config)
+
+    limiter.acquire("https://pncp.gov.br")
+    limiter.acquire("https://pncp.gov.br")
+    limiter.record_response("https://pncp.gov.br", _response(429, "30"))
+
+    mock_sleep.assert_not_called()
+    assert limiter._buckets == {}
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        (None, None),
+        ("", None),
+        ("12", 12.0),
+        ("3600", 60.0),
+        ("not a date", None),
+        ("Wed, 21 Oct 2015 07:28:00 GMT", 0.0),
+    ],
+)
+def testparse_retry_after(mock_config: MagicMock, value: str | None, expected: float | None) -> None:
+    """Tests parsing of Retry-After given in seconds or as an HTTP date."""
+    limiter = RateLimiter(mock_config)
+
+    assert limiter.parse_retry_after(value) == expected
@@ -653,3 +653,16 @@ def test_get_pending_analyses_ranked_not_found(analysis_repository: AnalysisRepo
     result = analysis_repository.get_pending_analyses_ranked()
 
     assert result == []
+
+
+def test_get_token_estimation_samples(analysis_repository: AnalysisRepository, mock_engine: MagicMock) -> None:
+    """Tests that estimated and exact token counts are returned as pairs."""
+    conn = mock_engine.connect.return_value.__enter__.return_value
+    conn.execute.return_value.fetchall.return_value = [(1000, 1300), (200, 180)]
+
+    samples = analysis_repository.get_token_estimation_samples(50)
+
+    assert samples == [(1000, 1300), (200, 180)]
+    sql, params = conn.execute.call_args.args
+    assert "NOT input_tokens_estimated" in str(sql)
+    assert params == {"limit": 50}
@@ -0,0 +1,118 @@
+"""This module contains the unit tests for the FileContentsRepository."""
+
+from datetime import datetime, timezone
+from unittest.mock import MagicMock
+
+import pytest
+from public_detective.models.file_contents import FileContent
+from public_detective.repositories.file_contents import FileContentsRepository
+
+CONTENT_HASH = "a" * 64
+
+
+@pytest.fixture
+def mock_engine() -> MagicMock:
+    """Fixture to create a mock SQLAlchemy engine."""
+    engine = MagicMock()
+    conn = MagicMock()
+    engine.connect.return_value.__enter__.return_value = conn
+    return engine
+
+
+def _content_row() -> dict:
+    """Builds a stored file content row.
+
+    Returns:
+        The row as returned by the database.
+    """
+    return {
+        "content_hash": CONTENT_HASH,
+        "extension": ".docx",
+        "size_bytes": 10,
+        "original_gcs_path": f"contents/{CONTENT_HASH}/original.docx",
+        "prepared_content_gcs_uris": [f"gs://bucket/contents/{CONTENT_HASH}/prepared.pdf"],
+        "inferred_extension": None,
+        "used_fallback_conversion": False,
+        "reference_count": 3,
+    }
+
+
+def test_get_file_contents_maps_rows_by_hash(mock_engine: MagicMock) -> None:
+    """Tests that stored contents are returned keyed by their hash and marked as used."""
+    conn = mock_engine.connect.return_value.__enter__.return_value
+    conn.execute.return_value.mappings.return_value.all.return_value = [_content_row()]
+
+    stored_contents = FileContentsRepository(mock_engine).get_file_contents([CONTENT_HASH, CONTENT_HASH])
+
+    assert stored_contents == {CONTENT_HASH: FileContent.model_validate(_content_row())}
+    assert conn.execute.call_args.args[1] == {"content_hashes": [CONTENT_HASH]}
+    assert "SET last_used_at = NOW()" in str(conn.execute.call_args.args[0])
+    conn.commit.assert_called_once()
+
+
+def test_get_file_contents_skips_query_without_hashes(mock_engine: MagicMock) -> None:
+    """Tests that no query is sent when there is nothing to look up."""
+    assert FileContentsRepository(mock_engine).get_file_contents([]) == {}
+    mock_engine.connect.assert_not_called()
+
+
+def test_save_file_content_ignores_conflicts(mock_engine: MagicMock) -> None:
+    """Tests that saving a content keeps the row stored by a concurrent run."""
+    conn = mock_engine.connect.return_value.__enter__.return_value
+
+    FileContentsRepository(mock_engine).save_file_content(FileContent.model_validate(_content_row()))
+
+    statement, params = conn.execute.call_args.args
+    assert "ON CONFLICT (content_hash) DO NOTHING" in str(statement)
+    assert params["content_hash"] == CONTENT_HASH
+    assert "reference_count" not in params
+    conn.commit.assert_called_once()
+
+
+def test_add_reference_increments_count(mock_engine: MagicMock) -> None:
+    """Tests that adding a reference bumps the count and the last use."""
+    conn = mock_engine.connect.return_value.__enter__.return_value
+
+    FileContentsRepository(mock_engine).add_reference(CONTENT_HASH)
+
+    statement, params = conn.execute.call_args.args
+    assert "reference_count = reference_count + 1" in str(statement)
+    assert "last_used_at = NOW()" in str(statement)
+    assert params == {"content_hash": CONTENT_HASH}
+    conn.commit.assert_called_once()
+
+
+def test_save_estimated_tokens_updates_each_content(mock_engine: MagicMock) -> None:
+    """Tests that token estimates are saved in a single batch."""
+    conn = mock_engine.connect.return_value.__enter__.return_value
+
+    FileContentsRepository(mock_engine).save_estimated_tokens({CONTENT_HASH: 258})
+
+    statement, params = conn.execute.call_args.args
+    assert "SET estimated_tokens = :estimated_tokens" in str(statement)
+    assert params == [{"content_hash": CONTENT_HASH, "estimated_tokens": 258}]
+    conn.commit.assert_called_once()
+
+
+def test_save_estimated_tokens_skips_empty_batch(mock_engine: MagicMock) -> None:
+    """Tests that no query is sent when nothing was estimated."""
+    FileContentsRepository(mock_engine).save_estimated_tokens({})
+    mock_engine.connect.assert_not_called()
+
+
+def test_collect_garbage_recounts_then_deletes(mock_engine: MagicMock) -> None:
+    """Tests that references are recounted, and checked again, before unused contents are deleted."""
+    conn = mock_engine.connect.return_value.__enter__.return_value
+    row = {**_content_row(), "reference_count": 0}
+    conn.execute.return_value.mappings.return_value.all.return_value = [row]
+    unused_since = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+    deleted = FileContentsRepository(mock_engine).collect_garbage(unused_since)
+
+    statements = [str(call.args[0]) for call in conn.execute.call_args_list]
+    assert "FROM file_records fr WHERE fr.content_hash = fc.content_hash" in statements[0]
+    assert "DELETE FROM file_contents" in statements[1]
+    assert "NOT EXISTS (SELECT 1 FROM file_records fr WHERE fr.content_hash = fc.content_hash)" in statements[1]
+    assert conn.execute.call_args_list[1].args[1] == {"unused_since": unused_since}
+    assert deleted == [FileContent.model_validate(row)]
+    conn.commit.assert_called_once()
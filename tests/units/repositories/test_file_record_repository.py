@@ -118,3 +118,20 @@ def test_set_files_as_included_happy_path(repository: FileRecordsRepository) ->
     mock_connection = repository.engine.connect().__enter__()
     mock_connection.execute.assert_called_once()
     mock_connection.commit.assert_called_once()
+
+
+def test_set_files_as_excluded(repository: FileRecordsRepository) -> None:
+    """Tests that the UPDATE statement clears the inclusion flag of the given files."""
+    file_ids = [uuid4(), uuid4()]
+    repository.set_files_as_excluded(file_ids)
+    mock_connection = repository.engine.connect().__enter__()
+    sql, params = mock_connection.execute.call_args.args
+    assert "included_in_analysis = FALSE" in str(sql)
+    assert params == {"file_ids": file_ids}
+    mock_connection.commit.assert_called_once()
+
+
+def test_set_files_as_excluded_empty_list(repository: FileRecordsRepository) -> None:
+    """Tests that no database call is made when an empty list is passed."""
+    repository.set_files_as_excluded([])
+    repository.engine.connect.assert_not_called()
@@ -0,0 +1,107 @@
+"""This module contains the unit tests for the PreAnalysisCheckpointRepository."""
+
+from datetime import date
+from unittest.mock import MagicMock
+
+import pytest
+from public_detective.models.pre_analysis_checkpoints import PreAnalysisCheckpoint
+from public_detective.repositories.pre_analysis_checkpoints import PreAnalysisCheckpointRepository
+
+START_DATE = date(2025, 1, 1)
+END_DATE = date(2025, 1, 30)
+
+
+@pytest.fixture
+def mock_engine() -> MagicMock:
+    """Fixture to create a mock SQLAlchemy engine."""
+    engine = MagicMock()
+    conn = MagicMock()
+    engine.connect.return_value.__enter__.return_value = conn
+    return engine
+
+
+def test_get_checkpoint_returns_model(mock_engine: MagicMock) -> None:
+    """Tests that a stored checkpoint row is returned as a model."""
+    conn = mock_engine.connect.return_value.__enter__.return_value
+    conn.execute.return_value.mappings.return_value.first.return_value = {
+        "start_date": START_DATE,
+        "end_date": END_DATE,
+        "last_completed_date": date(2025, 1, 16),
+        "page_date": date(2025, 1, 17),
+        "city_code": 3550308,
+        "modality": 6,
+        "page": 3,
+    }
+
+    checkpoint = PreAnalysisCheckpointRepository(mock_engine).get_checkpoint(START_DATE, END_DATE)
+
+    assert checkpoint == PreAnalysisCheckpoint(
+        start_date=START_DATE,
+        end_date=END_DATE,
+        last_completed_date=date(2025, 1, 16),
+        page_date=date(2025, 1, 17),
+        city_code=3550308,
+        modality=6,
+        page=3,
+    )
+
+
+def test_get_checkpoint_returns_none_when_missing(mock_engine: MagicMock) -> None:
+    """Tests that a run without a checkpoint row returns None."""
+    conn = mock_engine.connect.return_value.__enter__.return_value
+    conn.execute.return_value.mappings.return_value.first.return_value = None
+
+    assert PreAnalysisCheckpointRepository(mock_engine).get_checkpoint(START_DATE, END_DATE) is None
+
+
+def test_start_run_replaces_previous_checkpoint(mock_engine: MagicMock) -> None:
+    """Tests that starting a run deletes the old checkpoint before inserting a new one."""
+    conn = mock_engine.connect.return_value.__enter__.return_value
+
+    PreAnalysisCheckpointRepository(mock_engine).start_run(START_DATE, END_DATE)
+
+    statements = [str(call.args[0]) for call in conn.execute.call_args_list]
+    assert "DELETE FROM pre_analysis_checkpoints" in statements[0]
+    assert "INSERT INTO pre_analysis_checkpoints" in statements[1]
+    conn.commit.assert_called_once()
+
+
+def test_save_page_updates_search_position(mock_engine: MagicMock) -> None:
+    """Tests that saving a page stores the day, city, modality and page."""
+    conn = mock_engine.connect.return_value.__enter__.return_value
+
+    PreAnalysisCheckpointRepository(mock_engine).save_page(START_DATE, END_DATE, date(2025, 1, 17), None, 8, 2)
+
+    params = conn.execute.call_args.args[1]
+    assert params["target_date"] == date(2025, 1, 17)
+    assert params["city_code"] is None
+    assert params["modality"] == 8
+    assert params["page"] == 2
+    conn.commit.assert_called_once()
+
+
+def test_save_completed_day_clears_day_progress(mock_engine: MagicMock) -> None:
+    """Tests that completing a day resets the page position and drops its processed procurements."""
+    conn = mock_engine.connect.return_value.__enter__.return_value
+
+    PreAnalysisCheckpointRepository(mock_engine).save_completed_day(START_DATE, END_DATE, date(2025, 1, 17))
+
+    statements = [str(call.args[0]) for call in conn.execute.call_args_list]
+    assert "SET last_completed_date = :target_date" in statements[0]
+    assert "DELETE FROM pre_analysis_checkpoint_procurements" in statements[1]
+    conn.commit.assert_called_once()
+
+
+def test_mark_processed_and_get_processed_control_numbers(mock_engine: MagicMock) -> None:
+    """Tests recording a processed procurement and reading the processed set back."""
+    conn = mock_engine.connect.return_value.__enter__.return_value
+    conn.execute.return_value.scalars.return_value.all.return_value = ["PN-1", "PN-2"]
+    repo = PreAnalysisCheckpointRepository(mock_engine)
+
+    repo.mark_processed(START_DATE, END_DATE, date(2025, 1, 17), "PN-1")
+    processed = repo.get_processed_control_numbers(START_DATE, END_DATE, date(2025, 1, 17))
+
+    insert_sql = str(conn.execute.call_args_list[0].args[0])
+    assert "ON CONFLICT DO NOTHING" in insert_sql
+    assert conn.execute.call_args_list[0].args[1]["pncp_control_number"] == "PN-1"
+    assert processed == {"PN-1", "PN-2"}
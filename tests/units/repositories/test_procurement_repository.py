@@ -4,14 +4,19 @@ import io
 import json
 import logging
 import lzma
+import os
 import tarfile
+import tempfile
+import threading
+import time
 import zipfile
-from collections.abc import Callable, Iterable
+from collections.abc import Callable, Generator, Iterable
 from datetime import date
 from decimal import Decimal
 from http import HTTPStatus
+from pathlib import Path
 from types import SimpleNamespace
-from typing import Any, Literal
+from typing import Any, Literal, cast
 from unittest.mock import MagicMock, patch
 from uuid import uuid4
 
@@ -20,11 +25,21 @@ import pytest
 import rarfile
 import requests
 from google.api_core import exceptions
+from public_detective.exceptions.extraction import ExtractionLimitError
 from public_detective.models.procurements import Procurement, ProcurementDocument, ProcurementListResponse
-from public_detective.repositories.procurements import ProcessedFile, ProcurementsRepository
+from public_detective.providers.download_cache import DownloadCache
+from public_detective.providers.file_type import ArchiveFormat
+from public_detective.repositories.procurements import (
+    DownloadedFile,
+    ExtractionBudget,
+    ExtractionStats,
+    ProcessedFile,
+    ProcurementsRepository,
+)
 from pydantic import ValidationError
 
 SAMPLE_CONTENT = b"sample-content"
+FILE_SAMPLES_DIR = Path(__file__).parents[2] / "fixtures" / "file_samples"
 
 
 if not hasattr(rarfile, "NeedPassword"):
@@ -137,6 +152,17 @@ def repo(
     """Provides a ProcurementsRepository instance with mocked dependencies."""
     with patch("public_detective.providers.config.ConfigProvider.get_config") as mock_get_config:
         mock_config = MagicMock()
+        mock_config.PNCP_FETCH_MAX_WORKERS = 1
+        mock_config.PNCP_FETCH_QUEUE_MAX_EVENTS = 1000
+        mock_config.PNCP_DOWNLOAD_MAX_WORKERS = 1
+        mock_config.PNCP_DOWNLOAD_SPOOL_MAX_MEMORY_BYTES = 1024
+        mock_config.PNCP_DOWNLOAD_MAX_BYTES = 1024 * 1024
+        mock_config.PNCP_DOWNLOAD_CACHE_DIR = None
+        mock_config.PNCP_EXTRACTION_MAX_DEPTH = 5
+        mock_config.PNCP_EXTRACTION_MAX_TOTAL_BYTES = 1024 * 1024
+        mock_config.PNCP_EXTRACTION_MAX_MEMBERS = 100
+        mock_config.PNCP_EXTRACTION_MAX_RATIO = 100.0
+        mock_config.PNCP_EXTRACTION_7Z_PARALLEL = False
         mock_get_config.return_value = mock_config
         return ProcurementsRepository(
             engine=mock_engine, pubsub_provider=mock_pubsub_provider, http_provider=mock_http_provider
@@ -150,12 +176,203 @@ def test_extract_from_zip(repo: ProcurementsRepository) -> None:
         zf.writestr("file1.txt", "content1")
         zf.writestr("file2.txt", "content2")
     zip_content = zip_buffer.getvalue()
-    extracted_files = repo._extract_from_zip(zip_content)
+    extracted_files = list(repo._extract_from_zip(zip_content))
     assert len(extracted_files) == 2
     assert ("file1.txt", b"content1") in extracted_files
     assert ("file2.txt", b"content2") in extracted_files
 
 
+def test_recursive_file_processing_holds_one_member_at_a_time(repo: ProcurementsRepository) -> None:
+    """Tests that nested archive members are processed one at a time."""
+    inner_buffer = io.BytesIO()
+    with zipfile.ZipFile(inner_buffer, "w", zipfile.ZIP_STORED) as zf:
+        zf.writestr("a.txt", b"a" * 1000)
+        zf.writestr("b.txt", b"b" * 1000)
+    outer_buffer = io.BytesIO()
+    with zipfile.ZipFile(outer_buffer, "w", zipfile.ZIP_STORED) as zf:
+        zf.writestr("inner.zip", inner_buffer.getvalue())
+        zf.writestr("c.txt", b"c" * 500)
+    files: list[ProcessedFile] = []
+    stats = ExtractionStats()
+
+    repo._recursive_file_processing("doc", outer_buffer.getvalue(), "outer.zip", 0, files, {}, stats)
+
+    assert [file.relative_path for file in files] == [
+        "outer.zip/inner.zip/a.txt",
+        "outer.zip/inner.zip/b.txt",
+        "outer.zip/c.txt",
+    ]
+    assert stats.members == 4
+    assert stats.largest_member_bytes == len(inner_buffer.getvalue())
+    assert stats.peak_held_bytes == len(inner_buffer.getvalue()) + 1000
+    assert stats.held_bytes == 0
+
+
+def test_recursive_file_processing_discards_partial_archive(repo: ProcurementsRepository) -> None:
+    """Tests that an archive failing midway is kept whole instead of partially extracted."""
+
+    def failing_members(_content: bytes, _stats: ExtractionStats) -> Iterable[tuple[str, bytes]]:
+        yield "first.txt", b"first"
+        raise zipfile.BadZipFile("truncated")
+
+    files = [
+        ProcessedFile(source_document_id="doc", relative_path="before.txt", content=b"x", raw_document_metadata={})
+    ]
+    with patch.object(repo, "_extract_from_zip", side_effect=failing_members):
+        repo._recursive_file_processing("doc", b"zip", "archive.zip", 0, files, {})
+
+    assert [(file.relative_path, file.extraction_failed) for file in files] == [
+        ("before.txt", False),
+        ("archive.zip", True),
+    ]
+
+
+def _budget_stats(
+    max_depth: int = 5, max_total_bytes: int = 1024 * 1024, max_members: int = 100, max_ratio: float = 100.0
+) -> ExtractionStats:
+    """Builds extraction counters bound to a budget."""
+    return ExtractionStats(
+        budget=ExtractionBudget(
+            max_depth=max_depth,
+            max_total_bytes=max_total_bytes,
+            max_members=max_members,
+            max_ratio=max_ratio,
+            ratio_min_bytes=1024,
+        )
+    )
+
+
+def _zip_bytes(members: dict[str, bytes], compression: int = zipfile.ZIP_STORED) -> bytes:
+    """Builds a ZIP archive in memory."""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression) as zf:
+        for name, content in members.items():
+            zf.writestr(name, content)
+    return buffer.getvalue()
+
+
+def test_recursive_file_processing_depth_limit(repo: ProcurementsRepository) -> None:
+    """Tests that archives nested beyond the maximum depth are kept unextracted."""
+    innermost = _zip_bytes({"deep.txt": b"deep"})
+    inner = _zip_bytes({"innermost.zip": innermost})
+    outer = _zip_bytes({"inner.zip": inner, "top.txt": b"top"})
+    files: list[ProcessedFile] = []
+    stats = _budget_stats(max_depth=2)
+
+    repo._recursive_file_processing("doc", outer, "outer.zip", 0, files, {}, stats)
+
+    assert [(file.relative_path, file.extraction_limit_exceeded) for file in files] == [
+        ("outer.zip/inner.zip/innermost.zip", True),
+        ("outer.zip/top.txt", False),
+    ]
+    assert files[0].content == innermost
+    assert stats.limits_exceeded == {"depth": 1}
+
+
+def test_recursive_file_processing_total_bytes_limit(repo: ProcurementsRepository) -> None:
+    """Tests that extraction stops once the procurement's byte budget is spent."""
+    archive = _zip_bytes({"a.txt": b"a" * 600, "b.txt": b"b" * 600})
+    files = [
+        ProcessedFile(source_document_id="doc", relative_path="before.txt", content=b"x", raw_document_metadata={})
+    ]
+    stats = _budget_stats(max_total_bytes=1000)
+
+    repo._recursive_file_processing("doc", archive, "archive.zip", 0, files, {}, stats)
+
+    assert [(file.relative_path, file.extraction_limit_exceeded) for file in files] == [
+        ("before.txt", False),
+        ("archive.zip", True),
+    ]
+    assert files[1].content == archive
+    assert stats.limits_exceeded == {"total_bytes": 1}
+    assert stats.held_bytes == 0
+
+
+def test_recursive_file_processing_members_limit(repo: ProcurementsRepository) -> None:
+    """Tests that archives with too many members are kept unextracted."""
+    archive = _zip_bytes({f"{index}.txt": b"x" for index in range(5)})
+    files: list[ProcessedFile] = []
+    stats = _budget_stats(max_members=3)
+
+    repo._recursive_file_processing("doc", archive, "archive.zip", 0, files, {}, stats)
+
+    assert [(file.relative_path, file.extraction_limit_exceeded) for file in files] == [("archive.zip", True)]
+    assert stats.limits_exceeded == {"members": 1}
+
+
+def test_recursive_file_processing_ratio_limit(repo: ProcurementsRepository) -> None:
+    """Tests that highly compressed archives are kept unextracted while siblings are processed."""
+    bomb = _zip_bytes({"zeros.txt": b"\0" * 200_000}, zipfile.ZIP_DEFLATED)
+    outer = _zip_bytes({"bomb.zip": bomb, "ok.txt": b"ok"})
+    files: list[ProcessedFile] = []
+    stats = _budget_stats(max_ratio=10.0)
+
+    repo._recursive_file_processing("doc", outer, "outer.zip", 0, files, {}, stats)
+
+    assert [(file.relative_path, file.extraction_limit_exceeded) for file in files] == [
+        ("outer.zip/bomb.zip", True),
+        ("outer.zip/ok.txt", False),
+    ]
+    assert stats.limits_exceeded == {"ratio": 1}
+
+
+def test_recursive_file_processing_single_file_limit(repo: ProcurementsRepository) -> None:
+    """Tests that single-file decompression is streamed against the byte budget."""
+    content = gzip.compress(b"a" * 5000)
+    files: list[ProcessedFile] = []
+    stats = _budget_stats(max_total_bytes=1000, max_ratio=1000.0)
+
+    repo._recursive_file_processing("doc", content, "document.txt.gz", 0, files, {}, stats)
+
+    assert [(file.relative_path, file.extraction_limit_exceeded) for file in files] == [("document.txt.gz", True)]
+    assert stats.limits_exceeded == {"total_bytes": 1}
+
+
+def test_extract_from_7z_declared_size_limit(repo: ProcurementsRepository) -> None:
+    """Tests that 7z archives declaring more bytes than the budget are not extracted."""
+    buffer = io.BytesIO()
+    with py7zr.SevenZipFile(buffer, "w", mp=False) as archive:
+        archive.writestr(b"a" * 2000, "file.txt")
+
+    with pytest.raises(ExtractionLimitError):
+        list(repo._extract_from_7z(buffer.getvalue(), _budget_stats(max_total_bytes=1000)))
+
+
+def test_recursive_file_processing_routes_by_magic_bytes(repo: ProcurementsRepository) -> None:
+    """Tests that archives are recognized from their content when their extension does not tell."""
+    tar_buffer = io.BytesIO()
+    with tarfile.open(fileobj=tar_buffer, mode="w") as archive:
+        info = tarfile.TarInfo("inner.txt")
+        info.size = len(SAMPLE_CONTENT)
+        archive.addfile(info, io.BytesIO(SAMPLE_CONTENT))
+    files: list[ProcessedFile] = []
+
+    repo._recursive_file_processing("doc", gzip.compress(tar_buffer.getvalue()), "anexo", 0, files, {})
+    repo._recursive_file_processing("doc", create_7z_payload([("a.txt", b"a")]), "edital.bin", 0, files, {})
+
+    assert [(file.relative_path, file.content) for file in files] == [
+        ("anexo/inner.txt", SAMPLE_CONTENT),
+        ("edital.bin/a.txt", b"a"),
+    ]
+
+
+def test_recursive_file_processing_does_not_scan_leaf_files(repo: ProcurementsRepository) -> None:
+    """Tests that leaf files are classified from their first bytes only."""
+    content = b"%PDF-1.7" + b"\0" * (5 * 1024 * 1024)
+    files: list[ProcessedFile] = []
+
+    with (
+        patch("public_detective.repositories.procurements.sniff_archive_format", return_value=None) as mock_sniff,
+        patch("tarfile.is_tarfile") as mock_is_tarfile,
+    ):
+        repo._recursive_file_processing("doc", content, "edital.pdf", 0, files, {})
+
+    assert len(mock_sniff.call_args.args[0]) == 4096
+    mock_is_tarfile.assert_not_called()
+    assert files[0].content == content
+    assert files[0].archive_format is None
+
+
 def test_extract_from_zip_member_read_error(repo: ProcurementsRepository) -> None:
     """Propagates ValueError when a ZIP member cannot be read."""
     mock_member = MagicMock()
@@ -164,13 +381,13 @@ def test_extract_from_zip_member_read_error(repo: ProcurementsRepository) -> Non
 
     mock_archive = MagicMock()
     mock_archive.infolist.return_value = [mock_member]
-    mock_archive.read.side_effect = ValueError("broken member")
+    mock_archive.open.side_effect = ValueError("broken member")
 
     mock_context = MagicMock()
     mock_context.__enter__.return_value = mock_archive
     with patch("zipfile.ZipFile", return_value=mock_context):
         with pytest.raises(ValueError, match="broken member"):
-            repo._extract_from_zip(b"dummy content")
+            list(repo._extract_from_zip(b"dummy content"))
 
 
 def test_extract_from_7z(repo: ProcurementsRepository) -> None:
@@ -180,42 +397,138 @@ def test_extract_from_7z(repo: ProcurementsRepository) -> None:
         archive.writestr(b"content1", "file1.txt")
         archive.writestr(b"content2", "file2.txt")
     s_content = s_buffer.getvalue()
-    extracted_files = repo._extract_from_7z(s_content)
+    extracted_files = list(repo._extract_from_7z(s_content))
     assert len(extracted_files) == 2
     assert ("file1.txt", b"content1") in extracted_files
     assert ("file2.txt", b"content2") in extracted_files
 
 
-@patch("os.chmod")
-@patch("os.walk")
-@patch("py7zr.SevenZipFile")
-def test_extract_from_7z_permission_error(
-    mock_seven_zip: MagicMock,
-    mock_os_walk: MagicMock,
-    mock_chmod: MagicMock,
-    repo: ProcurementsRepository,
-    caplog: Any,
-) -> None:
-    """Retries reading files when a PermissionError occurs."""
-    caplog.set_level(logging.WARNING)
+def test_extract_from_7z_does_not_touch_disk(repo: ProcurementsRepository) -> None:
+    """Tests that 7z members are extracted in memory, in archive order."""
+    payload = create_7z_payload([("b.txt", b"second"), ("a.txt", b"first")])
+
+    with patch("tempfile.TemporaryDirectory") as mock_tmpdir, patch("tempfile.NamedTemporaryFile") as mock_tmpfile:
+        extracted = list(repo._extract_from_7z(payload))
+
+    assert extracted == [("b.txt", b"second"), ("a.txt", b"first")]
+    mock_tmpdir.assert_not_called()
+    mock_tmpfile.assert_not_called()
+
+
+def _multi_block_7z(tmp_path: Path, members: list[tuple[str, bytes]]) -> bytes:
+    """Builds a 7z archive with one compressed block per member."""
+    archive_path = tmp_path / "blocks.7z"
+    for index, (name, content) in enumerate(members):
+        with py7zr.SevenZipFile(archive_path, "w" if index == 0 else "a") as archive:
+            archive.writestr(content, name)
+    return archive_path.read_bytes()
+
+
+def test_extract_from_7z_parallel_blocks(repo: ProcurementsRepository, tmp_path: Path) -> None:
+    """Tests that archives with several blocks are decompressed in parallel when enabled."""
+    payload = _multi_block_7z(tmp_path, [("a.txt", b"a" * 5000), ("b.txt", b"b" * 5000), ("c.txt", b"c" * 5000)])
+    repo.config.PNCP_EXTRACTION_7Z_PARALLEL = True
+    stats = ExtractionStats()
+
+    extracted = list(repo._extract_from_7z(payload, stats))
+
+    assert extracted == [("a.txt", b"a" * 5000), ("b.txt", b"b" * 5000), ("c.txt", b"c" * 5000)]
+    assert stats.total_bytes == 15000
+    assert stats.peak_held_bytes == 15000
+    assert stats.held_bytes == 0
+
+
+def test_extract_from_7z_holds_one_member_at_a_time(repo: ProcurementsRepository) -> None:
+    """Tests that sequential 7z extraction only keeps the member being processed in memory."""
+    payload = create_7z_payload([("a.txt", b"a" * 5000), ("b.txt", b"b" * 5000), ("c.txt", b"c" * 5000)])
+    files: list[ProcessedFile] = []
+    stats = ExtractionStats()
+
+    repo._recursive_file_processing("doc", payload, "docs.7z", 0, files, {}, stats)
+
+    assert [file.relative_path for file in files] == ["docs.7z/a.txt", "docs.7z/b.txt", "docs.7z/c.txt"]
+    assert stats.total_bytes == 15000
+    assert stats.peak_held_bytes == 5000
+    assert stats.held_bytes == 0
+
+
+def test_extract_from_7z_decompresses_solid_archive_once(repo: ProcurementsRepository) -> None:
+    """Tests that members of a solid 7z block are not decompressed again for each member."""
+    members = [(f"{index}.txt", bytes([65 + index]) * 5000) for index in range(5)]
+    payload = create_7z_payload(members)
+    decompress = py7zr.compressor.SevenZipDecompressor.decompress
+    decompressed_sizes: list[int] = []
+
+    def counting_decompress(decompressor: Any, *args: Any, **kwargs: Any) -> bytes:
+        data = decompress(decompressor, *args, **kwargs)
+        decompressed_sizes.append(len(data))
+        return data
+
+    with patch.object(py7zr.compressor.SevenZipDecompressor, "decompress", autospec=True) as mock_decompress:
+        mock_decompress.side_effect = counting_decompress
+        extracted = list(repo._extract_from_7z(payload))
+
+    assert extracted == members
+    # The archive header is compressed too, but is far smaller than a member.
+    assert 25000 <= sum(decompressed_sizes) < 30000
+
+
+def test_extract_from_7z_stops_extraction_when_consumer_stops(repo: ProcurementsRepository) -> None:
+    """Tests that closing the generator early stops the producer thread and frees the buffers."""
+    payload = create_7z_payload([("a.txt", b"a" * 5000), ("b.txt", b"b" * 5000), ("c.txt", b"c" * 5000)])
+    stats = ExtractionStats()
+
+    extraction = cast(Generator[tuple[str, bytes], None, None], repo._extract_from_7z(payload, stats))
+    assert next(extraction) == ("a.txt", b"a" * 5000)
+    extraction.close()
+
+    assert stats.held_bytes == 0
+    assert not [thread for thread in threading.enumerate() if thread.name == "7z-extract"]
 
-    mock_archive = MagicMock()
-    mock_seven_zip.return_value.__enter__.return_value = mock_archive
 
-    def fake_walk(tmpdir: str) -> Iterable[tuple[str, list[str], list[str]]]:
-        yield tmpdir, [], ["restricted.txt"]
+def test_extract_from_7z_ratio_limit_while_decompressing(repo: ProcurementsRepository) -> None:
+    """Tests that the budget is charged while 7z members are inflated."""
+    payload = create_7z_payload([("zeros.txt", b"\0" * 200_000)])
+    files: list[ProcessedFile] = []
+    stats = _budget_stats(max_ratio=10.0)
 
-    mock_os_walk.side_effect = fake_walk
+    repo._recursive_file_processing("doc", payload, "bomb.7z", 0, files, {}, stats)
 
-    file_handle = MagicMock()
-    file_handle.__enter__.return_value.read.return_value = b"permitted"
-    file_handle.__exit__.return_value = None
+    assert [(file.relative_path, file.extraction_limit_exceeded) for file in files] == [("bomb.7z", True)]
+    assert stats.limits_exceeded == {"ratio": 1}
+    assert stats.held_bytes == 0
 
-    with patch("builtins.open", side_effect=[PermissionError("denied"), file_handle]):
-        extracted = repo._extract_from_7z(b"content")
 
-    assert extracted == [("restricted.txt", b"permitted")]
-    assert mock_chmod.called
+def test_extract_from_7z_benchmark(repo: ProcurementsRepository, record_property: Callable[[str, Any], None]) -> None:
+    """Compares the in-memory 7z extraction with a temporary-directory round trip.
+
+    The timings of both paths over the file samples are recorded as test
+    properties (visible in the JUnit report).
+    """
+    samples = sorted((FILE_SAMPLES_DIR).iterdir())
+    payload = create_7z_payload([(sample.name, sample.read_bytes()) for sample in samples])
+    rounds = 5
+
+    def extract_through_temp_directory() -> dict[str, bytes]:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with py7zr.SevenZipFile(io.BytesIO(payload), mode="r") as archive:
+                archive.extractall(path=tmpdir)
+            return {name: (Path(tmpdir) / name).read_bytes() for name in os.listdir(tmpdir)}
+
+    started = time.perf_counter()
+    for _ in range(rounds):
+        baseline = extract_through_temp_directory()
+    temp_directory_seconds = (time.perf_counter() - started) / rounds
+
+    started = time.perf_counter()
+    for _ in range(rounds):
+        extracted = dict(repo._extract_from_7z(payload))
+    in_memory_seconds = (time.perf_counter() - started) / rounds
+
+    record_property("7z_temp_directory_seconds", temp_directory_seconds)
+    record_property("7z_in_memory_seconds", in_memory_seconds)
+    assert extracted == baseline
+    assert extracted == {sample.name: sample.read_bytes() for sample in samples}
 
 
 def test_extract_from_tar(repo: ProcurementsRepository) -> None:
@@ -229,7 +542,7 @@ def test_extract_from_tar(repo: ProcurementsRepository) -> None:
         info2.size = len(b"content2")
         tar.addfile(info2, io.BytesIO(b"content2"))
     tar_content = tar_buffer.getvalue()
-    extracted_files = repo._extract_from_tar(tar_content)
+    extracted_files = list(repo._extract_from_tar(tar_content))
     assert len(extracted_files) == 2
     assert ("file1.txt", b"content1") in extracted_files
     assert ("file2.txt", b"content2") in extracted_files
@@ -244,7 +557,7 @@ def test_extract_from_tar_empty_file(repo: ProcurementsRepository) -> None:
     mock_archive.extractfile.return_value = None  # Simulate an unextractable file
 
     with patch("tarfile.open", return_value=mock_archive):
-        result = repo._extract_from_tar(b"dummy tar content")
+        result = list(repo._extract_from_tar(b"dummy tar content"))
         assert result == []
 
 
@@ -288,7 +601,7 @@ def test_get_all_documents_metadata_success(repo: ProcurementsRepository) -> Non
     procurement.procurement_sequence = "1"
     repo.config.PNCP_INTEGRATION_API_URL = "http://test.api/"
 
-    docs = repo._get_all_documents_metadata(procurement)
+    docs = repo.get_all_documents_metadata(procurement)
 
     assert len(docs) == 1
     doc_model, raw_meta = docs[0]
@@ -324,7 +637,7 @@ def test_get_all_documents_metadata_all_active(repo: ProcurementsRepository) ->
     procurement.procurement_sequence = "1"
     repo.config.PNCP_INTEGRATION_API_URL = "http://test.api/"
 
-    docs = repo._get_all_documents_metadata(procurement)
+    docs = repo.get_all_documents_metadata(procurement)
 
     assert len(docs) == 1
     assert docs[0][1] == raw_doc1
@@ -340,27 +653,161 @@ def test_get_all_documents_metadata_request_error(repo: ProcurementsRepository)
     procurement.procurement_year = 2025
     procurement.procurement_sequence = 1
     repo.config.PNCP_INTEGRATION_API_URL = "http://test.api/"
-    docs = repo._get_all_documents_metadata(procurement)
+    docs = repo.get_all_documents_metadata(procurement)
     assert docs == []
 
 
-def test_download_file_content_success(repo: ProcurementsRepository) -> None:
-    """Tests successful download of file content."""
+def _streamed_response(chunks: list[bytes], headers: dict[str, str] | None = None) -> MagicMock:
+    """Builds a mocked streamed response yielding the given chunks."""
     mock_response = MagicMock()
     mock_response.status_code = 200
-    mock_response.content = b"file content"
-    repo.http_provider.get.return_value = mock_response
-    content = repo._download_file_content("http://test.url/file.pdf")
-    assert content == b"file content"
+    mock_response.headers = headers or {}
+    mock_response.iter_content.return_value = iter(chunks)
+    return mock_response
+
+
+def test_download_file_success(repo: ProcurementsRepository) -> None:
+    """Tests that the content is streamed and the metadata comes from the same GET."""
+    repo.http_provider.get.return_value = _streamed_response(
+        [b"file ", b"content"],
+        {
+            "Content-Disposition": 'attachment; filename="edital.pdf"',
+            "Content-Type": "application/pdf",
+            "Content-Length": "12",
+            "ETag": '"abc"',
+            "Last-Modified": "Wed, 21 Oct 2015 07:28:00 GMT",
+        },
+    )
+
+    downloaded = repo._download_file("http://test.url/file.pdf")
+
+    assert downloaded is not None
+    assert downloaded.content.read() == b"file content"
+    assert downloaded.size == 12
+    assert downloaded.size_limit_exceeded is False
+    assert downloaded.filename == "edital.pdf"
+    assert downloaded.content_type == "application/pdf"
+    assert downloaded.content_length == 12
+    assert downloaded.etag == '"abc"'
+    assert downloaded.last_modified == "Wed, 21 Oct 2015 07:28:00 GMT"
+    repo.http_provider.get.assert_called_once_with("http://test.url/file.pdf", timeout=90, stream=True)
+    repo.http_provider.get.return_value.close.assert_called_once()
+    repo.http_provider.head.assert_not_called()
+
+
+def test_download_file_without_metadata_headers(repo: ProcurementsRepository) -> None:
+    """Tests that missing headers leave the metadata empty."""
+    repo.http_provider.get.return_value = _streamed_response([b"file content"])
+
+    downloaded = repo._download_file("http://test.url/file.pdf")
+
+    assert downloaded is not None
+    assert downloaded.filename is None
+    assert downloaded.content_type is None
+    assert downloaded.content_length is None
+    assert downloaded.etag is None
+    assert downloaded.last_modified is None
+
+
+def test_download_file_spools_to_disk_above_threshold(repo: ProcurementsRepository) -> None:
+    """Tests that a download larger than the spool threshold is moved out of memory."""
+    repo.config.PNCP_DOWNLOAD_SPOOL_MAX_MEMORY_BYTES = 4
+    repo.http_provider.get.return_value = _streamed_response([b"0123", b"4567"])
+
+    downloaded = repo._download_file("http://test.url/file.pdf")
+
+    assert downloaded is not None
+    assert downloaded.content._rolled is True
+    assert downloaded.content.read() == b"01234567"
+
+
+def test_download_file_closes_spool_on_unexpected_error(repo: ProcurementsRepository) -> None:
+    """Tests that an error other than a request failure still closes the spool before propagating."""
+    repo.http_provider.get.return_value = _streamed_response([b"0123"])
+
+    with patch("public_detective.repositories.procurements.tempfile.SpooledTemporaryFile") as mock_spool_class:
+        spool = mock_spool_class.return_value
+        spool.write.side_effect = OSError("No space left on device")
+        with pytest.raises(OSError):
+            repo._download_file("http://test.url/file.pdf")
 
+    spool.close.assert_called_once()
 
-def test_download_file_content_empty_body(repo: ProcurementsRepository) -> None:
+
+def test_download_file_rejects_announced_oversized_file(repo: ProcurementsRepository) -> None:
+    """Tests that a Content-Length above the limit aborts before reading the body."""
+    repo.config.PNCP_DOWNLOAD_MAX_BYTES = 10
+    response = _streamed_response([b"x" * 11], {"Content-Length": "11"})
+    repo.http_provider.get.return_value = response
+
+    downloaded = repo._download_file("http://test.url/file.pdf")
+
+    assert downloaded is not None
+    assert downloaded.size_limit_exceeded is True
+    assert downloaded.content.read() == b""
+    response.iter_content.assert_not_called()
+    response.close.assert_called_once()
+
+
+def test_download_file_aborts_stream_above_limit(repo: ProcurementsRepository) -> None:
+    """Tests that a body growing past the limit is aborted while streaming."""
+    repo.config.PNCP_DOWNLOAD_MAX_BYTES = 10
+    repo.http_provider.get.return_value = _streamed_response([b"x" * 6, b"x" * 6, b"x" * 6])
+
+    downloaded = repo._download_file("http://test.url/file.pdf")
+
+    assert downloaded is not None
+    assert downloaded.size_limit_exceeded is True
+    assert downloaded.size == 0
+
+
+def test_download_file_stores_and_revalidates_with_cache(repo: ProcurementsRepository, tmp_path: Any) -> None:
+    """Tests that a cached download is revalidated and served from disk on 304."""
+    repo.download_cache = DownloadCache(str(tmp_path), max_bytes=1024)
+    repo.http_provider.get.return_value = _streamed_response(
+        [b"%PDF-1.4"], {"ETag": '"v1"', "Content-Disposition": 'attachment; filename="edital.pdf"'}
+    )
+    first = repo._download_file("http://test.url/file.pdf")
+    assert first is not None
+    first.content.close()
+
+    not_modified = MagicMock(status_code=HTTPStatus.NOT_MODIFIED, headers={})
+    repo.http_provider.get.return_value = not_modified
+    second = repo._download_file("http://test.url/file.pdf")
+
+    assert second is not None
+    with second.content:
+        assert second.content.read() == b"%PDF-1.4"
+    assert second.filename == "edital.pdf"
+    assert second.size == 8
+    repo.http_provider.get.assert_called_with(
+        "http://test.url/file.pdf", timeout=90, stream=True, headers={"If-None-Match": '"v1"'}
+    )
+    not_modified.iter_content.assert_not_called()
+    assert repo.download_cache.get_stats()["hits"] == 1
+    assert repo.download_cache.get_stats()["misses"] == 1
+
+
+def test_download_file_refreshes_changed_cached_file(repo: ProcurementsRepository, tmp_path: Any) -> None:
+    """Tests that a changed document replaces its cache entry."""
+    repo.download_cache = DownloadCache(str(tmp_path), max_bytes=1024)
+    repo.http_provider.get.return_value = _streamed_response([b"old"], {"ETag": '"v1"'})
+    repo._download_file("http://test.url/file.pdf")
+
+    repo.http_provider.get.return_value = _streamed_response([b"new"], {"ETag": '"v2"'})
+    downloaded = repo._download_file("http://test.url/file.pdf")
+
+    assert downloaded is not None
+    assert downloaded.content.read() == b"new"
+    cached = repo.download_cache.lookup("http://test.url/file.pdf")
+    assert cached is not None
+    assert cached.etag == '"v2"'
+
+
+def test_download_file_empty_body(repo: ProcurementsRepository) -> None:
     """Returns None when the response body is empty."""
-    mock_response = MagicMock()
-    mock_response.status_code = 200
-    mock_response.content = b""
-    repo.http_provider.get.return_value = mock_response
-    assert repo._download_file_content("http://test.url/file.pdf") is None
+    repo.http_provider.get.return_value = _streamed_response([])
+    assert repo._download_file("http://test.url/file.pdf") is None
 
 
 def test_recursive_file_processing_non_archive(repo: ProcurementsRepository) -> None:
@@ -383,11 +830,11 @@ def test_recursive_file_processing_non_archive(repo: ProcurementsRepository) ->
 
 def test_process_procurement_documents_download_fails(repo: ProcurementsRepository) -> None:
     """Tests that processing continues even if a document download fails."""
-    procurement = MagicMock(spec=Procurement)
+    procurement = MagicMock(spec=Procurement, pncp_control_number="PNCP-1")
     mock_doc = (MagicMock(spec=ProcurementDocument), {"key": "value"})
     mock_doc[0].url = "http://fail.com"
-    with patch.object(repo, "_get_all_documents_metadata", return_value=[mock_doc]):
-        with patch.object(repo, "_download_file_content", return_value=None):
+    with patch.object(repo, "get_all_documents_metadata", return_value=[mock_doc]):
+        with patch.object(repo, "_download_file", return_value=None):
             result = repo.process_procurement_documents(procurement)
             assert result == []
 
@@ -395,7 +842,7 @@ def test_process_procurement_documents_download_fails(repo: ProcurementsReposito
 def test_process_procurement_documents_no_metadata(repo: ProcurementsRepository) -> None:
     """Returns an empty list when there are no documents to process."""
     procurement = MagicMock(spec=Procurement)
-    with patch.object(repo, "_get_all_documents_metadata", return_value=[]):
+    with patch.object(repo, "get_all_documents_metadata", return_value=[]):
         assert repo.process_procurement_documents(procurement) == []
 
 
@@ -542,7 +989,7 @@ def test_recursive_file_processing_7z(repo: ProcurementsRepository) -> None:
 
 def test_recursive_file_processing_tar(repo: ProcurementsRepository) -> None:
     """Tests that .tar files are dispatched to the correct handler."""
-    with patch("tarfile.is_tarfile", return_value=True):
+    with patch("public_detective.repositories.procurements.sniff_archive_format", return_value=ArchiveFormat.TAR):
         with patch.object(repo, "_extract_from_tar") as mock_extract:
             repo._recursive_file_processing(
                 source_document_id="src-doc-1",
@@ -616,24 +1063,24 @@ def test_extract_from_rar_with_directory(repo: ProcurementsRepository) -> None:
     mock_dir_info.isdir.return_value = True
 
     mock_archive.infolist.return_value = [mock_dir_info, mock_file_info]
-    mock_archive.read.return_value = b"content"
+    mock_archive.open.return_value = io.BytesIO(b"content")
 
     # Configure the context manager correctly
     mock_rar_file_context = MagicMock()
     mock_rar_file_context.__enter__.return_value = mock_archive
 
     with patch("rarfile.RarFile", return_value=mock_rar_file_context):
-        result = repo._extract_from_rar(b"dummy rar content")
+        result = list(repo._extract_from_rar(b"dummy rar content"))
         assert len(result) == 1
         assert result[0] == ("file.txt", b"content")
-        mock_archive.read.assert_called_once_with("file.txt")
+        mock_archive.open.assert_called_once_with(mock_file_info)
 
 
 def test_extract_from_rar_with_bad_file(repo: ProcurementsRepository, caplog: Any) -> None:
     """Tests that a BadRarFile error triggers a runtime error with logging."""
     with patch("rarfile.RarFile", side_effect=rarfile.BadRarFile("bad")):
         with pytest.raises(RuntimeError, match="Failed to extract from RAR archive"):
-            repo._extract_from_rar(b"bad content")
+            list(repo._extract_from_rar(b"bad content"))
     assert "Failed to extract from a corrupted or invalid RAR file" in caplog.text
 
 
@@ -644,28 +1091,28 @@ def test_extract_from_rar_member_read_error(repo: ProcurementsRepository) -> Non
     mock_member.filename = "doc.txt"
     mock_archive = MagicMock()
     mock_archive.infolist.return_value = [mock_member]
-    mock_archive.read.side_effect = rarfile.Error("read error")
+    mock_archive.open.side_effect = rarfile.Error("read error")
 
     mock_context = MagicMock()
     mock_context.__enter__.return_value = mock_archive
 
     with patch("rarfile.RarFile", return_value=mock_context):
         with pytest.raises(RuntimeError, match="Failed to read member 'doc.txt'"):
-            repo._extract_from_rar(b"content")
+            list(repo._extract_from_rar(b"content"))
 
 
 def test_extract_from_rar_need_password(repo: ProcurementsRepository) -> None:
     """Transforms NeedPassword into a runtime error."""
     with patch("rarfile.RarFile", side_effect=rarfile.NeedPassword("pw")):
         with pytest.raises(RuntimeError, match="Password-protected RAR archives are not supported"):
-            repo._extract_from_rar(b"content")
+            list(repo._extract_from_rar(b"content"))
 
 
 def test_extract_from_rar_unexpected_error(repo: ProcurementsRepository) -> None:
     """Transforms other rarfile errors into runtime exceptions."""
     with patch("rarfile.RarFile", side_effect=rarfile.Error("unexpected")):
         with pytest.raises(RuntimeError, match="Unexpected RAR extraction error"):
-            repo._extract_from_rar(b"content")
+            list(repo._extract_from_rar(b"content"))
 
 
 def test_recursive_file_processing_rar_extraction_failure(repo: ProcurementsRepository) -> None:
@@ -705,15 +1152,15 @@ def test_get_all_documents_metadata_request_exception(
     """Tests handling of RequestException when fetching document metadata."""
     repo.http_provider.get.side_effect = requests.RequestException("Network error")
     repo.config.PNCP_INTEGRATION_API_URL = "http://dummy.url"
-    result = repo._get_all_documents_metadata(mock_procurement)
+    result = repo.get_all_documents_metadata(mock_procurement)
     assert result == []
     assert "Failed to get/validate document list for 123: Network error" in caplog.text
 
 
-def test_download_file_content_request_exception(repo: ProcurementsRepository, caplog: Any) -> None:
+def test_download_file_request_exception(repo: ProcurementsRepository, caplog: Any) -> None:
     """Tests handling of RequestException during file download."""
     repo.http_provider.get.side_effect = requests.RequestException("Download failed")
-    result = repo._download_file_content("http://example.com/file")
+    result = repo._download_file("http://example.com/file")
     assert result is None
     assert "Failed to download content from http://example.com/file: Download failed" in caplog.text
 
@@ -732,19 +1179,95 @@ def test_process_procurement_documents_happy_path(repo: ProcurementsRepository)
     raw_meta = {"some": "meta"}
 
     with (
-        patch.object(repo, "_get_all_documents_metadata", return_value=[(mock_doc, raw_meta)]),
-        patch.object(repo, "_download_file_content", return_value=b"hello"),
-        patch.object(repo, "_determine_original_filename", return_value=None),
+        patch.object(repo, "get_all_documents_metadata", return_value=[(mock_doc, raw_meta)]),
+        patch.object(repo, "_download_file", return_value=DownloadedFile(content=io.BytesIO(b"hello"), size=5)),
     ):
-        result = repo.process_procurement_documents(MagicMock(spec=Procurement))
+        result = repo.process_procurement_documents(MagicMock(spec=Procurement, pncp_control_number="PNCP-1"))
         assert isinstance(result, list)
         assert len(result) == 1
         pf = result[0]
         assert isinstance(pf, ProcessedFile)
         assert pf.content == b"hello"
+        assert pf.relative_path == "file.pdf"
         assert pf.raw_document_metadata == raw_meta
 
 
+def test_process_procurement_documents_reports_extraction_memory(
+    repo: ProcurementsRepository, caplog: pytest.LogCaptureFixture
+) -> None:
+    """Ensure the archive member memory and peak RSS are logged for each procurement."""
+    mock_doc = MagicMock(url="http://example.com/files.zip", title="files.zip", cnpj="1")
+    zip_buffer = io.BytesIO()
+    with zipfile.ZipFile(zip_buffer, "w") as zf:
+        zf.writestr("a.txt", b"a" * 300)
+        zf.writestr("b.txt", b"b" * 100)
+    downloaded = DownloadedFile(content=io.BytesIO(zip_buffer.getvalue()), size=len(zip_buffer.getvalue()))
+
+    with (
+        patch.object(repo, "_download_file", return_value=downloaded),
+        caplog.at_level(logging.INFO),
+    ):
+        repo.process_procurement_documents(MagicMock(spec=Procurement, pncp_control_number="PNCP-1"), [(mock_doc, {})])
+
+    assert "Extraction memory for PNCP-1: 2 archive members, largest 300 bytes" in caplog.text
+    assert "at most 300 bytes held at once" in caplog.text
+    assert "Process peak RSS" in caplog.text
+
+
+def test_process_procurement_documents_parallel_keeps_document_order(repo: ProcurementsRepository) -> None:
+    """Ensure files come back in document order even when later downloads finish first."""
+    repo.config.PNCP_DOWNLOAD_MAX_WORKERS = 3
+    docs = []
+    for sequence in range(1, 4):
+        doc = MagicMock()
+        doc.url = f"http://example.com/{sequence}.pdf"
+        doc.title = f"{sequence}.pdf"
+        doc.cnpj = "12345678000199"
+        doc.procurement_year = 2025
+        doc.procurement_sequence = 1
+        doc.document_sequence = sequence
+        docs.append((doc, {"sequence": sequence}))
+    first_download_released = threading.Event()
+
+    def fake_download(url: str) -> DownloadedFile:
+        if url.endswith("/1.pdf"):
+            first_download_released.wait(timeout=5)
+        else:
+            first_download_released.set()
+        return DownloadedFile(content=io.BytesIO(url.encode()), size=len(url))
+
+    with (
+        patch.object(repo, "get_all_documents_metadata", return_value=docs),
+        patch.object(repo, "_download_file", side_effect=fake_download),
+    ):
+        result = repo.process_procurement_documents(MagicMock(spec=Procurement, pncp_control_number="PNCP-1"))
+
+    assert [file.relative_path for file in result] == ["1.pdf", "2.pdf", "3.pdf"]
+    assert [file.raw_document_metadata for file in result] == [{"sequence": 1}, {"sequence": 2}, {"sequence": 3}]
+
+
+def test_process_procurement_documents_closes_downloads_when_processing_fails(repo: ProcurementsRepository) -> None:
+    """Ensure the downloads not processed yet are closed when processing a document fails."""
+    repo.config.PNCP_DOWNLOAD_MAX_WORKERS = 3
+    docs = [(MagicMock(url=f"http://example.com/{sequence}.pdf", title=f"{sequence}.pdf"), {}) for sequence in range(3)]
+    downloads: list[DownloadedFile] = []
+
+    def fake_download(url: str) -> DownloadedFile:
+        downloaded = DownloadedFile(content=io.BytesIO(url.encode()), size=len(url))
+        downloads.append(downloaded)
+        return downloaded
+
+    with (
+        patch.object(repo, "_download_file", side_effect=fake_download),
+        patch.object(repo, "_recursive_file_processing", side_effect=RuntimeError("boom")),
+    ):
+        with pytest.raises(RuntimeError, match="boom"):
+            repo.process_procurement_documents(MagicMock(spec=Procurement, pncp_control_number="PNCP-1"), docs)
+
+    assert len(downloads) == 3
+    assert all(downloaded.content.closed for downloaded in downloads)
+
+
 def test_create_zip_from_files_success(repo: ProcurementsRepository) -> None:
     """Ensure zip is created successfully and contains expected files."""
     files = [("a/b.txt", b"one"), ("c:d.txt", b"two")]
@@ -803,9 +1326,9 @@ def test_recursive_processing_nested_handler(repo: ProcurementsRepository) -> No
 
 
 def test_recursive_processing_tar_handler_branch(repo: ProcurementsRepository) -> None:
-    """Force tarfile.is_tarfile to True and ensure tar handler is invoked and results collected."""
+    """Force the sniffed format to TAR and ensure tar handler is invoked and results collected."""
     file_collection: list[ProcessedFile] = []
-    with patch("tarfile.is_tarfile", return_value=True):
+    with patch("public_detective.repositories.procurements.sniff_archive_format", return_value=ArchiveFormat.TAR):
         with patch.object(repo, "_extract_from_tar", return_value=[("a.txt", b"x")]):
             repo._recursive_file_processing(
                 source_document_id="s2",
@@ -829,47 +1352,83 @@ def test_get_all_documents_metadata_validation_error(
     mock_response.json.return_value = {"invalid": "data"}
     repo.http_provider.get.return_value = mock_response
     repo.config.PNCP_INTEGRATION_API_URL = "http://dummy.url"
-    result = repo._get_all_documents_metadata(mock_procurement)
+    result = repo.get_all_documents_metadata(mock_procurement)
     assert result == []
     assert "Failed to get/validate document list for 123" in caplog.text
 
 
-def test_determine_original_filename_request_exception(repo: ProcurementsRepository, caplog: Any) -> None:
-    """Tests handling of RequestException when determining filename."""
-    repo.http_provider.head.side_effect = requests.RequestException("HEAD request failed")
-    result = repo._determine_original_filename("http://example.com/file")
-    assert result is None
-    assert "Could not determine filename from headers for http://example.com/file" in caplog.text
+def test_process_procurement_documents_uses_content_disposition_filename(repo: ProcurementsRepository) -> None:
+    """Ensure the filename sent with the download is preferred over the document title."""
+    mock_doc = MagicMock()
+    mock_doc.url = "http://example.com/download/1"
+    mock_doc.title = "Edital"
+    with (
+        patch.object(repo, "get_all_documents_metadata", return_value=[(mock_doc, {})]),
+        patch.object(
+            repo,
+            "_download_file",
+            return_value=DownloadedFile(content=io.BytesIO(b"%PDF"), size=4, filename="edital.pdf"),
+        ),
+    ):
+        result = repo.process_procurement_documents(MagicMock(spec=Procurement, pncp_control_number="PNCP-1"))
 
+    assert [file.relative_path for file in result] == ["edital.pdf"]
+    repo.http_provider.head.assert_not_called()
 
-def test_determine_original_filename_no_header(repo: ProcurementsRepository) -> None:
-    """Tests handling of a missing Content-Disposition header."""
-    mock_response = MagicMock()
-    mock_response.status_code = HTTPStatus.OK
-    mock_response.headers = {}  # No Content-Disposition header
-    repo.http_provider.head.return_value = mock_response
-    filename = repo._determine_original_filename("http://example.com/file")
-    assert filename is None
 
+def test_process_procurement_documents_flags_oversized_download(repo: ProcurementsRepository) -> None:
+    """Ensure a document over the size limit is kept as an empty, flagged file."""
+    mock_doc = MagicMock()
+    mock_doc.title = "huge.zip"
+    downloaded = DownloadedFile(content=io.BytesIO(), size=0, size_limit_exceeded=True)
+    with (
+        patch.object(repo, "get_all_documents_metadata", return_value=[(mock_doc, {})]),
+        patch.object(repo, "_download_file", return_value=downloaded),
+    ):
+        result = repo.process_procurement_documents(MagicMock(spec=Procurement, pncp_control_number="PNCP-1"))
 
-def test_determine_original_filename_header_no_filename(repo: ProcurementsRepository) -> None:
-    """Tests handling of a Content-Disposition header that is missing the filename."""
-    mock_response = MagicMock()
-    mock_response.status_code = HTTPStatus.OK
-    mock_response.headers = {"Content-Disposition": "attachment"}
-    repo.http_provider.head.return_value = mock_response
-    filename = repo._determine_original_filename("http://example.com/file")
-    assert filename is None
+    assert len(result) == 1
+    assert result[0].relative_path == "huge.zip"
+    assert result[0].content == b""
+    assert result[0].size_limit_exceeded is True
 
 
-def test_determine_original_filename_success(repo: ProcurementsRepository) -> None:
-    """Tests successful extraction of filename from Content-Disposition header."""
-    mock_response = MagicMock()
-    mock_response.status_code = HTTPStatus.OK
-    mock_response.headers = {"Content-Disposition": 'attachment; filename="test_file.pdf"'}
-    repo.http_provider.head.return_value = mock_response
-    filename = repo._determine_original_filename("http://example.com/file")
-    assert filename == "test_file.pdf"
+def test_process_procurement_documents_extracts_archive_from_handle(repo: ProcurementsRepository) -> None:
+    """Ensure archives are extracted straight from the downloaded file handle, which is then closed."""
+    zip_buffer = io.BytesIO()
+    with zipfile.ZipFile(zip_buffer, "w") as zf:
+        zf.writestr("a.txt", b"first")
+        zf.writestr("b.txt", b"second")
+    spool = tempfile.SpooledTemporaryFile(max_size=8)
+    spool.write(zip_buffer.getvalue())
+    mock_doc = MagicMock()
+    mock_doc.title = "docs.zip"
+    downloaded = DownloadedFile(content=spool, size=spool.tell())
+    with (
+        patch.object(repo, "get_all_documents_metadata", return_value=[(mock_doc, {})]),
+        patch.object(repo, "_download_file", return_value=downloaded),
+    ):
+        result = repo.process_procurement_documents(MagicMock(spec=Procurement, pncp_control_number="PNCP-1"))
+
+    assert [(file.relative_path, file.content) for file in result] == [
+        ("docs.zip/a.txt", b"first"),
+        ("docs.zip/b.txt", b"second"),
+    ]
+    assert spool.closed
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        (None, None),
+        ("attachment", None),
+        ('attachment; filename="test_file.pdf"', "test_file.pdf"),
+        ("attachment; FILENAME=plain.zip", "plain.zip"),
+    ],
+)
+def test_parse_content_disposition_filename(header: str | None, expected: str | None) -> None:
+    """Tests extraction of the filename from a Content-Disposition header."""
+    assert ProcurementsRepository._parse_content_disposition_filename(header) == expected
 
 
 def test_publish_procurement_to_pubsub_api_error(
@@ -1045,6 +1604,171 @@ def test_get_updated_procurements_with_raw_data_pagination(repo: ProcurementsRep
     assert procurements[1][1] == raw_proc_page2
 
 
+def test_get_updated_procurements_with_raw_data_concurrent_keeps_search_order(repo: ProcurementsRepository) -> None:
+    """Tests that concurrent searches still yield their events grouped and in order."""
+    pages_by_search = {
+        ("111", "6"): [_get_mock_procurement_data("PNCP-A-1"), _get_mock_procurement_data("PNCP-A-2")],
+        ("222", "8"): [_get_mock_procurement_data("PNCP-B-1")],
+    }
+
+    def fake_get(_url: str, params: dict) -> MagicMock:
+        pages = pages_by_search.get((params["codigoMunicipioIbge"], params["codigoModalidadeContratacao"]))
+        if not pages:
+            return MagicMock(status_code=HTTPStatus.NO_CONTENT)
+        page = int(params["pagina"])
+        response = MagicMock(status_code=HTTPStatus.OK)
+        response.json.return_value = {
+            "totalRegistros": len(pages),
+            "numeroPagina": page,
+            "totalPaginas": len(pages),
+            "data": [pages[page - 1]],
+        }
+        return response
+
+    repo.http_provider.get.side_effect = fake_get
+    repo.config.PNCP_FETCH_MAX_WORKERS = 4
+    repo.config.PNCP_PUBLIC_QUERY_API_URL = "http://dummy.url"
+    repo.config.TARGET_IBGE_CODES = ["111", "222"]
+
+    events = list(repo.get_updated_procurements_with_raw_data(date(2023, 1, 1)))
+
+    assert [event for event, _ in events].count("modality_started") == 8
+    control_numbers = [data[0].pncp_control_number for event, data in events if event == "procurements_page"]
+    assert control_numbers == ["PNCP-A-1", "PNCP-A-2", "PNCP-B-1"]
+    first_search_events = events[: events.index(("modality_started", "BIDDING_WAIVER"))]
+    assert first_search_events[:2] == [
+        ("search_started", ("111", 6)),
+        ("modality_started", "ELECTRONIC_REVERSE_AUCTION"),
+    ]
+    assert ("pages_total", 2) in first_search_events
+    assert [data for event, data in first_search_events if event == "page_fetched"] == [1, 2]
+    assert repo.http_provider.get.call_count == 9
+
+
+def test_get_updated_procurements_with_raw_data_bounds_buffered_events(repo: ProcurementsRepository) -> None:
+    """Tests that searches fetched ahead wait for room in their queue instead of buffering every page."""
+    pages = [_get_mock_procurement_data(f"PNCP-{page}") for page in range(1, 6)]
+
+    def fake_get(_url: str, params: dict) -> MagicMock:
+        page = int(params["pagina"])
+        response = MagicMock(status_code=HTTPStatus.OK)
+        response.json.return_value = {
+            "totalRegistros": len(pages),
+            "numeroPagina": page,
+            "totalPaginas": len(pages),
+            "data": [pages[page - 1]],
+        }
+        return response
+
+    repo.http_provider.get.side_effect = fake_get
+    repo.config.PNCP_FETCH_MAX_WORKERS = 4
+    repo.config.PNCP_FETCH_QUEUE_MAX_EVENTS = 1
+    repo.config.PNCP_PUBLIC_QUERY_API_URL = "http://dummy.url"
+    repo.config.TARGET_IBGE_CODES = ["111"]
+
+    scan = repo.get_updated_procurements_with_raw_data(date(2023, 1, 1))
+    assert next(scan) == ("search_started", ("111", 6))
+    assert next(scan) == ("modality_started", "ELECTRONIC_REVERSE_AUCTION")
+    time.sleep(0.3)
+
+    assert repo.http_provider.get.call_count <= 8
+    events = list(scan)
+    control_numbers = [data[0].pncp_control_number for event, data in events if event == "procurements_page"]
+    assert control_numbers == [f"PNCP-{page}" for page in range(1, 6)] * 4
+
+
+def test_get_updated_procurements_with_raw_data_stops_workers_when_closed(repo: ProcurementsRepository) -> None:
+    """Tests that closing the scan early releases workers blocked on a full queue."""
+    pages = [_get_mock_procurement_data(f"PNCP-{page}") for page in range(1, 11)]
+
+    def fake_get(_url: str, params: dict) -> MagicMock:
+        page = int(params["pagina"])
+        response = MagicMock(status_code=HTTPStatus.OK)
+        response.json.return_value = {
+            "totalRegistros": len(pages),
+            "numeroPagina": page,
+            "totalPaginas": len(pages),
+            "data": [pages[page - 1]],
+        }
+        return response
+
+    repo.http_provider.get.side_effect = fake_get
+    repo.config.PNCP_FETCH_MAX_WORKERS = 2
+    repo.config.PNCP_FETCH_QUEUE_MAX_EVENTS = 1
+    repo.config.PNCP_PUBLIC_QUERY_API_URL = "http://dummy.url"
+    repo.config.TARGET_IBGE_CODES = ["111"]
+
+    scan = repo.get_updated_procurements_with_raw_data(date(2023, 1, 1))
+    next(scan)
+    next(scan)
+    next(scan)
+    scan.close()
+
+    assert repo.http_provider.get.call_count < 40
+
+
+def test_get_updated_procurements_with_raw_data_resumes_after_page(repo: ProcurementsRepository) -> None:
+    """Tests that a resumed scan skips earlier searches and continues after the checkpointed page."""
+    pages = [_get_mock_procurement_data(f"PNCP-{page}") for page in (1, 2, 3)]
+
+    def fake_get(_url: str, params: dict) -> MagicMock:
+        if params["codigoMunicipioIbge"] != "222" or params["codigoModalidadeContratacao"] != "8":
+            return MagicMock(status_code=HTTPStatus.NO_CONTENT)
+        page = int(params["pagina"])
+        response = MagicMock(status_code=HTTPStatus.OK)
+        response.json.return_value = {
+            "totalRegistros": 3,
+            "numeroPagina": page,
+            "totalPaginas": 3,
+            "data": [pages[page - 1]],
+        }
+        return response
+
+    repo.http_provider.get.side_effect = fake_get
+    repo.config.PNCP_PUBLIC_QUERY_API_URL = "http://dummy.url"
+    repo.config.TARGET_IBGE_CODES = ["111", "222"]
+
+    events = list(repo.get_updated_procurements_with_raw_data(date(2023, 1, 1), resume_after=("222", 8, 1)))
+
+    searches = [data for event, data in events if event == "search_started"]
+    assert searches[0] == ("222", 8)
+    assert len(searches) == 3
+    assert ("pages_total", 2) in events
+    assert [data for event, data in events if event == "page_fetched"] == [2, 3]
+    control_numbers = [data[0].pncp_control_number for event, data in events if event == "procurements_page"]
+    assert control_numbers == ["PNCP-2", "PNCP-3"]
+    requested_pages = [
+        call.kwargs["params"]["pagina"]
+        for call in repo.http_provider.get.call_args_list
+        if call.kwargs["params"]["codigoModalidadeContratacao"] == "8"
+    ]
+    assert requested_pages == ["2", "3"]
+
+
+def test_get_updated_procurements_with_raw_data_unknown_resume_point(
+    repo: ProcurementsRepository, caplog: pytest.LogCaptureFixture
+) -> None:
+    """Tests that a resume point matching no search falls back to a full scan."""
+    repo.http_provider.get.return_value = MagicMock(status_code=HTTPStatus.NO_CONTENT)
+    repo.config.PNCP_PUBLIC_QUERY_API_URL = "http://dummy.url"
+    repo.config.TARGET_IBGE_CODES = ["111"]
+
+    events = list(repo.get_updated_procurements_with_raw_data(date(2023, 1, 1), resume_after=("999", 8, 4)))
+
+    assert [event for event, _ in events].count("search_started") == 4
+    assert "does not match any search" in caplog.text
+
+
+def test_get_updated_procurements_with_raw_data_reraises_unexpected_errors(repo: ProcurementsRepository) -> None:
+    """Tests that unexpected errors raised on a worker thread reach the consumer."""
+    repo.http_provider.get.side_effect = RuntimeError("boom")
+    repo.config.PNCP_PUBLIC_QUERY_API_URL = "http://dummy.url"
+    repo.config.TARGET_IBGE_CODES = [None]
+
+    with pytest.raises(RuntimeError, match="boom"):
+        list(repo.get_updated_procurements_with_raw_data(date(2023, 1, 1)))
+
+
 @patch.object(ProcurementsRepository, "_extract_from_zip", side_effect=Exception("ZIP processing error"))
 def test_recursive_file_processing_generic_archive_exception(
     mock_extract: MagicMock, repo: ProcurementsRepository, caplog: Any
@@ -0,0 +1,56 @@
+"""This module contains the unit tests for the TokenCountsRepository."""
+
+from unittest.mock import MagicMock
+
+import pytest
+from public_detective.repositories.token_counts import TokenCountsRepository
+
+CONTENT_HASH = "a" * 64
+
+
+@pytest.fixture
+def mock_engine() -> MagicMock:
+    """Fixture to create a mock SQLAlchemy engine."""
+    engine = MagicMock()
+    conn = MagicMock()
+    engine.connect.return_value.__enter__.return_value = conn
+    return engine
+
+
+def test_get_token_counts_keeps_requested_mime_types(mock_engine: MagicMock) -> None:
+    """Tests that only the requested content and MIME type pairs are returned."""
+    conn = mock_engine.connect.return_value.__enter__.return_value
+    conn.execute.return_value.mappings.return_value.all.return_value = [
+        {"content_hash": CONTENT_HASH, "mime_type": "application/pdf", "token_count": 1200},
+        {"content_hash": CONTENT_HASH, "mime_type": "text/plain", "token_count": 900},
+    ]
+
+    token_counts = TokenCountsRepository(mock_engine).get_token_counts(
+        "gemini-test", [(CONTENT_HASH, "application/pdf")]
+    )
+
+    assert token_counts == {(CONTENT_HASH, "application/pdf"): 1200}
+    assert conn.execute.call_args.args[1] == {"model": "gemini-test", "content_hashes": [CONTENT_HASH]}
+
+
+def test_get_token_counts_skips_query_without_contents(mock_engine: MagicMock) -> None:
+    """Tests that no query is sent when there is nothing to look up."""
+    assert TokenCountsRepository(mock_engine).get_token_counts("gemini-test", []) == {}
+    mock_engine.connect.assert_not_called()
+
+
+def test_save_token_count_ignores_conflicts(mock_engine: MagicMock) -> None:
+    """Tests that saving a count keeps the row stored by a concurrent run."""
+    conn = mock_engine.connect.return_value.__enter__.return_value
+
+    TokenCountsRepository(mock_engine).save_token_count("gemini-test", CONTENT_HASH, "application/pdf", 1200)
+
+    sql, params = conn.execute.call_args.args
+    assert "ON CONFLICT (content_hash, mime_type, model) DO NOTHING" in str(sql)
+    assert params == {
+        "content_hash": CONTENT_HASH,
+        "mime_type": "application/pdf",
+        "model": "gemini-test",
+        "token_count": 1200,
+    }
+    conn.commit.assert_called_once()
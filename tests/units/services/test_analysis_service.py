@@ -1,5 +1,6 @@
 """Unit tests for the AnalysisService."""
 
+import asyncio
 import uuid
 from datetime import date, datetime, timedelta, timezone
 from decimal import Decimal
@@ -13,7 +14,8 @@ from public_detective.models.file_records import ExclusionReason, Prioritization
 from public_detective.models.procurement_analysis_status import ProcurementAnalysisStatus
 from public_detective.models.procurements import Procurement
 from public_detective.repositories.procurements import ProcessedFile
-from public_detective.services.analysis import AIFileCandidate, AnalysisService
+from public_detective.services.analysis import ANALYSIS_INSTRUCTIONS, AIFileCandidate, AnalysisService
+from public_detective.services.token_counter import TokenCounter
 
 
 def _build_ranked_procurement(
@@ -335,9 +337,7 @@ def test_get_priority(analysis_service: AnalysisService) -> None:
 
 def test_calculate_procurement_hash(analysis_service: AnalysisService, mock_procurement: Procurement) -> None:
     """Tests that the procurement hash is consistent and based on key fields."""
-    files = [
-        ProcessedFile(source_document_id="1", relative_path="f1.pdf", content=b"c1", raw_document_metadata={"a": 1})
-    ]
+    files = [{"a": 1}]
     hash1 = analysis_service._calculate_procurement_hash(mock_procurement, files)
 
     # Test that the hash is deterministic
@@ -356,6 +356,99 @@ def test_calculate_procurement_hash(analysis_service: AnalysisService, mock_proc
     assert hash1 == hash4
 
 
+def test_calculate_procurement_hash_depends_on_document_listing_only(
+    analysis_service: AnalysisService, mock_procurement: Procurement
+) -> None:
+    """Tests that the hash follows the document metadata but not its order."""
+    first = {"sequencialDocumento": 1, "titulo": "Edital"}
+    second = {"sequencialDocumento": 2, "titulo": "Anexo"}
+
+    base_hash = analysis_service._calculate_procurement_hash(mock_procurement, [first, second])
+
+    assert analysis_service._calculate_procurement_hash(mock_procurement, [second, first]) == base_hash
+    assert analysis_service._calculate_procurement_hash(mock_procurement, [first]) != base_hash
+    changed = {**second, "dataPublicacaoPncp": "2025-01-02"}
+    assert analysis_service._calculate_procurement_hash(mock_procurement, [first, changed]) != base_hash
+
+
+def test_pre_analyze_procurement_skips_unchanged_before_downloading(
+    analysis_service: AnalysisService, mock_procurement: Procurement
+) -> None:
+    """Tests that an already known hash skips the procurement before any download."""
+    documents = [(MagicMock(), {"sequencialDocumento": 1})]
+    analysis_service.procurement_repo.get_all_documents_metadata.return_value = documents
+    analysis_service.procurement_repo.get_procurement_by_hash.return_value = {"exists": True}
+
+    analysis_service._pre_analyze_procurement(mock_procurement, {})
+
+    expected_hash = analysis_service._calculate_procurement_hash(mock_procurement, [{"sequencialDocumento": 1}])
+    analysis_service.procurement_repo.get_procurement_by_hash.assert_called_once_with(expected_hash)
+    analysis_service.procurement_repo.process_procurement_documents.assert_not_called()
+
+
+def test_pre_analyze_procurement_reuses_document_listing(
+    analysis_service: AnalysisService, mock_procurement: Procurement
+) -> None:
+    """Tests that a changed procurement is downloaded without listing its documents again."""
+    documents = [(MagicMock(), {"sequencialDocumento": 1})]
+    analysis_service.procurement_repo.get_all_documents_metadata.return_value = documents
+    analysis_service.procurement_repo.get_procurement_by_hash.return_value = None
+    analysis_service.procurement_repo.process_procurement_documents.return_value = []
+    analysis_service.procurement_repo.get_procurement_uuid.return_value = None
+    analysis_service.procurement_repo.get_latest_version.return_value = 0
+
+    with pytest.raises(AnalysisError):
+        analysis_service._pre_analyze_procurement(mock_procurement, {})
+
+    analysis_service.procurement_repo.get_all_documents_metadata.assert_called_once_with(mock_procurement)
+    analysis_service.procurement_repo.process_procurement_documents.assert_called_once_with(mock_procurement, documents)
+
+
+def test_pre_analyze_procurement_leaves_failed_downloads_out_of_saved_hash(
+    analysis_service: AnalysisService, mock_procurement: Procurement
+) -> None:
+    """Tests that a document whose download failed is not part of the hash saved with the version."""
+    downloaded = {"sequencialDocumento": 1}
+    failed = {"sequencialDocumento": 2}
+    documents = [(MagicMock(), downloaded), (MagicMock(), failed)]
+    analysis_service.procurement_repo.get_all_documents_metadata.return_value = documents
+    analysis_service.procurement_repo.get_procurement_by_hash.return_value = None
+    analysis_service.procurement_repo.process_procurement_documents.return_value = [
+        ProcessedFile(
+            source_document_id="1", relative_path="edital.pdf", content=b"%PDF", raw_document_metadata=downloaded
+        )
+    ]
+    analysis_service.procurement_repo.get_latest_version.return_value = 0
+    analysis_service.procurement_repo.get_procurement_uuid.return_value = None
+    analysis_service._prepare_ai_candidates = MagicMock(return_value=[])
+
+    with pytest.raises(AnalysisError):
+        analysis_service._pre_analyze_procurement(mock_procurement, {})
+
+    full_hash = analysis_service._calculate_procurement_hash(mock_procurement, [downloaded, failed])
+    partial_hash = analysis_service._calculate_procurement_hash(mock_procurement, [downloaded])
+    assert [call.args[0] for call in analysis_service.procurement_repo.get_procurement_by_hash.call_args_list] == [
+        full_hash,
+        partial_hash,
+    ]
+    saved_hash = analysis_service.procurement_repo.save_procurement_version.call_args.kwargs["content_hash"]
+    assert saved_hash == partial_hash != full_hash
+
+
+def test_pre_analyze_procurement_skips_version_already_saved_with_same_failures(
+    analysis_service: AnalysisService, mock_procurement: Procurement
+) -> None:
+    """Tests that repeating the same download failure does not save a duplicate version."""
+    documents = [(MagicMock(), {"sequencialDocumento": 1})]
+    analysis_service.procurement_repo.get_all_documents_metadata.return_value = documents
+    analysis_service.procurement_repo.get_procurement_by_hash.side_effect = [None, {"exists": True}]
+    analysis_service.procurement_repo.process_procurement_documents.return_value = []
+
+    analysis_service._pre_analyze_procurement(mock_procurement, {})
+
+    analysis_service.procurement_repo.save_procurement_version.assert_not_called()
+
+
 def test_get_prioritization_logic(analysis_service: AnalysisService) -> None:
     """Tests the priority string generation."""
     candidate_edital_metadata = AIFileCandidate(
@@ -382,10 +475,11 @@ def test_select_files_by_token_limit_all_fit(mock_build_prompt: MagicMock, analy
     """Tests file selection when all files are within the token limit."""
     mock_build_prompt.return_value = "prompt"
     analysis_service.ai_provider.count_tokens_for_analysis.return_value = (100, 0, 0)
+    analysis_service.ai_provider.count_tokens_for_file.return_value = 10
 
     candidates = [
-        MagicMock(exclusion_reason=None, ai_gcs_uris=["uri1"]),
-        MagicMock(exclusion_reason=None, ai_gcs_uris=["uri2"]),
+        MagicMock(exclusion_reason=None, ai_gcs_uris=["uri1"], token_count=None, content_hash=""),
+        MagicMock(exclusion_reason=None, ai_gcs_uris=["uri2"], token_count=None, content_hash=""),
     ]
 
     selected = analysis_service._select_files_by_token_limit(candidates, MagicMock())
@@ -399,11 +493,16 @@ def test_select_files_by_token_limit_some_excluded(
 ) -> None:
     """Tests file selection when some files exceed the token limit."""
     mock_build_prompt.return_value = "prompt"
-    analysis_service.ai_provider.count_tokens_for_analysis.side_effect = [(100, 0, 0), (200000, 0, 0)]
+    analysis_service.ai_provider.count_tokens_for_analysis.side_effect = [(100, 0, 0), (125, 0, 0)]
+    analysis_service.ai_provider.count_tokens_for_file.side_effect = [20, 200000]
 
     candidates = [
-        MagicMock(original_path="file1.pdf", exclusion_reason=None, ai_gcs_uris=["uri1"], is_included=False),
-        MagicMock(original_path="file2.pdf", exclusion_reason=None, ai_gcs_uris=["uri2"], is_included=False),
+        MagicMock(
+            original_path="file1.pdf", exclusion_reason=None, ai_gcs_uris=["uri1"], is_included=False, token_count=None
+        ),
+        MagicMock(
+            original_path="file2.pdf", exclusion_reason=None, ai_gcs_uris=["uri2"], is_included=False, token_count=None
+        ),
     ]
     analysis_service.config.GCP_GEMINI_MAX_INPUT_TOKENS = 150
 
@@ -420,11 +519,16 @@ def test_select_files_by_token_limit_prioritization(
 ) -> None:
     """Tests that high-priority files are selected first."""
     mock_build_prompt.return_value = "prompt"
-    analysis_service.ai_provider.count_tokens_for_analysis.side_effect = [(100, 0, 0), (200000, 0, 0)]
+    analysis_service.ai_provider.count_tokens_for_analysis.side_effect = [(100, 0, 0), (125, 0, 0)]
+    analysis_service.ai_provider.count_tokens_for_file.side_effect = [20, 200000]
 
     candidates = [
-        MagicMock(original_path="outro.pdf", exclusion_reason=None, ai_gcs_uris=["uri2"], is_included=False),
-        MagicMock(original_path="edital.pdf", exclusion_reason=None, ai_gcs_uris=["uri1"], is_included=False),
+        MagicMock(
+            original_path="outro.pdf", exclusion_reason=None, ai_gcs_uris=["uri2"], is_included=False, token_count=None
+        ),
+        MagicMock(
+            original_path="edital.pdf", exclusion_reason=None, ai_gcs_uris=["uri1"], is_included=False, token_count=None
+        ),
     ]
     analysis_service.config.GCP_GEMINI_MAX_INPUT_TOKENS = 150
 
@@ -435,6 +539,90 @@ def test_select_files_by_token_limit_prioritization(
     assert selected[1].exclusion_reason == ExclusionReason.TOKEN_LIMIT_EXCEEDED
 
 
+@patch("public_detective.services.analysis.AnalysisService._build_analysis_prompt")
+def test_select_files_counts_each_file_once(
+    mock_build_prompt: MagicMock, analysis_service: AnalysisService, mock_procurement: MagicMock
+) -> None:
+    """Tests that files are counted alone once and the selection is checked with one request."""
+    mock_build_prompt.return_value = "prompt"
+    analysis_service.ai_provider.count_tokens_for_analysis.side_effect = [(100, 0, 0), (131, 0, 0)]
+    analysis_service.ai_provider.count_tokens_for_file.side_effect = [10, 20]
+    analysis_service.config.GCP_GEMINI_MAX_INPUT_TOKENS = 1000
+    candidates = [
+        AIFileCandidate(synthetic_id="1", raw_document_metadata={}, original_path="edital.pdf", ai_gcs_uris=["uri1"]),
+        AIFileCandidate(synthetic_id="1", raw_document_metadata={}, original_path="copia.pdf", ai_gcs_uris=["uri1"]),
+        AIFileCandidate(synthetic_id="1", raw_document_metadata={}, original_path="anexo.pdf", ai_gcs_uris=["uri2"]),
+    ]
+
+    selected, input_tokens = analysis_service._select_files_and_count_tokens(candidates, mock_procurement)
+
+    assert all(c.is_included for c in selected)
+    assert input_tokens == 131
+    assert analysis_service.ai_provider.count_tokens_for_file.call_count == 2
+    assert analysis_service.ai_provider.count_tokens_for_analysis.call_args_list[-1].args == (
+        "prompt",
+        ["uri1", "uri2"],
+    )
+
+
+@patch("public_detective.services.analysis.AnalysisService._build_analysis_prompt")
+def test_select_files_drops_lowest_priority_when_final_count_exceeds_limit(
+    mock_build_prompt: MagicMock, analysis_service: AnalysisService, mock_procurement: MagicMock
+) -> None:
+    """Tests that the final exact count can still drop a file the local sum let in."""
+    mock_build_prompt.return_value = "prompt"
+    analysis_service.ai_provider.count_tokens_for_analysis.side_effect = [(100, 0, 0), (160, 0, 0), (125, 0, 0)]
+    analysis_service.ai_provider.count_tokens_for_file.side_effect = [20, 25]
+    analysis_service.config.GCP_GEMINI_MAX_INPUT_TOKENS = 150
+    candidates = [
+        AIFileCandidate(synthetic_id="1", raw_document_metadata={}, original_path="edital.pdf", ai_gcs_uris=["uri1"]),
+        AIFileCandidate(synthetic_id="1", raw_document_metadata={}, original_path="outro.pdf", ai_gcs_uris=["uri2"]),
+    ]
+
+    selected, input_tokens = analysis_service._select_files_and_count_tokens(candidates, mock_procurement)
+
+    assert [c.is_included for c in selected] == [True, False]
+    assert selected[1].exclusion_reason == ExclusionReason.TOKEN_LIMIT_EXCEEDED
+    assert input_tokens == 125
+
+
+@patch("public_detective.services.analysis.AnalysisService._build_analysis_prompt")
+def test_select_files_reads_counts_from_token_count_cache(
+    mock_build_prompt: MagicMock, analysis_service: AnalysisService, mock_procurement: MagicMock
+) -> None:
+    """Tests that contents already counted are taken from the cache and new ones are stored."""
+    mock_build_prompt.return_value = "prompt"
+    analysis_service.ai_provider.count_tokens_for_analysis.side_effect = [(100, 0, 0), (160, 0, 0)]
+    analysis_service.ai_provider.count_tokens_for_file.return_value = 25
+    token_count_repo = MagicMock()
+    token_count_repo.get_token_counts.return_value = {("hash1", "application/pdf"): 30}
+    analysis_service.token_counter = TokenCounter(analysis_service.ai_provider, token_count_repo)
+    candidates = [
+        AIFileCandidate(
+            synthetic_id="1",
+            raw_document_metadata={},
+            original_path="edital.pdf",
+            ai_gcs_uris=["gs://b/1.pdf"],
+            ai_content_hash="hash1",
+        ),
+        AIFileCandidate(
+            synthetic_id="1",
+            raw_document_metadata={},
+            original_path="outro.pdf",
+            ai_gcs_uris=["gs://b/2.pdf"],
+            ai_content_hash="hash2",
+        ),
+    ]
+
+    selected, _ = analysis_service._select_files_and_count_tokens(candidates, mock_procurement)
+
+    assert [c.token_count for c in selected] == [30, 25]
+    analysis_service.ai_provider.count_tokens_for_file.assert_called_once_with("gs://b/2.pdf")
+    token_count_repo.save_token_count.assert_called_once_with(
+        analysis_service.token_counter.model, "hash2", "application/pdf", 25
+    )
+
+
 def test_analyze_procurement_no_file_records(analysis_service: AnalysisService, caplog: Any) -> None:
     """Tests that analysis proceeds if no file records are found."""
     analysis_id = uuid.uuid4()
@@ -464,6 +652,7 @@ def test_analyze_procurement_no_file_records(analysis_service: AnalysisService,
         10,
         {},
         "thoughts",
+        0,
     )
     analysis_service.ai_provider.get_structured_analysis.return_value = (
         mock_valid_analysis,
@@ -472,6 +661,7 @@ def test_analyze_procurement_no_file_records(analysis_service: AnalysisService,
         10,
         {},
         "thoughts",
+        0,
     )
 
     # Mock pricing service
@@ -523,6 +713,7 @@ def test_analyze_procurement_no_included_files(analysis_service: AnalysisService
         10,
         {},
         "thoughts",
+        0,
     )
 
     # Mock pricing service
@@ -540,7 +731,7 @@ def test_analyze_procurement_no_included_files(analysis_service: AnalysisService
     assert "No files were selected" in caplog.text
 
 
-@patch("public_detective.services.analysis.AnalysisService._build_analysis_prompt")
+@patch("public_detective.services.analysis.AnalysisService._build_procurement_context")
 def test_analyze_procurement_happy_path(
     mock_build_prompt: MagicMock,
     analysis_service: AnalysisService,
@@ -558,6 +749,7 @@ def test_analyze_procurement_happy_path(
         spec=AnalysisResult,
         document_hash="testhash",
         analysis_prompt="prompt",
+        retry_count=0,
     )
     analysis_service.analysis_repo.get_analysis_by_id.return_value = mock_analysis_record
 
@@ -578,6 +770,7 @@ def test_analyze_procurement_happy_path(
         10,
         {},
         "thoughts",
+        0,
     )
     analysis_service.pricing_service.calculate_total_cost.return_value = (
         Decimal(0),
@@ -590,18 +783,97 @@ def test_analyze_procurement_happy_path(
     analysis_service.analyze_procurement(mock_procurement, 1, analysis_id)
 
     analysis_service.ai_provider.get_structured_analysis.assert_called_once_with(
-        prompt="prompt", file_uris=["gs://bucket/file.pdf"], max_output_tokens=None
+        prompt="prompt",
+        file_uris=["gs://bucket/file.pdf"],
+        max_output_tokens=None,
+        system_instruction=ANALYSIS_INSTRUCTIONS,
+        document_hash=None,
     )
     analysis_service.analysis_repo.save_analysis.assert_called_once()
     analysis_service.budget_ledger_repo.save_expense.assert_called_once()
 
     saved_result: AnalysisResult = analysis_service.analysis_repo.save_analysis.call_args[1]["result"]
     assert saved_result.document_hash == "testhash"
-    assert saved_result.analysis_prompt == "prompt"
+    assert saved_result.analysis_prompt == ANALYSIS_INSTRUCTIONS + "prompt"
     assert saved_result.procurement_control_number == "PNCP123"
     assert saved_result.ai_analysis == mock_valid_analysis
 
 
+@patch("public_detective.services.analysis.AnalysisService._build_procurement_context")
+def test_analyze_procurement_async_awaits_model_under_semaphore(
+    mock_build_prompt: MagicMock,
+    analysis_service: AnalysisService,
+    mock_valid_analysis: Analysis,
+    mock_procurement: MagicMock,
+) -> None:
+    """Tests that the async pipeline awaits the async client while holding the AI semaphore."""
+    analysis_id = uuid.uuid4()
+    mock_procurement.pncp_control_number = "PNCP123"
+    mock_build_prompt.return_value = "prompt"
+    analysis_service.analysis_repo.get_analysis_by_id.return_value = MagicMock(document_hash="testhash", retry_count=0)
+    analysis_service.file_record_repo.get_all_file_records_by_analysis_id.return_value = [
+        {"included_in_analysis": True, "prepared_content_gcs_uris": ["gs://bucket/file.pdf"], "extension": "pdf"}
+    ]
+    analysis_service.procurement_repo.get_procurement_uuid.return_value = uuid.uuid4()
+    analysis_service.pricing_service.calculate_total_cost.return_value = (Decimal(0),) * 5
+    semaphore_values = []
+
+    async def run() -> None:
+        ai_semaphore = asyncio.Semaphore(2)
+
+        async def get_structured_analysis_async(**_: Any) -> tuple:
+            semaphore_values.append(ai_semaphore._value)
+            return mock_valid_analysis, 100, 50, 10, {}, "thoughts", 0
+
+        analysis_service.ai_provider.get_structured_analysis_async = get_structured_analysis_async
+        await analysis_service.analyze_procurement_async(mock_procurement, 1, analysis_id, ai_semaphore)
+
+    asyncio.run(run())
+
+    assert semaphore_values == [1]
+    analysis_service.ai_provider.get_structured_analysis.assert_not_called()
+    analysis_service.analysis_repo.save_analysis.assert_called_once()
+    analysis_service.budget_ledger_repo.save_expense.assert_called_once()
+
+
+def test_analyze_procurement_retry_caches_documents_and_prices_cached_tokens(
+    analysis_service: AnalysisService, mock_valid_analysis: Analysis, mock_procurement: MagicMock
+) -> None:
+    """Tests that a retry passes its document hash to be cached and that cached tokens are priced and saved."""
+    analysis_id = uuid.uuid4()
+    analysis_service.analysis_repo.get_analysis_by_id.return_value = MagicMock(document_hash="testhash", retry_count=1)
+    analysis_service.file_record_repo.get_all_file_records_by_analysis_id.return_value = []
+    analysis_service.procurement_repo.get_procurement_uuid.return_value = uuid.uuid4()
+    analysis_service.ai_provider.get_structured_analysis.return_value = (mock_valid_analysis, 100, 50, 10, {}, None, 80)
+    analysis_service.pricing_service = MagicMock()
+    analysis_service.pricing_service.calculate_total_cost.return_value = (Decimal(0),) * 5
+
+    with patch.object(analysis_service, "_build_procurement_context", return_value="prompt"):
+        analysis_service.analyze_procurement(mock_procurement, 1, analysis_id)
+
+    assert analysis_service.ai_provider.get_structured_analysis.call_args.kwargs["document_hash"] == "testhash"
+    assert analysis_service.pricing_service.calculate_total_cost.call_args.kwargs["cached_input_tokens"] == 80
+    assert analysis_service.analysis_repo.save_analysis.call_args.kwargs["cached_input_tokens"] == 80
+
+
+def test_process_analysis_from_message_async_marks_failure(analysis_service: AnalysisService) -> None:
+    """Tests that a failed async analysis is recorded and raised as an AnalysisError."""
+    analysis_id = uuid.uuid4()
+    analysis_service.analysis_repo.get_analysis_by_id.return_value = MagicMock(version_number=1)
+    analysis_service.procurement_repo.get_procurement_by_id_and_version.return_value = MagicMock()
+
+    async def run() -> None:
+        with patch.object(analysis_service, "analyze_procurement_async", side_effect=AnalysisError("Boom")):
+            await analysis_service.process_analysis_from_message_async(analysis_id, asyncio.Semaphore(1))
+
+    with pytest.raises(AnalysisError, match="Boom"):
+        asyncio.run(run())
+
+    analysis_service.analysis_repo.update_analysis_status.assert_called_once_with(
+        analysis_id, ProcurementAnalysisStatus.ANALYSIS_FAILED
+    )
+
+
 def test_update_status_with_history(analysis_service: AnalysisService) -> None:
     """Tests that the status is updated and a history record is created."""
     analysis_id = uuid.uuid4()
@@ -967,6 +1239,7 @@ def test_run_ranked_analysis_and_skips(analysis_service: AnalysisService) -> Non
     analysis = MagicMock()
     analysis.analysis_id = uuid.uuid4()
     analysis.total_cost = Decimal("100")
+    analysis.input_tokens_estimated = False
     analysis.votes_count = 0
     analysis.procurement_control_number = "P"
     analysis.version_number = 1
@@ -1237,6 +1510,7 @@ def test_run_ranked_analysis_manual_budget(mock_run_specific: MagicMock, analysi
     mock_analysis = MagicMock()
     mock_analysis.analysis_id = uuid.uuid4()
     mock_analysis.total_cost = Decimal("10")
+    mock_analysis.input_tokens_estimated = False
     mock_analysis.votes_count = 1
     analysis_service.analysis_repo.get_pending_analyses_ranked.return_value = [mock_analysis]
     analysis_service.procurement_repo.get_procurement_by_id_and_version.return_value = _build_ranked_procurement()
@@ -1248,6 +1522,113 @@ def test_run_ranked_analysis_manual_budget(mock_run_specific: MagicMock, analysi
     mock_run_specific.assert_called_once_with(mock_analysis.analysis_id)
 
 
+@patch("public_detective.services.analysis.AnalysisService._count_estimated_analysis_tokens")
+@patch("public_detective.services.analysis.AnalysisService.run_specific_analysis")
+def test_run_ranked_analysis_counts_estimated_tokens_before_budgeting(
+    mock_run_specific: MagicMock, mock_count: MagicMock, analysis_service: AnalysisService
+) -> None:
+    """Tests that an analysis with estimated tokens is budgeted with its exact cost."""
+    mock_analysis = MagicMock()
+    mock_analysis.analysis_id = uuid.uuid4()
+    mock_analysis.total_cost = Decimal("5")
+    mock_analysis.input_tokens_estimated = True
+    mock_analysis.votes_count = 1
+    mock_count.return_value = Decimal("20")
+    analysis_service.analysis_repo.get_pending_analyses_ranked.return_value = [mock_analysis]
+    analysis_service.procurement_repo.get_procurement_by_id_and_version.return_value = _build_ranked_procurement()
+
+    analysis_service.run_ranked_analysis(
+        use_auto_budget=False, budget=Decimal("15"), budget_period=None, zero_vote_budget_percent=10
+    )
+
+    mock_count.assert_called_once()
+    mock_run_specific.assert_not_called()
+
+
+@patch("public_detective.services.analysis.AnalysisService._build_analysis_prompt")
+def test_count_estimated_analysis_tokens_reselects_files(
+    mock_build_prompt: MagicMock, analysis_service: AnalysisService, mock_procurement: MagicMock
+) -> None:
+    """Tests that the exact count reselects the files and stores exact tokens."""
+    mock_build_prompt.return_value = "prompt"
+    analysis_service.ai_provider.count_tokens_for_analysis.side_effect = [(100, 0, 0), (120, 0, 0)]
+    analysis_service.ai_provider.count_tokens_for_file.side_effect = [20, 500]
+    analysis_service.config.GCP_GEMINI_MAX_INPUT_TOKENS = 150
+    analysis_service.pricing_service.calculate_total_cost.return_value = (1, 2, 0, 0, Decimal("3"))
+    kept_id, dropped_id = uuid.uuid4(), uuid.uuid4()
+    candidates = [
+        AIFileCandidate(
+            synthetic_id="1",
+            raw_document_metadata={},
+            original_path="edital.pdf",
+            ai_gcs_uris=["uri1"],
+            file_record_id=kept_id,
+        ),
+        AIFileCandidate(
+            synthetic_id="1",
+            raw_document_metadata={},
+            original_path="anexo.pdf",
+            ai_gcs_uris=["uri2"],
+            file_record_id=dropped_id,
+        ),
+    ]
+    analysis = MagicMock(analysis_id=uuid.uuid4(), version_number=1, input_tokens_used=95, estimated_input_tokens=90)
+    analysis_service.ranking_service = MagicMock()
+
+    with patch.object(analysis_service, "_rebuild_candidates_from_db", return_value=candidates):
+        total_cost = analysis_service._count_estimated_analysis_tokens(analysis, mock_procurement)
+
+    assert total_cost == Decimal("3")
+    analysis_service.file_record_repo.set_files_as_excluded.assert_called_once_with([dropped_id])
+    analysis_service.file_record_repo.set_files_as_included.assert_called_once_with([kept_id])
+    update_kwargs = analysis_service.analysis_repo.update_pre_analysis_with_tokens.call_args.kwargs
+    assert update_kwargs["input_tokens_used"] == 120
+    assert update_kwargs["estimated_input_tokens"] == 90
+    assert update_kwargs["input_tokens_estimated"] is False
+    analysis_service.ranking_service.calculate_priority.assert_called_once()
+
+
+@patch("public_detective.services.analysis.AnalysisService._build_analysis_prompt")
+def test_select_files_and_estimate_tokens(
+    mock_build_prompt: MagicMock, analysis_service: AnalysisService, mock_procurement: MagicMock
+) -> None:
+    """Tests that files are selected from calibrated local estimates without model calls."""
+    mock_build_prompt.return_value = "p" * 40
+    analysis_service.config.GCP_GEMINI_MAX_INPUT_TOKENS = 100
+    analysis_service.token_estimator.analysis_repo.get_token_estimation_samples.return_value = [(10, 20)]
+    candidates = [
+        AIFileCandidate(
+            synthetic_id="1",
+            raw_document_metadata={},
+            original_path="edital.txt",
+            original_content=b"a" * 120,
+            ai_gcs_uris=["uri1"],
+        ),
+        AIFileCandidate(
+            synthetic_id="1",
+            raw_document_metadata={},
+            original_path="copia.txt",
+            original_content=b"a" * 120,
+            ai_gcs_uris=["uri1"],
+        ),
+        AIFileCandidate(
+            synthetic_id="1",
+            raw_document_metadata={},
+            original_path="anexo.txt",
+            original_content=b"a" * 80,
+            ai_gcs_uris=["uri2"],
+        ),
+    ]
+
+    selected, estimated_tokens = analysis_service._select_files_and_estimate_tokens(candidates, mock_procurement)
+
+    assert [c.is_included for c in selected] == [True, True, False]
+    assert selected[2].exclusion_reason == ExclusionReason.TOKEN_LIMIT_EXCEEDED
+    assert estimated_tokens == 40
+    analysis_service.ai_provider.count_tokens_for_analysis.assert_not_called()
+    analysis_service.ai_provider.count_tokens_for_file.assert_not_called()
+
+
 @patch("public_detective.services.analysis.AnalysisService.run_specific_analysis")
 def test_run_ranked_analysis_budget_exceeded(
     mock_run_specific: MagicMock, analysis_service: AnalysisService, caplog: pytest.LogCaptureFixture
@@ -1256,6 +1637,7 @@ def test_run_ranked_analysis_budget_exceeded(
     mock_analysis = MagicMock()
     mock_analysis.analysis_id = uuid.uuid4()
     mock_analysis.total_cost = Decimal("20")
+    mock_analysis.input_tokens_estimated = False
     analysis_service.analysis_repo.get_pending_analyses_ranked.return_value = [mock_analysis]
     analysis_service.procurement_repo.get_procurement_by_id_and_version.return_value = _build_ranked_procurement()
 
@@ -1275,6 +1657,7 @@ def test_run_ranked_analysis_zero_vote_budget_exceeded(
     mock_analysis = MagicMock()
     mock_analysis.analysis_id = uuid.uuid4()
     mock_analysis.total_cost = Decimal("10")
+    mock_analysis.input_tokens_estimated = False
     mock_analysis.votes_count = 0
     analysis_service.analysis_repo.get_pending_analyses_ranked.return_value = [mock_analysis]
     analysis_service.procurement_repo.get_procurement_by_id_and_version.return_value = _build_ranked_procurement()
@@ -1292,6 +1675,7 @@ def test_run_ranked_analysis_max_messages(mock_run_specific: MagicMock, analysis
     """Tests that the job stops when max_messages is reached."""
     mock_analysis1 = MagicMock(
         analysis_id=uuid.uuid4(),
+        input_tokens_estimated=False,
         total_cost=Decimal("1"),
         votes_count=1,
         procurement_control_number="PCN1",
@@ -1299,6 +1683,7 @@ def test_run_ranked_analysis_max_messages(mock_run_specific: MagicMock, analysis
     )
     mock_analysis2 = MagicMock(
         analysis_id=uuid.uuid4(),
+        input_tokens_estimated=False,
         total_cost=Decimal("1"),
         votes_count=1,
         procurement_control_number="PCN2",
@@ -1453,6 +1838,7 @@ def test_analyze_procurement_no_procurement_id(
         10,
         {},
         "thoughts",
+        0,
     )
 
     # Mock pricing service
@@ -1495,7 +1881,15 @@ def test_analyze_procurement_save_analysis_fails(
         {"included_in_analysis": True, "prepared_content_gcs_uris": ["uri"]}
     ]
 
-    analysis_service.ai_provider.get_structured_analysis.return_value = (mock_valid_analysis, 1, 1, 1, {}, "thoughts")
+    analysis_service.ai_provider.get_structured_analysis.return_value = (
+        mock_valid_analysis,
+        1,
+        1,
+        1,
+        {},
+        "thoughts",
+        0,
+    )
     analysis_service.pricing_service.calculate_total_cost.return_value = (
         Decimal("0.1"),
         Decimal("0.2"),
@@ -1532,6 +1926,7 @@ def test_run_ranked_analysis_zero_vote_happy(mock_run_specific: MagicMock, analy
     mock_analysis = MagicMock()
     mock_analysis.analysis_id = uuid.uuid4()
     mock_analysis.total_cost = Decimal("5")
+    mock_analysis.input_tokens_estimated = False
     mock_analysis.votes_count = 0
     analysis_service.analysis_repo.get_pending_analyses_ranked.return_value = [mock_analysis]
     analysis_service.procurement_repo.get_procurement_by_id_and_version.return_value = _build_ranked_procurement()
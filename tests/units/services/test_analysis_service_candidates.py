@@ -1,3 +1,4 @@
+import hashlib
 from unittest.mock import MagicMock
 from uuid import uuid4
 
@@ -38,6 +39,7 @@ def analysis_service() -> AnalysisService:
     service.file_type_provider = MagicMock()
     service.image_converter_provider = MagicMock()
     service.converter_service = MagicMock()
+    service.converter_service.normalize_image.side_effect = lambda content, _name: content
     return service
 
 
@@ -53,6 +55,7 @@ def test_prepare_ai_candidates_lock_file(analysis_service: AnalysisService) -> N
     candidates = analysis_service._prepare_ai_candidates([processed_file])
     assert len(candidates) == 1
     assert candidates[0].exclusion_reason == ExclusionReason.LOCK_FILE
+    assert candidates[0].ai_content_hash == ""
 
 
 def test_prepare_ai_candidates_extraction_failed(analysis_service: AnalysisService) -> None:
@@ -69,6 +72,34 @@ def test_prepare_ai_candidates_extraction_failed(analysis_service: AnalysisServi
     assert candidates[0].exclusion_reason == ExclusionReason.EXTRACTION_FAILED
 
 
+def test_prepare_ai_candidates_size_limit_exceeded(analysis_service: AnalysisService) -> None:
+    """Tests that files too large to download are excluded."""
+    processed_file = ProcessedFile(
+        source_document_id=str(uuid4()),
+        relative_path="huge.zip",
+        content=b"",
+        size_limit_exceeded=True,
+        raw_document_metadata={},
+    )
+    candidates = analysis_service._prepare_ai_candidates([processed_file])
+    assert len(candidates) == 1
+    assert candidates[0].exclusion_reason == ExclusionReason.FILE_TOO_LARGE
+
+
+def test_prepare_ai_candidates_extraction_limit_exceeded(analysis_service: AnalysisService) -> None:
+    """Tests that archives over the extraction budget are excluded."""
+    processed_file = ProcessedFile(
+        source_document_id=str(uuid4()),
+        relative_path="bomb.zip",
+        content=b"zip",
+        extraction_limit_exceeded=True,
+        raw_document_metadata={},
+    )
+    candidates = analysis_service._prepare_ai_candidates([processed_file])
+    assert len(candidates) == 1
+    assert candidates[0].exclusion_reason == ExclusionReason.EXTRACTION_LIMIT_EXCEEDED
+
+
 def test_prepare_ai_candidates_specialized_image(analysis_service: AnalysisService) -> None:
     """Tests specialized image conversion."""
     processed_file = ProcessedFile(
@@ -87,6 +118,7 @@ def test_prepare_ai_candidates_specialized_image(analysis_service: AnalysisServi
     assert candidates[0].ai_content == b"png_content"
     assert candidates[0].ai_path == "image.png"
     assert candidates[0].exclusion_reason is None
+    assert candidates[0].ai_content_hash == hashlib.sha256(b"png_content").hexdigest()
 
 
 def test_prepare_ai_candidates_specialized_image_failure(analysis_service: AnalysisService) -> None:
@@ -204,3 +236,57 @@ def test_resolve_redirects_exception(analysis_service: AnalysisService) -> None:
 
     resolved = analysis_service._resolve_redirects(url)
     assert resolved == url
+
+
+def test_prepare_ai_candidates_keeps_order_across_backends(analysis_service: AnalysisService) -> None:
+    """Tests that files converted in parallel come back in their original order."""
+    analysis_service.file_type_provider.get_file_type.side_effect = lambda ext: (
+        SPECIALIZED_IMAGE if ext == ".psd" else None
+    )
+    analysis_service.converter_service.is_supported_for_conversion.side_effect = lambda ext: ext == ".docx"
+    analysis_service.converter_service.docx_to_pdf.return_value = b"pdf"
+    analysis_service.converter_service.gif_to_mp4.side_effect = Exception("Conversion failed")
+    analysis_service.image_converter_provider.to_png.return_value = b"png"
+    paths = ["edital.docx", "~$edital.docx", "animacao.gif", "planta.psd", "anexo.pdf"]
+    processed_files = [
+        ProcessedFile(
+            source_document_id=str(uuid4()),
+            relative_path=path,
+            content=path.encode(),
+            extraction_failed=False,
+            raw_document_metadata={},
+        )
+        for path in paths
+    ]
+
+    candidates = analysis_service._prepare_ai_candidates(processed_files)
+
+    assert [c.original_path for c in candidates] == paths
+    assert [c.ai_path for c in candidates] == ["edital.pdf", "~$edital.docx", "animacao.gif", "planta.png", "anexo.pdf"]
+    assert [c.exclusion_reason for c in candidates] == [
+        None,
+        ExclusionReason.LOCK_FILE,
+        ExclusionReason.CONVERSION_FAILED,
+        None,
+        None,
+    ]
+
+
+def test_prepare_ai_candidates_normalizes_images(analysis_service: AnalysisService) -> None:
+    """Tests that a downscaled image replaces the original as the prepared content."""
+    analysis_service.file_type_provider.get_file_type.return_value = None
+    analysis_service.converter_service.normalize_image.side_effect = lambda content, _name: b"small png"
+    processed_file = ProcessedFile(
+        source_document_id=str(uuid4()),
+        relative_path="fotos/obra.png",
+        content=b"large png",
+        extraction_failed=False,
+        raw_document_metadata={},
+    )
+
+    candidates = analysis_service._prepare_ai_candidates([processed_file])
+
+    analysis_service.converter_service.normalize_image.assert_called_once_with(b"large png", "fotos/obra.png")
+    assert candidates[0].ai_content == b"small png"
+    assert candidates[0].original_content == b"large png"
+    assert candidates[0].prepared_content_gcs_uris == ["fotos/obra.png"]
@@ -91,6 +91,7 @@ def analysis_service(
     service.logger = MagicMock()
     service.ranking_service = MagicMock()
     service.converter_service = MagicMock()
+    service.converter_service.normalize_image.side_effect = lambda content, _name: content
     service.file_type_provider = MagicMock()
     service.image_converter_provider = MagicMock()
     return service
@@ -156,7 +157,7 @@ def test_analyze_procurement_no_prepared_content_uris(
     ]
 
     # Mock AI provider to return something so it doesn't fail later
-    analysis_service.ai_provider.get_structured_analysis.return_value = ({}, 100, 100, 0, {}, "thoughts")
+    analysis_service.ai_provider.get_structured_analysis.return_value = ({}, 100, 100, 0, {}, "thoughts", 0)
     analysis_service.pricing_service.calculate_total_cost.return_value = (0, 0, 0, 0, 0)
 
     with patch.object(analysis_service.logger, "warning") as mock_warn:
@@ -172,6 +173,8 @@ def test_prepare_ai_candidates_fallback_conversion_failure(analysis_service: Ana
     processed_file.relative_path = "test.xyz"
     processed_file.content = b"content"
     processed_file.extraction_failed = False
+    processed_file.size_limit_exceeded = False
+    processed_file.extraction_limit_exceeded = False
     processed_file.source_document_id = "123"
     processed_file.raw_document_metadata = {}
 
@@ -195,6 +198,8 @@ def test_prepare_ai_candidates_inferred_extension_supported(analysis_service: An
     processed_file.relative_path = "test.xyz"
     processed_file.content = b"content"
     processed_file.extraction_failed = False
+    processed_file.size_limit_exceeded = False
+    processed_file.extraction_limit_exceeded = False
     processed_file.source_document_id = "123"
     processed_file.raw_document_metadata = {}
 
@@ -214,6 +219,8 @@ def test_prepare_ai_candidates_default_handling(analysis_service: AnalysisServic
     processed_file.relative_path = "test.pdf"
     processed_file.content = b"content"
     processed_file.extraction_failed = False
+    processed_file.size_limit_exceeded = False
+    processed_file.extraction_limit_exceeded = False
     processed_file.source_document_id = "123"
     processed_file.raw_document_metadata = {}
 
@@ -240,10 +247,13 @@ def test_select_files_by_token_limit_skips_excluded(analysis_service: AnalysisSe
     procurement.proposal_opening_date = datetime.now()
     procurement.proposal_closing_date = datetime.now()
 
+    analysis_service.ai_provider.count_tokens_for_analysis.return_value = (100, 0, 0)
+
     analysis_service._select_files_by_token_limit([candidate], procurement)
 
-    # Should not call count_tokens_for_analysis
-    analysis_service.ai_provider.count_tokens_for_analysis.assert_not_called()
+    analysis_service.ai_provider.count_tokens_for_file.assert_not_called()
+    count_calls = analysis_service.ai_provider.count_tokens_for_analysis.call_args_list
+    assert all(call.args[1] == [] for call in count_calls)
 
 
 def test_get_prioritization_logic_keyword(analysis_service: AnalysisService) -> None:
@@ -271,7 +281,7 @@ def test_run_pre_analysis_events(analysis_service: AnalysisService, procurement_
     end_date = date(2023, 1, 1)
 
     # Mock generator events
-    def mock_gen(target_date: date) -> object:
+    def mock_gen(target_date: date, resume_after: tuple | None = None) -> object:
         yield "modality_started", "Pregão"
         yield "pages_total", 1
         yield "procurements_page", (MagicMock(), {})
@@ -332,6 +342,7 @@ def test_run_ranked_analysis_budget_exhausted(
     """Test run_ranked_analysis stops when budget exhausted."""
     analysis = MagicMock()
     analysis.total_cost = Decimal("100.00")
+    analysis.input_tokens_estimated = False
     analysis.votes_count = 1
     analysis_repo.get_pending_analyses_ranked.return_value = [analysis]
 
@@ -350,8 +361,8 @@ def test_run_ranked_analysis_max_messages_reached(
     analysis_service: AnalysisService, analysis_repo: MagicMock, procurement_repo: MagicMock
 ) -> None:
     """Test run_ranked_analysis stops when max_messages reached."""
-    analysis1 = MagicMock(analysis_id=uuid4(), total_cost=Decimal("10"), votes_count=1)
-    analysis2 = MagicMock(analysis_id=uuid4(), total_cost=Decimal("10"), votes_count=1)
+    analysis1 = MagicMock(analysis_id=uuid4(), input_tokens_estimated=False, total_cost=Decimal("10"), votes_count=1)
+    analysis2 = MagicMock(analysis_id=uuid4(), input_tokens_estimated=False, total_cost=Decimal("10"), votes_count=1)
     analysis_repo.get_pending_analyses_ranked.return_value = [analysis1, analysis2]
 
     procurement = MagicMock(is_stable=True)
@@ -370,7 +381,7 @@ def test_run_ranked_analysis_exception_in_loop(
     analysis_service: AnalysisService, analysis_repo: MagicMock, procurement_repo: MagicMock
 ) -> None:
     """Test run_ranked_analysis handles exception in loop."""
-    analysis = MagicMock(analysis_id=uuid4(), total_cost=Decimal("10"), votes_count=1)
+    analysis = MagicMock(analysis_id=uuid4(), input_tokens_estimated=False, total_cost=Decimal("10"), votes_count=1)
     analysis_repo.get_pending_analyses_ranked.return_value = [analysis]
 
     procurement = MagicMock(is_stable=True)
@@ -392,10 +403,12 @@ def test_prepare_ai_candidates_specialized_image(analysis_service: AnalysisServi
     processed_file.relative_path = "image.ai"
     processed_file.content = b"content"
     processed_file.extraction_failed = False
+    processed_file.size_limit_exceeded = False
+    processed_file.extraction_limit_exceeded = False
     processed_file.source_document_id = "123"
     processed_file.raw_document_metadata = {}
 
-    analysis_service.file_type_provider.get_file_type.side_effect = [SPECIALIZED_IMAGE, "unknown"]
+    analysis_service.file_type_provider.get_file_type.return_value = SPECIALIZED_IMAGE
     analysis_service.file_type_provider.infer_extension.return_value = ".ai"
     analysis_service.image_converter_provider.to_png.return_value = b"png"
 
@@ -0,0 +1,269 @@
+"""Unit tests for the content-addressed file store in AnalysisService."""
+
+import hashlib
+from unittest.mock import MagicMock, patch
+from uuid import uuid4
+
+import pytest
+from public_detective.exceptions.analysis import AnalysisError
+from public_detective.models.candidates import AIFileCandidate
+from public_detective.models.file_contents import FileContent
+from public_detective.models.procurements import Procurement
+from public_detective.repositories.procurements import ProcessedFile
+from public_detective.services.analysis import AnalysisService
+
+DOCX_CONTENT = b"docx content"
+DOCX_HASH = hashlib.sha256(DOCX_CONTENT).hexdigest()
+
+
+@pytest.fixture
+def analysis_service() -> AnalysisService:
+    """Creates an AnalysisService with mocked dependencies and a content store."""
+    service = AnalysisService(
+        procurement_repo=MagicMock(),
+        analysis_repo=MagicMock(),
+        source_document_repo=MagicMock(),
+        file_record_repo=MagicMock(),
+        status_history_repo=MagicMock(),
+        budget_ledger_repo=MagicMock(),
+        ai_provider=MagicMock(),
+        gcs_provider=MagicMock(),
+        http_provider=MagicMock(),
+        file_content_repo=MagicMock(),
+    )
+    service.config = MagicMock()
+    service.config.GCP_GCS_BUCKET_PROCUREMENTS = "bucket"
+    service.config.GCP_GEMINI_MAX_INPUT_TOKENS = 1000
+    service.converter_service = MagicMock()
+    service.converter_service.docx_to_pdf.return_value = b"pdf content"
+    service.file_content_repo.get_file_contents.return_value = {}
+    return service
+
+
+def _processed_file(relative_path: str, content: bytes = DOCX_CONTENT) -> ProcessedFile:
+    """Builds a processed file.
+
+    Args:
+        relative_path: The path of the file inside the procurement.
+        content: The content of the file.
+
+    Returns:
+        The processed file.
+    """
+    return ProcessedFile(
+        source_document_id=str(uuid4()),
+        relative_path=relative_path,
+        content=content,
+        extraction_failed=False,
+        raw_document_metadata={},
+    )
+
+
+def _stored_content() -> FileContent:
+    """Builds a content already in the store.
+
+    Returns:
+        The stored content.
+    """
+    return FileContent(
+        content_hash=DOCX_HASH,
+        extension=".docx",
+        size_bytes=len(DOCX_CONTENT),
+        original_gcs_path=f"contents/{DOCX_HASH}/original.docx",
+        prepared_content_gcs_uris=[f"gs://bucket/contents/{DOCX_HASH}/prepared.pdf"],
+        ai_content_hash="prepared-hash",
+    )
+
+
+def test_prepare_ai_candidates_converts_duplicates_once(analysis_service: AnalysisService) -> None:
+    """Tests that identical files in the same run share a single conversion."""
+    candidates = analysis_service._prepare_ai_candidates(
+        [_processed_file("edital.docx"), _processed_file("anexos/copia.docx")]
+    )
+
+    analysis_service.converter_service.docx_to_pdf.assert_called_once_with(DOCX_CONTENT)
+    assert [c.ai_path for c in candidates] == ["edital.pdf", "anexos/copia.pdf"]
+    assert candidates[1].prepared_content_gcs_uris == ["anexos/copia.pdf"]
+    assert candidates[1].ai_content == b"pdf content"
+    assert {c.content_hash for c in candidates} == {DOCX_HASH}
+
+
+def test_prepare_ai_candidates_reuses_stored_content(analysis_service: AnalysisService) -> None:
+    """Tests that a content prepared by an earlier run is not converted again."""
+    stored_content = _stored_content()
+    analysis_service.file_content_repo.get_file_contents.return_value = {DOCX_HASH: stored_content}
+
+    candidates = analysis_service._prepare_ai_candidates([_processed_file("edital.docx")])
+
+    analysis_service.converter_service.docx_to_pdf.assert_not_called()
+    assert candidates[0].ai_path == "edital.pdf"
+    assert candidates[0].ai_gcs_uris == stored_content.prepared_content_gcs_uris
+    assert candidates[0].token_count is None
+    assert candidates[0].ai_content_hash == "prepared-hash"
+    assert candidates[0].stored_content == stored_content
+    assert candidates[0].content_hash == DOCX_HASH
+
+
+def test_candidate_content_hash_matches_between_converted_and_reused(analysis_service: AnalysisService) -> None:
+    """Tests that a file is identified by the same hash whether it was just converted or reused."""
+    converted = analysis_service._prepare_ai_candidates([_processed_file("edital.docx")])[0]
+    stored_content = _stored_content()
+    stored_content.ai_content_hash = converted.ai_content_hash
+    analysis_service.file_content_repo.get_file_contents.return_value = {DOCX_HASH: stored_content}
+
+    reused = analysis_service._prepare_ai_candidates([_processed_file("edital.docx")])[0]
+
+    assert reused.ai_path == converted.ai_path == "edital.pdf"
+    assert reused.ai_content == b""
+    assert analysis_service._get_candidate_content_hash(reused) == hashlib.sha256(b"pdf content").hexdigest()
+    assert analysis_service._get_candidate_content_hash(converted) == hashlib.sha256(b"pdf content").hexdigest()
+
+
+def test_estimate_stored_contents_uses_prepared_content(analysis_service: AnalysisService) -> None:
+    """Tests that a stored .docx without an estimate is sized from its converted PDF, once."""
+    docx = b"PK\x03\x04" + b"word/document.xml" * 2000
+    docx_hash = hashlib.sha256(docx).hexdigest()
+    stored_content = _stored_content().model_copy(update={"content_hash": docx_hash})
+    analysis_service.file_content_repo.get_file_contents.return_value = {docx_hash: stored_content}
+    analysis_service.gcs_provider.download_file.return_value = b"%PDF-1.4\n<< /Type /Pages /Count 1 >>"
+    candidates = analysis_service._prepare_ai_candidates([_processed_file("edital.docx", docx)])
+
+    analysis_service._estimate_stored_contents(candidates)
+
+    analysis_service.gcs_provider.download_file.assert_called_once_with("bucket", f"contents/{DOCX_HASH}/prepared.pdf")
+    assert candidates[0].estimated_tokens == 258
+    assert analysis_service.token_estimator.estimate_candidate(candidates[0]) == 258
+    assert analysis_service.token_estimator.estimate_file("edital.docx", docx) > 10 * 258
+    analysis_service.file_content_repo.save_estimated_tokens.assert_called_once_with({docx_hash: 258})
+
+
+def test_estimate_stored_contents_reuses_saved_estimate(analysis_service: AnalysisService) -> None:
+    """Tests that a stored content with a saved estimate is not downloaded again."""
+    stored_content = _stored_content()
+    stored_content.estimated_tokens = 516
+    analysis_service.file_content_repo.get_file_contents.return_value = {DOCX_HASH: stored_content}
+    candidates = analysis_service._prepare_ai_candidates([_processed_file("edital.docx")])
+
+    analysis_service._estimate_stored_contents(candidates)
+
+    analysis_service.gcs_provider.download_file.assert_not_called()
+    analysis_service.file_content_repo.save_estimated_tokens.assert_not_called()
+    assert analysis_service.token_estimator.estimate_candidate(candidates[0]) == 516
+
+
+def test_prepare_ai_candidates_ignores_stored_content_with_other_extension(
+    analysis_service: AnalysisService,
+) -> None:
+    """Tests that a stored content is only reused under the same extension."""
+    analysis_service.file_content_repo.get_file_contents.return_value = {DOCX_HASH: _stored_content()}
+    analysis_service.file_type_provider = MagicMock()
+    analysis_service.file_type_provider.get_file_type.return_value = None
+
+    candidates = analysis_service._prepare_ai_candidates([_processed_file("edital.txt")])
+
+    assert candidates[0].stored_content is None
+    assert candidates[0].content_hash == ""
+
+
+def test_upload_stores_each_content_once(analysis_service: AnalysisService, mock_procurement: Procurement) -> None:
+    """Tests that duplicates are uploaded once and each record references the content."""
+    candidates = analysis_service._prepare_ai_candidates(
+        [_processed_file("edital.docx"), _processed_file("copia.docx")]
+    )
+    source_docs_map = {c.synthetic_id: uuid4() for c in candidates}
+
+    analysis_service._upload_and_save_initial_records(mock_procurement, uuid4(), uuid4(), candidates, source_docs_map)
+
+    uploaded = [call.kwargs["destination_blob_name"] for call in analysis_service.gcs_provider.upload_file.mock_calls]
+    assert uploaded == [f"contents/{DOCX_HASH}/original.docx", f"contents/{DOCX_HASH}/prepared.pdf"]
+    analysis_service.file_content_repo.save_file_content.assert_called_once()
+    saved_records = [call.args[0] for call in analysis_service.file_record_repo.save_file_record.call_args_list]
+    assert [record.content_hash for record in saved_records] == [DOCX_HASH, DOCX_HASH]
+    assert [record.gcs_path for record in saved_records] == [f"contents/{DOCX_HASH}/original.docx"] * 2
+    assert analysis_service.file_content_repo.add_reference.call_count == 2
+    saved_content = analysis_service.file_content_repo.save_file_content.call_args.args[0]
+    assert saved_content.estimated_tokens == analysis_service.token_estimator.estimate_file(
+        "edital.pdf", b"pdf content"
+    )
+    assert candidates[0].ai_gcs_uris == candidates[1].ai_gcs_uris == [f"gs://bucket/contents/{DOCX_HASH}/prepared.pdf"]
+
+
+def test_upload_skips_stored_content(analysis_service: AnalysisService, mock_procurement: Procurement) -> None:
+    """Tests that a content found in the store is referenced without being uploaded."""
+    analysis_service.file_content_repo.get_file_contents.return_value = {DOCX_HASH: _stored_content()}
+    candidates = analysis_service._prepare_ai_candidates([_processed_file("edital.docx")])
+
+    analysis_service._upload_and_save_initial_records(
+        mock_procurement, uuid4(), uuid4(), candidates, {candidates[0].synthetic_id: uuid4()}
+    )
+
+    analysis_service.gcs_provider.upload_file.assert_not_called()
+    analysis_service.file_content_repo.save_file_content.assert_not_called()
+    analysis_service.file_content_repo.add_reference.assert_called_once_with(DOCX_HASH)
+
+
+@patch("public_detective.services.analysis.AnalysisService._build_analysis_prompt")
+def test_select_files_counts_every_file_through_token_counter(
+    mock_build_prompt: MagicMock, analysis_service: AnalysisService, mock_procurement: Procurement
+) -> None:
+    """Tests that counts carried by a candidate are ignored and each URI is counted once."""
+    mock_build_prompt.return_value = "prompt"
+    analysis_service.ai_provider.count_tokens_for_analysis.side_effect = [(100, 0, 0), (650, 0, 0)]
+    analysis_service.ai_provider.count_tokens_for_file.side_effect = [300, 250]
+    candidates = [
+        AIFileCandidate(
+            synthetic_id="1",
+            raw_document_metadata={},
+            original_path="a.pdf",
+            ai_gcs_uris=["uri-a"],
+            content_hash="a",
+            token_count=999,
+        ),
+        AIFileCandidate(
+            synthetic_id="1",
+            raw_document_metadata={},
+            original_path="b.pdf",
+            ai_gcs_uris=["uri-b"],
+            content_hash="b",
+        ),
+        AIFileCandidate(
+            synthetic_id="1",
+            raw_document_metadata={},
+            original_path="c.pdf",
+            ai_gcs_uris=["uri-a"],
+            content_hash="a",
+        ),
+    ]
+
+    selected = analysis_service._select_files_by_token_limit(candidates, mock_procurement)
+
+    assert all(c.is_included for c in selected)
+    assert [c.token_count for c in candidates] == [300, 250, None]
+    count_calls = analysis_service.ai_provider.count_tokens_for_analysis.call_args_list
+    assert [call.args[1] for call in count_calls] == [[], ["uri-a", "uri-b"]]
+    assert [call.args[0] for call in analysis_service.ai_provider.count_tokens_for_file.call_args_list] == [
+        "uri-a",
+        "uri-b",
+    ]
+
+
+def test_collect_unused_file_contents_deletes_blobs(analysis_service: AnalysisService) -> None:
+    """Tests that collected contents have their original and prepared objects removed."""
+    analysis_service.file_content_repo.collect_garbage.return_value = [_stored_content()]
+
+    deleted_count = analysis_service.collect_unused_file_contents(30)
+
+    assert deleted_count == 1
+    deleted = [call.args for call in analysis_service.gcs_provider.delete_file.call_args_list]
+    assert deleted == [
+        ("bucket", f"contents/{DOCX_HASH}/original.docx"),
+        ("bucket", f"contents/{DOCX_HASH}/prepared.pdf"),
+    ]
+
+
+def test_collect_unused_file_contents_requires_an_idle_day(analysis_service: AnalysisService) -> None:
+    """Tests that contents just looked up by a running analysis can never be collected."""
+    with pytest.raises(AnalysisError, match="at least one day"):
+        analysis_service.collect_unused_file_contents(0)
+
+    analysis_service.file_content_repo.collect_garbage.assert_not_called()
@@ -90,6 +90,7 @@ def test_analyze_procurement_happy_path(analysis_service: AnalysisService) -> No
         10,  # thinking_tokens
         {"search_queries": [], "sources": []},  # raw_grounding_metadata
         "thoughts",  # thoughts
+        0,  # cached_input_tokens
     )
 
     analysis_service.pricing_service.calculate_total_cost.return_value = (
@@ -133,6 +134,7 @@ def test_analyze_procurement_no_file_records(analysis_service: AnalysisService)
         10,  # thinking_tokens
         {"search_queries": [], "sources": []},  # raw_grounding_metadata
         "thoughts",  # thoughts
+        0,  # cached_input_tokens
     )
 
     # Mock analysis repo response
@@ -178,6 +180,7 @@ def test_analyze_procurement_no_included_records(analysis_service: AnalysisServi
         10,  # thinking_tokens
         {"search_queries": [], "sources": []},  # raw_grounding_metadata
         "thoughts",  # thoughts
+        0,  # cached_input_tokens
     )
 
     # Mock analysis repo response
@@ -47,11 +47,17 @@ def test_run_ranked_analysis_manual_budget(analysis_service: AnalysisService) ->
         analysis_id=uuid4(),
         procurement_control_number="1",
         version_number=1,
+        input_tokens_estimated=False,
         total_cost=Decimal("10.00"),
         votes_count=1,
     )
     analysis2 = MagicMock(
-        analysis_id=uuid4(), procurement_control_number="2", version_number=1, total_cost=Decimal("5.00"), votes_count=0
+        analysis_id=uuid4(),
+        procurement_control_number="2",
+        version_number=1,
+        input_tokens_estimated=False,
+        total_cost=Decimal("5.00"),
+        votes_count=0,
     )
 
     analysis_service.analysis_repo.get_pending_analyses_ranked.return_value = [analysis1, analysis2]
@@ -92,6 +98,7 @@ def test_run_ranked_analysis_budget_exhausted(analysis_service: AnalysisService)
         analysis_id=uuid4(),
         procurement_control_number="1",
         version_number=1,
+        input_tokens_estimated=False,
         total_cost=Decimal("60.00"),
         votes_count=1,
     )
@@ -99,6 +106,7 @@ def test_run_ranked_analysis_budget_exhausted(analysis_service: AnalysisService)
         analysis_id=uuid4(),
         procurement_control_number="2",
         version_number=1,
+        input_tokens_estimated=False,
         total_cost=Decimal("50.00"),
         votes_count=1,
     )
@@ -134,10 +142,20 @@ def test_run_ranked_analysis_zero_vote_budget(analysis_service: AnalysisService)
     # Analysis 2: Cost 6, Votes 0 -> Exceeds remaining zero-vote (5) -> Skipped
 
     analysis1 = MagicMock(
-        analysis_id=uuid4(), procurement_control_number="1", version_number=1, total_cost=Decimal("5.00"), votes_count=0
+        analysis_id=uuid4(),
+        procurement_control_number="1",
+        version_number=1,
+        input_tokens_estimated=False,
+        total_cost=Decimal("5.00"),
+        votes_count=0,
     )
     analysis2 = MagicMock(
-        analysis_id=uuid4(), procurement_control_number="2", version_number=1, total_cost=Decimal("6.00"), votes_count=0
+        analysis_id=uuid4(),
+        procurement_control_number="2",
+        version_number=1,
+        input_tokens_estimated=False,
+        total_cost=Decimal("6.00"),
+        votes_count=0,
     )
 
     analysis_service.analysis_repo.get_pending_analyses_ranked.return_value = [analysis1, analysis2]
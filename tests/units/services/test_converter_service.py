@@ -1,9 +1,17 @@
 """Unit tests for the ConverterService."""
 
+import io
+import threading
+import time
+from pathlib import Path
+from typing import Any
 from unittest.mock import ANY, MagicMock, patch
 
+import numpy as np
 import pytest
-from public_detective.services.converter import ConverterService
+from PIL import Image
+from public_detective.providers.conversion_cache import ConversionCache
+from public_detective.services.converter import ConversionBackend, ConversionExecutor, ConverterService
 
 
 @pytest.fixture
@@ -12,24 +20,201 @@ def converter_service() -> ConverterService:
     return ConverterService()
 
 
-@patch("imageio.get_reader")
-@patch("imageio.get_writer")
-def test_gif_to_mp4(
-    mock_get_writer: MagicMock, mock_get_reader: MagicMock, converter_service: ConverterService
-) -> None:
+def _gif_bytes(colors: list[tuple[int, int, int]], duration_ms: int, size: tuple[int, int] = (40, 30)) -> bytes:
+    """Builds an animated GIF with one solid frame per color.
+
+    Args:
+        colors: The color of each frame.
+        duration_ms: How long each frame is shown, in milliseconds.
+        size: The width and height of the frames.
+
+    Returns:
+        The content of the GIF.
+    """
+    frames = [Image.new("RGB", size, color) for color in colors]
+    with io.BytesIO() as buffer:
+        frames[0].save(buffer, format="GIF", save_all=True, append_images=frames[1:], duration=duration_ms, loop=0)
+        return buffer.getvalue()
+
+
+def test_gif_to_mp4(converter_service: ConverterService) -> None:
     """Test the gif_to_mp4 method successfully converts GIF to MP4."""
-    dummy_gif_content = b"GIF89a..."
-    mock_reader = mock_get_reader.return_value
-    mock_reader.get_meta_data.return_value = {"fps": 30}
-    mock_reader.__iter__.return_value = [b"frame1", b"frame2"]
-    mock_writer_instance = mock_get_writer.return_value.__enter__.return_value
+    gif_content = _gif_bytes([(255, 0, 0), (0, 255, 0)] * 10, duration_ms=100)
 
-    result = converter_service.gif_to_mp4(dummy_gif_content)
+    result = converter_service.gif_to_mp4(gif_content)
 
-    mock_get_reader.assert_called_once_with(dummy_gif_content, format="gif")
-    mock_get_writer.assert_called_once()
-    assert mock_writer_instance.append_data.call_count == 2
-    assert isinstance(result, bytes)
+    assert result[4:8] == b"ftyp"
+
+
+def test_gif_to_mp4_converts_one_pixel_gifs(converter_service: ConverterService) -> None:
+    """Tests that GIFs one pixel high or wide are padded to an even size instead of failing."""
+    for size in ((1, 1), (3, 1)):
+        gif_content = _gif_bytes([(255, 0, 0), (0, 255, 0)], duration_ms=500, size=size)
+
+        result = converter_service.gif_to_mp4(gif_content)
+
+        assert result[4:8] == b"ftyp"
+
+
+def test_read_gif_frames_samples_target_fps(converter_service: ConverterService) -> None:
+    """Tests that frames are sampled at the target rate and slow frames are yielded once."""
+    fast_gif = _gif_bytes([(index * 10, 0, 0) for index in range(25)], duration_ms=100)
+    slow_gif = _gif_bytes([(255, 0, 0), (0, 0, 255)], duration_ms=2000)
+    fast_sampling = {"duration": 0.0}
+    slow_sampling = {"duration": 0.0}
+
+    fast_frames = list(converter_service._read_gif_frames(fast_gif, 2.0, fast_sampling))
+    slow_frames = list(converter_service._read_gif_frames(slow_gif, 1.0, slow_sampling))
+
+    assert [(frame.shape, ticks) for frame, ticks in fast_frames] == [((30, 40, 3), 1)] * 5
+    assert fast_sampling["duration"] == pytest.approx(2.5)
+    assert [frame[0, 0, 0] for frame, _ in fast_frames] == [0, 50, 100, 150, 200]
+    assert [ticks for _, ticks in slow_frames] == [2, 2]
+    assert slow_sampling["duration"] == pytest.approx(4.0)
+
+
+def test_read_gif_frames_downscales_while_decoding(converter_service: ConverterService) -> None:
+    """Tests that long, large frames are downscaled once each instead of being repeated at full size."""
+    converter_service.config = MagicMock(MEDIA_NORMALIZATION_MAX_DIMENSION=100, GIF_MAX_DURATION_SECONDS=0)
+    gif_content = _gif_bytes([(255, 0, 0), (0, 0, 255)], duration_ms=60000, size=(2000, 2000))
+
+    frames = list(converter_service._read_gif_frames(gif_content, 1.0, {"duration": 0.0}))
+
+    assert [(frame.shape, ticks) for frame, ticks in frames] == [((100, 100, 3), 60)] * 2
+
+
+def test_read_gif_frames_stops_at_max_duration(converter_service: ConverterService) -> None:
+    """Tests that only the first seconds of a long GIF are sampled."""
+    converter_service.config = MagicMock(MEDIA_NORMALIZATION_MAX_DIMENSION=1536, GIF_MAX_DURATION_SECONDS=3)
+    converter_service.logger = MagicMock()
+    gif_content = _gif_bytes([(255, 0, 0), (0, 0, 255), (0, 255, 0)], duration_ms=2000)
+    sampling = {"duration": 0.0}
+
+    frames = list(converter_service._read_gif_frames(gif_content, 1.0, sampling))
+
+    assert [ticks for _, ticks in frames] == [2, 1]
+    assert sampling["duration"] == pytest.approx(3.0)
+    converter_service.logger.info.assert_called_once_with("Sampled only the first 3 seconds of the GIF.")
+
+
+def test_downscale_frame_averages_blocks(converter_service: ConverterService) -> None:
+    """Tests that a frame is shrunk below the maximum dimension."""
+    converter_service.config = MagicMock(MEDIA_NORMALIZATION_MAX_DIMENSION=60)
+    frame = np.zeros((90, 120, 3), dtype=np.uint8)
+    frame[:, 1::2] = 200
+
+    downscaled = converter_service._downscale_frame(frame)
+
+    assert downscaled.shape == (45, 60, 3)
+    assert (downscaled == 100).all()
+
+
+def test_downscale_frame_keeps_thin_frames(converter_service: ConverterService) -> None:
+    """Tests that a frame thinner than the downscale factor keeps at least one pixel."""
+    converter_service.config = MagicMock(MEDIA_NORMALIZATION_MAX_DIMENSION=60)
+
+    downscaled = converter_service._downscale_frame(np.full((1, 300, 3), 50, dtype=np.uint8))
+
+    assert downscaled.shape == (1, 60, 3)
+    assert (downscaled == 50).all()
+
+
+def test_pad_to_even_size_repeats_edges(converter_service: ConverterService) -> None:
+    """Tests that odd frames are padded with their last row and column."""
+    frame = np.arange(3, dtype=np.uint8).reshape(1, 3, 1).repeat(3, axis=2)
+
+    padded = converter_service._pad_to_even_size(frame)
+
+    assert padded.shape == (2, 4, 3)
+    assert padded[:, :, 0].tolist() == [[0, 1, 2, 2], [0, 1, 2, 2]]
+
+
+def test_select_keyframes_drops_repeated_frames(converter_service: ConverterService) -> None:
+    """Tests that only frames differing from the one before are kept, for one tick each."""
+    frames = [(np.full((4, 4, 3), value, dtype=np.uint8), 2) for value in (0, 0, 255, 255, 0)]
+
+    keyframes = list(converter_service._select_keyframes(frames))
+
+    assert [(frame[0, 0, 0], ticks) for frame, ticks in keyframes] == [(0, 1), (255, 1), (0, 1)]
+
+
+def test_write_mp4_fails_clearly_without_output(converter_service: ConverterService) -> None:
+    """Tests that a missing ffmpeg output is reported instead of surfacing as FileNotFoundError."""
+    with patch("public_detective.services.converter.imageio_ffmpeg.write_frames"):
+        with pytest.raises(RuntimeError, match="did not write the MP4 file"):
+            converter_service._write_mp4([(np.zeros((2, 2, 3), dtype=np.uint8), 3)], 1.0)
+
+
+def test_write_mp4_requires_frames(converter_service: ConverterService) -> None:
+    """Tests that an empty frame stream is rejected."""
+    with pytest.raises(ValueError, match="no frames"):
+        converter_service._write_mp4([], 1.0)
+
+
+def test_gif_to_mp4_keyframes_only_shortens_video(converter_service: ConverterService) -> None:
+    """Tests that keyframes are shown for one tick each and the report is logged."""
+    converter_service.config = MagicMock(
+        MEDIA_NORMALIZATION_MAX_DIMENSION=1536,
+        GIF_TARGET_FPS=1.0,
+        GIF_KEYFRAMES_ONLY=True,
+        GIF_MAX_DURATION_SECONDS=300,
+    )
+    converter_service.logger = MagicMock()
+    gif_content = _gif_bytes([(255, 0, 0)] * 10 + [(0, 0, 255)], duration_ms=1000)
+    written: list[tuple[tuple[int, ...], int]] = []
+
+    def fake_write(frames: Any, fps: float) -> tuple[bytes, int]:
+        written.extend((frame.shape, ticks) for frame, ticks in frames)
+        assert fps == 1.0
+        return b"mp4", len(written)
+
+    with patch.object(converter_service, "_write_mp4", side_effect=fake_write):
+        converter_service.gif_to_mp4(gif_content, "anexos/animacao.gif")
+
+    assert written == [((30, 40, 3), 1)] * 2
+    report = converter_service.logger.info.call_args.args[0]
+    assert report.startswith("Normalized anexos/animacao.gif:")
+    assert "~2838 -> ~516 estimated tokens" in report
+
+
+def test_gif_to_mp4_keyframes_only_keeps_target_fps(converter_service: ConverterService) -> None:
+    """Tests that keyframes are written at the target frame rate instead of a fixed one."""
+    converter_service.config = MagicMock(
+        MEDIA_NORMALIZATION_MAX_DIMENSION=1536,
+        GIF_TARGET_FPS=2.0,
+        GIF_KEYFRAMES_ONLY=True,
+        GIF_MAX_DURATION_SECONDS=300,
+    )
+    gif_content = _gif_bytes([(255, 0, 0)] * 4 + [(0, 0, 255)], duration_ms=500)
+
+    with patch.object(converter_service, "_write_mp4", return_value=(b"mp4", 2)) as mock_write:
+        converter_service.gif_to_mp4(gif_content)
+
+    assert mock_write.call_args.args[1] == 2.0
+
+
+def test_normalize_image_downscales_large_images(converter_service: ConverterService) -> None:
+    """Tests that an image beyond the maximum dimension is shrunk in its own format."""
+    converter_service.config = MagicMock(MEDIA_NORMALIZATION_MAX_DIMENSION=800)
+    with io.BytesIO() as buffer:
+        Image.new("RGB", (1600, 1200), (10, 20, 30)).save(buffer, format="JPEG")
+        image_content = buffer.getvalue()
+
+    result = converter_service.normalize_image(image_content, "foto.jpg")
+
+    with Image.open(io.BytesIO(result)) as img:
+        assert img.format == "JPEG"
+        assert img.size == (800, 600)
+
+
+def test_normalize_image_keeps_small_and_unreadable_images(converter_service: ConverterService) -> None:
+    """Tests that images within the limit, or that cannot be read, are left untouched."""
+    with io.BytesIO() as buffer:
+        Image.new("RGB", (100, 100)).save(buffer, format="PNG")
+        small_image = buffer.getvalue()
+
+    assert converter_service.normalize_image(small_image, "small.png") == small_image
+    assert converter_service.normalize_image(b"not an image", "broken.png") == b"not an image"
 
 
 @patch("PIL.Image.open")
@@ -45,11 +230,21 @@ def test_bmp_to_png(mock_open: MagicMock, converter_service: ConverterService) -
     assert isinstance(result, bytes)
 
 
-@patch("imageio.get_reader")
-def test_gif_to_mp4_conversion_failure(mock_get_reader: MagicMock, converter_service: ConverterService) -> None:
+def test_gif_to_mp4_uses_conversion_cache(converter_service: ConverterService, tmp_path: Path) -> None:
+    """Tests that a GIF already encoded with the same settings is not encoded again."""
+    converter_service.conversion_cache = ConversionCache(str(tmp_path), max_bytes=1024)
+
+    with patch.object(converter_service, "_gif_to_mp4", return_value=b"mp4") as mock_convert:
+        first = converter_service.gif_to_mp4(b"GIF89a...")
+        second = converter_service.gif_to_mp4(b"GIF89a...")
+
+    assert first == second == b"mp4"
+    mock_convert.assert_called_once_with(b"GIF89a...", "GIF")
+
+
+def test_gif_to_mp4_conversion_failure(converter_service: ConverterService) -> None:
     """Tests that an exception during GIF to MP4 conversion is properly handled."""
-    mock_get_reader.side_effect = Exception("imageio error")
-    with pytest.raises(Exception, match="imageio error"):
+    with pytest.raises(Exception, match="cannot identify image file"):
         converter_service.gif_to_mp4(b"bad gif content")
 
 
@@ -122,3 +317,60 @@ def test_xlsb_to_pdf(mock_convert_to_pdf: MagicMock, converter_service: Converte
     result = converter_service.xlsb_to_pdf(b"xlsb content")
     assert result == b"pdf content"
     mock_convert_to_pdf.assert_called_once_with(b"xlsb content", ".xlsb")
+
+
+@pytest.fixture
+def conversion_executor() -> ConversionExecutor:
+    """Provides a ConversionExecutor with two LibreOffice slots."""
+    config = MagicMock()
+    config.CONVERTER_LIBREOFFICE_MAX_WORKERS = 2
+    config.CONVERTER_IMAGEMAGICK_MAX_WORKERS = 1
+    config.CONVERTER_IMAGEIO_MAX_WORKERS = 1
+    return ConversionExecutor(config)
+
+
+def test_conversion_executor_keeps_task_order(conversion_executor: ConversionExecutor) -> None:
+    """Tests that results come back in the order of the tasks, whatever their backend."""
+
+    def slow_conversion() -> str:
+        time.sleep(0.05)
+        return "docx"
+
+    tasks = [
+        (ConversionBackend.LIBREOFFICE, slow_conversion),
+        (None, lambda: "pdf"),
+        (ConversionBackend.IMAGEIO, lambda: "gif"),
+        (ConversionBackend.IMAGEMAGICK, lambda: "psd"),
+    ]
+
+    assert conversion_executor.run(tasks) == ["docx", "pdf", "gif", "psd"]
+
+
+def test_conversion_executor_respects_backend_limit(conversion_executor: ConversionExecutor) -> None:
+    """Tests that no more conversions than allowed run at once on a backend."""
+    lock = threading.Lock()
+    running = [0]
+    peak = [0]
+
+    def convert() -> None:
+        with conversion_executor.limit(ConversionBackend.LIBREOFFICE):
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            time.sleep(0.02)
+            with lock:
+                running[0] -= 1
+
+    conversion_executor.run([(ConversionBackend.LIBREOFFICE, convert) for _ in range(6)])
+
+    assert peak[0] == 2
+
+
+def test_conversion_executor_propagates_errors(conversion_executor: ConversionExecutor) -> None:
+    """Tests that an unexpected error in a task is raised to the caller."""
+
+    def fail() -> None:
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError, match="boom"):
+        conversion_executor.run([(ConversionBackend.IMAGEIO, fail)])
@@ -1,12 +1,14 @@
 """Unit tests for the pre-analysis service functions."""
 
 from collections.abc import Generator
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date
 from typing import Any
 from unittest.mock import MagicMock, patch
 from uuid import uuid4
 
 import pytest
+from public_detective.models.pre_analysis_checkpoints import PreAnalysisCheckpoint
 from public_detective.models.procurements import Procurement
 from public_detective.providers.ai import AiProvider
 from public_detective.providers.gcs import GcsProvider
@@ -14,9 +16,11 @@ from public_detective.providers.pubsub import PubSubProvider
 from public_detective.repositories.analyses import AnalysisRepository
 from public_detective.repositories.budget_ledgers import BudgetLedgerRepository
 from public_detective.repositories.file_records import FileRecordsRepository
+from public_detective.repositories.pre_analysis_checkpoints import PreAnalysisCheckpointRepository
 from public_detective.repositories.procurements import ProcurementsRepository
 from public_detective.repositories.source_documents import SourceDocumentsRepository
 from public_detective.repositories.status_histories import StatusHistoryRepository
+from public_detective.services import analysis as analysis_module
 from public_detective.services.analysis import AnalysisService
 
 
@@ -65,10 +69,104 @@ def test_run_pre_analysis_no_procurements_found(mock_dependencies: dict) -> None
     # Consume the generator to trigger the logic
     list(service.run_pre_analysis(start_date, end_date, 100, 60, None))
 
-    service.procurement_repo.get_updated_procurements_with_raw_data.assert_called_once_with(target_date=start_date)
+    service.procurement_repo.get_updated_procurements_with_raw_data.assert_called_once_with(
+        target_date=start_date, resume_after=None
+    )
     service.analysis_repo.create_pre_analysis_record.assert_not_called()
 
 
+def _procurement(control_number: str) -> MagicMock:
+    """Creates a procurement mock with the given control number.
+
+    Args:
+        control_number: The PNCP control number of the procurement.
+
+    Returns:
+        The procurement mock.
+    """
+    procurement = MagicMock(spec=Procurement)
+    procurement.pncp_control_number = control_number
+    return procurement
+
+
+def test_run_pre_analysis_records_checkpoints(mock_dependencies: dict) -> None:
+    """Tests that a fresh run checkpoints each procurement, page and day."""
+    checkpoint_repo = MagicMock(spec=PreAnalysisCheckpointRepository)
+    service = AnalysisService(**mock_dependencies, pre_analysis_checkpoint_repo=checkpoint_repo)
+    day = date(2025, 1, 1)
+
+    def mock_generator(*_args: Any, **_kwargs: Any) -> Generator[Any, Any, None]:
+        yield "search_started", (3550308, 6)
+        yield "modality_started", "ELECTRONIC_REVERSE_AUCTION"
+        yield "pages_total", 1
+        yield "procurements_page", (_procurement("PN-1"), {})
+        yield "procurements_page", (_procurement("PN-2"), {})
+        yield "page_fetched", 1
+
+    service.procurement_repo.get_updated_procurements_with_raw_data.side_effect = mock_generator
+
+    with patch.object(service, "_pre_analyze_procurement"):
+        list(service.run_pre_analysis(day, day, 100, 0))
+
+    checkpoint_repo.get_checkpoint.assert_not_called()
+    checkpoint_repo.start_run.assert_called_once_with(day, day)
+    assert [call.args[3] for call in checkpoint_repo.mark_processed.call_args_list] == ["PN-1", "PN-2"]
+    checkpoint_repo.save_page.assert_called_once_with(day, day, day, 3550308, 6, 1)
+    checkpoint_repo.save_completed_day.assert_called_once_with(day, day, day)
+
+
+def test_run_pre_analysis_resumes_from_checkpoint(mock_dependencies: dict) -> None:
+    """Tests that a resumed run skips completed days, pages and procurements."""
+    checkpoint_repo = MagicMock(spec=PreAnalysisCheckpointRepository)
+    start_date = date(2025, 1, 1)
+    end_date = date(2025, 1, 30)
+    checkpoint_repo.get_checkpoint.return_value = PreAnalysisCheckpoint(
+        start_date=start_date,
+        end_date=end_date,
+        last_completed_date=date(2025, 1, 16),
+        page_date=date(2025, 1, 17),
+        city_code=3550308,
+        modality=6,
+        page=3,
+    )
+    checkpoint_repo.get_processed_control_numbers.side_effect = lambda *_args: {"PN-1"}
+    service = AnalysisService(**mock_dependencies, pre_analysis_checkpoint_repo=checkpoint_repo)
+
+    def mock_generator(*_args: Any, **_kwargs: Any) -> Generator[Any, Any, None]:
+        yield "procurements_page", (_procurement("PN-1"), {})
+        yield "procurements_page", (_procurement("PN-2"), {})
+
+    service.procurement_repo.get_updated_procurements_with_raw_data.side_effect = mock_generator
+
+    with patch.object(service, "_pre_analyze_procurement") as mock_pre_analyze:
+        events = list(service.run_pre_analysis(start_date, end_date, 100, 0, resume=True))
+
+    checkpoint_repo.start_run.assert_not_called()
+    days = [data[0] for event, data in events if event == "day_started"]
+    assert days[0] == date(2025, 1, 17)
+    assert len(days) == 14
+    fetch_calls = service.procurement_repo.get_updated_procurements_with_raw_data.call_args_list
+    assert fetch_calls[0].kwargs == {"target_date": date(2025, 1, 17), "resume_after": (3550308, 6, 3)}
+    assert fetch_calls[1].kwargs == {"target_date": date(2025, 1, 18), "resume_after": None}
+    pre_analyzed = [call.args[0].pncp_control_number for call in mock_pre_analyze.call_args_list]
+    assert pre_analyzed.count("PN-1") == 0
+    assert pre_analyzed.count("PN-2") == 14
+
+
+def test_run_pre_analysis_resume_without_checkpoint_starts_over(mock_dependencies: dict) -> None:
+    """Tests that resuming a run that has no checkpoint starts from the first day."""
+    checkpoint_repo = MagicMock(spec=PreAnalysisCheckpointRepository)
+    checkpoint_repo.get_checkpoint.return_value = None
+    service = AnalysisService(**mock_dependencies, pre_analysis_checkpoint_repo=checkpoint_repo)
+    service.procurement_repo.get_updated_procurements_with_raw_data.return_value = []
+    day = date(2025, 1, 1)
+
+    events = list(service.run_pre_analysis(day, day, 100, 0, resume=True))
+
+    checkpoint_repo.start_run.assert_called_once_with(day, day)
+    assert events[0] == ("day_started", (day, 1))
+
+
 def test_pre_analyze_procurement_idempotency(mock_dependencies: dict, mock_procurement: Procurement) -> None:
     """
     Tests that _pre_analyze_procurement skips processing if a procurement
@@ -100,3 +198,67 @@ def test_pre_analyze_procurement_existing_hash(mock_dependencies: dict, mock_pro
         assert any("already exists. Skipping." in call.args[0] for call in mock_logger.info.call_args_list)
 
     service.procurement_repo.save_procurement_version.assert_not_called()
+
+
+def test_run_pre_analysis_with_workers_uses_process_pool(mock_dependencies: dict, monkeypatch: Any) -> None:
+    """Tests that several workers pre-analyze each batch on the pool and pause between batches."""
+    service = AnalysisService(**mock_dependencies, gcs_path_prefix="prefix")
+    procurements = [_procurement(f"PN-{index}") for index in range(4)]
+
+    def mock_generator(*_args: Any, **_kwargs: Any) -> Generator[Any, Any, None]:
+        for procurement in procurements:
+            yield "procurements_page", (procurement, {})
+
+    service.procurement_repo.get_updated_procurements_with_raw_data.side_effect = mock_generator
+    pools: list[ThreadPoolExecutor] = []
+
+    def fake_pool(max_workers: int, **kwargs: Any) -> ThreadPoolExecutor:
+        assert kwargs["mp_context"].get_start_method() == "spawn"
+        assert kwargs["initargs"] == ("prefix", 3)
+        pool = ThreadPoolExecutor(max_workers=max_workers)
+        pools.append(pool)
+        return pool
+
+    def fake_job(procurement: MagicMock, _raw_data: dict) -> None:
+        if procurement.pncp_control_number == "PN-1":
+            raise RuntimeError("boom")
+
+    job = MagicMock(side_effect=fake_job)
+    sleep = MagicMock()
+    monkeypatch.setattr("public_detective.services.analysis.ProcessPoolExecutor", fake_pool)
+    monkeypatch.setattr("public_detective.services.analysis._run_pre_analysis_job", job)
+    monkeypatch.setattr("public_detective.services.analysis.time.sleep", sleep)
+
+    events = list(service.run_pre_analysis(date(2025, 1, 1), date(2025, 1, 1), 2, 5, workers=2))
+
+    assert len(pools) == 1
+    assert pools[0]._shutdown
+    assert job.call_count == 4
+    processed = [data[0].pncp_control_number for event, data in events if event == "procurement_processed"]
+    assert sorted(processed) == ["PN-0", "PN-2", "PN-3"]
+    sleep.assert_called_once_with(5)
+    assert [call.args for call in service.http_provider.share_rate_limit.call_args_list] == [(3,), (1,)]
+
+
+def test_run_pre_analysis_job_requires_initialized_worker() -> None:
+    """Tests that a pool job fails clearly when its worker has no service."""
+    with pytest.raises(RuntimeError, match="not initialized"):
+        analysis_module._run_pre_analysis_job(MagicMock(), {})
+
+
+def test_initialize_pre_analysis_worker_builds_service(monkeypatch: Any) -> None:
+    """Tests that a worker process builds its own service and runs jobs with it."""
+    for name in ("DatabaseManager", "PubSubProvider", "HttpProvider", "AiProvider", "GcsProvider"):
+        monkeypatch.setattr(f"public_detective.services.analysis.{name}", MagicMock())
+    monkeypatch.setattr(analysis_module, "_pre_analysis_worker_service", None)
+
+    analysis_module._initialize_pre_analysis_worker("prefix", 3)
+    service = analysis_module._pre_analysis_worker_service
+    assert service is not None
+    assert service.gcs_path_prefix == "prefix"
+    service.http_provider.share_rate_limit.assert_called_once_with(3)
+
+    procurement = _procurement("PN-1")
+    with patch.object(service, "_pre_analyze_procurement") as mock_pre_analyze:
+        analysis_module._run_pre_analysis_job(procurement, {"k": "v"})
+    mock_pre_analyze.assert_called_once_with(procurement, {"k": "v"})
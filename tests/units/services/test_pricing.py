@@ -28,6 +28,10 @@ def pricing_service() -> Generator[PricingService, Any, None]:
         mock_config.GCP_GEMINI_VIDEO_INPUT_LONG_COST = Decimal("0.008")
         mock_config.GCP_GEMINI_TEXT_OUTPUT_LONG_COST = Decimal("0.003")
 
+        # Cached input costs
+        mock_config.GCP_GEMINI_CACHED_INPUT_COST = Decimal("0.00035")
+        mock_config.GCP_GEMINI_CACHED_INPUT_LONG_COST = Decimal("0.0007")
+
         mock_config.GCP_GEMINI_LONG_CONTEXT_THRESHOLD = 128000
         mock_config.GCP_GEMINI_SEARCH_QUERY_COST = Decimal("14.00")
 
@@ -180,3 +184,30 @@ def test_calculate_search_cost(pricing_service: PricingService) -> None:
     assert thinking_cost == expected_thinking
     assert search_cost == expected_search
     assert total_cost == expected_input + expected_output + expected_thinking + expected_search
+
+
+@pytest.mark.parametrize(
+    "input_tokens, input_cost_per_million, cached_cost_per_million",
+    [
+        (100_000, Decimal("0.0035"), Decimal("0.00035")),
+        (300_000, Decimal("0.007"), Decimal("0.0007")),
+    ],
+)
+def test_calculate_cached_input_tokens(
+    pricing_service: PricingService,
+    input_tokens: int,
+    input_cost_per_million: Decimal,
+    cached_cost_per_million: Decimal,
+) -> None:
+    """Tests that cached input tokens are billed at the cached rate and the rest at the input rate."""
+    cached_tokens = 40_000
+
+    input_cost, _, _, _, total_cost = pricing_service.calculate_total_cost(
+        input_tokens, 0, 0, Modality.TEXT, cached_input_tokens=cached_tokens
+    )
+
+    expected_input = (Decimal(input_tokens - cached_tokens) / 1_000_000) * input_cost_per_million + (
+        Decimal(cached_tokens) / 1_000_000
+    ) * cached_cost_per_million
+    assert input_cost == expected_input
+    assert total_cost == expected_input
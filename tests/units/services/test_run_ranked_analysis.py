@@ -105,12 +105,14 @@ def test_run_ranked_analysis_temporal_filter(analysis_service: AnalysisService)
         analysis_id=uuid.uuid4(),
         procurement_control_number="PCN1",
         version_number=1,
+        input_tokens_estimated=False,
         total_cost=Decimal("10"),
     )
     mock_analysis_outside_window = MagicMock(
         analysis_id=uuid.uuid4(),
         procurement_control_number="PCN2",
         version_number=1,
+        input_tokens_estimated=False,
         total_cost=Decimal("10"),
     )
     analysis_service.analysis_repo.get_pending_analyses_ranked.return_value = [
@@ -161,18 +163,21 @@ def test_run_ranked_analysis_proportional_allocation(analysis_service: AnalysisS
         analysis_id=uuid.uuid4(),
         procurement_control_number="PCN1",
         version_number=1,
+        input_tokens_estimated=False,
         total_cost=Decimal("10"),
     )
     mock_analysis_city_a_secondary = MagicMock(
         analysis_id=uuid.uuid4(),
         procurement_control_number="PCN2",
         version_number=1,
+        input_tokens_estimated=False,
         total_cost=Decimal("10"),
     )
     mock_analysis_city_b_primary = MagicMock(
         analysis_id=uuid.uuid4(),
         procurement_control_number="PCN3",
         version_number=1,
+        input_tokens_estimated=False,
         total_cost=Decimal("10"),
     )
     analysis_service.analysis_repo.get_pending_analyses_ranked.return_value = [
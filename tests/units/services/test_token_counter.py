@@ -0,0 +1,99 @@
+"""Unit tests for the TokenCounter."""
+
+from unittest.mock import MagicMock
+
+from public_detective.services.token_counter import TokenCounter
+
+
+def test_count_file_asks_the_model_once_per_uri() -> None:
+    """Tests that a file is only counted by the model the first time."""
+    ai_provider = MagicMock()
+    ai_provider.count_tokens_for_file.side_effect = lambda uri: {"gs://b/a.pdf": 10, "gs://b/b.pdf": 20}[uri]
+    counter = TokenCounter(ai_provider)
+
+    assert counter.count_files(["gs://b/a.pdf", "gs://b/b.pdf"]) == 30
+    assert counter.count_files(["gs://b/a.pdf"]) == 10
+    assert ai_provider.count_tokens_for_file.call_count == 2
+
+
+def test_remember_skips_the_model() -> None:
+    """Tests that a count known from elsewhere is used without a model call."""
+    ai_provider = MagicMock()
+    counter = TokenCounter(ai_provider)
+
+    counter.remember("gs://b/a.pdf", 7)
+
+    assert counter.count_file("gs://b/a.pdf") == 7
+    ai_provider.count_tokens_for_file.assert_not_called()
+
+
+def test_memo_keeps_most_recently_used_uris() -> None:
+    """Tests that the least recently used counts are forgotten beyond the limit."""
+    ai_provider = MagicMock()
+    ai_provider.count_tokens_for_file.return_value = 5
+    counter = TokenCounter(ai_provider)
+    counter._MAX_MEMOIZED_URIS = 2
+
+    counter.count_file("a")
+    counter.count_file("b")
+    counter.count_file("a")
+    counter.count_file("c")
+    counter.count_file("a")
+    counter.count_file("b")
+
+    assert [call.args[0] for call in ai_provider.count_tokens_for_file.call_args_list] == ["a", "b", "c", "b"]
+
+
+def test_count_prompt_and_request() -> None:
+    """Tests that prompts and final requests are counted by the model as a whole."""
+    ai_provider = MagicMock()
+    ai_provider.count_tokens_for_analysis.side_effect = [(100, 0, 0), (130, 0, 0)]
+    counter = TokenCounter(ai_provider)
+
+    assert counter.count_prompt("prompt") == 100
+    assert counter.count_request("prompt", ["gs://b/a.pdf"]) == 130
+    ai_provider.count_tokens_for_analysis.assert_any_call("prompt", [])
+    ai_provider.count_tokens_for_analysis.assert_called_with("prompt", ["gs://b/a.pdf"])
+
+
+def test_register_contents_uses_stored_counts() -> None:
+    """Tests that contents already counted by the model are not counted again."""
+    ai_provider = MagicMock()
+    token_count_repo = MagicMock()
+    token_count_repo.get_token_counts.return_value = {("hash-a", "application/pdf"): 42}
+    counter = TokenCounter(ai_provider, token_count_repo)
+
+    counter.register_contents({"gs://b/a.pdf": "hash-a"})
+
+    assert counter.count_file("gs://b/a.pdf") == 42
+    token_count_repo.get_token_counts.assert_called_once_with(counter.model, [("hash-a", "application/pdf")])
+    ai_provider.count_tokens_for_file.assert_not_called()
+    token_count_repo.save_token_count.assert_not_called()
+
+
+def test_count_file_saves_registered_contents() -> None:
+    """Tests that counting a registered content stores its count once."""
+    ai_provider = MagicMock()
+    ai_provider.count_tokens_for_file.return_value = 15
+    token_count_repo = MagicMock()
+    token_count_repo.get_token_counts.return_value = {}
+    counter = TokenCounter(ai_provider, token_count_repo)
+
+    counter.register_contents({"gs://b/a.png": "hash-a"})
+    counter.count_file("gs://b/a.png")
+    counter.count_file("gs://b/a.png")
+    counter.count_file("gs://b/unregistered.pdf")
+
+    token_count_repo.save_token_count.assert_called_once_with(counter.model, "hash-a", "image/png", 15)
+
+
+def test_register_contents_without_repository() -> None:
+    """Tests that contents are counted with the model when counts are not persisted."""
+    ai_provider = MagicMock()
+    ai_provider.count_tokens_for_file.return_value = 3
+    counter = TokenCounter(ai_provider)
+
+    counter.register_contents({"gs://b/a.pdf": "hash-a"})
+
+    assert counter.count_file("gs://b/a.pdf") == 3
+    ai_provider.count_tokens_for_file.assert_called_once_with("gs://b/a.pdf")
@@ -0,0 +1,220 @@
+"""Unit tests for the TokenEstimator."""
+
+import io
+import subprocess  # nosec B404
+import wave
+import zlib
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import imageio_ffmpeg
+import numpy as np
+import pytest
+from PIL import Image
+from public_detective.models.candidates import AIFileCandidate
+from public_detective.models.file_contents import FileContent
+from public_detective.services.token_estimator import (
+    TokenEstimator,
+    count_pdf_pages,
+    estimate_image_tokens,
+    estimate_video_tokens,
+)
+
+
+@pytest.fixture
+def estimator() -> TokenEstimator:
+    """Provides a TokenEstimator with a mocked analysis repository."""
+    config = MagicMock(TOKEN_ESTIMATION_CALIBRATION_SAMPLES=100)
+    return TokenEstimator(MagicMock(), config)
+
+
+def _png_bytes(width: int, height: int) -> bytes:
+    """Builds a PNG image.
+
+    Args:
+        width: The width of the image.
+        height: The height of the image.
+
+    Returns:
+        The content of the PNG.
+    """
+    with io.BytesIO() as buffer:
+        Image.new("RGB", (width, height)).save(buffer, format="PNG")
+        return buffer.getvalue()
+
+
+def _wav_bytes(seconds: int) -> bytes:
+    """Builds a silent mono WAV file.
+
+    Args:
+        seconds: The duration of the audio.
+
+    Returns:
+        The content of the WAV.
+    """
+    with io.BytesIO() as buffer:
+        with wave.open(buffer, "wb") as wav_file:
+            wav_file.setnchannels(1)
+            wav_file.setsampwidth(2)
+            wav_file.setframerate(8000)
+            wav_file.writeframes(b"\0\0" * 8000 * seconds)
+        return buffer.getvalue()
+
+
+def _mp3_bytes(tmp_path: Path, seconds: int) -> bytes:
+    """Encodes a silent MP3 file with FFmpeg.
+
+    Args:
+        tmp_path: The directory the MP3 is written to.
+        seconds: The duration of the audio.
+
+    Returns:
+        The content of the MP3.
+    """
+    mp3_path = tmp_path / "silence.mp3"
+    subprocess.run(  # nosec B603
+        [
+            imageio_ffmpeg.get_ffmpeg_exe(),
+            "-hide_banner",
+            "-loglevel",
+            "error",
+            "-f",
+            "lavfi",
+            "-i",
+            "anullsrc=r=8000:cl=mono",
+            "-t",
+            str(seconds),
+            "-c:a",
+            "libmp3lame",
+            "-b:a",
+            "8k",
+            str(mp3_path),
+        ],
+        check=True,
+    )
+    return mp3_path.read_bytes()
+
+
+def _mp4_bytes(tmp_path: Path, seconds: int) -> bytes:
+    """Encodes a black MP4 video at one frame per second.
+
+    Args:
+        tmp_path: The directory the MP4 is written to.
+        seconds: The duration of the video.
+
+    Returns:
+        The content of the MP4.
+    """
+    mp4_path = tmp_path / "video.mp4"
+    writer = imageio_ffmpeg.write_frames(str(mp4_path), (16, 16), fps=1, ffmpeg_log_level="error")
+    writer.send(None)
+    for _ in range(seconds):
+        writer.send(np.zeros((16, 16, 3), dtype=np.uint8))
+    writer.close()
+    return mp4_path.read_bytes()
+
+
+def test_estimate_image_tokens() -> None:
+    """Tests that small images cost one tile and larger ones a tile per 768 pixels."""
+    assert estimate_image_tokens(384, 200) == 258
+    assert estimate_image_tokens(1536, 1000) == 4 * 258
+    assert estimate_image_tokens(3000, 2000) == 12 * 258
+
+
+def test_estimate_video_tokens() -> None:
+    """Tests that videos cost one tile per started second."""
+    assert estimate_video_tokens(0.2) == 258
+    assert estimate_video_tokens(2.5) == 3 * 258
+
+
+def test_count_pdf_pages_from_page_tree() -> None:
+    """Tests that the count of the root page tree wins over nested ones."""
+    pdf = (
+        b"%PDF-1.4\n1 0 obj << /Type /Pages /Kids [2 0 R 3 0 R] /Count 5 >> endobj\n"
+        b"2 0 obj << /Type /Pages /Parent 1 0 R /Count 2 >> endobj\n"
+        b"4 0 obj << /Type /Page /Parent 2 0 R >> endobj\n"
+    )
+
+    assert count_pdf_pages(pdf) == 5
+
+
+def test_count_pdf_pages_from_page_objects() -> None:
+    """Tests that page objects are counted when no page tree declares a count."""
+    pdf = b"%PDF-1.4\n1 0 obj << /Type /Page >> endobj\n2 0 obj << /Type/Page >> endobj\n"
+
+    assert count_pdf_pages(pdf) == 2
+
+
+def test_count_pdf_pages_in_compressed_streams() -> None:
+    """Tests that pages kept in compressed object streams are found."""
+    object_stream = zlib.compress(b"<< /Type /Pages /Kids [4 0 R 5 0 R 6 0 R] /Count 3 >>")
+    pdf = b"%PDF-1.5\n1 0 obj << /Type /ObjStm /Filter /FlateDecode >> stream\n" + object_stream + b"endstream\n"
+
+    assert count_pdf_pages(pdf) == 3
+
+
+def test_estimate_file_by_type(estimator: TokenEstimator) -> None:
+    """Tests that PDFs, images and texts are measured by pages, pixels and characters."""
+    pdf = b"%PDF-1.4\n<< /Type /Pages /Count 4 >>"
+
+    assert estimator.estimate_file("edital.pdf", pdf) == 4 * 258
+    assert estimator.estimate_file("foto.png", _png_bytes(800, 400)) == 2 * 258
+    assert estimator.estimate_file("dados.csv", b"a" * 10) == 3
+    assert estimator.estimate_file("corrompido.png", b"abcd") == 1
+
+
+def test_estimate_file_for_wav_reads_header(estimator: TokenEstimator) -> None:
+    """Tests that a WAV file is measured by the duration in its header, without FFmpeg."""
+    with patch("public_detective.services.token_estimator.subprocess.run") as mock_run:
+        assert estimator.estimate_file("audio.wav", _wav_bytes(30)) == 30 * 32
+    mock_run.assert_not_called()
+
+
+def test_estimate_file_for_audio_only_mp3(estimator: TokenEstimator, tmp_path: Path) -> None:
+    """Tests that an audio-only MP3 is measured by its duration rather than as text."""
+    # The encoder may pad the stream slightly past 30 seconds.
+    assert 30 * 32 <= estimator.estimate_file("audio.mp3", _mp3_bytes(tmp_path, 30)) <= 31 * 32
+
+
+def test_estimate_file_for_video(estimator: TokenEstimator, tmp_path: Path) -> None:
+    """Tests that a video is measured by its duration."""
+    assert estimator.estimate_file("video.mp4", _mp4_bytes(tmp_path, 3)) == 3 * 258
+
+
+def test_estimate_file_for_unreadable_audio(estimator: TokenEstimator) -> None:
+    """Tests that audio whose duration cannot be read is estimated as text."""
+    assert estimator.estimate_file("audio.wav", b"RIFF") == 1
+
+
+def test_estimate_candidate_reusing_stored_content(estimator: TokenEstimator) -> None:
+    """Tests that a candidate reusing a converted stored content uses the estimate saved with it."""
+    docx = b"PK\x03\x04" + b"\x00" * 36_000
+    candidate = AIFileCandidate(
+        synthetic_id="1",
+        raw_document_metadata={},
+        original_path="edital.docx",
+        original_content=docx,
+        ai_path="edital.pdf",
+        estimated_tokens=258,
+        stored_content=FileContent(
+            content_hash="h", extension=".docx", size_bytes=len(docx), original_gcs_path="p", estimated_tokens=258
+        ),
+    )
+
+    assert estimator.estimate_candidate(candidate) == 258
+
+
+def test_calibration_factor_is_computed_once(estimator: TokenEstimator) -> None:
+    """Tests that estimates are scaled by the ratio of exact to estimated tokens."""
+    estimator.analysis_repo.get_token_estimation_samples.return_value = [(100, 150), (100, 250)]
+
+    assert estimator.calibrate(10) == 20
+    assert estimator.calibrate(3) == 6
+    estimator.analysis_repo.get_token_estimation_samples.assert_called_once_with(100)
+
+
+def test_calibration_factor_without_samples(estimator: TokenEstimator) -> None:
+    """Tests that estimates are used as is until there are analyses to calibrate against."""
+    estimator.analysis_repo.get_token_estimation_samples.return_value = []
+
+    assert estimator.get_calibration_factor() == 1.0
@@ -1,6 +1,8 @@
+import asyncio
 import json
+from concurrent.futures import Future, wait
 from typing import Any
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 from google.api_core.exceptions import GoogleAPICallError
@@ -43,6 +45,17 @@ def test_process_message_success(subscription: Subscription, mock_message: Magic
     mock_message.nack.assert_not_called()
 
 
+def test_process_message_logs_connection_reuse(subscription: Subscription, mock_message: MagicMock) -> None:
+    """Tests that the HTTP connection reuse counters are logged after each message."""
+    subscription.http_provider.get_connection_stats.return_value = {"requests": 5, "connections": 1, "reused": 4}
+    subscription.logger = MagicMock()
+
+    subscription._process_message(mock_message, max_output_tokens=None)
+
+    logged = [call.args[0] for call in subscription.logger.info.call_args_list]
+    assert "HTTP connection reuse: 5 requests over 1 connections (4 reused)." in logged
+
+
 def test_process_message_validation_error(subscription: Subscription) -> None:
     """Tests that a message with invalid data is NACKed."""
     invalid_message = MagicMock()
@@ -317,3 +330,91 @@ def test_run_worker_cleanup_on_exception_during_result_wait(subscription: Subscr
 
     assert future.cancel.call_count == 1
     assert future.result.call_count == 2
+
+
+def test_process_message_async_success(subscription: Subscription, mock_message: MagicMock) -> None:
+    """Tests that the async path awaits the service with the worker's AI semaphore and ACKs."""
+    subscription.analysis_service.process_analysis_from_message_async = AsyncMock()
+
+    async def run() -> None:
+        subscription._ai_semaphore = asyncio.Semaphore(1)
+        await subscription._process_message_async(mock_message, max_output_tokens=100)
+
+    asyncio.run(run())
+
+    subscription.analysis_service.process_analysis_from_message_async.assert_awaited_once_with(
+        "123", subscription._ai_semaphore, max_output_tokens=100
+    )
+    mock_message.ack.assert_called_once()
+    mock_message.nack.assert_not_called()
+
+
+def test_process_message_async_analysis_error(subscription: Subscription, mock_message: MagicMock) -> None:
+    """Tests that an AnalysisError on the async path results in a NACK."""
+    subscription.analysis_service.process_analysis_from_message_async = AsyncMock(side_effect=AnalysisError("Boom"))
+
+    async def run() -> None:
+        subscription._ai_semaphore = asyncio.Semaphore(1)
+        await subscription._process_message_async(mock_message)
+
+    asyncio.run(run())
+
+    mock_message.nack.assert_called_once()
+    mock_message.ack.assert_not_called()
+
+
+def test_run_worker_async_mode(subscription: Subscription, mock_message: MagicMock, monkeypatch: Any) -> None:
+    """Tests that async mode leases more messages, processes them on the loop and drains it on shutdown."""
+    monkeypatch.setattr(subscription.config, "WORKER_ASYNC_MODE", True)
+    monkeypatch.setattr(subscription.config, "WORKER_ASYNC_MAX_MESSAGES", 10)
+    monkeypatch.setattr(subscription.config, "WORKER_ASYNC_MAX_AI_CALLS", 2)
+    subscription.analysis_service.process_analysis_from_message_async = AsyncMock()
+    future = MagicMock()
+    future.cancelled.return_value = True
+
+    def subscribe(_: str, callback: Any, flow_control: Any) -> MagicMock:
+        future.result.side_effect = lambda timeout=None: callback(mock_message)
+        return future
+
+    subscription.pubsub_provider.subscribe.side_effect = subscribe
+
+    subscription.run()
+
+    flow_control = subscription.pubsub_provider.subscribe.call_args.kwargs["flow_control"]
+    assert flow_control.max_messages == 10
+    subscription.analysis_service.process_analysis_from_message.assert_not_called()
+    subscription.analysis_service.process_analysis_from_message_async.assert_awaited_once()
+    mock_message.ack.assert_called_once()
+    assert subscription._loop is None
+    assert not subscription._pending_messages
+
+
+def test_stop_event_loop_waits_for_messages_submitted_while_draining(
+    subscription: Subscription, mock_message: MagicMock
+) -> None:
+    """Tests that a message scheduled while the loop drains is processed before the loop stops."""
+    late_message = MagicMock()
+    late_message.data = json.dumps({"analysis_id": "456"}).encode("utf-8")
+
+    async def process(analysis_id: str, *_: Any, **__: Any) -> None:
+        if analysis_id == "456":
+            await asyncio.sleep(0.2)
+
+    subscription.analysis_service.process_analysis_from_message_async = AsyncMock(side_effect=process)
+    subscription._start_event_loop()
+    subscription._submit_message(mock_message)
+
+    def wait_and_submit(futures: list[Future]) -> Any:
+        if late_message not in submitted:
+            submitted.append(late_message)
+            subscription._submit_message(late_message)
+        return wait(futures)
+
+    submitted: list[MagicMock] = []
+    with patch("public_detective.worker.subscription.wait", side_effect=wait_and_submit):
+        subscription._stop_event_loop()
+
+    mock_message.ack.assert_called_once()
+    late_message.ack.assert_called_once()
+    assert subscription._loop is None
+    assert not subscription._pending_messages